@@ -52,7 +52,7 @@ def segment_index(model, segment_name):
 def markers_to_array(model, q: np.ndarray) -> np.ndarray:
     """
     Get all markers position from a position q in the format (3 x NMarker x NTime).
-    This function probably only works with the Eigen backend
+    With the Eigen backend, all the frames are computed at once. Otherwise, the frames are computed one at a time
 
     Parameters
     ----------
@@ -66,6 +66,9 @@ def markers_to_array(model, q: np.ndarray) -> np.ndarray:
     The markers position in the format (3 x NMarker x NTime)
     """
 
+    if biorbd.currentLinearAlgebraBackend() == 0:
+        return model.markersBatch(q)
+
     markers = np.ndarray((3, model.nbMarkers(), q.shape[1]))
     for i, q_tp in enumerate(q.T):
         markers[:, :, i] = np.array([mark.to_array() for mark in model.markers(q_tp)]).T
@@ -105,26 +108,40 @@ def extended_kalman_filter(model: biorbd.Model, trial: str) -> tuple[np.ndarray,
     params = biorbd.KalmanParam(freq)
     kalman = biorbd.KalmanReconsMarkers(model, params)
 
-    # Perform the kalman filter for each frame (the first frame is much longer than the next)
-    q = biorbd.GeneralizedCoordinates(model)
-    qdot = biorbd.GeneralizedVelocity(model)
-    qddot = biorbd.GeneralizedAcceleration(model)
+    # Perform the kalman filter for all the frames (the first frame is much longer than the next)
     frame_rate = c3d["header"]["points"]["frame_rate"]
     first_frame = c3d["header"]["points"]["first_frame"]
     last_frame = c3d["header"]["points"]["last_frame"]
     t = np.linspace(first_frame / frame_rate, last_frame / frame_rate, n_frames)
-    q_out = np.ndarray((model.nbQ(), n_frames))
-    qdot_out = np.ndarray((model.nbQdot(), n_frames))
-    qddot_out = np.ndarray((model.nbQddot(), n_frames))
-    for i in range(n_frames):
-        kalman.reconstructFrame(model, np.reshape(markers_in_c3d[:, :, i].T, -1), q, qdot, qddot)
-        q_out[:, i] = q.to_array()
-        qdot_out[:, i] = qdot.to_array()
-        qddot_out[:, i] = qddot.to_array()
+    q_out, qdot_out, qddot_out = kalman.reconstructTrial(model, markers_in_c3d)
 
     return t, q_out, qdot_out, qddot_out
 
 
+def _solve_inverse_kinematics_chunk(model_path: str, marker_data: np.ndarray, method: str) -> tuple:
+    """
+    Solve the inverse kinematics of a chunk of frames. This is the work done by each process of
+    InverseKinematics.solve when n_workers > 1
+
+    Parameters
+    ----------
+    model_path: str
+        The path of the bioMod to load the model of the worker from
+    marker_data: np.ndarray
+        The position of the markers of the chunk (nb_dim, nb_marker, nb_frame)
+    method: str
+        The method used to solve the chunk (see InverseKinematics.solve)
+
+    Returns
+    -------
+    The generalized coordinates of the chunk and the list of the results of each frame
+    """
+
+    ik = InverseKinematics(biorbd.Model(model_path), marker_data)
+    q = ik.solve(method=method)
+    return q, ik.list_sol
+
+
 class InverseKinematics:
     """
     The class for generate inverse kinematics from c3d files
@@ -147,10 +164,10 @@ class InverseKinematics:
         generalized coordinates
     bounds: tuple(np.ndarray, np.ndarray)
         The min and max ranges of the model Q
-    indices_to_remove: list(list(int))
-        The list of markers index  which have a nan value in xp_markers
-    indices_to_keep: list(list(int))
-        The list of markers index  which have a number value in xp_markers
+    indices_to_remove: np.ndarray
+        The (nb_marker x nb_frame) mask of the markers which have a nan value in xp_markers
+    indices_to_keep: np.ndarray
+        The (nb_marker x nb_frame) mask of the markers which only have number values in xp_markers
     list_sol: list(scipy.OptimizeResult)
         The list of results of least_square function
     output: dict()
@@ -169,7 +186,7 @@ class InverseKinematics:
                 So the markers that have the biggest difference between the model and the c3d for each frame.
             message: list(str)
                 The list of the verbal description of the termination reason of the least_square function for each frame.
-            status: list(int)
+            status: np.ndarray
                 The reason for algorithm termination for each frame
                 -1 : improper input parameters status returned from MINPACK.
                 0 : the maximum number of function evaluations is exceeded.
@@ -177,7 +194,7 @@ class InverseKinematics:
                 2 : ftol termination condition is satisfied.
                 3 : xtol termination condition is satisfied.
                 4 : Both ftol and xtol termination conditions are satisfied.
-            success: list(bool)
+            success: np.ndarray
                 The list of success for each frame. True if one of the convergence criteria is satisfied (status > 0).
     nb_dim: int
         The number of dimension of the model
@@ -185,15 +202,22 @@ class InverseKinematics:
     Methods
     -------
     _get_nan_index(self)
-        Find, for each frame, the index of the markers which has a nan value
+        Find, for each frame, the markers which have a nan value
     _marker_diff(markers_model: np.ndarray, markers_real: np.ndarray)
         Compute the difference between the marker position in the model and the position in the data.
-    _marker_jacobian(self, jacobian_matrix)
+    _marker_jacobian(self, jacobian_matrix, indices_to_keep)
         Generate the Jacobian matrix for each frame.
     optimize(self, n_frame: int, method: str, bounds: tuple() = None)
         Uses least_square function to minimize the difference between markers' positions of model and c3d.
-    solve(self, method: str = "lm")
-        Solve the inverse kinematics by using least_square method from scipy.
+    solve(self, method: str = "lm", n_workers: int = 1, chunk_size: int = None, n_overlap: int = 10,
+          smoothness_weight: float = 0)
+        Solve the inverse kinematics by using least_square method from scipy or the native biorbd solver.
+    _solve_parallel(self, method: str, n_workers: int, chunk_size: int, n_overlap: int)
+        Solve the inverse kinematics by overlapping chunks of frames in worker processes.
+    _solve_trajectory(self, smoothness_weight: float)
+        Solve the inverse kinematics of all the frames jointly with a sparse Jacobian.
+    _solve_native(self)
+        Solve the inverse kinematics of all the frames with the biorbd Levenberg-Marquardt solver.
     sol(self)
         Create and return a dict which contains the output each optimization.
 
@@ -224,8 +248,8 @@ class InverseKinematics:
 
         self.bounds = get_range_q(self.biorbd_model)
 
-        self.indices_to_remove = []
-        self.indices_to_keep = []
+        self.indices_to_remove = None
+        self.indices_to_keep = None
         self._get_nan_index()
 
         self.list_sol = []
@@ -235,11 +259,10 @@ class InverseKinematics:
 
     def _get_nan_index(self):
         """
-        Find, for each frame, the index of the markers which has a nan value
+        Find, for each frame, the markers which have a nan value
         """
-        for j in range(self.nb_frames):
-            self.indices_to_remove.append(list(np.unique(np.isnan(self.xp_markers[:, :, j]).nonzero()[1])))
-            self.indices_to_keep.append(list(np.unique(np.isfinite(self.xp_markers[:, :, j]).nonzero()[1])))
+        self.indices_to_remove = np.any(np.isnan(self.xp_markers), axis=0)
+        self.indices_to_keep = ~self.indices_to_remove
 
     @staticmethod
     def _marker_diff(markers_model: np.ndarray, markers_real: np.ndarray):
@@ -266,28 +289,31 @@ class InverseKinematics:
 
         return vect_pos_markers - np.reshape(markers_real.T, (3 * nb_marker,))
 
-    def _marker_jacobian(self, jacobian_matrix: np.ndarray):
+    def _marker_jacobian(self, jacobian_matrix: np.ndarray, indices_to_keep: np.ndarray):
         """
         Generate the Jacobian matrix for each frame.
 
         Parameters:
         -----------
         jacobian_matrix: np.ndarray
-            The Jacobian matrix of the model
+            The stacked Jacobian matrix of all the technical markers of the model (3 * nb_marker, nb_q)
+        indices_to_keep: np.ndarray
+            The markers to keep for this frame
 
         Return:
         ------
             The Jacobian matrix with right dimension
         """
-        nb_markers = len(jacobian_matrix)
-        jacobian = np.zeros((3 * nb_markers, self.nb_q))
-
-        for m, value in enumerate(jacobian_matrix):
-            jacobian[m * 3 : (m + 1) * 3, :] = value.to_array()
+        return jacobian_matrix.reshape(-1, 3, self.nb_q)[indices_to_keep].reshape(-1, self.nb_q)
 
-        return jacobian
-
-    def solve(self, method: str = "lm"):
+    def solve(
+        self,
+        method: str = "lm",
+        n_workers: int = 1,
+        chunk_size: int = None,
+        n_overlap: int = 10,
+        smoothness_weight: float = 0,
+    ):
         """
         Solve the inverse kinematics by using least_square method from scipy
 
@@ -300,6 +326,11 @@ class InverseKinematics:
             Then, the 'lm' method will be used for the following frames.
             If method = 'trf', the 'trf' method will be used for all the frames.
             If method = 'only_lm', the 'lm' method will be used for all the frames.
+            If method = 'native', the frames are solved in C++ by biorbd using a Levenberg-Marquardt algorithm.
+                It starts from the middle of the ranges of the model for the first frame, like 'trf', and then
+                does not handle bounds, like 'lm'. It is much faster and only works with the Eigen backend.
+            If method = 'trajectory', all the frames are solved jointly by the 'trf' method, in the bounds of the
+                model, with a sparse block-banded Jacobian.
 
             In least_square:
                 -‘trf’ : Trust Region Reflective algorithm, particularly suitable for large sparse problems
@@ -308,12 +339,31 @@ class InverseKinematics:
                 -‘lm’ : Levenberg-Marquardt algorithm as implemented in MINPACK.
                         Doesn’t handle bounds and sparse Jacobians.
                         Usually the most efficient method for small unconstrained problems.
+        n_workers: int
+            The number of processes to solve the trial with. If more than one, the trial is split into chunks that are
+            solved in parallel, each worker loading its own model from model.path()
+        chunk_size: int
+            The number of frames of each chunk. By default, the trial is split evenly between the workers
+        n_overlap: int
+            The number of frames each chunk starts before its first frame. These frames bootstrap the warm start of
+            the chunk and, when the chunks are stitched, the solution with the smallest residual is kept
+        smoothness_weight: float
+            The weight of the difference between consecutive q, only used by the 'trajectory' method
 
         Returns
         ----------
         q : np.array
             generalized coordinates
         """
+        if method == "trajectory":
+            if n_workers > 1:
+                raise ValueError("The 'trajectory' method solves all the frames jointly and cannot use n_workers")
+            return self._solve_trajectory(smoothness_weight)
+        if n_workers > 1:
+            return self._solve_parallel(method, n_workers, chunk_size, n_overlap)
+        if method == "native":
+            return self._solve_native()
+
         initial_bounds = (-np.inf, np.inf) if method == "only_lm" else self.bounds
         initial_method = "lm" if method == "only_lm" else "trf"
 
@@ -321,7 +371,9 @@ class InverseKinematics:
         method = "lm" if method == "only_lm" else method
 
         if method != "lm" and method != "trf" and method != "only_lm":
-            raise ValueError('This method is not implemented please use "trf", "lm" or "only_lm" as argument')
+            raise ValueError(
+                'This method is not implemented please use "trf", "lm", "only_lm", "native" or "trajectory" as argument'
+            )
 
         for f in range(self.nb_frames):
             if initial_method != "lm":
@@ -342,10 +394,10 @@ class InverseKinematics:
                 fun=lambda q, marker_real, indices_to_keep: self._marker_diff(
                     np.array(self.biorbd_model.technicalMarkers(q))[indices_to_keep], marker_real
                 ),
-                args=(self.xp_markers[:, :, f][:, self.indices_to_keep[f]], self.indices_to_keep[f]),
+                args=(self.xp_markers[:, self.indices_to_keep[:, f], f], self.indices_to_keep[:, f]),
                 bounds=initial_bounds if f == 0 else bounds,
-                jac=lambda q, jacobian_matrix, indices_to_keep: self._marker_jacobian(
-                    np.array(self.biorbd_model.technicalMarkersJacobian(q))[indices_to_keep]
+                jac=lambda q, marker_real, indices_to_keep: self._marker_jacobian(
+                    self.biorbd_model.allTechnicalMarkersJacobian(q).to_array(), indices_to_keep
                 ),
                 x0=x0,
                 method=initial_method if f == 0 else method,
@@ -356,6 +408,183 @@ class InverseKinematics:
             self.list_sol.append(sol)
         return self.q
 
+    def _solve_parallel(self, method: str, n_workers: int, chunk_size: int, n_overlap: int):
+        """
+        Solve the inverse kinematics by chunks of frames in worker processes and stitch the chunks together
+
+        Parameters:
+        ----------
+        method: str
+            The method used to solve each chunk (see solve)
+        n_workers: int
+            The number of processes
+        chunk_size: int
+            The number of frames of each chunk. If None, the trial is split evenly between the workers
+        n_overlap: int
+            The number of bootstrap frames solved before each chunk
+
+        Returns
+        ----------
+        q : np.array
+            generalized coordinates
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        if chunk_size is None:
+            chunk_size = int(np.ceil(self.nb_frames / n_workers))
+        if chunk_size < 1 or n_overlap < 0:
+            raise ValueError("chunk_size must be strictly positive and n_overlap must be positive")
+
+        model_path = self.biorbd_model.path().absolutePath().to_string()
+        if not model_path:
+            raise ValueError("Solving with multiple workers requires a model loaded from a file")
+
+        starts = range(0, self.nb_frames, chunk_size)
+        first_frames = [max(start - n_overlap, 0) for start in starts]
+        last_frames = [min(start + chunk_size, self.nb_frames) for start in starts]
+        with ProcessPoolExecutor(max_workers=n_workers) as executor:
+            futures = [
+                executor.submit(_solve_inverse_kinematics_chunk, model_path, self.xp_markers[:, :, first:last], method)
+                for first, last in zip(first_frames, last_frames)
+            ]
+            results = [future.result() for future in futures]
+
+        # The bootstrap frames of a chunk are also solved by the previous chunk, keep the best of the two
+        self.list_sol = [None] * self.nb_frames
+        for first, (q, list_sol) in zip(first_frames, results):
+            for i, sol in enumerate(list_sol):
+                f = first + i
+                if self.list_sol[f] is None or np.sum(sol.fun**2) < np.sum(self.list_sol[f].fun**2):
+                    self.q[:, f] = q[:, i]
+                    self.list_sol[f] = sol
+        return self.q
+
+    def _solve_trajectory(self, smoothness_weight: float):
+        """
+        Solve the inverse kinematics of all the frames jointly. The Jacobian of the problem is block-banded (each frame
+        only depends on its own q, and the smoothness term on two consecutive q) so it is given as a sparse matrix
+
+        Parameters:
+        ----------
+        smoothness_weight: float
+            The weight of the difference between consecutive q
+
+        Returns
+        ----------
+        q : np.array
+            generalized coordinates
+        """
+        from scipy import sparse
+
+        nb_q = self.nb_q
+        nb_frames = self.nb_frames
+        mask = self.indices_to_keep
+        nb_rows_per_frame = np.sum(mask, axis=0) * self.nb_dim
+        first_rows = np.concatenate(([0], np.cumsum(nb_rows_per_frame)))
+        nb_marker_rows = first_rows[-1]
+        nb_smoothness_rows = nb_q * (nb_frames - 1) if smoothness_weight else 0
+        shape = (nb_marker_rows + nb_smoothness_rows, nb_q * nb_frames)
+        xp_markers = self.xp_markers.transpose(2, 1, 0)[mask.T]  # nb_kept x nb_dim, frame by frame
+
+        # The sparsity pattern only depends on the occlusions, so it is built once
+        marker_rows = np.concatenate(
+            [first_rows[f] + np.repeat(np.arange(nb_rows_per_frame[f]), nb_q) for f in range(nb_frames)]
+        )
+        marker_cols = np.concatenate(
+            [f * nb_q + np.tile(np.arange(nb_q), nb_rows_per_frame[f]) for f in range(nb_frames)]
+        )
+        weight = np.sqrt(smoothness_weight)
+        smoothness_rows = nb_marker_rows + np.tile(np.arange(nb_smoothness_rows), 2)
+        smoothness_cols = np.concatenate((np.arange(nb_smoothness_rows), nb_q + np.arange(nb_smoothness_rows)))
+        smoothness_data = np.concatenate((-np.ones(nb_smoothness_rows), np.ones(nb_smoothness_rows))) * weight
+        rows = np.concatenate((marker_rows, smoothness_rows))
+        cols = np.concatenate((marker_cols, smoothness_cols))
+
+        def residuals(x):
+            q = x.reshape(nb_frames, nb_q).T
+            markers_model = self.biorbd_model.technicalMarkersBatch(q)[: self.nb_dim].transpose(2, 1, 0)[mask.T]
+            markers_diff = (markers_model - xp_markers).reshape(-1)
+            if not nb_smoothness_rows:
+                return markers_diff
+            return np.concatenate((markers_diff, weight * np.diff(q, axis=1).T.reshape(-1)))
+
+        def jacobian(x):
+            q = x.reshape(nb_frames, nb_q).T
+            data = []
+            for f in range(nb_frames):
+                jacobian_frame = self.biorbd_model.allTechnicalMarkersJacobian(q[:, f]).to_array()
+                data.append(jacobian_frame.reshape(-1, 3, nb_q)[mask[:, f], : self.nb_dim, :].reshape(-1))
+            data = np.concatenate(data + [smoothness_data])
+            return sparse.csr_matrix((data, (rows, cols)), shape=shape)
+
+        x0 = np.tile(
+            [(bounds_inf + bounds_sup) / 2 for bounds_inf, bounds_sup in zip(self.bounds[0], self.bounds[1])],
+            nb_frames,
+        )
+        sol = optimize.least_squares(
+            fun=residuals,
+            jac=jacobian,
+            x0=x0,
+            bounds=(np.tile(self.bounds[0], nb_frames), np.tile(self.bounds[1], nb_frames)),
+            method="trf",
+            xtol=1e-6,
+            tr_solver="lsmr",
+        )
+        self.q = sol.x.reshape(nb_frames, nb_q).T
+
+        # Split the joint solution into per-frame results so sol() reports them as for the other methods
+        self.list_sol = [
+            optimize.OptimizeResult(
+                x=self.q[:, f],
+                fun=sol.fun[first_rows[f] : first_rows[f + 1]],
+                nfev=sol.nfev,
+                njev=sol.njev,
+                status=sol.status,
+                message=sol.message,
+                success=sol.success,
+            )
+            for f in range(nb_frames)
+        ]
+        return self.q
+
+    def _solve_native(self):
+        """
+        Solve the inverse kinematics of all the frames with the biorbd Levenberg-Marquardt solver.
+        The per-frame results are stored in list_sol so sol() reports them as for the scipy methods
+
+        Returns
+        ----------
+        q : np.array
+            generalized coordinates
+        """
+        x0 = np.array(
+            [(bounds_inf + bounds_sup) / 2 for bounds_inf, bounds_sup in zip(self.bounds[0], self.bounds[1])]
+        )
+        self.q, residuals_xyz, nfev, njev, status = self.biorbd_model.inverseKinematicsSequence(self.xp_markers, x0)
+
+        messages = {
+            -1: "There is no marker to track.",
+            0: "The maximum number of function evaluations is exceeded.",
+            1: "`gtol` termination condition is satisfied.",
+            2: "`ftol` termination condition is satisfied.",
+            3: "`xtol` termination condition is satisfied.",
+        }
+        self.list_sol = []
+        for f in range(self.nb_frames):
+            fun = residuals_xyz[:, f]
+            self.list_sol.append(
+                optimize.OptimizeResult(
+                    x=self.q[:, f],
+                    fun=fun[np.isfinite(fun)],
+                    nfev=int(nfev[f]),
+                    njev=int(njev[f]),
+                    status=int(status[f]),
+                    message=messages[int(status[f])],
+                    success=bool(status[f] > 0),
+                )
+            )
+        return self.q
+
     def sol(self):
         """
         Create and return a dict that contains the output of each optimization.
@@ -366,29 +595,18 @@ class InverseKinematics:
             The output of least_square function, such as number of iteration per frames,
             and the marker with highest residual
         """
-        residuals_xyz = np.zeros((self.nb_markers * self.nb_dim, self.nb_frames))
-        residuals = np.zeros((self.nb_markers, self.nb_frames))
-        nfev = [sol.nfev for sol in self.list_sol]
-        njev = [sol.njev for sol in self.list_sol]
-
-        for f in range(self.nb_frames):
-            #  residuals_xyz must contains position for each markers on axis x, y and z
-            #  (or less depending on number of dimensions)
-            #  So, if we simply used indices_to_keep or to_remove, it doesn't work because it contains the markers'
-            #  indices [markers 0, markers 4, ...].
-            #  We have to create another list which contains indices for x, y and z
-            # [indices_to_keep or remove for markers 0 on x, indices_to_keep or remove for markers 0 on y, ...]
-            # And that correspond to [0, 1, 2, 4, 5, 6, ...] in our example.
-            indices_to_keep_xyz = [h * self.nb_dim + k for h in self.indices_to_keep[f] for k in range(self.nb_dim)]
-            indices_to_remove_xyz = [h * self.nb_dim + k for h in self.indices_to_remove[f] for k in range(self.nb_dim)]
-
-            # After we get the indices, we put the solution on the residuals
-            residuals_xyz[:, f][indices_to_keep_xyz] = self.list_sol[f].fun
-
-            # The markers that we removed have 0 as position on x, y and z but this is not true.
-            # So we replace it by nan value.
-            residuals_xyz[:, f][indices_to_remove_xyz] = np.nan
-            residuals[:, f] = np.linalg.norm(np.reshape(residuals_xyz[:, f], [self.nb_markers, self.nb_dim]), axis=1)
+        nb_sol = len(self.list_sol)
+        nfev = np.fromiter((sol.nfev for sol in self.list_sol), dtype=int, count=nb_sol)
+        njev = np.fromiter((0 if sol.njev is None else sol.njev for sol in self.list_sol), dtype=int, count=nb_sol)
+        status = np.fromiter((sol.status for sol in self.list_sol), dtype=int, count=nb_sol)
+        success = np.fromiter((sol.success for sol in self.list_sol), dtype=bool, count=nb_sol)
+
+        # residuals_xyz contains x, y and z (or less depending on number of dimensions) of each marker, so the
+        # markers masks are repeated for each axis. The removed markers have no residual, so they are nan
+        residuals_xyz = np.full((self.nb_markers * self.nb_dim, self.nb_frames), np.nan)
+        indices_to_keep_xyz = np.repeat(self.indices_to_keep, self.nb_dim, axis=0)
+        residuals_xyz.T[indices_to_keep_xyz.T] = np.concatenate([sol.fun for sol in self.list_sol])
+        residuals = np.linalg.norm(residuals_xyz.reshape(self.nb_markers, self.nb_dim, self.nb_frames), axis=1)
 
         self.output = dict(
             residuals=residuals,
@@ -397,8 +615,8 @@ class InverseKinematics:
             njev=njev,
             max_marker=[self.marker_names[i] for i in np.argmax(residuals, axis=0)],
             message=[sol.message for sol in self.list_sol],
-            status=[sol.status for sol in self.list_sol],
-            success=[sol.success for sol in self.list_sol],
+            status=status,
+            success=success,
         )
 
         return self.output
@@ -68,6 +68,8 @@ BIORBD_NAMESPACE::utils::String getVersion();
 
 namespace BIORBD_NAMESPACE
 {
+class Reader;
+
 ///
 /// \brief The actual musculoskeletal model that holds everything in biorbd
 ///
@@ -91,6 +93,8 @@ class BIORBD_API Model :
 #endif
     ,public rigidbody::SoftContacts
 {
+    friend Reader;
+
 public:
     ///
     /// \brief Construct an empty model that can be manually filled
@@ -100,10 +104,45 @@ public:
     ///
     /// \brief Construct a model from a bioMod file
     /// \param path The path of the file
+    /// \param lazyMeshes If the mesh files should only be read when their mesh is first accessed
+    ///
+    /// If the environment variable BIORBD_COMPILED_MODEL_CACHE is set (and is not 0),
+    /// the model is read from its compiled version when it is up to date (see
+    /// Reader::readModelFileWithCache), the meshes being stored in it.
+    /// The meshes are also read lazily if the environment variable BIORBD_LAZY_MESHES
+    /// is set (and is not 0), which saves the reading of the mesh files for the
+    /// models that are only used for the dynamics. With the compiled model cache,
+    /// the lazy meshes are read from the compiled version instead of the mesh files.
     ///
     Model(
+        const utils::Path& path,
+        bool lazyMeshes = false);
+
+    ///
+    /// \brief Return a copy of the model that can be used concurrently with this one.
+    /// The structure of the model (segments, markers, etc.) is shared, while the
+    /// kinematic state (RBDL model and constraint set) and the muscles are owned by the copy
+    /// \return A model to use in another thread
+    ///
+    Model workspace() const;
+
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Create a model from a compiled model file (see Reader::readCompiledModel)
+    /// \param path The path of the compiled file
+    /// \return The model, whose path is the one of the bioMod file it was compiled from
+    ///
+    static Model loadCompiled(
         const utils::Path& path);
 
+    ///
+    /// \brief Write the model in the binary compiled format (see Writer::writeCompiledModel)
+    /// \param path The path to write
+    ///
+    void saveCompiled(
+        const utils::Path& path);
+#endif
+
 private:
     std::shared_ptr<utils::Path> m_path;
 public:
@@ -0,0 +1,179 @@
+#ifndef BIORBD_FORWARD_SIMULATION_H
+#define BIORBD_FORWARD_SIMULATION_H
+
+#include <functional>
+#include <vector>
+#include "biorbdConfig.h"
+
+#ifndef BIORBD_USE_CASADI_MATH
+namespace BIORBD_NAMESPACE
+{
+class Model;
+
+namespace utils
+{
+class Vector;
+class Matrix;
+}
+
+///
+/// \brief Forward simulation of a model using explicit Runge-Kutta integrators
+///
+/// The states are stacked as [Q, QDot] (and the muscle activations for the
+/// muscle driven dynamics). Several initial conditions can be simulated at
+/// once, each thread working on its own workspace of the model.
+///
+class BIORBD_API ForwardSimulation
+{
+public:
+    ///
+    /// \brief The dynamics to integrate
+    ///
+    enum DYNAMICS {
+        TORQUE_DRIVEN, ///< The states are [Q, QDot] and the controls are the generalized torques
+        TORQUE_DRIVEN_WITH_CONTACTS, ///< Same as TORQUE_DRIVEN, the rigid contacts of the model being enforced
+        MUSCLE_EXCITATION_DRIVEN ///< The states are [Q, QDot, activations] and the controls are the muscle excitations
+    };
+
+    ///
+    /// \brief The available integrators
+    ///
+    enum INTEGRATOR {
+        RK4, ///< Fixed step Runge-Kutta of order 4
+        RK45 ///< Adaptive Dormand-Prince Runge-Kutta of order 5(4), the output is still sampled at each step
+    };
+
+    ///
+    /// \brief Function that fills the controls (last parameter) from the time and the states
+    ///
+    /// The function is called from the threads of the simulation, so it must be thread-safe
+    ///
+    typedef std::function<void(double, const utils::Vector&, utils::Vector&)> ControlFunction;
+
+    ///
+    /// \brief Construct a forward simulation
+    /// \param model The model to simulate
+    /// \param dynamics The dynamics to integrate
+    /// \param integrator The integrator to use
+    ///
+    ForwardSimulation(
+        Model& model,
+        DYNAMICS dynamics = TORQUE_DRIVEN,
+        INTEGRATOR integrator = RK4);
+
+    ///
+    /// \brief Return the number of states
+    /// \return The number of states
+    ///
+    unsigned int nbStates() const;
+
+    ///
+    /// \brief Return the number of controls
+    /// \return The number of controls
+    ///
+    unsigned int nbControls() const;
+
+    ///
+    /// \brief Set the tolerances of the adaptive integrator
+    /// \param rtol The relative tolerance
+    /// \param atol The absolute tolerance
+    ///
+    void setTolerances(
+        double rtol,
+        double atol);
+
+    ///
+    /// \brief Simulate the model with controls that are constant over each step
+    /// \param initialStates The initial states of each run (nbStates x nRuns)
+    /// \param controls The controls of each step (nbControls x nSteps), shared by all the runs
+    /// \param dt The duration of a step
+    /// \param nbThreads The number of threads to dispatch the runs on
+    /// \return The states of each run (nbStates x nSteps + 1), the first column being the initial states
+    ///
+    std::vector<utils::Matrix> run(
+        const utils::Matrix& initialStates,
+        const utils::Matrix& controls,
+        double dt,
+        unsigned int nbThreads = 1);
+
+    ///
+    /// \brief Simulate the model with controls computed during the integration
+    /// \param initialStates The initial states of each run (nbStates x nRuns)
+    /// \param control The function that computes the controls
+    /// \param nbSteps The number of steps to simulate
+    /// \param dt The duration of a step
+    /// \param nbThreads The number of threads to dispatch the runs on
+    /// \return The states of each run (nbStates x nSteps + 1), the first column being the initial states
+    ///
+    std::vector<utils::Matrix> run(
+        const utils::Matrix& initialStates,
+        const ControlFunction& control,
+        unsigned int nbSteps,
+        double dt,
+        unsigned int nbThreads = 1);
+
+protected:
+    ///
+    /// \brief Function that fills the controls (last parameter) from the step index, the time and the states
+    ///
+    typedef std::function<void(unsigned int, double, const utils::Vector&, utils::Vector&)>
+    StepControlFunction;
+
+    ///
+    /// \brief Dispatch the runs on the threads
+    /// \param initialStates The initial states of each run (nbStates x nRuns)
+    /// \param control The function that computes the controls
+    /// \param nbSteps The number of steps to simulate
+    /// \param dt The duration of a step
+    /// \param nbThreads The number of threads to dispatch the runs on
+    /// \return The states of each run (nbStates x nSteps + 1)
+    ///
+    std::vector<utils::Matrix> runAll(
+        const utils::Matrix& initialStates,
+        const StepControlFunction& control,
+        unsigned int nbSteps,
+        double dt,
+        unsigned int nbThreads);
+
+    ///
+    /// \brief Simulate one run
+    /// \param model The model (or workspace) to use
+    /// \param x0 The initial states
+    /// \param control The function that computes the controls
+    /// \param nbSteps The number of steps to simulate
+    /// \param dt The duration of a step
+    /// \param states The states of the run (nbStates x nSteps + 1)
+    ///
+    void integrate(
+        Model& model,
+        const utils::Vector& x0,
+        const StepControlFunction& control,
+        unsigned int nbSteps,
+        double dt,
+        utils::Matrix& states);
+
+    ///
+    /// \brief Compute the derivative of the states
+    /// \param model The model (or workspace) to use
+    /// \param x The states
+    /// \param u The controls
+    /// \param xdot The derivative of the states
+    ///
+    void dynamics(
+        Model& model,
+        const utils::Vector& x,
+        const utils::Vector& u,
+        utils::Vector& xdot);
+
+    Model& m_model; ///< A reference to the model
+    DYNAMICS m_dynamics; ///< The dynamics to integrate
+    INTEGRATOR m_integrator; ///< The integrator
+    double m_rtol; ///< The relative tolerance of the adaptive integrator
+    double m_atol; ///< The absolute tolerance of the adaptive integrator
+
+};
+
+}
+#endif
+
+#endif // BIORBD_FORWARD_SIMULATION_H
@@ -313,6 +313,7 @@ protected:
 
     std::shared_ptr<bool> m_isGeometryComputed; ///< To know if the geometry was computed at least once
     std::shared_ptr<bool> m_isVelocityComputed; ///< To know if the velocity was computed in the last update
+    std::shared_ptr<bool> m_arePointsComputed; ///< To know if the points in global and their jacobian were computed in the last update
     std::shared_ptr<bool> m_posAndJacoWereForced; ///< To know if the override was used on the muscle position and the Jacobian
 
 };
@@ -117,6 +117,13 @@ public:
     ///
     virtual void computeFlCE(const State &emg);
 
+    ///
+    /// \brief Return the derivative of the Force-Length of the contractile element with respect to the activation
+    /// \return The derivative of the Force-Length of the contractile element (0, it does not depend on the activation)
+    ///
+    virtual utils::Scalar FlCEActivationDerivative(
+        const State& emg);
+
 protected:
     ///
     /// \brief Set type to De_Groote
@@ -159,6 +159,24 @@ public:
     const utils::Scalar& FlCE(
         const State& emg);
 
+    ///
+    /// \brief Return the derivative of the Force-Length of the contractile element with respect to the activation
+    /// \param emg The EMG data
+    /// \return The derivative of the Force-Length of the contractile element
+    ///
+    virtual utils::Scalar FlCEActivationDerivative(
+        const State& emg);
+
+    ///
+    /// \brief Return the derivative of the force norm with respect to the activation, in closed form
+    /// \param emg The EMG data
+    /// \return The derivative of the force norm with respect to the activation
+    ///
+    /// Warning: This function assumes that the muscle is already updated (via `updateOrientations`)
+    ///
+    virtual utils::Scalar forceActivationDerivative(
+        const State& emg);
+
     ///
     /// \brief Return the Force-Length of the passive element
     /// \return The Force-Length of the passive element
@@ -137,6 +137,14 @@ public:
         const rigidbody::GeneralizedCoordinates& Q,
         const State& emg,
         int updateKin = 2);
+
+    ///
+    /// \brief Return the derivative of the force norm with respect to the activation
+    /// \param emg EMG data
+    /// \return The derivative of the force norm with respect to the activation (the maximal isometric force)
+    ///
+    virtual utils::Scalar forceActivationDerivative(
+        const State& emg);
 protected:
     ///
     /// \brief Function allowing modification of the way the multiplication is done in computeForce(EMG)
@@ -7,6 +7,8 @@
 #include "InternalForces/Muscles/MuscleGeometry.h"
 #include "Utils/Scalar.h"
 
+#define BIORBD_MUSCLE_FINITE_DIFFERENCE_STEP 1e-10
+
 namespace BIORBD_NAMESPACE
 {
 namespace utils
@@ -203,9 +205,19 @@ public:
     /// \brief Set the position of all the points attached to the muscle (0 being the origin)
     /// \param positions New value of the position
     ///
+    /// The surrogate of the muscle (if any) is removed, as it was fitted on the previous path.
+    ///
     void setPosition(
         const internal_forces::muscles::MuscleGeometry &positions);
 
+    ///
+    /// \brief Add a path modifier object
+    /// \param wrap Position of the object
+    ///
+    /// The surrogate of the muscle (if any) is removed, as it was fitted on the previous path.
+    ///
+    void addPathObject(utils::Vector3d& wrap);
+
     ///
     /// \brief Return the position of all the points attached to the muscle (0 being the origin)
     /// \return The positions
@@ -225,12 +237,23 @@ public:
     ///
     const Characteristics& characteristics() const;
 
+    ///
+    /// \brief Return the version of the characteristics and of the type of the muscle
+    /// \return The version of the characteristics and of the type of the muscle
+    ///
+    /// The version is incremented each time the characteristics are changed
+    /// (setCharacteristics, setForceIsoMax or DeepCopy).
+    ///
+    unsigned int characteristicsVersion() const;
+
     ///
     /// \brief Return the muscle points in global reference frame
     /// \param model The joint model
     /// \param Q The generalized coordinates
     /// \return The muscle points in global reference frame
     ///
+    /// The path of the muscle is computed even if a surrogate is used.
+    ///
     const std::vector<utils::Vector3d>& musclesPointsInGlobal(
         rigidbody::Joints &model,
         const rigidbody::GeneralizedCoordinates &Q);
@@ -316,6 +339,17 @@ public:
         const State& emg,
         int updateKin = 2) = 0;
 
+    ///
+    /// \brief Return the derivative of the force norm with respect to the activation
+    /// \param emg EMG data
+    /// \return The derivative of the force norm with respect to the activation
+    ///
+    /// Warning: This function assumes that the muscle is already updated (via `updateOrientations`).
+    /// The force is differentiated numerically with a step of BIORBD_MUSCLE_FINITE_DIFFERENCE_STEP, unless the muscle provides the derivative in closed form
+    ///
+    virtual utils::Scalar forceActivationDerivative(
+        const State& emg);
+
     ///
     /// \brief Return the type of the muscle
     /// \return The type of the muscle
@@ -346,6 +380,8 @@ protected:
     std::shared_ptr<MUSCLE_TYPE> m_type; ///< The type of the muscle
     std::shared_ptr<internal_forces::muscles::MuscleGeometry> m_position;
     std::shared_ptr<Characteristics> m_characteristics; ///< The muscle characteristics
+    std::shared_ptr<unsigned int>
+    m_characteristicsVersion; ///< The version of the characteristics and of the type
     std::shared_ptr<State> m_state; ///< The dynamic state
     std::shared_ptr<utils::Scalar> m_muscleLength; ///< muscle tendon length
 };
@@ -0,0 +1,132 @@
+#ifndef BIORBD_MUSCLES_MUSCLE_FORCES_KERNEL_H
+#define BIORBD_MUSCLES_MUSCLE_FORCES_KERNEL_H
+
+#include <vector>
+#include <memory>
+#include "biorbdConfig.h"
+#include "InternalForces/Muscles/MusclesEnums.h"
+
+#ifndef BIORBD_USE_CASADI_MATH
+namespace BIORBD_NAMESPACE
+{
+namespace utils
+{
+class Matrix;
+class Vector;
+}
+
+namespace internal_forces
+{
+namespace muscles
+{
+class Muscle;
+
+///
+/// \brief Structure of arrays of the characteristics of a set of muscles to compute
+/// their forces all at once
+///
+/// The characteristics of the muscles are gathered in one array per characteristic,
+/// so the forces of all the muscles (and of all the frames of a trial) are computed
+/// by array operations instead of a virtual call per muscle. The relations are the
+/// ones of the Hill family of muscles (HillType, HillThelenType, HillDeGrooteType and
+/// their active only and fatigable variants) and of the idealized actuators.
+/// The characteristics are copied at construction, so the kernel must be constructed
+/// again if the muscles are changed.
+///
+class BIORBD_API MuscleForcesKernel
+{
+public:
+    ///
+    /// \brief Construct an empty kernel
+    ///
+    MuscleForcesKernel();
+
+    ///
+    /// \brief Construct the kernel from a set of muscles
+    /// \param muscles The muscles
+    ///
+    MuscleForcesKernel(
+        const std::vector<std::shared_ptr<Muscle>>& muscles);
+
+    ///
+    /// \brief Return the number of muscles
+    /// \return The number of muscles
+    ///
+    unsigned int nbMuscles() const;
+
+    ///
+    /// \brief Return the optimal length of each muscle
+    /// \return The optimal lengths
+    ///
+    const utils::Vector& optimalLength() const;
+
+    ///
+    /// \brief Return the tendon slack length of each muscle
+    /// \return The tendon slack lengths
+    ///
+    const utils::Vector& tendonSlackLength() const;
+
+    ///
+    /// \brief Return the pennation angle of each muscle
+    /// \return The pennation angles
+    ///
+    const utils::Vector& pennationAngle() const;
+
+    ///
+    /// \brief Return the maximal isometric force of each muscle
+    /// \return The maximal isometric forces
+    ///
+    const utils::Vector& forceIsoMax() const;
+
+    ///
+    /// \brief Return the physiological cross-sectional area of each muscle
+    /// \return The physiological cross-sectional areas
+    ///
+    const utils::Vector& PCSA() const;
+
+    ///
+    /// \brief Compute the muscle forces
+    /// \param lengths The muscle length of each muscle (nbMuscles)
+    /// \param velocities The musculotendon velocity of each muscle (nbMuscles)
+    /// \param activations The activation of each muscle, saturated to [0, 1] (nbMuscles)
+    /// \param activeFibers The proportion of active fibers of each muscle, only used by the fatigable muscles (nbMuscles)
+    /// \return The muscle forces (nbMuscles)
+    ///
+    utils::Vector forces(
+        const utils::Vector& lengths,
+        const utils::Vector& velocities,
+        const utils::Vector& activations,
+        const utils::Vector& activeFibers) const;
+
+    ///
+    /// \brief Compute the muscle forces of several frames
+    /// \param lengths The muscle length of each muscle at each frame (nbMuscles x nFrames)
+    /// \param velocities The musculotendon velocity of each muscle at each frame (nbMuscles x nFrames)
+    /// \param activations The activation of each muscle at each frame, saturated to [0, 1] (nbMuscles x nFrames)
+    /// \param activeFibers The proportion of active fibers of each muscle, only used by the fatigable muscles (nbMuscles)
+    /// \return The muscle forces (nbMuscles x nFrames)
+    ///
+    utils::Matrix forces(
+        const utils::Matrix& lengths,
+        const utils::Matrix& velocities,
+        const utils::Matrix& activations,
+        const utils::Vector& activeFibers) const;
+
+protected:
+    std::shared_ptr<std::vector<MUSCLE_TYPE>> m_types; ///< The type of each muscle
+    std::shared_ptr<std::vector<bool>> m_useDamping; ///< If the damping is used by each muscle
+    std::shared_ptr<utils::Vector> m_optimalLength; ///< The optimal length of each muscle
+    std::shared_ptr<utils::Vector> m_tendonSlackLength; ///< The tendon slack length of each muscle
+    std::shared_ptr<utils::Vector> m_pennationAngle; ///< The pennation angle of each muscle
+    std::shared_ptr<utils::Vector> m_cosPennationAngle; ///< The cosine of the pennation angle of each muscle
+    std::shared_ptr<utils::Vector> m_forceIsoMax; ///< The maximal isometric force of each muscle
+    std::shared_ptr<utils::Vector> m_PCSA; ///< The physiological cross-sectional area of each muscle
+
+};
+
+}
+}
+}
+#endif
+
+#endif // BIORBD_MUSCLES_MUSCLE_FORCES_KERNEL_H
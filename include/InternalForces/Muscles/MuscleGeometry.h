@@ -30,6 +30,7 @@ class PathModifiers;
 namespace muscles
 {
 class Characteristics;
+class MuscleSurrogate;
 
 ///
 /// \brief Class muscle geometry of the muscle
@@ -69,6 +70,7 @@ public:
     /// \param Q The generalized coordinates of the joints (not needed if updateKin is less than 2)
     /// \param Qdot The generalized velocities of the joints (not needed if updateKin is less than 2)
     /// \param updateKin Update kinematics (0: don't update, 1:only muscles, [2: both kinematics and muscles])
+    /// \param useSurrogate If the surrogate (if any) is used, false to compute the path of the muscle
     ///
     /// updateKinematics MUST be called before retreiving data that are dependent on Q and/or Qdot
     ///
@@ -77,7 +79,8 @@ public:
         const Characteristics& characteristics,
         const rigidbody::GeneralizedCoordinates* Q = nullptr,
         const rigidbody::GeneralizedVelocity* Qdot = nullptr,
-        int updateKin = 2);
+        int updateKin = 2,
+        bool useSurrogate = true);
 
     ///
     /// \brief Updates the position and dynamic elements of the muscles.
@@ -87,6 +90,7 @@ public:
     /// \param Q The generalized coordinates of the joints (not needed if updateKin is less than 2)
     /// \param Qdot The generalized velocities of the joints (not needed if updateKin is less than 2)
     /// \param updateKin Update kinematics (0: don't update, 1:only muscles, [2: both kinematics and muscles])
+    /// \param useSurrogate If the surrogate (if any) is used, false to compute the path of the muscle
     ///
     /// updateKinematics MUST be called before retreiving data that are dependent on Q and/or Qdot
     ///
@@ -96,7 +100,8 @@ public:
         internal_forces::PathModifiers& pathModifiers,
         const rigidbody::GeneralizedCoordinates* Q = nullptr,
         const rigidbody::GeneralizedVelocity* Qdot = nullptr,
-        int updateKin = 2);
+        int updateKin = 2,
+        bool useSurrogate = true);
 
     ///
     /// \brief Updates the position and dynamic elements of the muscles by hand.
@@ -124,6 +129,34 @@ public:
     ///
     const utils::Scalar& musculoTendonLength() const;
 
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Set the surrogate used in place of the path of the muscle
+    /// \param surrogate The surrogate, nullptr to compute the geometry from the path again
+    ///
+    /// While a surrogate is set, updateKinematics computes the lengths, the length jacobian
+    /// and the velocity from the surrogate, so the points in global and their jacobian are
+    /// not updated and cannot be retrieved until the path is computed again. The surrogate
+    /// approximates the musculotendon length, so the characteristics of the muscle can be
+    /// changed without fitting it again, but not its path. The surrogate is shared with the
+    /// deep copies.
+    ///
+    void setSurrogate(
+        const std::shared_ptr<MuscleSurrogate>& surrogate);
+
+    ///
+    /// \brief Return if a surrogate is used in place of the path of the muscle
+    /// \return If a surrogate is used
+    ///
+    bool hasSurrogate() const;
+
+    ///
+    /// \brief Return the surrogate used in place of the path of the muscle
+    /// \return The surrogate
+    ///
+    const MuscleSurrogate& surrogate() const;
+#endif
+
 protected:
     ///
     /// \brief Actual function that implements the update of the kinematics
@@ -145,6 +178,23 @@ protected:
         const Characteristics* characteristics,
         internal_forces::PathModifiers* pathModifiers = nullptr);
 
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Update the lengths, the length jacobian and the velocity from the surrogate
+    /// \param Q The generalized coordinates
+    /// \param Qdot The generalized velocities
+    /// \param characteristics The muscle characteristics
+    ///
+    void updateKinematicsFromSurrogate(
+        const rigidbody::GeneralizedCoordinates& Q,
+        const rigidbody::GeneralizedVelocity* Qdot,
+        const Characteristics& characteristics);
+
+    std::shared_ptr<MuscleSurrogate> m_surrogate; ///< The surrogate used in place of the path (nullptr if none)
+    std::shared_ptr<utils::Vector> m_surrogateBasis; ///< Scratch storage of the polynomials of the surrogate
+    std::shared_ptr<utils::Matrix> m_surrogateChebyshev; ///< Scratch storage of the Chebyshev polynomials of the surrogate
+#endif
+
     // Position des nodes dans le repere local
     std::shared_ptr<utils::Scalar> m_muscleLength; ///< length
     std::shared_ptr<utils::Scalar> m_muscleTendonLength; ///< muscle tendon length
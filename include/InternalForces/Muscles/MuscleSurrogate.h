@@ -0,0 +1,151 @@
+#ifndef BIORBD_MUSCLES_MUSCLE_SURROGATE_H
+#define BIORBD_MUSCLES_MUSCLE_SURROGATE_H
+
+#include <vector>
+#include <memory>
+#include "biorbdConfig.h"
+#include "Utils/Scalar.h"
+
+#ifndef BIORBD_USE_CASADI_MATH
+namespace BIORBD_NAMESPACE
+{
+namespace utils
+{
+class Matrix;
+class Vector;
+}
+
+namespace internal_forces
+{
+namespace muscles
+{
+///
+/// \brief Polynomial approximation of the musculotendon length and of its jacobian
+///
+/// The length and each column of the length jacobian are fitted in the least squares
+/// sense by polynomials of the generalized coordinates the muscle spans, a coordinate
+/// being spanned if the length jacobian is not zero along it. The polynomials are
+/// expressed as products of Chebyshev polynomials of the coordinates normalized by
+/// their range, and are only meaningful inside that range.
+///
+class BIORBD_API MuscleSurrogate
+{
+public:
+    ///
+    /// \brief Construct an empty surrogate
+    ///
+    MuscleSurrogate();
+
+    ///
+    /// \brief Fit the surrogate
+    /// \param Q The sampled generalized coordinates (nbQ x nSamples)
+    /// \param lowerBounds The lower bound of each generalized coordinate
+    /// \param upperBounds The upper bound of each generalized coordinate
+    /// \param musculoTendonLengths The musculotendon length at each sample (nSamples)
+    /// \param jacobianLengths The length jacobian at each sample (nSamples x nbDof)
+    /// \param degree The total degree of the polynomials
+    ///
+    void fit(
+        const utils::Matrix& Q,
+        const utils::Vector& lowerBounds,
+        const utils::Vector& upperBounds,
+        const utils::Vector& musculoTendonLengths,
+        const utils::Matrix& jacobianLengths,
+        unsigned int degree);
+
+    ///
+    /// \brief Compute the maximal errors of the surrogate against reference values
+    /// \param Q The sampled generalized coordinates (nbQ x nSamples)
+    /// \param musculoTendonLengths The musculotendon length at each sample (nSamples)
+    /// \param jacobianLengths The length jacobian at each sample (nSamples x nbDof)
+    ///
+    void validate(
+        const utils::Matrix& Q,
+        const utils::Vector& musculoTendonLengths,
+        const utils::Matrix& jacobianLengths);
+
+    ///
+    /// \brief Evaluate the surrogate
+    /// \param Q The generalized coordinates
+    /// \param musculoTendonLength The musculotendon length
+    /// \param jacobianLength The length jacobian (1 x nbDof)
+    ///
+    void evaluate(
+        const utils::Vector& Q,
+        utils::Scalar& musculoTendonLength,
+        utils::Matrix& jacobianLength) const;
+
+    ///
+    /// \brief Evaluate the surrogate without allocating once the scratch storage is sized
+    /// \param Q The generalized coordinates
+    /// \param musculoTendonLength The musculotendon length
+    /// \param jacobianLength The length jacobian (1 x nbDof)
+    /// \param basis Scratch storage of the polynomials of the basis
+    /// \param chebyshev Scratch storage of the Chebyshev polynomials of each spanned coordinate
+    ///
+    /// The surrogate being shared between the copies of a model, the scratch storage is
+    /// provided by the caller so the surrogate can be evaluated from several threads.
+    ///
+    void evaluate(
+        const utils::Vector& Q,
+        utils::Scalar& musculoTendonLength,
+        utils::Matrix& jacobianLength,
+        utils::Vector& basis,
+        utils::Matrix& chebyshev) const;
+
+    ///
+    /// \brief Return the generalized coordinates spanned by the muscle
+    /// \return The indices of the generalized coordinates spanned by the muscle
+    ///
+    std::vector<unsigned int> dofs() const;
+
+    ///
+    /// \brief Return the total degree of the polynomials
+    /// \return The total degree of the polynomials
+    ///
+    unsigned int degree() const;
+
+    ///
+    /// \brief Return the maximal length error found by the last validation
+    /// \return The maximal length error
+    ///
+    double lengthError() const;
+
+    ///
+    /// \brief Return the maximal length jacobian error found by the last validation
+    /// \return The maximal length jacobian error
+    ///
+    double jacobianError() const;
+
+protected:
+    ///
+    /// \brief Evaluate the polynomials of the basis
+    /// \param Q The generalized coordinates
+    /// \param basis The value of each polynomial of the basis
+    /// \param chebyshev Scratch storage of the Chebyshev polynomials of each spanned coordinate
+    ///
+    void basis(
+        const utils::Vector& Q,
+        utils::Vector& basis,
+        utils::Matrix& chebyshev) const;
+
+    std::shared_ptr<std::vector<unsigned int>> m_dofs; ///< The spanned generalized coordinates
+    std::shared_ptr<std::vector<double>> m_center; ///< The center of the range of the spanned coordinates
+    std::shared_ptr<std::vector<double>> m_halfRange; ///< The half width of the range of the spanned coordinates
+    std::shared_ptr<unsigned int> m_degree; ///< The total degree of the polynomials
+    std::shared_ptr<std::vector<std::vector<unsigned int>>>
+            m_exponents; ///< The Chebyshev degree of each spanned coordinate for each polynomial of the basis
+    std::shared_ptr<utils::Matrix>
+    m_coefficients; ///< The coefficients of the length (first column) and of each spanned column of the jacobian
+    std::shared_ptr<unsigned int> m_nbDof; ///< The number of degrees of freedom of the model
+    std::shared_ptr<double> m_lengthError; ///< The maximal length error of the last validation
+    std::shared_ptr<double> m_jacobianError; ///< The maximal length jacobian error of the last validation
+
+};
+
+}
+}
+}
+#endif
+
+#endif // BIORBD_MUSCLES_MUSCLE_SURROGATE_H
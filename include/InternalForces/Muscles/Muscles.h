@@ -285,6 +285,33 @@ public:
     utils::Matrix musclesLengthJacobian(
         const rigidbody::GeneralizedCoordinates& Q);
 
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Fit polynomial surrogates of the length and length jacobian of each muscle
+    /// \param degree The total degree of the polynomials
+    /// \param nbSamples The number of configurations sampled inside the QRanges of the segments to fit the surrogates
+    /// \return The errors of each muscle (nbMuscles x 2): the maximal musculotendon length error and the maximal length jacobian error
+    ///
+    /// The errors are assessed on nbSamples other configurations sampled inside the QRanges.
+    /// Once fitted, updating the muscles evaluates the surrogates instead of computing the
+    /// path of the muscles (via points and wrapping objects), so the points of the muscles
+    /// in global and their jacobian are not updated anymore (retrieving them throws, except
+    /// through the functions computing them from the generalized coordinates). The surrogates
+    /// are only meaningful inside the QRanges and are shared with the workspaces of the model.
+    /// The surrogate of a muscle is removed if its path is changed (setPosition or
+    /// addPathObject), while its characteristics can be changed as the surrogates approximate
+    /// the musculotendon lengths. They must be fitted again if the segments are changed.
+    ///
+    utils::Matrix fitMusclesSurrogate(
+        unsigned int degree = 4,
+        unsigned int nbSamples = 1000);
+
+    ///
+    /// \brief Remove the surrogates, the muscles being computed from their path again
+    ///
+    void clearMusclesSurrogate();
+#endif
+
     ///
     /// \brief Compute and return the muscle forces
     /// \param emg The dynamic state
@@ -307,6 +334,50 @@ public:
         const rigidbody::GeneralizedCoordinates& Q,
         const rigidbody::GeneralizedVelocity& QDot);
 
+    ///
+    /// \brief Compute and return the derivative of each muscle force with respect to its activation
+    /// \param emg The dynamic state
+    /// \return The derivative of the muscle forces
+    ///
+    /// The derivative of the muscular joint torque with respect to the activations
+    /// is then -musclesLengthJacobian().transpose() * derivatives.asDiagonal().
+    /// Warning: This function assumes that muscles are already updated (via `updateMuscles`)
+    ///
+    utils::Vector muscleForcesActivationDerivative(
+        const std::vector<std::shared_ptr<State>>& emg);
+
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Compute and return the muscle forces from the activations, all the muscles at once
+    /// \param activations The activation of each muscle, saturated to [0, 1]
+    /// \return The muscle forces
+    ///
+    /// The forces are computed by a MuscleForcesKernel instead of a call to each muscle.
+    /// The kernel is kept and only rebuilt when a muscle is added or replaced, or when
+    /// the characteristics of a muscle are changed.
+    /// The fatigable muscles use their current proportion of active fibers.
+    /// Warning: This function assumes that muscles are already updated (via `updateMuscles`)
+    ///
+    utils::Vector muscleForcesFromActivations(
+        const utils::Vector& activations);
+
+    ///
+    /// \brief Compute and return the muscle forces of a trial from the activations, all the muscles and frames at once
+    /// \param activations The activation of each muscle at each frame, saturated to [0, 1] (nbMuscles x nFrames)
+    /// \param Q The generalized coordinates at each frame (nbQ x nFrames)
+    /// \param QDot The generalized velocities at each frame (nbQdot x nFrames)
+    /// \return The muscle forces (nbMuscles x nFrames)
+    ///
+    /// The muscles are updated at each frame, then the forces of the whole trial are
+    /// computed by a MuscleForcesKernel. The fatigable muscles use their current proportion
+    /// of active fibers for all the frames.
+    ///
+    utils::Matrix muscleForcesFromActivations(
+        const utils::Matrix& activations,
+        const utils::Matrix& Q,
+        const utils::Matrix& QDot);
+#endif
+
     ///
     /// \brief Return the total number of muscle groups
     /// \return The total number of muscle groups
@@ -326,8 +397,25 @@ public:
     unsigned int nbMuscles() const;
 
 protected:
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief The forces kernel of the muscles and the buffers used to call it
+    ///
+    class MuscleForcesWorkspace;
+
+    ///
+    /// \brief Rebuild the forces kernel if a muscle was added or replaced, or if the characteristics of a muscle were changed since it was built
+    /// \return The up to date workspace
+    ///
+    MuscleForcesWorkspace& muscleForcesWorkspace();
+#endif
+
     std::shared_ptr<std::vector<MuscleGroup>>
             m_mus; ///< Holder for muscle groups
+#ifndef BIORBD_USE_CASADI_MATH
+    std::shared_ptr<MuscleForcesWorkspace>
+    m_forcesWorkspace; ///< The forces kernel (each copy has its own)
+#endif
 };
 
 }
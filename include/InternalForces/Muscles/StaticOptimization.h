@@ -2,9 +2,16 @@
 #define BIORBD_MUSCLES_STATIC_OPTIMIZATION_H
 
 #include <vector>
+#include <map>
 #include <memory>
 #include <IpTNLP.hpp>
 #include "biorbdConfig.h"
+#include "Utils/String.h"
+
+namespace Ipopt
+{
+class IpoptApplication;
+}
 
 namespace BIORBD_NAMESPACE
 {
@@ -34,6 +41,14 @@ class StateDynamics;
 class BIORBD_API StaticOptimization
 {
 public:
+    ///
+    /// \brief The sets of options given to IPOPT before the user defined ones
+    ///
+    enum SOLVER_PROFILE {
+        DEVELOPMENT, ///< Verbose output and first order derivative test at each solve
+        PRODUCTION ///< Quiet output, no derivative test and tolerances tuned for long trials
+    };
+
     ///
     /// \brief Construct static optimization
     /// \param model The musculoskeletal Model
@@ -160,11 +175,64 @@ public:
         bool useResidualTorque = true,
         int verbose = 0);
 
+    ///
+    /// \brief Set the profile of options given to IPOPT
+    /// \param profile The profile
+    ///
+    void setSolverProfile(SOLVER_PROFILE profile);
+
+    ///
+    /// \brief Return the profile of options given to IPOPT
+    /// \return The profile
+    ///
+    SOLVER_PROFILE solverProfile() const;
+
+    ///
+    /// \brief Set a numeric IPOPT option, overriding the one of the profile
+    /// \param name The name of the option
+    /// \param value The value of the option
+    ///
+    void setSolverOption(
+        const utils::String& name,
+        double value);
+
+    ///
+    /// \brief Set an integer IPOPT option, overriding the one of the profile
+    /// \param name The name of the option
+    /// \param value The value of the option
+    ///
+    void setSolverOption(
+        const utils::String& name,
+        int value);
+
+    ///
+    /// \brief Set a string IPOPT option, overriding the one of the profile
+    /// \param name The name of the option
+    /// \param value The value of the option
+    ///
+    void setSolverOption(
+        const utils::String& name,
+        const utils::String& value);
+
     ///
     /// \brief Run the static optimization
     /// \param useLinearizedState If use the algorithm should be run with the linearized approach (faster but less precise)
+    /// \param nbThreads The number of threads to dispatch the frames on
     ///
-    void run(bool useLinearizedState = true);
+    /// The frames are split into nbThreads contiguous blocks. Each thread works
+    /// on its own workspace of the model and its own IPOPT application, and each
+    /// frame is warm started from the solution of the previous frame of its block.
+    /// The linear solver of IPOPT must therefore be thread-safe (MUMPS calls are
+    /// serialized by IPOPT since version 3.14).
+    ///
+    /// With the linearized approach, the 2-norm and the residual torques, each
+    /// frame is a bounded quadratic program solved without IPOPT, the active set of
+    /// a frame being the starting point of the next one. IPOPT is only used if
+    /// the quadratic program fails.
+    ///
+    void run(
+        bool useLinearizedState = true,
+        unsigned int nbThreads = 1);
 
     ///
     /// \brief Return the final solution
@@ -178,7 +246,32 @@ public:
     ///
     utils::Vector finalSolution(unsigned int index);
 
+    ///
+    /// \brief Return the time spent to solve each frame
+    /// \return The wall time spent to solve each frame in seconds
+    ///
+    std::vector<double> frameTimes() const;
+
 protected:
+    ///
+    /// \brief Create an IPOPT application set with the profile and the user defined options
+    /// \return The initialized IPOPT application
+    ///
+    Ipopt::SmartPtr<Ipopt::IpoptApplication> createSolver() const;
+
+    ///
+    /// \brief Solve a contiguous block of frames, each one being warm started from the previous one
+    /// \param model The model (or workspace) to use
+    /// \param useLinearizedState If the linearized approach is used
+    /// \param first The first frame of the block
+    /// \param last The frame after the last frame of the block
+    ///
+    void runFrames(
+        Model& model,
+        bool useLinearizedState,
+        unsigned int first,
+        unsigned int last);
+
     Model& m_model; ///< A reference to the model
     bool m_useResidualTorque; ///< To use residual torque
     std::vector<rigidbody::GeneralizedCoordinates>
@@ -194,6 +287,16 @@ protected:
     std::vector<Ipopt::SmartPtr<Ipopt::TNLP>>
                                            m_staticOptimProblem; ///<The static optimization problem
     bool m_alreadyRun; ///< If already ran the static optimization
+    SOLVER_PROFILE m_solverProfile; ///< The profile of options given to IPOPT
+    std::map<utils::String, double>
+    m_numericOptions; ///< The user defined numeric IPOPT options
+    std::map<utils::String, int>
+    m_integerOptions; ///< The user defined integer IPOPT options
+    std::map<utils::String, utils::String>
+    m_stringOptions; ///< The user defined string IPOPT options
+    std::vector<std::shared_ptr<Model>>
+    m_workspaces; ///< The workspaces used by the threads, kept alive with the problems
+    std::vector<double> m_frameTimes; ///< The wall time spent to solve each frame
 
 };
 
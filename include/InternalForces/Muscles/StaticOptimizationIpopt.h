@@ -5,6 +5,7 @@
 #include <IpIpoptApplication.hpp>
 #include <IpTNLP.hpp>
 #include "biorbdConfig.h"
+#include "InternalForces/Muscles/Muscle.h"
 
 namespace BIORBD_NAMESPACE
 {
@@ -44,6 +45,7 @@ public:
     /// \param pNormFactor The p-norm to perform
     /// \param verbose Level of IPOPT verbose you want
     /// \param eps The precision to perform the finite diffentiation
+    /// \param useAnalyticalJacobian If the constraint jacobian is computed from the moment arms and the derivative of the muscle forces instead of finite differences
     ///
     StaticOptimizationIpopt(
         Model &model,
@@ -54,7 +56,8 @@ public:
         bool  useResidual = true,
         unsigned int pNormFactor = 2,
         int verbose = 0,
-        double eps = 1e-10);
+        double eps = BIORBD_MUSCLE_FINITE_DIFFERENCE_STEP,
+        bool useAnalyticalJacobian = true);
 
     ///
     /// \brief Destroy class properly
@@ -236,6 +239,7 @@ protected:
     std::shared_ptr<unsigned int>
     m_nbTorqueResidual; ///< The number of torque residual
     std::shared_ptr<double> m_eps; ///< Precision of the finite differentiate
+    std::shared_ptr<bool> m_useAnalyticalJacobian; ///< If the constraint jacobian is computed analytically
     std::shared_ptr<utils::Vector> m_activations; ///< The activations
     std::shared_ptr<rigidbody::GeneralizedCoordinates>
     m_Q; ///< The generalized coordinates
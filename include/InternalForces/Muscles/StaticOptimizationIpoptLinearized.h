@@ -1,6 +1,7 @@
 #ifndef BIORBD_MUSCLES_STATIC_OPTIMIZATION_IPOPT_LINEARIZED_H
 #define BIORBD_MUSCLES_STATIC_OPTIMIZATION_IPOPT_LINEARIZED_H
 
+#include <vector>
 #include "biorbdConfig.h"
 #include "InternalForces/Muscles/StaticOptimizationIpopt.h"
 
@@ -46,7 +47,7 @@ public:
         bool useResidual = true,
         unsigned int pNormFactor = 2,
         int verbose = 0,
-        double eps = 1e-10);
+        double eps = BIORBD_MUSCLE_FINITE_DIFFERENCE_STEP);
 
     ///
     /// \brief Destroy class properly
@@ -92,9 +93,24 @@ public:
         Ipopt::Index* jCol,
         Ipopt::Number* values);
 
+    ///
+    /// \brief Solve the problem as a bounded quadratic program, without IPOPT
+    /// \param activeSet The bound each activation starts on (-1 lower, 0 free, 1 upper), replaced by the active set of the solution
+    /// \return If the quadratic program converged
+    ///
+    /// Only available with the 2-norm and the residual torques. Once the residuals
+    /// are replaced by their expression from the linearized constraints
+    /// (torqueTarget - torqueZero - jacobian * activations), the problem
+    /// is a convex quadratic of the activations subject to their bounds, which is
+    /// solved using a primal active-set method. The final solution is stored as if
+    /// IPOPT solved the problem.
+    ///
+    bool solveQuadratic(std::vector<int>& activeSet);
+
 protected:
     std::shared_ptr<utils::Matrix> m_jacobian; ///< The constraints jacobian
-    void prepareJacobian(); ///< Setup the constant constraints jacobian
+    std::shared_ptr<utils::Vector> m_torqueZero; ///< The muscular joint torque at zero activation
+    void prepareJacobian(); ///< Setup the constant constraints jacobian and the torque at zero activation
 
 };
 
@@ -5,6 +5,8 @@
 
 #include "InternalForces/Muscles/Characteristics.h"
 #include "InternalForces/Muscles/MuscleGeometry.h"
+#include "InternalForces/Muscles/MuscleSurrogate.h"
+#include "InternalForces/Muscles/MuscleForcesKernel.h"
 #include "InternalForces/Muscles/FatigueModel.h"
 #include "InternalForces/Muscles/FatigueDynamicState.h"
 #include "InternalForces/Muscles/FatigueDynamicStateXia.h"
@@ -3,6 +3,7 @@
 
 #include <vector>
 #include <map>
+#include <cstdint>
 #include "biorbdConfig.h"
 
 namespace BIORBD_NAMESPACE
@@ -21,6 +22,7 @@ class Path;
 class String;
 class Vector;
 class Vector3d;
+class Matrix;
 class Matrix3d;
 class SpatialVector;
 class RotoTrans;
@@ -37,19 +39,92 @@ public:
     ///
     /// \brief Create a biorbd model from a bioMod file
     /// \param path The path of the file
+    /// \param lazyMeshes If the mesh files should only be read when their mesh is first accessed
     ///
     static Model readModelFile(
-        const utils::Path &path);
+        const utils::Path &path,
+        bool lazyMeshes = false);
 
     ///
     /// \brief Create a biorbd model from a bioMod file
     /// \param path The path of the file
     /// \param model The model to fill
+    /// \param lazyMeshes If the mesh files should only be read when their mesh is first accessed
     /// \return Returns the model to fill
     ///
     static void readModelFile(
         const utils::Path &path,
-        Model *model);
+        Model *model,
+        bool lazyMeshes = false);
+
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Create a biorbd model from a bioMod file, using its compiled version when it is up to date
+    /// \param path The path of the bioMod file
+    /// \param model The model to fill
+    /// \param lazyMeshes If the meshes should only be read when they are first accessed
+    ///
+    /// The compiled version is looked for next to the bioMod file (see compiledModelPath).
+    /// If it is missing or outdated, the bioMod file is parsed and the compiled version
+    /// is written for the next time, unless the model cannot be compiled. A compiled
+    /// version that cannot be read (e.g. a truncated file) is deleted and the bioMod file
+    /// is parsed instead. The model must be empty, as it is replaced by the compiled model
+    /// when the compiled version is used.
+    ///
+    static void readModelFileWithCache(
+        const utils::Path &path,
+        Model *model,
+        bool lazyMeshes = false);
+
+    ///
+    /// \brief Create a biorbd model from a compiled model file (see Writer::writeCompiledModel)
+    /// \param path The path of the compiled file
+    /// \param lazyMeshes If the meshes should only be read from the compiled file when they are first accessed
+    /// \return The model
+    ///
+    static Model readCompiledModel(
+        const utils::Path &path,
+        bool lazyMeshes = false);
+
+    ///
+    /// \brief Create a biorbd model from a compiled model file (see Writer::writeCompiledModel)
+    /// \param path The path of the compiled file
+    /// \param model The model to fill
+    /// \param lazyMeshes If the meshes should only be read from the compiled file when they are first accessed
+    ///
+    /// A lazy mesh is read from the compiled file on its first access, which
+    /// throws if the compiled file was rewritten from other sources in between.
+    ///
+    static void readCompiledModel(
+        const utils::Path &path,
+        Model *model,
+        bool lazyMeshes = false);
+
+    ///
+    /// \brief Return the path of the compiled version of a bioMod file
+    /// \param path The path of the bioMod file
+    /// \return The path of the compiled version
+    ///
+    static utils::Path compiledModelPath(
+        const utils::Path &path);
+
+    ///
+    /// \brief Test if the compiled version of a bioMod file can be used in place of the bioMod file
+    /// \param path The path of the bioMod file
+    /// \return If the compiled version exists, was written by this version of biorbd and was built
+    /// from the current content of the bioMod and mesh files
+    ///
+    static bool isCompiledModelUpToDate(
+        const utils::Path &path);
+
+    ///
+    /// \brief Hash the content of a file
+    /// \param path The path of the file
+    /// \return The 64 bits FNV-1a hash of the file
+    ///
+    static std::uint64_t fileHash(
+        const utils::Path &path);
+#endif
 
     ///
     /// \brief Read a bioMark file, containing markers data
@@ -83,6 +158,50 @@ public:
     static std::vector<utils::Vector> readTorqueDataFile(
         const utils::Path &path);
 
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Read a bioMark file, containing markers data, into a single matrix
+    /// \param path The path of the file
+    /// \return The markers (3*nbMarkers x nbFrames), the coordinates of each marker being stacked
+    ///
+    static utils::Matrix readMarkerDataFileInMatrix(
+        const utils::Path &path);
+
+    ///
+    /// \brief Read a bioKin file, containing kinematics data, into a single matrix
+    /// \param path The path of the file
+    /// \return The generalized coordinates (nbQ x nbFrames)
+    ///
+    static utils::Matrix readQDataFileInMatrix(
+        const utils::Path &path);
+
+    ///
+    /// \brief Read a bioMus file, containing muscle activations data, into a single matrix
+    /// \param path The path of the file
+    /// \return The activations (nbMuscles x nbFrames)
+    ///
+    static utils::Matrix readActivationDataFileInMatrix(
+        const utils::Path &path);
+
+    ///
+    /// \brief Read a bioTorque file, containing generalized torques data, into a single matrix
+    /// \param path The path of the file
+    /// \return The generalized torques (nbGeneralizedTorque x nbFrames)
+    ///
+    static utils::Matrix readTorqueDataFileInMatrix(
+        const utils::Path &path);
+
+    ///
+    /// \brief Read a binary data file (see Writer::writeBinaryDataFile)
+    /// \param path The path of the file
+    /// \return The data
+    ///
+    /// The whole file is loaded, utils::MappedMatrix maps it instead.
+    ///
+    static utils::Matrix readBinaryDataFile(
+        const utils::Path &path);
+#endif
+
     ///
     /// \brief Read a bioGRF file containing ground reaction force (GRF) data
     /// \param path The path of the file
@@ -150,6 +269,14 @@ public:
                 std::vector<utils::String> &markOrder,
                 int nFramesToGet = -1);
 
+    ///
+    /// \brief Read a mesh file, its format being chosen from its extension
+    /// \param path The path of the file
+    /// \return Returns the mesh
+    ///
+    static rigidbody::Mesh readMeshFile(
+        const utils::Path& path);
+
     ///
     /// \brief Read a bioMesh file containing the meshing of a segment
     /// \param path The path of the file
@@ -228,6 +355,20 @@ protected:
         const std::map<utils::Equation, double>& variable,
         bool RTinMatrix,
         utils::RotoTrans &RT);
+
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Read a file made of frames starting with "T" and the time, followed by the values
+    /// \param path The path of the file
+    /// \param sizeTag The tag of the number of values per frame
+    /// \param errorMessage The message to raise if the file is too short
+    /// \return The values (nbValues x nbFrames), the time being dropped
+    ///
+    static utils::Matrix readTimeSeriesDataFile(
+        const utils::Path &path,
+        const utils::String &sizeTag,
+        const utils::String &errorMessage);
+#endif
 };
 
 }
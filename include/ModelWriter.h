@@ -2,6 +2,10 @@
 #define BIORBD_UTILS_WRITER_H
 
 #include "biorbdConfig.h"
+
+#define BIORBD_COMPILED_MODEL_MAGIC "BIORBDC"
+#define BIORBD_COMPILED_MODEL_VERSION 2
+
 namespace BIORBD_NAMESPACE
 {
 class Model;
@@ -9,6 +13,7 @@ class Model;
 namespace utils
 {
 class Path;
+class Matrix;
 }
 
 ///
@@ -26,6 +31,48 @@ public:
     static void writeModel(
         Model &model,
         const utils::Path& pathToWrite);
+
+    ///
+    /// \brief Writes the model in the binary compiled format
+    /// \param model The model to write
+    /// \param pathToWrite The path to write
+    ///
+    /// The compiled file holds the segments (with their meshes), the markers,
+    /// the IMUs, the custom RTs, the contacts and the muscles as they are once
+    /// the model is built, so it can be read back without parsing any text. The
+    /// hash of the bioMod and mesh files the model was built from is also
+    /// stored so the file can be used as a cache (see Reader::readModelFileWithCache),
+    /// the bioMod file being the one returned by model.path(). The path of the bioMod
+    /// file is restored in the model read from the compiled file.
+    /// The models with actuators, ligaments, passive torques, loop constraints
+    /// or contacts defined by their normal cannot be compiled yet.
+    ///
+    static void writeCompiledModel(
+        Model &model,
+        const utils::Path& pathToWrite);
+
+    ///
+    /// \brief Writes the model in the binary compiled format
+    /// \param model The model to write
+    /// \param pathToWrite The path to write
+    /// \param modelPath The path of the bioMod file the model was built from
+    ///
+    static void writeCompiledModel(
+        Model &model,
+        const utils::Path& pathToWrite,
+        const utils::Path& modelPath);
+
+    ///
+    /// \brief Writes data (usually one column per frame) in the binary data format
+    /// \param data The data to write
+    /// \param pathToWrite The path to write
+    ///
+    /// The file can be loaded with Reader::readBinaryDataFile or mapped with
+    /// utils::MappedMatrix.
+    ///
+    static void writeBinaryDataFile(
+        const utils::Matrix& data,
+        const utils::Path& pathToWrite);
 #endif
 };
 
@@ -175,7 +175,9 @@ public:
     /// \brief Return the rbdl idx of subtrees of each segments
     /// \return the rbdl idx of subtrees of each segments
     ///
-    std::vector<std::vector<unsigned int> > getDofSubTrees();
+    /// The subtrees are computed on the first call and kept until a segment is added
+    ///
+    const std::vector<std::vector<unsigned int> >& getDofSubTrees();
 
 protected:
     ///
@@ -340,11 +342,37 @@ public:
     /// \param Qdot The generalized velocities
     /// \param Qddot The generalized accelerations
     ///
+    /// The forward pass is skipped if the model is already at the requested Q, Qdot and Qddot
+    /// (bitwise comparison with the last update). With the Casadi backend, it is always computed
+    ///
     void UpdateKinematicsCustom(
         const GeneralizedCoordinates *Q = nullptr,
         const GeneralizedVelocity *Qdot = nullptr,
         const rigidbody::GeneralizedAcceleration *Qddot = nullptr);
 
+    ///
+    /// \brief Forget the state of the last kinematics update, so the next one is computed.
+    /// This must be called if the RBDL model is modified without going through the Joints interface
+    ///
+    void invalidateKinematicsCache();
+
+    ///
+    /// \brief Return the number of kinematics updates that were skipped since the model was already at the requested state
+    /// \return The number of kinematics updates skipped
+    ///
+    unsigned int nbKinematicsCacheHits() const;
+
+    ///
+    /// \brief Return the number of kinematics updates that were actually computed
+    /// \return The number of kinematics updates computed
+    ///
+    unsigned int nbKinematicsCacheMisses() const;
+
+    ///
+    /// \brief Set the kinematics cache hits and misses counters back to 0
+    ///
+    void resetKinematicsCacheCounters();
+
 
     // -- POSITION INTERFACE OF THE MODEL -- //
 
@@ -364,6 +392,16 @@ public:
     ///
     std::vector<utils::RotoTrans> allGlobalJCS() const;
 
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Return the joint coordinate system (JCS) of all the segments in global reference frame for a whole trajectory
+    /// \param Q The generalized coordinates (nbQ x nFrames), one frame per column
+    /// \return The JCS stacked (16*nbSegment x nFrames), the column major 4x4 matrix of the segment i at frame f being at rows [16*i, 16*i+15] of column f
+    ///
+    utils::Matrix allGlobalJCSBatch(
+        const utils::Matrix &Q);
+#endif
+
     ///
     /// \brief Return the joint coordinate system (JCS) for the segment in global reference frame at a given Q
     /// \param Q The generalized coordinates
@@ -693,6 +731,45 @@ public:
         bool updateKin = true
     );
 
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Return the vertices of all the meshes, packed in the reference frame of their segment
+    /// \return The vertices (3 x nVertices), the vertices of the segment i being the columns [meshPointsOffsets()[i], meshPointsOffsets()[i+1])
+    ///
+    /// The meshes are packed on the first call and kept until a segment is added
+    ///
+    const utils::Matrix& meshPointsPacked();
+
+    ///
+    /// \brief Return the index of the first packed vertex of each segment
+    /// \return The offsets (nbSegment + 1), the last one being the total number of vertices
+    ///
+    const std::vector<unsigned int>& meshPointsOffsets();
+
+    ///
+    /// \brief Return the faces of all the meshes, indexing the packed vertices
+    /// \return The vertex indices of the faces stacked (3*nFaces)
+    ///
+    const std::vector<int>& meshFacesPacked();
+
+    ///
+    /// \brief Return the vertices of all the meshes in global reference frame for a whole trajectory
+    /// \param Q The generalized coordinates (nbQ x nFrames), one frame per column
+    /// \return The vertices stacked (3*nVertices x nFrames), the vertex i of the frame f being at rows [3*i, 3*i+2] of column f
+    ///
+    utils::Matrix meshPointsBatch(
+        const utils::Matrix &Q);
+
+    ///
+    /// \brief Compute the vertices of all the meshes in global reference frame for a whole trajectory into a preallocated buffer
+    /// \param Q The generalized coordinates (nbQ x nFrames), one frame per column
+    /// \param out The buffer of 3*nVertices*nFrames values to fill, the vertex i of the frame f being at [3*(nVertices*f + i), 3*(nVertices*f + i)+2]
+    ///
+    void meshPointsBatch(
+        const utils::Matrix &Q,
+        double* out);
+#endif
+
     ///
     /// \brief Return the mesh faces for all the segments
     /// \return The mesh faces for all the segments
@@ -966,6 +1043,46 @@ public:
         std::vector<utils::SpatialVector>* f_ext = nullptr,
         std::vector<utils::Vector>* f_contacts = nullptr);
 
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Compute the derivatives of the inverse dynamics using the derivatives of the recursive Newton-Euler algorithm
+    /// \param Q The Generalized Coordinates
+    /// \param QDot The Generalized Velocities
+    /// \param QDDot The Generalized Accelerations
+    /// \param dTau_dQ The derivative of the Generalized Torques with respect to Q (nbGeneralizedTorque x nbQ)
+    /// \param dTau_dQDot The derivative of the Generalized Torques with respect to QDot (nbGeneralizedTorque x nbQdot)
+    /// \param dTau_dQDDot The derivative of the Generalized Torques with respect to QDDot, that is the mass matrix (nbGeneralizedTorque x nbQddot)
+    ///
+    /// Only the models made of single dof joints (no quaternion) and without soft contacts are supported
+    ///
+    void InverseDynamicsDerivatives(
+        const GeneralizedCoordinates& Q,
+        const GeneralizedVelocity& QDot,
+        const GeneralizedAcceleration& QDDot,
+        utils::Matrix& dTau_dQ,
+        utils::Matrix& dTau_dQDot,
+        utils::Matrix& dTau_dQDDot);
+
+    ///
+    /// \brief Compute the derivatives of the forward dynamics from the derivatives of the inverse dynamics
+    /// \param Q The Generalized Coordinates
+    /// \param QDot The Generalized Velocities
+    /// \param Tau The Generalized Torques
+    /// \param dQDDot_dQ The derivative of the Generalized Accelerations with respect to Q (nbQddot x nbQ)
+    /// \param dQDDot_dQDot The derivative of the Generalized Accelerations with respect to QDot (nbQddot x nbQdot)
+    /// \param dQDDot_dTau The derivative of the Generalized Accelerations with respect to Tau, that is the inverse of the mass matrix (nbQddot x nbGeneralizedTorque)
+    ///
+    /// Only the models made of single dof joints (no quaternion) and without soft contacts are supported
+    ///
+    void ForwardDynamicsDerivatives(
+        const GeneralizedCoordinates& Q,
+        const GeneralizedVelocity& QDot,
+        const GeneralizedTorque& Tau,
+        utils::Matrix& dQDDot_dQ,
+        utils::Matrix& dQDDot_dQDot,
+        utils::Matrix& dQDDot_dTau);
+#endif
+
     ///
     /// \brief Biorbd's implementation of forward dynamics with a free floating base
     /// \param Q The Generalized Coordinates
@@ -1058,8 +1175,35 @@ protected:
     m_nRotAQuat; ///< The number of segments per quaternion
     std::shared_ptr<bool>
     m_isKinematicsComputed; ///< If the kinematics are computed
+    std::shared_ptr<GeneralizedCoordinates>
+    m_kinematicsQ; ///< The Q of the last kinematics update
+    std::shared_ptr<GeneralizedVelocity>
+    m_kinematicsQdot; ///< The Qdot of the last kinematics update (empty if the velocities were not computed)
+    std::shared_ptr<GeneralizedAcceleration>
+    m_kinematicsQddot; ///< The Qddot of the last kinematics update (empty if the accelerations were not computed)
+    std::shared_ptr<unsigned int>
+    m_nbKinematicsCacheHits; ///< The number of kinematics updates skipped
+    std::shared_ptr<unsigned int>
+    m_nbKinematicsCacheMisses; ///< The number of kinematics updates computed
     std::shared_ptr<utils::Scalar>
     m_totalMass; ///< Mass of all the bodies combined
+    std::shared_ptr<std::vector<std::vector<unsigned int>>>
+    m_dofSubTrees; ///< The rbdl idx of subtrees of each dof (empty if not computed yet)
+    std::shared_ptr<std::vector<RigidBodyDynamics::Math::MatrixNd>>
+    m_massMatrixInverseF; ///< Workspace of the (6 x nbDof) F blocks of massMatrixInverse
+    std::shared_ptr<utils::Matrix>
+    m_meshPointsPacked; ///< The vertices of all the meshes in the reference frame of their segment
+    std::shared_ptr<std::vector<unsigned int>>
+    m_meshPointsOffsets; ///< The index of the first packed vertex of each segment (empty if not packed yet)
+    std::shared_ptr<std::vector<int>>
+    m_meshFacesPacked; ///< The faces of all the meshes, indexing the packed vertices
+
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Pack the vertices and the faces of all the meshes if they are not already
+    ///
+    void packMeshes();
+#endif
 
     ///
     /// \brief Calculate the joint coordinate system (JCS) in global reference frame of a specified segment
@@ -194,15 +194,10 @@ protected:
         const std::vector<unsigned int> &occlusion = std::vector<unsigned int>());
 
     ///
-    /// \brief Manage the occlusion during the iteration
-    /// \param InvTp The inverse of the Tp matrix
-    /// \param measure The vector actual measurement to track
-    /// \param occlusion The vector where occlusions occurs
+    /// \brief Return the number of measurements that are dropped for each occlusion index
+    /// \return The number of measurements of an occluded element
     ///
-    virtual void manageOcclusionDuringIteration(
-        utils::Matrix &InvTp,
-        utils::Vector &measure,
-        const std::vector<unsigned int> &occlusion);
+    virtual unsigned int nbMeasurementsByOcclusion() const;
 
     // Variables attributes
     std::shared_ptr<KalmanParam> m_params; ///< The parameters of the Kalman filter
@@ -218,6 +213,18 @@ protected:
     m_R; ///< Matrix of the noise on the measurements
     std::shared_ptr<utils::Matrix> m_Pp; ///< Covariance matrix
 
+    // Workspaces of the iteration, reused from one frame to the other
+    std::shared_ptr<std::vector<unsigned int>> m_observedRows; ///< Index of the measurements that are not occluded
+    std::shared_ptr<utils::Vector> m_xkm; ///< Predicted state
+    std::shared_ptr<utils::Matrix> m_Pkm; ///< Predicted covariance matrix
+    std::shared_ptr<utils::Matrix> m_Hobs; ///< Rows of the hessian of the observed measurements
+    std::shared_ptr<utils::Vector> m_innovation; ///< Innovation of the observed measurements
+    std::shared_ptr<utils::Matrix> m_Robs; ///< Noise matrix of the observed measurements
+    std::shared_ptr<utils::Matrix> m_PHt; ///< Predicted covariance times the transposed hessian
+    std::shared_ptr<utils::Matrix> m_S; ///< Covariance of the innovation
+    std::shared_ptr<utils::Matrix> m_K; ///< Gain of the filter
+    std::shared_ptr<utils::Matrix> m_IKH; ///< Identity minus the gain times the hessian
+
 };
 
 }
@@ -95,15 +95,10 @@ public:
 
 protected:
     ///
-    /// \brief Manage the occlusion during the iteration
-    /// \param InvTp The inverse of the Tp matrix
-    /// \param measure The vector actual measurement to track
-    /// \param occlusion The vector where occlusions occurs
-    ///
-    virtual void manageOcclusionDuringIteration(
-        utils::Matrix &InvTp,
-        utils::Vector &measure,
-        const std::vector<unsigned int> &occlusion);
+    /// \brief Return the number of measurements that are dropped for each occluded IMU
+    /// \return The number of measurements of an occluded IMU
+    ///
+    virtual unsigned int nbMeasurementsByOcclusion() const;
 
     std::shared_ptr<bool> m_firstIteration; ///< If first iteration was done
 };
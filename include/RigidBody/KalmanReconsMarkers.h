@@ -98,6 +98,23 @@ public:
         GeneralizedAcceleration *Qddot = nullptr,
         bool removeAxes=true);
 
+    ///
+    /// \brief Reconstruct the kinematics of a whole trial from markers data
+    /// \param model The joint model
+    /// \param Tobs The observed markers stacked (3*nbTechnicalMarkers x nFrames), the occluded markers being NaN or zeros
+    /// \param Q The generalized coordinates (nbQ x nFrames)
+    /// \param Qdot The generalized velocities (nbQdot x nFrames)
+    /// \param Qddot The generalized accelerations (nbQddot x nFrames)
+    /// \param removeAxes If the algo should ignore or not the removeAxis defined in the bioMod file
+    ///
+    void reconstructTrial(
+        Model &model,
+        const utils::Matrix &Tobs,
+        utils::Matrix &Q,
+        utils::Matrix &Qdot,
+        utils::Matrix &Qddot,
+        bool removeAxes=true);
+
     ///
     /// \brief This function cannot be used to reconstruct frames
     ///
@@ -116,15 +133,10 @@ protected:
     virtual void initialize();
 
     ///
-    /// \brief Manage the occlusion during the iteration
-    /// \param InvTp The inverse of the Tp matrix
-    /// \param measure The vector actual measurement to track
-    /// \param occlusion The vector where occlusions occurs
+    /// \brief Return the number of measurements that are dropped for each occluded marker
+    /// \return The number of measurements of an occluded marker
     ///
-    virtual void manageOcclusionDuringIteration(
-        utils::Matrix& InvTp,
-        utils::Vector &measure,
-        const std::vector<unsigned int> &occlusion);
+    virtual unsigned int nbMeasurementsByOcclusion() const;
 
     std::shared_ptr<utils::Matrix>
     m_PpInitial; ///< Initial covariance matrix
@@ -329,6 +329,14 @@ public:
     unsigned int nbMarkers(
         unsigned int idxSegment) const;
 
+    ///
+    /// \brief Return the index of the body the marker is attached on
+    /// \param idx The index of the marker
+    /// \return The index of the body in the RBDL model
+    ///
+    unsigned int markerBodyId(
+        unsigned int idx);
+
     ///
     /// \brief Return the number of technical markers
     /// \return The number of technical markers
@@ -387,6 +395,32 @@ public:
         bool updateKin);
 
 #ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Return the jacobian of all the markers in a single matrix
+    /// \param Q The generalized coordinates
+    /// \param removeAxis If there are axis to remove from the position variables
+    /// \param updateKin If the model should be updated
+    /// \return The jacobian of the markers stacked (3*nbMarkers x nbQ)
+    ///
+    /// The jacobian of each body is computed once and shared by all the markers attached on it
+    ///
+    utils::Matrix allMarkersJacobian(
+        const GeneralizedCoordinates &Q,
+        bool removeAxis=true,
+        bool updateKin = true);
+
+    ///
+    /// \brief Return the jacobian of all the technical markers in a single matrix
+    /// \param Q The generalized coordinates
+    /// \param removeAxis If there are axis to remove from the position variables
+    /// \param updateKin If the model should be updated
+    /// \return The jacobian of the technical markers stacked (3*nbTechnicalMarkers x nbQ)
+    ///
+    utils::Matrix allTechnicalMarkersJacobian(
+        const GeneralizedCoordinates &Q,
+        bool removeAxis=true,
+        bool updateKin = true);
+
     ///
     /// \brief Performs an inverse kinematics
     /// \param markers The markers to track
@@ -399,9 +433,84 @@ public:
         const GeneralizedCoordinates& Qinit,
         GeneralizedCoordinates &Q,
         bool removeAxes=true);
+
+    ///
+    /// \brief Performs an inverse kinematics on a sequence of frames using a Levenberg-Marquardt algorithm
+    /// \param markers The technical markers to track, stacked (3*nbTechnicalMarkers x nFrames). A marker with a NaN coordinate is ignored for that frame
+    /// \param Qinit The initial guess for the first frame, the following frames are warm-started from the solution of the previous one
+    /// \param Q The generalized coordinates that track the markers (nbQ x nFrames)
+    /// \param residuals The difference between the model and the tracked markers (3*nbTechnicalMarkers x nFrames), NaN for the ignored markers
+    /// \param nfev The number of residuals evaluations for each frame
+    /// \param njev The number of jacobian evaluations for each frame
+    /// \param status The reason of termination for each frame (-1: no marker to track, 0: maxNbEvaluations is reached, 1: gtol is satisfied, 2: ftol is satisfied, 3: xtol is satisfied)
+    /// \param removeAxes If the markers should be projected on the axes
+    /// \param xtol The tolerance on the relative change of the generalized coordinates
+    /// \param ftol The tolerance on the relative change of the cost function
+    /// \param gtol The tolerance on the gradient of the cost function
+    /// \param maxNbEvaluations The maximal number of residuals evaluations per frame
+    ///
+    void inverseKinematicsSequence(
+        const utils::Matrix& markers,
+        const GeneralizedCoordinates& Qinit,
+        utils::Matrix& Q,
+        utils::Matrix& residuals,
+        std::vector<int>& nfev,
+        std::vector<int>& njev,
+        std::vector<int>& status,
+        bool removeAxes = true,
+        double xtol = 1e-6,
+        double ftol = 1e-8,
+        double gtol = 1e-8,
+        unsigned int maxNbEvaluations = 1000);
+
+    ///
+    /// \brief Compute all the markers for a whole trajectory in the global reference frame
+    /// \param Q The generalized coordinates (nbQ x nFrames), one frame per column
+    /// \param removeAxis If there are axis to remove from the position variables
+    /// \return The markers stacked (3*nbMarkers x nFrames), the marker i of the frame f being at rows [3*i, 3*i+2] of column f
+    ///
+    utils::Matrix markersBatch(
+        const utils::Matrix& Q,
+        bool removeAxis = true);
+
+    ///
+    /// \brief Compute the technical markers for a whole trajectory in the global reference frame
+    /// \param Q The generalized coordinates (nbQ x nFrames), one frame per column
+    /// \param removeAxis If there are axis to remove from the position variables
+    /// \return The technical markers stacked (3*nbTechnicalMarkers x nFrames)
+    ///
+    utils::Matrix technicalMarkersBatch(
+        const utils::Matrix& Q,
+        bool removeAxis = true);
+
+    ///
+    /// \brief Compute the anatomical markers for a whole trajectory in the global reference frame
+    /// \param Q The generalized coordinates (nbQ x nFrames), one frame per column
+    /// \param removeAxis If there are axis to remove from the position variables
+    /// \return The anatomical markers stacked (3*nbAnatomicalMarkers x nFrames)
+    ///
+    utils::Matrix anatomicalMarkersBatch(
+        const utils::Matrix& Q,
+        bool removeAxis = true);
 #endif
 
 protected:
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Compute a subset of the markers for a whole trajectory
+    /// \param Q The generalized coordinates (nbQ x nFrames)
+    /// \param removeAxis If there are axis to remove from the position variables
+    /// \param lookForTechnical Keep only the technical markers
+    /// \param lookForAnatomical Keep only the anatomical markers
+    /// \return The markers stacked (3*nMarkers x nFrames)
+    ///
+    utils::Matrix markersBatch(
+        const utils::Matrix& Q,
+        bool removeAxis,
+        bool lookForTechnical,
+        bool lookForAnatomical);
+#endif
+
     ///
     /// \brief Compute the jacobian of the markers
     /// \param Q The generalized coordinates
@@ -416,6 +525,22 @@ protected:
         bool updateKin,
         bool lookForTechnical); // Retourne la jacobienne des markers
 
+#ifndef BIORBD_USE_CASADI_MATH
+    ///
+    /// \brief Compute the jacobian of the markers in a single matrix
+    /// \param Q The generalized coordinates
+    /// \param removeAxis If there are axis to remove from the position variables
+    /// \param updateKin If the model should be updated
+    /// \param lookForTechnical Check if only technical markers are to be computed
+    /// \return The jacobian of the markers stacked (3*nMarkers x nbQ)
+    ///
+    utils::Matrix allMarkersJacobian(
+        const GeneralizedCoordinates &Q,
+        bool removeAxis,
+        bool updateKin,
+        bool lookForTechnical);
+#endif
+
     std::shared_ptr<std::vector<NodeSegment>>
             m_marks; ///< The markers
 
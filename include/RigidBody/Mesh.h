@@ -2,6 +2,7 @@
 #define BIORBD_RIGIDBODY_MESH_H
 
 #include "biorbdConfig.h"
+#include <functional>
 #include <memory>
 #include <vector>
 
@@ -58,6 +59,24 @@ public:
     void DeepCopy(
         const Mesh& other);
 
+    ///
+    /// \brief Defer the reading of the vertex and the faces until they are first accessed
+    /// \param reader The function that reads the mesh (usually from the mesh file)
+    ///
+    /// The rotations and scalings applied before the reading are replayed on
+    /// the vertex once they are read. The deep copies of a deferred mesh share its
+    /// geometry, so it is read once for all of them, until one of them is modified
+    /// and gets its own geometry.
+    ///
+    void setDeferredReader(
+        const std::function<Mesh()>& reader);
+
+    ///
+    /// \brief Return if the vertex and the faces are read
+    /// \return If the vertex and the faces are read
+    ///
+    bool isLoaded() const;
+
     ///
     /// \brief Set the patch color
     /// \param color The color
@@ -167,10 +186,40 @@ public:
     const utils::Path& path() const;
 
 protected:
+    ///
+    /// \brief Read the vertex and the faces if they were deferred and are not read yet
+    ///
+    void load() const;
+
+    ///
+    /// \brief Apply a transformation to the vertex, or queue it if they are not read yet
+    /// \param transformation The transformation to apply to each vertex
+    ///
+    void transformVertex(
+        const std::function<void(utils::Vector3d&)>& transformation);
+
+    ///
+    /// \brief Give the mesh its own vertex if they are shared with a deep copy
+    ///
+    void detachVertex();
+
+    ///
+    /// \brief Give the mesh its own faces if they are shared with a deep copy
+    ///
+    void detachFaces();
+
+    ///
+    /// \brief The deferred reading of a mesh, shared by its deep copies
+    ///
+    class DeferredReader;
+
+    ///
+    /// \brief The vertex, the faces and their deferred reading of a mesh
+    ///
+    class Geometry;
+
+    std::shared_ptr<Geometry> m_geometry; ///< The geometry (shared by the shallow copies only)
     std::shared_ptr<utils::RotoTrans> m_rotation; ///< The rotation
-    std::shared_ptr<std::vector<utils::Vector3d>> m_vertex; ///< The vertex
-    std::shared_ptr<std::vector<MeshFace>>
-            m_faces; ///< The faces
     std::shared_ptr<utils::Path> m_pathFile; ///< The path to the mesh file
     std::shared_ptr<utils::Vector3d> m_patchColor; ///< The color of faces
     std::shared_ptr<utils::Vector3d> m_scale; ///< The scale
@@ -72,6 +72,10 @@ public:
     /// \param variables The variables in the equation
     /// \return The evaluated equation
     ///
+    /// Plain numbers are directly converted. Other equations are compiled the
+    /// first time they are met and the compiled version is kept, the variables
+    /// being looked up in the variable set at each evaluation.
+    ///
     static double evaluateEquation(
         Equation wholeEq,
         const std::map<Equation, double>& variables);
@@ -0,0 +1,89 @@
+#ifndef BIORBD_UTILS_MAPPED_MATRIX_H
+#define BIORBD_UTILS_MAPPED_MATRIX_H
+
+#include <memory>
+#include <cstddef>
+#include "biorbdConfig.h"
+
+#define BIORBD_BINARY_DATA_MAGIC "BIORBDD"
+#define BIORBD_BINARY_DATA_VERSION 1
+
+#ifndef BIORBD_USE_CASADI_MATH
+namespace BIORBD_NAMESPACE
+{
+namespace utils
+{
+class Path;
+class Matrix;
+
+///
+/// \brief Read-only memory mapping of a binary data file
+///
+/// The binary data files (see Writer::writeBinaryDataFile) hold a column-major
+/// matrix, usually one column per frame, after a 32 bytes header. Mapping them
+/// gives access to the values without loading the whole file, the operating
+/// system paging in the frames as they are used. The copies of a MappedMatrix
+/// share the same mapping, which is released with the last of them.
+///
+class BIORBD_API MappedMatrix
+{
+public:
+    ///
+    /// \brief Map a binary data file
+    /// \param path The path of the file
+    ///
+    MappedMatrix(
+        const Path& path);
+
+    ///
+    /// \brief Return the number of rows
+    /// \return The number of rows
+    ///
+    size_t rows() const;
+
+    ///
+    /// \brief Return the number of columns
+    /// \return The number of columns
+    ///
+    size_t cols() const;
+
+    ///
+    /// \brief Return the mapped values, stored column-major
+    /// \return The mapped values
+    ///
+    const double* data() const;
+
+    ///
+    /// \brief Copy some columns of the mapped values
+    /// \param firstCol The first column to copy
+    /// \param nbCols The number of columns to copy
+    /// \return The requested columns
+    ///
+    Matrix block(
+        size_t firstCol,
+        size_t nbCols) const;
+
+    ///
+    /// \brief Copy all the mapped values
+    /// \return The mapped values
+    ///
+    Matrix matrix() const;
+
+protected:
+    ///
+    /// \brief The mapping of a file, unmapped when destroyed
+    ///
+    class FileMapping;
+
+    std::shared_ptr<FileMapping> m_mapping; ///< The mapping of the file
+    size_t m_rows; ///< The number of rows
+    size_t m_cols; ///< The number of columns
+    const double* m_data; ///< The values in the mapping
+
+};
+
+}
+}
+#endif
+
+#endif // BIORBD_UTILS_MAPPED_MATRIX_H
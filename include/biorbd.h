@@ -7,6 +7,7 @@
 #include "BiorbdModel.h"
 #include "ModelReader.h"
 #include "ModelWriter.h"
+#include "ForwardSimulation.h"
 
 #include "Utils/all.h"
 #include "RigidBody/all.h"
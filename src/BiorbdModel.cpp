@@ -1,9 +1,11 @@
 #define BIORBD_API_EXPORTS
 #include "BiorbdModel.h"
 
+#include <cstdlib>
 #include <rbdl/Model.h>
 #include <rbdl/Kinematics.h>
 #include "ModelReader.h"
+#include "ModelWriter.h"
 #include "RigidBody/GeneralizedCoordinates.h"
 #include "RigidBody/NodeSegment.h"
 #include "Utils/String.h"
@@ -21,12 +23,58 @@ Model::Model() :
 
 }
 
-Model::Model(const utils::Path &path) :
+namespace
+{
+bool isEnvironmentVariableSet(const char* name)
+{
+    const char* value(std::getenv(name));
+    return value && utils::String(value).compare("") && utils::String(value).compare("0");
+}
+}
+
+Model::Model(
+    const utils::Path &path,
+    bool lazyMeshes) :
     m_path(std::make_shared<utils::Path>(path))
 {
+    lazyMeshes = lazyMeshes || isEnvironmentVariableSet("BIORBD_LAZY_MESHES");
+#ifndef BIORBD_USE_CASADI_MATH
+    // The compiled model cache is opt-in as it writes a file next to the bioMod
+    if (isEnvironmentVariableSet("BIORBD_COMPILED_MODEL_CACHE")) {
+        Reader::readModelFileWithCache(path, this, lazyMeshes);
+        // The compiled model holds the absolute path of the bioMod, the path is kept as given
+        m_path = std::make_shared<utils::Path>(path);
+        return;
+    }
+#endif
+    Reader::readModelFile(*m_path, this, lazyMeshes);
+}
 
-    Reader::readModelFile(*m_path, this);
+Model Model::workspace() const
+{
+    // The copy constructors share the structure, but copy the RBDL kinematic state
+    Model copy(*this);
+#ifdef MODULE_MUSCLES
+    // Muscles store their geometry and state while computing, so they cannot be shared
+    static_cast<internal_forces::muscles::Muscles&>(copy) =
+        internal_forces::muscles::Muscles::DeepCopy();
+#endif
+    return copy;
+}
+
+#ifndef BIORBD_USE_CASADI_MATH
+Model Model::loadCompiled(
+    const utils::Path& path)
+{
+    return Reader::readCompiledModel(path);
+}
+
+void Model::saveCompiled(
+    const utils::Path& path)
+{
+    Writer::writeCompiledModel(*this, path);
 }
+#endif
 
 utils::Path Model::path() const
 {
@@ -0,0 +1,273 @@
+#define BIORBD_API_EXPORTS
+#include "ForwardSimulation.h"
+
+#ifndef BIORBD_USE_CASADI_MATH
+#include <algorithm>
+#include <cmath>
+#include <exception>
+#include <thread>
+#include "BiorbdModel.h"
+#include "Utils/Error.h"
+#include "Utils/Matrix.h"
+#include "Utils/Vector.h"
+#include "RigidBody/GeneralizedCoordinates.h"
+#include "RigidBody/GeneralizedVelocity.h"
+#include "RigidBody/GeneralizedAcceleration.h"
+#include "RigidBody/GeneralizedTorque.h"
+#ifdef MODULE_MUSCLES
+#include "InternalForces/Muscles/State.h"
+#endif
+
+using namespace BIORBD_NAMESPACE;
+
+ForwardSimulation::ForwardSimulation(
+    Model &model,
+    DYNAMICS dynamics,
+    INTEGRATOR integrator) :
+    m_model(model),
+    m_dynamics(dynamics),
+    m_integrator(integrator),
+    m_rtol(1e-6),
+    m_atol(1e-8)
+{
+#ifndef MODULE_MUSCLES
+    utils::Error::check(m_dynamics != MUSCLE_EXCITATION_DRIVEN,
+                        "Muscle driven simulations require biorbd to be compiled with the muscles");
+#endif
+    if (m_dynamics == TORQUE_DRIVEN_WITH_CONTACTS) {
+        utils::Error::check(m_model.nbContacts() > 0,
+                            "The model must have rigid contacts to simulate with contacts");
+        // Bind the constraints before the workspaces copy them
+        m_model.getConstraints();
+    }
+}
+
+unsigned int ForwardSimulation::nbStates() const
+{
+    unsigned int nbStates(m_model.nbQ() + m_model.nbQdot());
+#ifdef MODULE_MUSCLES
+    if (m_dynamics == MUSCLE_EXCITATION_DRIVEN) {
+        nbStates += m_model.nbMuscles();
+    }
+#endif
+    return nbStates;
+}
+
+unsigned int ForwardSimulation::nbControls() const
+{
+#ifdef MODULE_MUSCLES
+    if (m_dynamics == MUSCLE_EXCITATION_DRIVEN) {
+        return m_model.nbMuscles();
+    }
+#endif
+    return m_model.nbGeneralizedTorque();
+}
+
+void ForwardSimulation::setTolerances(
+    double rtol,
+    double atol)
+{
+    utils::Error::check(rtol > 0 && atol > 0, "The tolerances must be positive");
+    m_rtol = rtol;
+    m_atol = atol;
+}
+
+std::vector<utils::Matrix> ForwardSimulation::run(
+    const utils::Matrix &initialStates,
+    const utils::Matrix &controls,
+    double dt,
+    unsigned int nbThreads)
+{
+    utils::Error::check(controls.rows() == nbControls(),
+                        "Controls must be of dimension nbControls x nSteps");
+    return runAll(initialStates,
+    [&controls](unsigned int step, double, const utils::Vector&, utils::Vector& u) {
+        u = controls.col(step);
+    }, static_cast<unsigned int>(controls.cols()), dt, nbThreads);
+}
+
+std::vector<utils::Matrix> ForwardSimulation::run(
+    const utils::Matrix &initialStates,
+    const ControlFunction &control,
+    unsigned int nbSteps,
+    double dt,
+    unsigned int nbThreads)
+{
+    return runAll(initialStates,
+    [&control](unsigned int, double t, const utils::Vector& x, utils::Vector& u) {
+        control(t, x, u);
+    }, nbSteps, dt, nbThreads);
+}
+
+std::vector<utils::Matrix> ForwardSimulation::runAll(
+    const utils::Matrix &initialStates,
+    const StepControlFunction &control,
+    unsigned int nbSteps,
+    double dt,
+    unsigned int nbThreads)
+{
+    utils::Error::check(initialStates.rows() == nbStates(),
+                        "Initial states must be of dimension nbStates x nRuns");
+    utils::Error::check(dt > 0, "The time step must be positive");
+    unsigned int nbRuns(static_cast<unsigned int>(initialStates.cols()));
+    nbThreads = std::max(1u, std::min(nbThreads, nbRuns));
+
+    std::vector<utils::Matrix> states(nbRuns);
+    if (nbThreads == 1) {
+        for (unsigned int r = 0; r < nbRuns; ++r) {
+            integrate(m_model, initialStates.col(r), control, nbSteps, dt, states[r]);
+        }
+        return states;
+    }
+
+    // Each thread works on its own workspace and takes one run out of nbThreads
+    std::vector<Model> workspaces;
+    workspaces.reserve(nbThreads);
+    for (unsigned int t = 0; t < nbThreads; ++t) {
+        workspaces.push_back(m_model.workspace());
+    }
+    std::vector<std::exception_ptr> errors(nbThreads);
+    std::vector<std::thread> threads;
+    for (unsigned int t = 0; t < nbThreads; ++t) {
+        threads.push_back(std::thread([&, t]() {
+            try {
+                for (unsigned int r = t; r < nbRuns; r += nbThreads) {
+                    integrate(workspaces[t], initialStates.col(r), control, nbSteps, dt, states[r]);
+                }
+            } catch (...) {
+                errors[t] = std::current_exception();
+            }
+        }));
+    }
+    for (auto& thread : threads) {
+        thread.join();
+    }
+    for (auto& error : errors) {
+        if (error) {
+            std::rethrow_exception(error);
+        }
+    }
+    return states;
+}
+
+void ForwardSimulation::integrate(
+    Model &model,
+    const utils::Vector &x0,
+    const StepControlFunction &control,
+    unsigned int nbSteps,
+    double dt,
+    utils::Matrix &states)
+{
+    unsigned int n(nbStates());
+    states.resize(n, nbSteps + 1);
+    states.col(0) = x0;
+
+    utils::Vector x(x0);
+    utils::Vector u(nbControls());
+    std::vector<utils::Vector> k(7, utils::Vector(n));
+    utils::Vector xTrial(n);
+    double h(dt); // The adaptive step is carried from one step to the next
+    for (unsigned int step = 0; step < nbSteps; ++step) {
+        double t0(step * dt);
+        if (m_integrator == RK4) {
+            control(step, t0, x, u);
+            dynamics(model, x, u, k[0]);
+            control(step, t0 + dt/2, x + dt/2 * k[0], u);
+            dynamics(model, x + dt/2 * k[0], u, k[1]);
+            control(step, t0 + dt/2, x + dt/2 * k[1], u);
+            dynamics(model, x + dt/2 * k[1], u, k[2]);
+            control(step, t0 + dt, x + dt * k[2], u);
+            dynamics(model, x + dt * k[2], u, k[3]);
+            x += dt/6 * (k[0] + 2*k[1] + 2*k[2] + k[3]);
+        } else {
+            // Dormand-Prince coefficients
+            static const double a[6][6] = {
+                {1./5},
+                {3./40, 9./40},
+                {44./45, -56./15, 32./9},
+                {19372./6561, -25360./2187, 64448./6561, -212./729},
+                {9017./3168, -355./33, 46732./5247, 49./176, -5103./18656},
+                {35./384, 0, 500./1113, 125./192, -2187./6784, 11./84}
+            };
+            static const double c[7] = {0, 1./5, 3./10, 4./5, 8./9, 1, 1};
+            static const double e[7] = {
+                71./57600, 0, -71./16695, 71./1920, -17253./339200, 22./525, -1./40
+            };
+
+            double t(t0);
+            double tEnd(t0 + dt);
+            unsigned int nbSubSteps(0);
+            while (t < tEnd - 1e-12 * dt) {
+                utils::Error::check(++nbSubSteps < 100000,
+                                    "The adaptive integrator failed to reach the requested tolerance");
+                h = std::min(h, tEnd - t);
+
+                control(step, t, x, u);
+                dynamics(model, x, u, k[0]);
+                for (unsigned int s = 1; s < 7; ++s) {
+                    xTrial = x;
+                    for (unsigned int j = 0; j < s; ++j) {
+                        xTrial += h * a[s-1][j] * k[j];
+                    }
+                    control(step, t + c[s] * h, xTrial, u);
+                    dynamics(model, xTrial, u, k[s]);
+                }
+
+                // The last stage is evaluated at the 5th order solution
+                double error(0);
+                for (unsigned int i = 0; i < n; ++i) {
+                    double errorI(0);
+                    for (unsigned int s = 0; s < 7; ++s) {
+                        errorI += h * e[s] * k[s][i];
+                    }
+                    double scale(m_atol + m_rtol * std::max(std::fabs(x[i]), std::fabs(xTrial[i])));
+                    error = std::max(error, std::fabs(errorI) / scale);
+                }
+                if (error <= 1) {
+                    t += h;
+                    x = xTrial;
+                }
+                h *= std::min(5., std::max(0.2, 0.9 * std::pow(std::max(error, 1e-10), -0.2)));
+            }
+        }
+        states.col(step + 1) = x;
+    }
+}
+
+void ForwardSimulation::dynamics(
+    Model &model,
+    const utils::Vector &x,
+    const utils::Vector &u,
+    utils::Vector &xdot)
+{
+    unsigned int nbQ(model.nbQ());
+    unsigned int nbQdot(model.nbQdot());
+    rigidbody::GeneralizedCoordinates Q(x.topRows(nbQ));
+    rigidbody::GeneralizedVelocity QDot(x.segment(nbQ, nbQdot));
+
+    rigidbody::GeneralizedTorque Tau(model);
+#ifdef MODULE_MUSCLES
+    if (m_dynamics == MUSCLE_EXCITATION_DRIVEN) {
+        std::vector<std::shared_ptr<internal_forces::muscles::State>> muscleStates(
+                    model.stateSet());
+        for (unsigned int i = 0; i < muscleStates.size(); ++i) {
+            muscleStates[i]->setExcitation(u[i], true);
+            muscleStates[i]->setActivation(x[nbQ + nbQdot + i], true);
+        }
+        xdot.bottomRows(muscleStates.size()) = model.activationDot(muscleStates);
+        Tau = model.muscularJointTorque(muscleStates, Q, QDot);
+    } else
+#endif
+    {
+        Tau = u;
+    }
+
+    xdot.topRows(nbQ) = model.computeQdot(Q, rigidbody::GeneralizedCoordinates(QDot));
+    if (m_dynamics == TORQUE_DRIVEN_WITH_CONTACTS) {
+        xdot.segment(nbQ, nbQdot) = model.ForwardDynamicsConstraintsDirect(
+                                        Q, QDot, Tau, model.getConstraints());
+    } else {
+        xdot.segment(nbQ, nbQdot) = model.ForwardDynamics(Q, QDot, Tau);
+    }
+}
+#endif
@@ -32,6 +32,7 @@ internal_forces::Geometry::Geometry() :
     m_velocity(std::make_shared<utils::Scalar>(0)),
     m_isGeometryComputed(std::make_shared<bool>(false)),
     m_isVelocityComputed(std::make_shared<bool>(false)),
+    m_arePointsComputed(std::make_shared<bool>(false)),
     m_posAndJacoWereForced(std::make_shared<bool>(false))
 {
 
@@ -55,6 +56,7 @@ internal_forces::Geometry::Geometry(
     m_velocity(std::make_shared<utils::Scalar>(0)),
     m_isGeometryComputed(std::make_shared<bool>(false)),
     m_isVelocityComputed(std::make_shared<bool>(false)),
+    m_arePointsComputed(std::make_shared<bool>(false)),
     m_posAndJacoWereForced(std::make_shared<bool>(false))
 {
 
@@ -88,6 +90,7 @@ void internal_forces::Geometry::DeepCopy(const internal_forces::Geometry &other)
     *m_velocity = *other.m_velocity;
     *m_isGeometryComputed = *other.m_isGeometryComputed;
     *m_isVelocityComputed = *other.m_isVelocityComputed;
+    *m_arePointsComputed = *other.m_arePointsComputed;
     *m_posAndJacoWereForced = *other.m_posAndJacoWereForced;
 }
 
@@ -210,6 +213,8 @@ const utils::Vector3d &internal_forces::Geometry::originInGlobal() const
 {
     utils::Error::check(*m_isGeometryComputed,
                                 "Geometry must be computed at least once before calling originInLocal()");
+    utils::Error::check(*m_arePointsComputed,
+                                "The points were not computed in the last update, calling originInGlobal() is not possible");
     return *m_originInGlobal;
 }
 const utils::Vector3d &internal_forces::Geometry::insertionInGlobal()
@@ -217,6 +222,8 @@ const
 {
     utils::Error::check(*m_isGeometryComputed,
                                 "Geometry must be computed at least once before calling insertionInGlobal()");
+    utils::Error::check(*m_arePointsComputed,
+                                "The points were not computed in the last update, calling insertionInGlobal() is not possible");
     return *m_insertionInGlobal;
 }
 const std::vector<utils::Vector3d>
@@ -224,6 +231,8 @@ const std::vector<utils::Vector3d>
 {
     utils::Error::check(*m_isGeometryComputed,
                                 "Geometry must be computed at least once before calling musclesPointsInGlobal()");
+    utils::Error::check(*m_arePointsComputed,
+                                "The points were not computed in the last update, calling musclesPointsInGlobal() is not possible");
     return *m_pointsInGlobal;
 }
 
@@ -247,18 +256,24 @@ const utils::Matrix& internal_forces::Geometry::jacobian() const
 {
     utils::Error::check(*m_isGeometryComputed,
                                 "Geometry must be computed before calling jacobian()");
+    utils::Error::check(*m_arePointsComputed,
+                                "The points were not computed in the last update, calling jacobian() is not possible");
     return *m_jacobian;
 } // Return the last Jacobian
 utils::Matrix internal_forces::Geometry::jacobianOrigin() const
 {
     utils::Error::check(*m_isGeometryComputed,
                                 "Geometry must be computed before calling jacobianOrigin()");
+    utils::Error::check(*m_arePointsComputed,
+                                "The points were not computed in the last update, calling jacobianOrigin() is not possible");
     return m_jacobian->block(0,0,3,m_jacobian->cols());
 }
 utils::Matrix internal_forces::Geometry::jacobianInsertion() const
 {
     utils::Error::check(*m_isGeometryComputed,
                                 "Geometry must be computed before calling jacobianInsertion()");
+    utils::Error::check(*m_arePointsComputed,
+                                "The points were not computed in the last update, calling jacobianInsertion() is not possible");
     return m_jacobian->block(m_jacobian->rows()-3,0,3,m_jacobian->cols());
 }
 utils::Matrix internal_forces::Geometry::jacobian(
@@ -266,6 +281,8 @@ utils::Matrix internal_forces::Geometry::jacobian(
 {
     utils::Error::check(*m_isGeometryComputed,
                                 "Geometry must be computed before calling jacobian(i)");
+    utils::Error::check(*m_arePointsComputed,
+                                "The points were not computed in the last update, calling jacobian(i) is not possible");
     return m_jacobian->block(3*idxViaPoint,0,3,m_jacobian->cols());
 }
 
@@ -285,6 +302,7 @@ void internal_forces::Geometry::_updateKinematics(
     // Compute the length and velocities
     length(pathModifiers);
     *m_isGeometryComputed = true;
+    *m_arePointsComputed = true;
 
     // Compute the jacobian of the lengths
     computeJacobianLength();
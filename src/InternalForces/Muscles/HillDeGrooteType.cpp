@@ -153,6 +153,12 @@ void internal_forces::muscles::HillDeGrooteType::computeFlCE(
                         ((b33 + b43*normLength)*(b33 + b43*normLength)));
 }
 
+utils::Scalar internal_forces::muscles::HillDeGrooteType::FlCEActivationDerivative(
+    const internal_forces::muscles::State&)
+{
+    return 0;
+}
+
 void internal_forces::muscles::HillDeGrooteType::setType()
 {
     *m_type = internal_forces::muscles::MUSCLE_TYPE::HILL_DE_GROOTE;
@@ -114,6 +114,12 @@ void internal_forces::muscles::HillThelenType::computeFlCE(
     *m_FlCE = exp( -((normLength - 1)*(normLength - 1)) /  0.45 );
 }
 
+utils::Scalar internal_forces::muscles::HillThelenType::FlCEActivationDerivative(
+    const internal_forces::muscles::State&)
+{
+    return 0;
+}
+
 void internal_forces::muscles::HillThelenType::computeFvCE()
 {
 	utils::Scalar v = m_position->velocity();
@@ -252,6 +252,29 @@ const utils::Scalar& internal_forces::muscles::HillType::FlCE(
     return *m_FlCE;
 }
 
+utils::Scalar internal_forces::muscles::HillType::FlCEActivationDerivative(
+    const internal_forces::muscles::State &emg)
+{
+    // FlCE = exp(-(l / (lopt * (c1 * (1 - a) + 1)) - 1)^2 / c2)
+    computeFlCE(emg);
+    utils::Scalar scaling(*m_cste_FlCE_1 * (1 - emg.activation()) + 1);
+    utils::Scalar normLength(position().length() / m_characteristics->optimalLength() / scaling);
+    return *m_FlCE * (-2 * (normLength - 1) / *m_cste_FlCE_2)
+           * normLength * *m_cste_FlCE_1 / scaling;
+}
+
+utils::Scalar internal_forces::muscles::HillType::forceActivationDerivative(
+    const internal_forces::muscles::State &emg)
+{
+    // Only the active part of the force depends on the activation
+    utils::Scalar dFlCE(FlCEActivationDerivative(emg));
+    computeFvCE();
+    computeFlCE(emg);
+    utils::Scalar cosAngle = cos(characteristics().pennationAngle());
+    return characteristics().forceIsoMax()
+           * (*m_FlCE + emg.activation() * dFlCE) * *m_FvCE * cosAngle;
+}
+
 const utils::Scalar& internal_forces::muscles::HillType::FlPE()
 {
     computeFlPE();
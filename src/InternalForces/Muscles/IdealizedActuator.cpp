@@ -109,6 +109,12 @@ const utils::Scalar& internal_forces::muscles::IdealizedActuator::force(
     return *m_force;
 }
 
+utils::Scalar internal_forces::muscles::IdealizedActuator::forceActivationDerivative(
+    const internal_forces::muscles::State&)
+{
+    return characteristics().forceIsoMax();
+}
+
 utils::Scalar
 internal_forces::muscles::IdealizedActuator::getForceFromActivation(
     const internal_forces::muscles::State &emg)
@@ -20,6 +20,7 @@ internal_forces::muscles::Muscle::Muscle() :
     m_position(std::make_shared<internal_forces::muscles::MuscleGeometry>()),
     m_type(std::make_shared<internal_forces::muscles::MUSCLE_TYPE>(internal_forces::muscles::MUSCLE_TYPE::NO_MUSCLE_TYPE)),
     m_characteristics(std::make_shared<internal_forces::muscles::Characteristics>()),
+    m_characteristicsVersion(std::make_shared<unsigned int>(0)),
     m_state(std::make_shared<internal_forces::muscles::State>())
 {
     setType();
@@ -35,6 +36,7 @@ internal_forces::muscles::Muscle::Muscle(
     m_type(std::make_shared<internal_forces::muscles::MUSCLE_TYPE>(internal_forces::muscles::MUSCLE_TYPE::NO_MUSCLE_TYPE)),
     m_characteristics(std::make_shared<internal_forces::muscles::Characteristics>
                       (characteristics)),
+    m_characteristicsVersion(std::make_shared<unsigned int>(0)),
     m_state(std::make_shared<internal_forces::muscles::State>())
 {
 
@@ -50,6 +52,7 @@ internal_forces::muscles::Muscle::Muscle(
     m_type(std::make_shared<internal_forces::muscles::MUSCLE_TYPE>(internal_forces::muscles::MUSCLE_TYPE::NO_MUSCLE_TYPE)),
     m_characteristics(std::make_shared<internal_forces::muscles::Characteristics>
                       (characteristics)),
+    m_characteristicsVersion(std::make_shared<unsigned int>(0)),
     m_state(std::make_shared<internal_forces::muscles::State>(dynamicState))
 {
 
@@ -65,6 +68,7 @@ internal_forces::muscles::Muscle::Muscle(
     m_type(std::make_shared<internal_forces::muscles::MUSCLE_TYPE>(internal_forces::muscles::MUSCLE_TYPE::NO_MUSCLE_TYPE)),
     m_characteristics(std::make_shared<internal_forces::muscles::Characteristics>
                       (characteristics)),
+    m_characteristicsVersion(std::make_shared<unsigned int>(0)),
     m_state(std::make_shared<internal_forces::muscles::State>())
 {
 
@@ -75,6 +79,7 @@ internal_forces::muscles::Muscle::Muscle(const internal_forces::muscles::Muscle
     m_position(other.m_position),
     m_type(other.m_type),
     m_characteristics(other.m_characteristics),
+    m_characteristicsVersion(other.m_characteristicsVersion),
     m_state(other.m_state)
 {
 
@@ -86,6 +91,7 @@ internal_forces::muscles::Muscle::Muscle(const std::shared_ptr<internal_forces::
     m_position(other->m_position),
     m_type(other->m_type),
     m_characteristics(other->m_characteristics),
+    m_characteristicsVersion(other->m_characteristicsVersion),
     m_state(other->m_state)
 {
 
@@ -100,6 +106,7 @@ internal_forces::muscles::Muscle::Muscle(const utils::String& name,
     m_position(std::make_shared<internal_forces::muscles::MuscleGeometry>(g)),
     m_type(std::make_shared<internal_forces::muscles::MUSCLE_TYPE>(internal_forces::muscles::MUSCLE_TYPE::NO_MUSCLE_TYPE)),
     m_characteristics(std::make_shared<internal_forces::muscles::Characteristics>(c)),
+    m_characteristicsVersion(std::make_shared<unsigned int>(0)),
     m_state(std::make_shared<internal_forces::muscles::State>())
 {
     setState(emg);
@@ -119,6 +126,7 @@ void internal_forces::muscles::Muscle::DeepCopy(const internal_forces::muscles::
     *m_position = other.m_position->DeepCopy();
     *m_type = *other.m_type;
     *m_characteristics = other.m_characteristics->DeepCopy();
+    ++*m_characteristicsVersion;
     *m_state = other.m_state->DeepCopy();
 }
 
@@ -169,6 +177,20 @@ void internal_forces::muscles::Muscle::setPosition(
     const internal_forces::muscles::MuscleGeometry &positions)
 {
     *m_position = positions;
+#ifndef BIORBD_USE_CASADI_MATH
+    // The surrogate was fitted on the previous path
+    m_position->setSurrogate(nullptr);
+#endif
+}
+
+void internal_forces::muscles::Muscle::addPathObject(
+    utils::Vector3d &wrap)
+{
+    internal_forces::Compound::addPathObject(wrap);
+#ifndef BIORBD_USE_CASADI_MATH
+    // The surrogate was fitted on the previous path
+    m_position->setSurrogate(nullptr);
+#endif
 }
 const internal_forces::muscles::MuscleGeometry &internal_forces::muscles::Muscle::position() const
 {
@@ -236,12 +258,23 @@ void internal_forces::muscles::Muscle::computeForce(const internal_forces::muscl
     *m_force = getForceFromActivation(emg);
 }
 
+utils::Scalar internal_forces::muscles::Muscle::forceActivationDerivative(
+    const internal_forces::muscles::State &emg)
+{
+    // The kinematics are kept, so only the force-activation relation is evaluated again
+    double eps(BIORBD_MUSCLE_FINITE_DIFFERENCE_STEP);
+    utils::Scalar forcePerturbed(force(internal_forces::muscles::State(
+                                           emg.excitation(), emg.activation() + eps)));
+    return (forcePerturbed - force(emg)) / eps;
+}
+
 const std::vector<utils::Vector3d>&
 internal_forces::muscles::Muscle::musclesPointsInGlobal(
     rigidbody::Joints &model,
     const rigidbody::GeneralizedCoordinates &Q)
 {
-    m_position->updateKinematics(model,*m_characteristics,*m_pathChanger,&Q,nullptr,2);
+    // The points are not computed by the surrogate (if any), so the path is always computed
+    m_position->updateKinematics(model,*m_characteristics,*m_pathChanger,&Q,nullptr,2,false);
 
     return musclesPointsInGlobal();
 }
@@ -256,12 +289,18 @@ void internal_forces::muscles::Muscle::setForceIsoMax(
     const utils::Scalar& forceMax)
 {
     m_characteristics->setForceIsoMax(forceMax);
+    ++*m_characteristicsVersion;
 }
 
 void internal_forces::muscles::Muscle::setCharacteristics(
     const internal_forces::muscles::Characteristics &characteristics)
 {
     *m_characteristics = characteristics;
+    ++*m_characteristicsVersion;
+}
+unsigned int internal_forces::muscles::Muscle::characteristicsVersion() const
+{
+    return *m_characteristicsVersion;
 }
 const internal_forces::muscles::Characteristics&
 internal_forces::muscles::Muscle::characteristics() const
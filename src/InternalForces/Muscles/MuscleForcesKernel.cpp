@@ -0,0 +1,220 @@
+#define BIORBD_API_EXPORTS
+#include "InternalForces/Muscles/MuscleForcesKernel.h"
+
+#ifndef BIORBD_USE_CASADI_MATH
+#include <cmath>
+#include "Utils/Error.h"
+#include "Utils/Matrix.h"
+#include "Utils/Vector.h"
+#include "InternalForces/Muscles/Muscle.h"
+#include "InternalForces/Muscles/Characteristics.h"
+
+using namespace BIORBD_NAMESPACE;
+
+internal_forces::muscles::MuscleForcesKernel::MuscleForcesKernel() :
+    m_types(std::make_shared<std::vector<internal_forces::muscles::MUSCLE_TYPE>>()),
+    m_useDamping(std::make_shared<std::vector<bool>>()),
+    m_optimalLength(std::make_shared<utils::Vector>()),
+    m_tendonSlackLength(std::make_shared<utils::Vector>()),
+    m_pennationAngle(std::make_shared<utils::Vector>()),
+    m_cosPennationAngle(std::make_shared<utils::Vector>()),
+    m_forceIsoMax(std::make_shared<utils::Vector>()),
+    m_PCSA(std::make_shared<utils::Vector>())
+{
+
+}
+
+internal_forces::muscles::MuscleForcesKernel::MuscleForcesKernel(
+    const std::vector<std::shared_ptr<internal_forces::muscles::Muscle>>& muscles) :
+    m_types(std::make_shared<std::vector<internal_forces::muscles::MUSCLE_TYPE>>()),
+    m_useDamping(std::make_shared<std::vector<bool>>()),
+    m_optimalLength(std::make_shared<utils::Vector>(static_cast<unsigned int>(muscles.size()))),
+    m_tendonSlackLength(std::make_shared<utils::Vector>(static_cast<unsigned int>(muscles.size()))),
+    m_pennationAngle(std::make_shared<utils::Vector>(static_cast<unsigned int>(muscles.size()))),
+    m_cosPennationAngle(std::make_shared<utils::Vector>(static_cast<unsigned int>(muscles.size()))),
+    m_forceIsoMax(std::make_shared<utils::Vector>(static_cast<unsigned int>(muscles.size()))),
+    m_PCSA(std::make_shared<utils::Vector>(static_cast<unsigned int>(muscles.size())))
+{
+    for (unsigned int i=0; i<muscles.size(); ++i) {
+        internal_forces::muscles::MUSCLE_TYPE type(muscles[i]->type());
+        utils::Error::check(type != internal_forces::muscles::MUSCLE_TYPE::NO_MUSCLE_TYPE,
+                            "The type of the muscle " + muscles[i]->name() + " is not defined");
+        const internal_forces::muscles::Characteristics& characteristics(
+            muscles[i]->characteristics());
+        m_types->push_back(type);
+        m_useDamping->push_back(characteristics.useDamping());
+        (*m_optimalLength)[i] = characteristics.optimalLength();
+        (*m_tendonSlackLength)[i] = characteristics.tendonSlackLength();
+        (*m_pennationAngle)[i] = characteristics.pennationAngle();
+        (*m_cosPennationAngle)[i] = std::cos(characteristics.pennationAngle());
+        (*m_forceIsoMax)[i] = characteristics.forceIsoMax();
+        (*m_PCSA)[i] = characteristics.PCSA();
+    }
+}
+
+unsigned int internal_forces::muscles::MuscleForcesKernel::nbMuscles() const
+{
+    return static_cast<unsigned int>(m_types->size());
+}
+
+const utils::Vector& internal_forces::muscles::MuscleForcesKernel::optimalLength() const
+{
+    return *m_optimalLength;
+}
+
+const utils::Vector& internal_forces::muscles::MuscleForcesKernel::tendonSlackLength() const
+{
+    return *m_tendonSlackLength;
+}
+
+const utils::Vector& internal_forces::muscles::MuscleForcesKernel::pennationAngle() const
+{
+    return *m_pennationAngle;
+}
+
+const utils::Vector& internal_forces::muscles::MuscleForcesKernel::forceIsoMax() const
+{
+    return *m_forceIsoMax;
+}
+
+const utils::Vector& internal_forces::muscles::MuscleForcesKernel::PCSA() const
+{
+    return *m_PCSA;
+}
+
+utils::Vector internal_forces::muscles::MuscleForcesKernel::forces(
+    const utils::Vector& lengths,
+    const utils::Vector& velocities,
+    const utils::Vector& activations,
+    const utils::Vector& activeFibers) const
+{
+    return forces(utils::Matrix(lengths), utils::Matrix(velocities),
+                  utils::Matrix(activations), activeFibers).col(0);
+}
+
+utils::Matrix internal_forces::muscles::MuscleForcesKernel::forces(
+    const utils::Matrix& lengths,
+    const utils::Matrix& velocities,
+    const utils::Matrix& activations,
+    const utils::Vector& activeFibers) const
+{
+    Eigen::Index nbMus(nbMuscles());
+    Eigen::Index nbFrames(lengths.cols());
+    utils::Error::check(lengths.rows() == nbMus && velocities.rows() == nbMus
+                        && activations.rows() == nbMus && activeFibers.size() == nbMus,
+                        "There must be a value for each muscle");
+    utils::Error::check(velocities.cols() == nbFrames && activations.cols() == nbFrames,
+                        "There must be a length, a velocity and an activation for each frame");
+
+    // The constants of the relations (see HillType, HillThelenType and HillDeGrooteType)
+    const double hillFlCE_1(0.15);
+    const double hillFlCE_2(0.45);
+    const double hillFvCE_1(1);
+    const double hillFvCE_2(-.33/2 * hillFvCE_1/(1+hillFvCE_1));
+    const double hillFlPE_1(10.0);
+    const double hillFlPE_2(5.0);
+    const double damping(0.1);
+    const double maxShorteningSpeed(10.0);
+
+    // Classify the muscles
+    typedef Eigen::Array<bool, Eigen::Dynamic, 1> Mask;
+    Mask isHill(Mask::Constant(nbMus, false));
+    Mask isDeGroote(Mask::Constant(nbMus, false));
+    Mask isIdealized(Mask::Constant(nbMus, false));
+    Mask isFatigable(Mask::Constant(nbMus, false));
+    Mask hasPassive(Mask::Constant(nbMus, true));
+    Mask hasDamping(Mask::Constant(nbMus, false));
+    for (Eigen::Index i=0; i<nbMus; ++i) {
+        switch ((*m_types)[i]) {
+        case internal_forces::muscles::MUSCLE_TYPE::IDEALIZED_ACTUATOR:
+            isIdealized[i] = true;
+            hasPassive[i] = false;
+            break;
+        case internal_forces::muscles::MUSCLE_TYPE::HILL:
+            isHill[i] = true;
+            break;
+        case internal_forces::muscles::MUSCLE_TYPE::HILL_THELEN_ACTIVE:
+            hasPassive[i] = false;
+            break;
+        case internal_forces::muscles::MUSCLE_TYPE::HILL_THELEN_FATIGABLE:
+            isFatigable[i] = true;
+            break;
+        case internal_forces::muscles::MUSCLE_TYPE::HILL_DE_GROOTE:
+            isDeGroote[i] = true;
+            break;
+        case internal_forces::muscles::MUSCLE_TYPE::HILL_DE_GROOTE_ACTIVE:
+            isDeGroote[i] = true;
+            hasPassive[i] = false;
+            break;
+        case internal_forces::muscles::MUSCLE_TYPE::HILL_DE_GROOTE_FATIGABLE:
+            isDeGroote[i] = true;
+            isFatigable[i] = true;
+            break;
+        default:
+            break;
+        }
+        hasDamping[i] = hasPassive[i] && (*m_useDamping)[i];
+    }
+    auto frames = [nbFrames](const Mask& mask) {
+        return mask.replicate(1, nbFrames);
+    };
+
+    Eigen::ArrayXd optimalLength(m_optimalLength->array());
+    Eigen::ArrayXXd length(lengths.array());
+    Eigen::ArrayXXd velocity(velocities.array());
+    // Same saturation as State::setActivation
+    Eigen::ArrayXXd activation(activations.array().max(0).min(1));
+    Eigen::ArrayXXd normLength(length.colwise() / optimalLength);
+    Eigen::ArrayXXd normVelocity(velocity.colwise() / optimalLength / maxShorteningSpeed);
+
+    // Force-length relation of the contractile element
+    Eigen::ArrayXXd hillNormLength(normLength / (hillFlCE_1 * (1 - activation) + 1));
+    auto deGrooteGaussian = [&normLength](double b1, double b2, double b3, double b4) {
+        return (b1 * (-0.5 * (normLength - b2).square()
+                      / (b3 + b4 * normLength).square()).exp()).eval();
+    };
+    Eigen::ArrayXXd FlCE(frames(isHill).select(
+                             (-(hillNormLength - 1).square() / hillFlCE_2).exp(),
+                             frames(isDeGroote).select(
+                                 deGrooteGaussian(0.815, 1.055, 0.162, 0.063)
+                                 + deGrooteGaussian(0.433, 0.717, -0.030, 0.200)
+                                 + deGrooteGaussian(0.100, 1.000, 0.354, 0.0),
+                                 (-(normLength - 1).square() / 0.45).exp())));
+    FlCE = frames(isFatigable).select(FlCE.colwise() * activeFibers.array(), FlCE);
+
+    // Force-velocity relation of the contractile element
+    Eigen::ArrayXXd hillVelocity(velocity / maxShorteningSpeed);
+    Eigen::ArrayXXd hillFvCE((velocity <= 0).select(
+                                 (1 - hillVelocity.abs()) / (1 + hillVelocity.abs() / hillFvCE_1),
+                                 (1 - 1.33 * hillVelocity / hillFvCE_2) / (1 - hillVelocity / hillFvCE_2)));
+    Eigen::ArrayXXd thelenFvCE((normVelocity > 0).select(
+                                   (1 + normVelocity * 1.6 / 0.06) / (1 + normVelocity / 0.06), 0));
+    Eigen::ArrayXXd deGrooteVelocity(-8.149 * hillVelocity - 0.374);
+    Eigen::ArrayXXd deGrooteFvCE(
+        -0.318 * (deGrooteVelocity + (deGrooteVelocity.square() + 1).sqrt()).log() + 0.886);
+    Eigen::ArrayXXd FvCE(frames(isHill).select(
+                             hillFvCE, frames(isDeGroote).select(deGrooteFvCE, thelenFvCE)));
+
+    // Force-length relation of the passive element
+    Eigen::ArrayXXd FlPE(frames(isHill).select(
+                             (length > 0).select((hillFlPE_1 * (normLength - 1) - hillFlPE_2).exp(), 0),
+                             (normLength > 1).select(
+                                 frames(isDeGroote).select(
+                                     (((4 * (normLength - 1)) / 0.6).exp() - 1) / (std::exp(4.0) - 1),
+                                     ((5.0 * (normLength - 1) / 0.6).exp() - 1) / (std::exp(5.0) - 1)),
+                                 0)));
+    FlPE = frames(hasPassive).select(FlPE, 0);
+
+    // Damping
+    Eigen::ArrayXXd dampingForce(
+        (frames(hasDamping) && velocity > 0).select(normVelocity * damping, 0));
+
+    // Combine the forces
+    Eigen::ArrayXXd force(
+        ((activation * FlCE * FvCE + FlPE + dampingForce).colwise()
+         * (m_forceIsoMax->array() * m_cosPennationAngle->array())));
+    force = frames(isIdealized).select(
+                activation.colwise() * m_forceIsoMax->array(), force);
+    return force.matrix();
+}
+#endif
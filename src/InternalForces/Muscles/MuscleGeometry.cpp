@@ -4,6 +4,7 @@
 #include <rbdl/Kinematics.h>
 #include "Utils/Error.h"
 #include "Utils/Matrix.h"
+#include "Utils/Vector.h"
 #include "Utils/RotoTrans.h"
 #include "RigidBody/NodeSegment.h"
 #include "RigidBody/Joints.h"
@@ -15,6 +16,9 @@
 #include "InternalForces/Geometry.h"
 #include "InternalForces/Muscles/Characteristics.h"
 #include "InternalForces/Muscles/MuscleGeometry.h"
+#ifndef BIORBD_USE_CASADI_MATH
+#include "InternalForces/Muscles/MuscleSurrogate.h"
+#endif
 
 using namespace BIORBD_NAMESPACE;
 
@@ -22,6 +26,11 @@ internal_forces::muscles::MuscleGeometry::MuscleGeometry() :
     internal_forces::Geometry(),
     m_muscleTendonLength(std::make_shared<utils::Scalar>(0)),
     m_muscleLength(std::make_shared<utils::Scalar>(0))
+#ifndef BIORBD_USE_CASADI_MATH
+    ,
+    m_surrogateBasis(std::make_shared<utils::Vector>()),
+    m_surrogateChebyshev(std::make_shared<utils::Matrix>())
+#endif
 
 {
 
@@ -33,6 +42,11 @@ internal_forces::muscles::MuscleGeometry::MuscleGeometry(
     internal_forces::Geometry(origin, insertion),
     m_muscleTendonLength(std::make_shared<utils::Scalar>(0)),
     m_muscleLength(std::make_shared<utils::Scalar>(0))
+#ifndef BIORBD_USE_CASADI_MATH
+    ,
+    m_surrogateBasis(std::make_shared<utils::Vector>()),
+    m_surrogateChebyshev(std::make_shared<utils::Matrix>())
+#endif
 {
 
 }
@@ -49,6 +63,10 @@ void internal_forces::muscles::MuscleGeometry::DeepCopy(const internal_forces::m
     internal_forces::Geometry::DeepCopy(other);
     *m_muscleLength = *other.m_muscleLength;
     *m_muscleTendonLength = *other.m_muscleTendonLength;
+#ifndef BIORBD_USE_CASADI_MATH
+    // The surrogate is not modified once fitted, so it is shared, but not its scratch storage
+    m_surrogate = other.m_surrogate;
+#endif
 }
 
 
@@ -58,7 +76,8 @@ void internal_forces::muscles::MuscleGeometry::updateKinematics(
     const internal_forces::muscles::Characteristics& characteristics,
     const rigidbody::GeneralizedCoordinates *Q,
     const rigidbody::GeneralizedVelocity *Qdot,
-    int updateKin)
+    int updateKin,
+    bool useSurrogate)
 {
     if (*m_posAndJacoWereForced) {
         utils::Error::warning(
@@ -68,6 +87,15 @@ void internal_forces::muscles::MuscleGeometry::updateKinematics(
         *m_posAndJacoWereForced = false;
     }
 
+#ifndef BIORBD_USE_CASADI_MATH
+    if (m_surrogate && useSurrogate) {
+        updateKinematicsFromSurrogate(*Q, Qdot, characteristics);
+        return;
+    }
+#else
+    (void)useSurrogate;
+#endif
+
     // Make sure the model is in the right configuration
 #ifdef BIORBD_USE_CASADI_MATH
     updateKin = 2;
@@ -92,7 +120,8 @@ void internal_forces::muscles::MuscleGeometry::updateKinematics(
         internal_forces::PathModifiers &pathModifiers,
         const rigidbody::GeneralizedCoordinates *Q,
         const rigidbody::GeneralizedVelocity *Qdot,
-        int updateKin)
+        int updateKin,
+        bool useSurrogate)
 {
     if (*m_posAndJacoWereForced) {
         utils::Error::warning(
@@ -100,6 +129,14 @@ void internal_forces::muscles::MuscleGeometry::updateKinematics(
             " previously sent position and jacobian");
         *m_posAndJacoWereForced = false;
     }
+#ifndef BIORBD_USE_CASADI_MATH
+    if (m_surrogate && useSurrogate) {
+        updateKinematicsFromSurrogate(*Q, Qdot, characteristics);
+        return;
+    }
+#else
+    (void)useSurrogate;
+#endif
 #ifdef BIORBD_USE_CASADI_MATH
     updateKin = 2;
 #endif
@@ -151,6 +188,26 @@ const utils::Scalar& internal_forces::muscles::MuscleGeometry::musculoTendonLeng
     return *m_muscleTendonLength;
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+void internal_forces::muscles::MuscleGeometry::setSurrogate(
+    const std::shared_ptr<internal_forces::muscles::MuscleSurrogate>& surrogate)
+{
+    m_surrogate = surrogate;
+}
+
+bool internal_forces::muscles::MuscleGeometry::hasSurrogate() const
+{
+    return m_surrogate != nullptr;
+}
+
+const internal_forces::muscles::MuscleSurrogate&
+internal_forces::muscles::MuscleGeometry::surrogate() const
+{
+    utils::Error::check(hasSurrogate(), "The muscle has no surrogate");
+    return *m_surrogate;
+}
+#endif
+
 // --------------------------------------- //
 
 void internal_forces::muscles::MuscleGeometry::_updateKinematics(
@@ -161,6 +218,7 @@ void internal_forces::muscles::MuscleGeometry::_updateKinematics(
     // Compute the length and velocities
     length(characteristics, pathModifiers);
     *m_isGeometryComputed = true;
+    *m_arePointsComputed = true;
 
     // Compute the jacobian of the lengths
     computeJacobianLength();
@@ -172,6 +230,28 @@ void internal_forces::muscles::MuscleGeometry::_updateKinematics(
     }
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+void internal_forces::muscles::MuscleGeometry::updateKinematicsFromSurrogate(
+    const rigidbody::GeneralizedCoordinates& Q,
+    const rigidbody::GeneralizedVelocity* Qdot,
+    const internal_forces::muscles::Characteristics& characteristics)
+{
+    m_surrogate->evaluate(Q, *m_muscleTendonLength, *m_jacobianLength,
+                          *m_surrogateBasis, *m_surrogateChebyshev);
+    *m_muscleLength = (*m_muscleTendonLength - characteristics.tendonSlackLength())
+                      /std::cos(characteristics.pennationAngle());
+    *m_isGeometryComputed = true;
+    *m_arePointsComputed = false;
+
+    if (Qdot != nullptr) {
+        velocity(*Qdot);
+        *m_isVelocityComputed = true;
+    } else {
+        *m_isVelocityComputed = false;
+    }
+}
+#endif
+
 const utils::Scalar& internal_forces::muscles::MuscleGeometry::length(
     const internal_forces::muscles::Characteristics* characteristics,
     internal_forces::PathModifiers *pathModifiers)
@@ -63,41 +63,41 @@ void internal_forces::muscles::MuscleGroup::DeepCopy(
     for (unsigned int i=0; i<other.m_mus->size(); ++i) {
         if ((*other.m_mus)[i]->type() ==
                 internal_forces::muscles::MUSCLE_TYPE::IDEALIZED_ACTUATOR) {
-            (*m_mus)[i] = std::make_shared<internal_forces::muscles::IdealizedActuator>((
-                              *other.m_mus)[i]);
+            (*m_mus)[i] = std::make_shared<internal_forces::muscles::IdealizedActuator>(
+                              dynamic_cast<const internal_forces::muscles::IdealizedActuator&>(*(*other.m_mus)[i]).DeepCopy());
         } else if ((*other.m_mus)[i]->type() == internal_forces::muscles::MUSCLE_TYPE::HILL) {
-            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillType>((*other.m_mus)[i]);
+            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillType>(
+                              dynamic_cast<const internal_forces::muscles::HillType&>(*(*other.m_mus)[i]).DeepCopy());
         } else if ((*other.m_mus)[i]->type() ==
                    internal_forces::muscles::MUSCLE_TYPE::HILL_THELEN) {
-            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillThelenType>((
-                              *other.m_mus)[i]);
+            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillThelenType>(
+                              dynamic_cast<const internal_forces::muscles::HillThelenType&>(*(*other.m_mus)[i]).DeepCopy());
         } else if ((*other.m_mus)[i]->type() ==
                    internal_forces::muscles::MUSCLE_TYPE::HILL_DE_GROOTE) {
-            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillDeGrooteType>((
-                              *other.m_mus)[i]);
+            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillDeGrooteType>(
+                              dynamic_cast<const internal_forces::muscles::HillDeGrooteType&>(*(*other.m_mus)[i]).DeepCopy());
         } else if ((*other.m_mus)[i]->type() ==
                    internal_forces::muscles::MUSCLE_TYPE::HILL_THELEN_ACTIVE) {
-            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillThelenActiveOnlyType>((
-                              *other.m_mus)[i]);
+            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillThelenActiveOnlyType>(
+                              dynamic_cast<const internal_forces::muscles::HillThelenActiveOnlyType&>(*(*other.m_mus)[i]).DeepCopy());
         } else if ((*other.m_mus)[i]->type() ==
                    internal_forces::muscles::MUSCLE_TYPE::HILL_THELEN_FATIGABLE) {
-            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillThelenTypeFatigable>((
-                              *other.m_mus)[i]);
+            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillThelenTypeFatigable>(
+                              dynamic_cast<const internal_forces::muscles::HillThelenTypeFatigable&>(*(*other.m_mus)[i]).DeepCopy());
         } else if ((*other.m_mus)[i]->type() ==
                    internal_forces::muscles::MUSCLE_TYPE::HILL_DE_GROOTE_ACTIVE) {
-            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillDeGrooteActiveOnlyType>((
-                              *other.m_mus)[i]);
+            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillDeGrooteActiveOnlyType>(
+                              dynamic_cast<const internal_forces::muscles::HillDeGrooteActiveOnlyType&>(*(*other.m_mus)[i]).DeepCopy());
         } else if ((*other.m_mus)[i]->type() ==
                    internal_forces::muscles::MUSCLE_TYPE::HILL_DE_GROOTE_FATIGABLE) {
-            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillDeGrooteTypeFatigable>((
-                              *other.m_mus)[i]);
+            (*m_mus)[i] = std::make_shared<internal_forces::muscles::HillDeGrooteTypeFatigable>(
+                              dynamic_cast<const internal_forces::muscles::HillDeGrooteTypeFatigable&>(*(*other.m_mus)[i]).DeepCopy());
         } else {
             utils::Error::raise("DeepCopy was not prepared to copy " +
                                         utils::String(
                                             internal_forces::muscles::MUSCLE_TYPE_toStr((*other.m_mus)[i]->type())) + " type");
         }
     }
-    *m_mus = *other.m_mus;
     *m_name = *other.m_name;
     *m_originName = *other.m_originName;
     *m_insertName = *other.m_insertName;
@@ -0,0 +1,205 @@
+#define BIORBD_API_EXPORTS
+#include "InternalForces/Muscles/MuscleSurrogate.h"
+
+#ifndef BIORBD_USE_CASADI_MATH
+#include <algorithm>
+#include <cmath>
+#include "Utils/Error.h"
+#include "Utils/Matrix.h"
+#include "Utils/Vector.h"
+
+using namespace BIORBD_NAMESPACE;
+
+namespace
+{
+// Append all the combinations of degrees of the coordinates from the index
+// coordinate onward, the total degree not exceeding remainingDegree
+void appendExponents(
+    std::vector<unsigned int>& current,
+    unsigned int coordinate,
+    unsigned int remainingDegree,
+    std::vector<std::vector<unsigned int>>& exponents)
+{
+    if (coordinate == current.size()) {
+        exponents.push_back(current);
+        return;
+    }
+    for (unsigned int d = 0; d <= remainingDegree; ++d) {
+        current[coordinate] = d;
+        appendExponents(current, coordinate + 1, remainingDegree - d, exponents);
+    }
+    current[coordinate] = 0;
+}
+}
+
+internal_forces::muscles::MuscleSurrogate::MuscleSurrogate() :
+    m_dofs(std::make_shared<std::vector<unsigned int>>()),
+    m_center(std::make_shared<std::vector<double>>()),
+    m_halfRange(std::make_shared<std::vector<double>>()),
+    m_degree(std::make_shared<unsigned int>(0)),
+    m_exponents(std::make_shared<std::vector<std::vector<unsigned int>>>()),
+    m_coefficients(std::make_shared<utils::Matrix>()),
+    m_nbDof(std::make_shared<unsigned int>(0)),
+    m_lengthError(std::make_shared<double>(0)),
+    m_jacobianError(std::make_shared<double>(0))
+{
+
+}
+
+void internal_forces::muscles::MuscleSurrogate::fit(
+    const utils::Matrix& Q,
+    const utils::Vector& lowerBounds,
+    const utils::Vector& upperBounds,
+    const utils::Vector& musculoTendonLengths,
+    const utils::Matrix& jacobianLengths,
+    unsigned int degree)
+{
+    unsigned int nbSamples(static_cast<unsigned int>(Q.cols()));
+    utils::Error::check(musculoTendonLengths.size() == nbSamples
+                        && jacobianLengths.rows() == nbSamples,
+                        "There must be a length and a length jacobian for each sample");
+    utils::Error::check(lowerBounds.size() == Q.rows() && upperBounds.size() == Q.rows(),
+                        "There must be a range for each generalized coordinate");
+    *m_nbDof = static_cast<unsigned int>(jacobianLengths.cols());
+    *m_degree = degree;
+
+    // The muscle spans the coordinates it can be lengthened by
+    m_dofs->clear();
+    m_center->clear();
+    m_halfRange->clear();
+    for (unsigned int i = 0; i < *m_nbDof; ++i) {
+        if (jacobianLengths.col(i).lpNorm<Eigen::Infinity>() > 1e-10) {
+            utils::Error::check(upperBounds[i] > lowerBounds[i],
+                                "The range of the generalized coordinates spanned by a muscle cannot be empty");
+            m_dofs->push_back(i);
+            m_center->push_back((upperBounds[i] + lowerBounds[i]) / 2);
+            m_halfRange->push_back((upperBounds[i] - lowerBounds[i]) / 2);
+        }
+    }
+
+    m_exponents->clear();
+    std::vector<unsigned int> current(m_dofs->size(), 0);
+    appendExponents(current, 0, degree, *m_exponents);
+    unsigned int nbTerms(static_cast<unsigned int>(m_exponents->size()));
+    utils::Error::check(nbSamples >= nbTerms,
+                        "The number of samples must be at least the number of polynomials of the basis ("
+                        + std::to_string(nbTerms) + ")");
+
+    // Least squares fit of the length and the spanned columns of the jacobian at once
+    unsigned int nbSpanned(static_cast<unsigned int>(m_dofs->size()));
+    utils::Matrix design(nbSamples, nbTerms);
+    utils::Matrix values(nbSamples, 1 + nbSpanned);
+    utils::Vector b(nbTerms);
+    utils::Matrix chebyshev;
+    for (unsigned int s = 0; s < nbSamples; ++s) {
+        basis(Q.col(s), b, chebyshev);
+        design.row(s) = b.transpose();
+        values(s, 0) = musculoTendonLengths[s];
+        for (unsigned int j = 0; j < nbSpanned; ++j) {
+            values(s, 1 + j) = jacobianLengths(s, (*m_dofs)[j]);
+        }
+    }
+    *m_coefficients = design.colPivHouseholderQr().solve(values);
+}
+
+void internal_forces::muscles::MuscleSurrogate::validate(
+    const utils::Matrix& Q,
+    const utils::Vector& musculoTendonLengths,
+    const utils::Matrix& jacobianLengths)
+{
+    utils::Error::check(musculoTendonLengths.size() == Q.cols()
+                        && jacobianLengths.rows() == Q.cols(),
+                        "There must be a length and a length jacobian for each sample");
+
+    *m_lengthError = 0;
+    *m_jacobianError = 0;
+    utils::Scalar length;
+    utils::Matrix jacobianLength;
+    utils::Vector b;
+    utils::Matrix chebyshev;
+    for (unsigned int s = 0; s < Q.cols(); ++s) {
+        evaluate(Q.col(s), length, jacobianLength, b, chebyshev);
+        *m_lengthError = std::max(*m_lengthError,
+                                  std::fabs(length - musculoTendonLengths[s]));
+        *m_jacobianError = std::max(*m_jacobianError,
+                                    (jacobianLength - jacobianLengths.row(s)).lpNorm<Eigen::Infinity>());
+    }
+}
+
+void internal_forces::muscles::MuscleSurrogate::evaluate(
+    const utils::Vector& Q,
+    utils::Scalar& musculoTendonLength,
+    utils::Matrix& jacobianLength) const
+{
+    utils::Vector b;
+    utils::Matrix chebyshev;
+    evaluate(Q, musculoTendonLength, jacobianLength, b, chebyshev);
+}
+
+void internal_forces::muscles::MuscleSurrogate::evaluate(
+    const utils::Vector& Q,
+    utils::Scalar& musculoTendonLength,
+    utils::Matrix& jacobianLength,
+    utils::Vector& b,
+    utils::Matrix& chebyshev) const
+{
+    basis(Q, b, chebyshev);
+
+    musculoTendonLength = m_coefficients->col(0).dot(b);
+    // Resizing does not allocate if the size is unchanged
+    jacobianLength.resize(1, *m_nbDof);
+    jacobianLength.setZero();
+    for (unsigned int j = 0; j < m_dofs->size(); ++j) {
+        jacobianLength(0, (*m_dofs)[j]) = m_coefficients->col(1 + j).dot(b);
+    }
+}
+
+std::vector<unsigned int> internal_forces::muscles::MuscleSurrogate::dofs() const
+{
+    return *m_dofs;
+}
+
+unsigned int internal_forces::muscles::MuscleSurrogate::degree() const
+{
+    return *m_degree;
+}
+
+double internal_forces::muscles::MuscleSurrogate::lengthError() const
+{
+    return *m_lengthError;
+}
+
+double internal_forces::muscles::MuscleSurrogate::jacobianError() const
+{
+    return *m_jacobianError;
+}
+
+void internal_forces::muscles::MuscleSurrogate::basis(
+    const utils::Vector& Q,
+    utils::Vector& basis,
+    utils::Matrix& chebyshev) const
+{
+    // Chebyshev polynomials of each normalized coordinate (T0 = 1, T1 = x, Tn+1 = 2x Tn - Tn-1)
+    unsigned int nbSpanned(static_cast<unsigned int>(m_dofs->size()));
+    chebyshev.resize(*m_degree + 1, nbSpanned);
+    for (unsigned int j = 0; j < nbSpanned; ++j) {
+        double x((Q[(*m_dofs)[j]] - (*m_center)[j]) / (*m_halfRange)[j]);
+        chebyshev(0, j) = 1;
+        if (*m_degree > 0) {
+            chebyshev(1, j) = x;
+        }
+        for (unsigned int d = 2; d <= *m_degree; ++d) {
+            chebyshev(d, j) = 2 * x * chebyshev(d - 1, j) - chebyshev(d - 2, j);
+        }
+    }
+
+    basis.resize(static_cast<unsigned int>(m_exponents->size()));
+    for (unsigned int t = 0; t < m_exponents->size(); ++t) {
+        double value(1);
+        for (unsigned int j = 0; j < nbSpanned; ++j) {
+            value *= chebyshev((*m_exponents)[t][j], j);
+        }
+        basis[t] = value;
+    }
+}
+#endif
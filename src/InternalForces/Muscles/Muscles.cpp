@@ -1,26 +1,60 @@
 #define BIORBD_API_EXPORTS
 #include "InternalForces/Muscles/Muscles.h"
 
+#include <random>
 #include "Utils/Error.h"
 #include "Utils/Matrix.h"
+#include "Utils/Range.h"
+#include "Utils/Vector.h"
 #include "RigidBody/Joints.h"
+#include "RigidBody/Segment.h"
 #include "RigidBody/GeneralizedCoordinates.h"
 #include "RigidBody/GeneralizedVelocity.h"
 #include "RigidBody/GeneralizedTorque.h"
 #include "InternalForces/Muscles/Muscle.h"
 #include "InternalForces/Muscles/MuscleGroup.h"
+#include "InternalForces/Muscles/MuscleSurrogate.h"
+#include "InternalForces/Muscles/MuscleForcesKernel.h"
+#include "InternalForces/Muscles/FatigueModel.h"
+#include "InternalForces/Muscles/FatigueState.h"
 #include "InternalForces/Muscles/StateDynamics.h"
 
 using namespace BIORBD_NAMESPACE;
 
+#ifndef BIORBD_USE_CASADI_MATH
+class internal_forces::muscles::Muscles::MuscleForcesWorkspace
+{
+public:
+    MuscleForcesKernel kernel; ///< The kernel built from the muscles
+    std::vector<std::shared_ptr<Muscle>> muscles; ///< The muscles the kernel was built from
+    std::vector<unsigned int> versions; ///< The version of the characteristics of each muscle when the kernel was built
+    std::vector<std::pair<unsigned int, const FatigueModel*>>
+            fatigables; ///< The index and the fatigue model of the fatigable muscles
+    utils::Vector activeFibers; ///< The proportion of active fibers of each muscle
+    utils::Vector lengths; ///< The length of each muscle
+    utils::Vector velocities; ///< The velocity of each muscle
+    utils::Matrix trialLengths; ///< The length of each muscle at each frame
+    utils::Matrix trialVelocities; ///< The velocity of each muscle at each frame
+};
+
+#endif
+
 internal_forces::muscles::Muscles::Muscles() :
     m_mus(std::make_shared<std::vector<internal_forces::muscles::MuscleGroup>>())
+#ifndef BIORBD_USE_CASADI_MATH
+    ,
+    m_forcesWorkspace(std::make_shared<MuscleForcesWorkspace>())
+#endif
 {
 
 }
 
 internal_forces::muscles::Muscles::Muscles(const internal_forces::muscles::Muscles &other) :
     m_mus(other.m_mus)
+#ifndef BIORBD_USE_CASADI_MATH
+    ,
+    m_forcesWorkspace(std::make_shared<MuscleForcesWorkspace>())
+#endif
 {
 
 }
@@ -42,7 +76,7 @@ void internal_forces::muscles::Muscles::DeepCopy(const internal_forces::muscles:
 {
     m_mus->resize(other.m_mus->size());
     for (unsigned int i=0; i<other.m_mus->size(); ++i) {
-        (*m_mus)[i] = (*other.m_mus)[i];
+        (*m_mus)[i] = (*other.m_mus)[i].DeepCopy();
     }
 }
 
@@ -232,6 +266,108 @@ utils::Vector internal_forces::muscles::Muscles::muscleForces(
     return muscleForces(emg);
 }
 
+utils::Vector internal_forces::muscles::Muscles::muscleForcesActivationDerivative(
+    const std::vector<std::shared_ptr<internal_forces::muscles::State>>& emg)
+{
+    utils::Vector derivatives(nbMuscleTotal());
+
+    unsigned int cmpMus(0);
+    for (unsigned int i=0; i<m_mus->size(); ++i) { // muscle group
+        for (unsigned int j=0; j<(*m_mus)[i].nbMuscles(); ++j) {
+            derivatives(cmpMus, 0) = (*m_mus)[i].muscle(j).forceActivationDerivative(*emg[cmpMus]);
+            ++cmpMus;
+        }
+    }
+    return derivatives;
+}
+
+#ifndef BIORBD_USE_CASADI_MATH
+internal_forces::muscles::Muscles::MuscleForcesWorkspace&
+internal_forces::muscles::Muscles::muscleForcesWorkspace()
+{
+    MuscleForcesWorkspace& workspace(*m_forcesWorkspace);
+
+    // Compare the muscles with the ones the kernel was built from
+    bool isUpToDate(true);
+    unsigned int cmpMus(0);
+    for (unsigned int i=0; i<m_mus->size() && isUpToDate; ++i) { // muscle group
+        for (const auto& muscle : (*m_mus)[i].muscles()) {
+            if (cmpMus >= workspace.muscles.size()
+                    || workspace.muscles[cmpMus].get() != muscle.get()
+                    || workspace.versions[cmpMus] != muscle->characteristicsVersion()) {
+                isUpToDate = false;
+                break;
+            }
+            ++cmpMus;
+        }
+    }
+    if (isUpToDate && cmpMus == workspace.muscles.size()) {
+        return workspace;
+    }
+
+    workspace.muscles = muscles();
+    unsigned int nbMus(static_cast<unsigned int>(workspace.muscles.size()));
+    workspace.kernel = internal_forces::muscles::MuscleForcesKernel(workspace.muscles);
+    workspace.versions.resize(nbMus);
+    workspace.fatigables.clear();
+    workspace.activeFibers = utils::Vector(nbMus);
+    workspace.activeFibers.setOnes();
+    for (unsigned int i=0; i<nbMus; ++i) {
+        workspace.versions[i] = workspace.muscles[i]->characteristicsVersion();
+        const internal_forces::muscles::FatigueModel* fatigue(
+            dynamic_cast<const internal_forces::muscles::FatigueModel*>(workspace.muscles[i].get()));
+        if (fatigue) {
+            workspace.fatigables.push_back(std::make_pair(i, fatigue));
+        }
+    }
+    workspace.lengths = utils::Vector(nbMus);
+    workspace.velocities = utils::Vector(nbMus);
+    return workspace;
+}
+
+utils::Vector internal_forces::muscles::Muscles::muscleForcesFromActivations(
+    const utils::Vector& activations)
+{
+    MuscleForcesWorkspace& workspace(muscleForcesWorkspace());
+    for (unsigned int i=0; i<workspace.muscles.size(); ++i) {
+        workspace.lengths[i] = workspace.muscles[i]->position().length();
+        workspace.velocities[i] = workspace.muscles[i]->position().velocity();
+    }
+    for (const auto& fatigable : workspace.fatigables) {
+        workspace.activeFibers[fatigable.first] = fatigable.second->fatigueState().activeFibers();
+    }
+    return workspace.kernel.forces(workspace.lengths, workspace.velocities, activations,
+                                   workspace.activeFibers);
+}
+
+utils::Matrix internal_forces::muscles::Muscles::muscleForcesFromActivations(
+    const utils::Matrix& activations,
+    const utils::Matrix& Q,
+    const utils::Matrix& QDot)
+{
+    utils::Error::check(Q.cols() == activations.cols() && QDot.cols() == activations.cols(),
+                        "There must be generalized coordinates and velocities for each frame");
+
+    // Only the geometry is computed frame by frame
+    MuscleForcesWorkspace& workspace(muscleForcesWorkspace());
+    workspace.trialLengths.resize(workspace.muscles.size(), activations.cols());
+    workspace.trialVelocities.resize(workspace.muscles.size(), activations.cols());
+    for (unsigned int f=0; f<activations.cols(); ++f) {
+        updateMuscles(rigidbody::GeneralizedCoordinates(Q.col(f)),
+                      rigidbody::GeneralizedVelocity(QDot.col(f)), true);
+        for (unsigned int i=0; i<workspace.muscles.size(); ++i) {
+            workspace.trialLengths(i, f) = workspace.muscles[i]->position().length();
+            workspace.trialVelocities(i, f) = workspace.muscles[i]->position().velocity();
+        }
+    }
+    for (const auto& fatigable : workspace.fatigables) {
+        workspace.activeFibers[fatigable.first] = fatigable.second->fatigueState().activeFibers();
+    }
+    return workspace.kernel.forces(workspace.trialLengths, workspace.trialVelocities,
+                                   activations, workspace.activeFibers);
+}
+#endif
+
 unsigned int internal_forces::muscles::Muscles::nbMuscleGroups() const
 {
     return static_cast<unsigned int>(m_mus->size());
@@ -262,6 +398,77 @@ utils::Matrix internal_forces::muscles::Muscles::musclesLengthJacobian(
 }
 
 
+#ifndef BIORBD_USE_CASADI_MATH
+utils::Matrix internal_forces::muscles::Muscles::fitMusclesSurrogate(
+    unsigned int degree,
+    unsigned int nbSamples)
+{
+    // Assuming that this is also a Joints type (via BiorbdModel)
+    const rigidbody::Joints &model = dynamic_cast<rigidbody::Joints &>(*this);
+    utils::Error::check(model.nbQ() == model.nbDof(),
+                        "Muscle surrogates are not available for models with quaternions");
+    utils::Error::check(nbSamples > 0, "The number of samples must be positive");
+
+    // The segments hold the ranges of their generalized coordinates in order
+    utils::Vector lowerBounds(model.nbQ());
+    utils::Vector upperBounds(model.nbQ());
+    unsigned int cmpDof(0);
+    for (unsigned int i=0; i<model.nbSegment(); ++i) {
+        for (auto& range : model.segment(i).QRanges()) {
+            lowerBounds[cmpDof] = range.min();
+            upperBounds[cmpDof] = range.max();
+            ++cmpDof;
+        }
+    }
+
+    // Sample the geometric path, the first half to fit and the second half to validate
+    clearMusclesSurrogate();
+    std::vector<std::shared_ptr<Muscle>> allMuscles(muscles());
+    std::mt19937 generator; // Fixed seed so the fits are reproducible
+    std::uniform_real_distribution<double> distribution(0, 1);
+    utils::Matrix Q(model.nbQ(), 2*nbSamples);
+    utils::Matrix lengths(allMuscles.size(), 2*nbSamples);
+    std::vector<utils::Matrix> jacobians(allMuscles.size(),
+                                         utils::Matrix(2*nbSamples, model.nbDof()));
+    for (unsigned int s=0; s<2*nbSamples; ++s) {
+        for (unsigned int i=0; i<model.nbQ(); ++i) {
+            Q(i, s) = lowerBounds[i] + distribution(generator) * (upperBounds[i] - lowerBounds[i]);
+        }
+        updateMuscles(rigidbody::GeneralizedCoordinates(Q.col(s)), true);
+        for (unsigned int m=0; m<allMuscles.size(); ++m) {
+            lengths(m, s) = allMuscles[m]->position().musculoTendonLength();
+            jacobians[m].row(s) = allMuscles[m]->position().jacobianLength();
+        }
+    }
+
+    // The surrogates are only set once they are all fitted
+    utils::Matrix errors(allMuscles.size(), 2);
+    std::vector<std::shared_ptr<MuscleSurrogate>> surrogates;
+    for (unsigned int m=0; m<allMuscles.size(); ++m) {
+        surrogates.push_back(std::make_shared<MuscleSurrogate>());
+        surrogates[m]->fit(Q.leftCols(nbSamples), lowerBounds, upperBounds,
+                           lengths.row(m).head(nbSamples).transpose(),
+                           jacobians[m].topRows(nbSamples), degree);
+        surrogates[m]->validate(Q.rightCols(nbSamples),
+                                lengths.row(m).tail(nbSamples).transpose(),
+                                jacobians[m].bottomRows(nbSamples));
+        errors(m, 0) = surrogates[m]->lengthError();
+        errors(m, 1) = surrogates[m]->jacobianError();
+    }
+    for (unsigned int m=0; m<allMuscles.size(); ++m) {
+        allMuscles[m]->m_position->setSurrogate(surrogates[m]);
+    }
+    return errors;
+}
+
+void internal_forces::muscles::Muscles::clearMusclesSurrogate()
+{
+    for (auto& muscle : muscles()) {
+        muscle->m_position->setSurrogate(nullptr);
+    }
+}
+#endif
+
 unsigned int internal_forces::muscles::Muscles::nbMuscleTotal() const
 {
     return nbMuscles();
@@ -300,7 +507,8 @@ void internal_forces::muscles::Muscles::updateMuscles(
         for (unsigned int j=0; j<group.nbMuscles(); ++j) {
             group.muscle(j).updateOrientations(model, Q, QDot, updateKinTP);
 #ifndef BIORBD_USE_CASADI_MATH
-            if (updateKinTP){
+            // A muscle using its surrogate does not update the kinematics of the model
+            if (updateKinTP && !group.muscle(j).position().hasSurrogate()){
                 updateKinTP=1;
             }
 #endif
@@ -331,7 +539,8 @@ void internal_forces::muscles::Muscles::updateMuscles(
         for (unsigned int j=0; j<group.nbMuscles(); ++j) {
             group.muscle(j).updateOrientations(model, Q,updateKinTP);
 #ifndef BIORBD_USE_CASADI_MATH
-            if (updateKinTP){
+            // A muscle using its surrogate does not update the kinematics of the model
+            if (updateKinTP && !group.muscle(j).position().hasSurrogate()){
                 updateKinTP=1;
             }
 #endif
@@ -1,5 +1,9 @@
 #define BIORBD_API_EXPORTS
 
+#include <algorithm>
+#include <chrono>
+#include <exception>
+#include <thread>
 #include <IpIpoptApplication.hpp>
 #include "BiorbdModel.h"
 #include "Utils/Error.h"
@@ -30,7 +34,8 @@ internal_forces::muscles::StaticOptimization::StaticOptimization(
     m_pNormFactor(pNormFactor),
     m_verbose(verbose),
     m_staticOptimProblem(),
-    m_alreadyRun(false)
+    m_alreadyRun(false),
+    m_solverProfile(DEVELOPMENT)
 {
     m_allQ.push_back(Q);
     m_allQdot.push_back(Qdot);
@@ -56,7 +61,8 @@ internal_forces::muscles::StaticOptimization::StaticOptimization(
     m_pNormFactor(pNormFactor),
     m_verbose(verbose),
     m_staticOptimProblem(),
-    m_alreadyRun(false)
+    m_alreadyRun(false),
+    m_solverProfile(DEVELOPMENT)
 {
     m_allQ.push_back(Q);
     m_allQdot.push_back(Qdot);
@@ -86,7 +92,8 @@ internal_forces::muscles::StaticOptimization::StaticOptimization(
                              (m_model.nbMuscles())),
     m_pNormFactor(pNormFactor),
     m_verbose(verbose),
-    m_alreadyRun(false)
+    m_alreadyRun(false),
+    m_solverProfile(DEVELOPMENT)
 {
     m_allQ.push_back(Q);
     m_allQdot.push_back(Qdot);
@@ -123,7 +130,8 @@ internal_forces::muscles::StaticOptimization::StaticOptimization(
                              (m_model.nbMuscles())),
     m_pNormFactor(pNormFactor),
     m_verbose(verbose),
-    m_alreadyRun(false)
+    m_alreadyRun(false),
+    m_solverProfile(DEVELOPMENT)
 {
     for (unsigned int i=0; i<m_model.nbMuscles(); ++i) {
         (*m_initialActivationGuess)[i] = initialActivationGuess;
@@ -148,7 +156,8 @@ internal_forces::muscles::StaticOptimization::StaticOptimization(
                              (m_model.nbMuscles())),
     m_pNormFactor(pNormFactor),
     m_verbose(verbose),
-    m_alreadyRun(false)
+    m_alreadyRun(false),
+    m_solverProfile(DEVELOPMENT)
 {
     if (initialActivationGuess.size() != m_model.nbMuscles()) {
         utils::Error::raise(
@@ -176,7 +185,8 @@ internal_forces::muscles::StaticOptimization::StaticOptimization(
                              (m_model.nbMuscles())),
     m_pNormFactor(pNormFactor),
     m_verbose(verbose),
-    m_alreadyRun(false)
+    m_alreadyRun(false),
+    m_solverProfile(DEVELOPMENT)
 {
     if (initialActivationGuess.size() != m_model.nbMuscles()) {
         utils::Error::raise(
@@ -191,50 +201,172 @@ internal_forces::muscles::StaticOptimization::StaticOptimization(
     }
 }
 
-void internal_forces::muscles::StaticOptimization::run(
-    bool useLinearizedState)
+void internal_forces::muscles::StaticOptimization::setSolverProfile(
+    SOLVER_PROFILE profile)
+{
+    m_solverProfile = profile;
+}
+
+internal_forces::muscles::StaticOptimization::SOLVER_PROFILE
+internal_forces::muscles::StaticOptimization::solverProfile() const
+{
+    return m_solverProfile;
+}
+
+void internal_forces::muscles::StaticOptimization::setSolverOption(
+    const utils::String& name,
+    double value)
+{
+    m_numericOptions[name] = value;
+}
+
+void internal_forces::muscles::StaticOptimization::setSolverOption(
+    const utils::String& name,
+    int value)
+{
+    m_integerOptions[name] = value;
+}
+
+void internal_forces::muscles::StaticOptimization::setSolverOption(
+    const utils::String& name,
+    const utils::String& value)
+{
+    m_stringOptions[name] = value;
+}
+
+Ipopt::SmartPtr<Ipopt::IpoptApplication>
+internal_forces::muscles::StaticOptimization::createSolver() const
 {
-    // Setup the Ipopt problem
     Ipopt::SmartPtr<Ipopt::IpoptApplication> app = IpoptApplicationFactory();
-    app->Options()->SetNumericValue("tol", 1e-7);
     app->Options()->SetStringValue("mu_strategy", "adaptive");
     //app->Options()->SetStringValue("output_file", "ipopt.out");
     app->Options()->SetStringValue("hessian_approximation", "limited-memory");
-    app->Options()->SetStringValue("derivative_test", "first-order");
-    app->Options()->SetIntegerValue("max_iter", 10000);
-    app->Options()->SetIntegerValue("print_level", 5);
+    if (m_solverProfile == PRODUCTION) {
+        app->Options()->SetNumericValue("tol", 1e-6);
+        app->Options()->SetNumericValue("acceptable_tol", 1e-4);
+        app->Options()->SetIntegerValue("acceptable_iter", 5);
+        app->Options()->SetStringValue("derivative_test", "none");
+        app->Options()->SetIntegerValue("max_iter", 1000);
+        app->Options()->SetIntegerValue("print_level", 0);
+        app->Options()->SetStringValue("sb", "yes");
+    } else {
+        app->Options()->SetNumericValue("tol", 1e-7);
+        app->Options()->SetStringValue("derivative_test", "first-order");
+        app->Options()->SetIntegerValue("max_iter", 10000);
+        app->Options()->SetIntegerValue("print_level", 5);
+    }
+    for (auto& option : m_numericOptions) {
+        app->Options()->SetNumericValue(option.first, option.second);
+    }
+    for (auto& option : m_integerOptions) {
+        app->Options()->SetIntegerValue(option.first, option.second);
+    }
+    for (auto& option : m_stringOptions) {
+        app->Options()->SetStringValue(option.first, option.second);
+    }
 
     Ipopt::ApplicationReturnStatus status;
     status = app->Initialize();
     utils::Error::check(status == Ipopt::Solve_Succeeded,
                                 "Ipopt initialization failed");
+    return app;
+}
+
+void internal_forces::muscles::StaticOptimization::run(
+    bool useLinearizedState,
+    unsigned int nbThreads)
+{
+    unsigned int nbFrames(static_cast<unsigned int>(m_allQ.size()));
+    nbThreads = std::max(1u, std::min(nbThreads, nbFrames));
+
+    m_staticOptimProblem.clear();
+    m_staticOptimProblem.resize(nbFrames);
+    m_frameTimes.assign(nbFrames, 0);
+    m_workspaces.clear();
+    if (nbThreads == 1) {
+        runFrames(m_model, useLinearizedState, 0, nbFrames);
+        m_alreadyRun = true;
+        return;
+    }
+
+    // Each thread works on its own workspace and takes a contiguous block of frames
+    for (unsigned int t = 0; t < nbThreads; ++t) {
+        m_workspaces.push_back(std::make_shared<Model>(m_model.workspace()));
+    }
+    std::vector<std::exception_ptr> errors(nbThreads);
+    std::vector<std::thread> threads;
+    for (unsigned int t = 0; t < nbThreads; ++t) {
+        unsigned int first(t * nbFrames / nbThreads);
+        unsigned int last((t + 1) * nbFrames / nbThreads);
+        threads.push_back(std::thread([&, t, first, last]() {
+            try {
+                runFrames(*m_workspaces[t], useLinearizedState, first, last);
+            } catch (...) {
+                errors[t] = std::current_exception();
+            }
+        }));
+    }
+    for (auto& thread : threads) {
+        thread.join();
+    }
+    for (auto& error : errors) {
+        if (error) {
+            std::rethrow_exception(error);
+        }
+    }
+    m_alreadyRun = true;
+}
+
+void internal_forces::muscles::StaticOptimization::runFrames(
+    Model& model,
+    bool useLinearizedState,
+    unsigned int first,
+    unsigned int last)
+{
+    // The IPOPT application is only created if a frame needs it
+    Ipopt::SmartPtr<Ipopt::IpoptApplication> app;
+    bool useQuadratic(useLinearizedState && m_pNormFactor == 2 && m_useResidualTorque);
+    std::vector<int> activeSet;
 
-    for (unsigned int i=0; i<m_allQ.size(); ++i) {
+    // The first frame of the block starts from the initial guess
+    utils::Vector activationGuess(*m_initialActivationGuess);
+    for (unsigned int i=first; i<last; ++i) {
+        std::chrono::steady_clock::time_point start(std::chrono::steady_clock::now());
         if (useLinearizedState)
-            m_staticOptimProblem.push_back(
+            m_staticOptimProblem[i] =
                 new internal_forces::muscles::StaticOptimizationIpoptLinearized(
-                    m_model, m_allQ[i], m_allQdot[i], m_allTorqueTarget[i],
-                    *m_initialActivationGuess,
+                    model, m_allQ[i], m_allQdot[i], m_allTorqueTarget[i],
+                    activationGuess,
                     m_useResidualTorque, m_pNormFactor, m_verbose
-                )
-            );
+                );
         else
-            m_staticOptimProblem.push_back(
+            m_staticOptimProblem[i] =
                 new internal_forces::muscles::StaticOptimizationIpopt(
-                    m_model, m_allQ[i], m_allQdot[i], m_allTorqueTarget[i],
-                    *m_initialActivationGuess,
+                    model, m_allQ[i], m_allQdot[i], m_allTorqueTarget[i],
+                    activationGuess,
                     m_useResidualTorque, m_pNormFactor, m_verbose
-                )
-            );
-        // Optimize!
-        status = app->OptimizeTNLP(m_staticOptimProblem[i]);
+                );
+
+        // The quadratic program warm starts from the active set of the previous frame
+        bool isSolved(useQuadratic
+                      && static_cast<internal_forces::muscles::StaticOptimizationIpoptLinearized*>(
+                          Ipopt::GetRawPtr(m_staticOptimProblem[i]))->solveQuadratic(activeSet));
+        if (!isSolved) {
+            // Optimize!
+            if (Ipopt::IsNull(app)) {
+                app = createSolver();
+            }
+            app->OptimizeTNLP(m_staticOptimProblem[i]);
+            activeSet.clear();
+        }
 
         // Take the solution of the previous optimization as the solution for the next optimization
-        *m_initialActivationGuess =
+        activationGuess =
             static_cast<internal_forces::muscles::StaticOptimizationIpopt*>(
                 Ipopt::GetRawPtr(m_staticOptimProblem[i]))->finalSolution();
+        m_frameTimes[i] = std::chrono::duration<double>(
+                              std::chrono::steady_clock::now() - start).count();
     }
-    m_alreadyRun = true;
 }
 
 std::vector<utils::Vector>
@@ -272,3 +404,14 @@ utils::Vector internal_forces::muscles::StaticOptimization::finalSolution(
     return res;
 }
 
+
+std::vector<double>
+internal_forces::muscles::StaticOptimization::frameTimes() const
+{
+    if (!m_alreadyRun) {
+        utils::Error::raise(
+            "Problem has not been ran through the optimization process "
+            "yet, you should optimize it first to get the time spent");
+    }
+    return m_frameTimes;
+}
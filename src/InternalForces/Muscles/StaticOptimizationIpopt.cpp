@@ -24,7 +24,8 @@ internal_forces::muscles::StaticOptimizationIpopt::StaticOptimizationIpopt(
     bool useResidual,
     unsigned int pNormFactor,
     int verbose,
-    double eps) :
+    double eps,
+    bool useAnalyticalJacobian) :
     m_model(model),
     m_nbQ(std::make_shared<unsigned int>(model.nbQ())),
     m_nbQdot(std::make_shared<unsigned int>(model.nbQdot())),
@@ -33,6 +34,7 @@ internal_forces::muscles::StaticOptimizationIpopt::StaticOptimizationIpopt(
     m_nbTorque(std::make_shared<unsigned int>(model.nbGeneralizedTorque())),
     m_nbTorqueResidual(std::make_shared<unsigned int>(*m_nbQ)),
     m_eps(std::make_shared<double>(eps)),
+    m_useAnalyticalJacobian(std::make_shared<bool>(useAnalyticalJacobian)),
     m_activations(std::make_shared<utils::Vector>(activationInit)),
     m_Q(std::make_shared<rigidbody::GeneralizedCoordinates>(Q)),
     m_Qdot(std::make_shared<rigidbody::GeneralizedVelocity>(Qdot)),
@@ -264,34 +266,46 @@ bool internal_forces::muscles::StaticOptimizationIpopt::eval_jac_g(
         if (new_x) {
             dispatch(x);
         }
-        const rigidbody::GeneralizedTorque& GeneralizedTorqueMusc(
-            m_model.muscularJointTorque(*m_states));
         unsigned int k(0);
-        for( unsigned int j = 0; j < *m_nbMus; ++j ) {
-            std::vector<std::shared_ptr<internal_forces::muscles::State>> stateEpsilon;
-            for (unsigned int i = 0; i < *m_nbMus; ++i) {
-                unsigned int delta(0);
-                if (i == j) {
-                    delta = 1;
+        if (*m_useAnalyticalJacobian) {
+            // The force of each muscle only depends on its own activation, so
+            // dTau/da = -musclesLengthJacobian^T * diag(dF/da)
+            utils::Matrix jacobian(-m_model.musclesLengthJacobian().transpose()
+                                   * m_model.muscleForcesActivationDerivative(*m_states).asDiagonal());
+            for( unsigned int j = 0; j < *m_nbMus; ++j ) {
+                for( unsigned int i = 0; i < static_cast<unsigned int>(m); i++ ) {
+                    values[k++] = jacobian(i, j);
                 }
-                stateEpsilon.push_back(
-                    std::make_shared<internal_forces::muscles::State>(
-                        internal_forces::muscles::State(0, (*m_activations)[i]+delta* *m_eps)));
             }
-            const rigidbody::GeneralizedTorque& GeneralizedTorqueCalculEpsilon(
-                m_model.muscularJointTorque(stateEpsilon));
-            for( unsigned int i = 0; i < static_cast<unsigned int>(m); i++ ) {
-                values[k++] = (GeneralizedTorqueCalculEpsilon[i]-GeneralizedTorqueMusc[i])/
-                              *m_eps;
-                if (*m_verbose >= 3) {
-                    std::cout << std::setprecision (20) << std::endl;
-                    std::cout << "values[" << k-1 << "]: " << values[k-1] << std::endl;
-                    std::cout << "GeneralizedTorqueCalculEpsilon[" << i << "]: " <<
-                              GeneralizedTorqueCalculEpsilon[i] << std::endl;
-                    std::cout << "GeneralizedTorqueMusc[" << i << "]: " << GeneralizedTorqueMusc[i]
-                              << std::endl;
+        } else {
+            const rigidbody::GeneralizedTorque& GeneralizedTorqueMusc(
+                m_model.muscularJointTorque(*m_states));
+            for( unsigned int j = 0; j < *m_nbMus; ++j ) {
+                std::vector<std::shared_ptr<internal_forces::muscles::State>> stateEpsilon;
+                for (unsigned int i = 0; i < *m_nbMus; ++i) {
+                    unsigned int delta(0);
+                    if (i == j) {
+                        delta = 1;
+                    }
+                    stateEpsilon.push_back(
+                        std::make_shared<internal_forces::muscles::State>(
+                            internal_forces::muscles::State(0, (*m_activations)[i]+delta* *m_eps)));
                 }
+                const rigidbody::GeneralizedTorque& GeneralizedTorqueCalculEpsilon(
+                    m_model.muscularJointTorque(stateEpsilon));
+                for( unsigned int i = 0; i < static_cast<unsigned int>(m); i++ ) {
+                    values[k++] = (GeneralizedTorqueCalculEpsilon[i]-GeneralizedTorqueMusc[i])/
+                                  *m_eps;
+                    if (*m_verbose >= 3) {
+                        std::cout << std::setprecision (20) << std::endl;
+                        std::cout << "values[" << k-1 << "]: " << values[k-1] << std::endl;
+                        std::cout << "GeneralizedTorqueCalculEpsilon[" << i << "]: " <<
+                                  GeneralizedTorqueCalculEpsilon[i] << std::endl;
+                        std::cout << "GeneralizedTorqueMusc[" << i << "]: " << GeneralizedTorqueMusc[i]
+                                  << std::endl;
+                    }
 
+                }
             }
         }
         for( unsigned int j = 0; j < *m_nbTorqueResidual; j++ ) {
@@ -1,7 +1,11 @@
 #define BIORBD_API_EXPORTS
 #include "InternalForces/Muscles/StaticOptimizationIpoptLinearized.h"
 
+#include <algorithm>
+#include <cmath>
+#include <iostream>
 #include "BiorbdModel.h"
+#include "Utils/Error.h"
 #include "Utils/Matrix.h"
 #include "RigidBody/GeneralizedTorque.h"
 #include "InternalForces/Muscles/State.h"
@@ -23,7 +27,8 @@ internal_forces::muscles::StaticOptimizationIpoptLinearized::StaticOptimizationI
     internal_forces::muscles::StaticOptimizationIpopt(
         model, Q, Qdot, torqueTarget, activationInit, useResidual,
         pNormFactor, verbose, eps),
-    m_jacobian(std::make_shared<utils::Matrix>(*m_nbDof, *m_nbMus))
+    m_jacobian(std::make_shared<utils::Matrix>(*m_nbDof, *m_nbMus)),
+    m_torqueZero(std::make_shared<utils::Vector>(*m_nbTorque))
 {
     prepareJacobian();
 }
@@ -40,6 +45,7 @@ void internal_forces::muscles::StaticOptimizationIpoptLinearized::prepareJacobia
     }
     const rigidbody::GeneralizedTorque& GeneralizedTorque_zero(
         m_model.muscularJointTorque(state_zero));
+    *m_torqueZero = GeneralizedTorque_zero;
     for (unsigned int i = 0; i<*m_nbMus; ++i) {
         std::vector<std::shared_ptr<internal_forces::muscles::State>> state;
         for (unsigned int j = 0; j<*m_nbMus; ++j) {
@@ -53,9 +59,9 @@ void internal_forces::muscles::StaticOptimizationIpoptLinearized::prepareJacobia
                 std::make_shared<internal_forces::muscles::State>
                 (internal_forces::muscles::State(0, delta*1)));
         }
+        // The muscles are already updated at Q and Qdot
         const rigidbody::GeneralizedTorque& GeneralizedTorque(
-            m_model.muscularJointTorque(
-                state, *m_Q.get(), *m_Qdot.get()));
+            m_model.muscularJointTorque(state));
         for (unsigned int j = 0; j<*m_nbTorque; ++j) {
             (*m_jacobian)(j, i) =
                 GeneralizedTorque(j) - GeneralizedTorque_zero(j);
@@ -81,14 +87,10 @@ bool internal_forces::muscles::StaticOptimizationIpoptLinearized::eval_g(
         dispatch(x);
     }
 
-    utils::Vector res(static_cast<unsigned int>(m));
-    res.setZero();
-    // TODO Optimization using Eigen?
+    // The muscular torque is approximated by torqueZero + jacobian * activations
+    utils::Vector res(*m_torqueZero + *m_jacobian * *m_activations);
     for( unsigned int i = 0; i < static_cast<unsigned int>(m); i++ ) {
-        for (unsigned int j = 0; j<*m_nbMus; j++) {
-            res[i] += (*m_jacobian)(i,j)*x[j];
-        }
-        g[i] = res[i] + (*m_torqueResidual)[i];
+        g[i] = res[i] + (*m_torqueResidual)[i] - (*m_torqueTarget)[i];
     }
     if (*m_verbose >= 2) {
         std::cout << "GeneralizedTorque_musc_approximated = "
@@ -139,3 +141,133 @@ bool internal_forces::muscles::StaticOptimizationIpoptLinearized::eval_jac_g(
     }
     return true;
 }
+
+bool internal_forces::muscles::StaticOptimizationIpoptLinearized::solveQuadratic(
+    std::vector<int>& activeSet)
+{
+    utils::Error::check(*m_pNormFactor == 2 && *m_nbTorqueResidual,
+                        "The quadratic program requires the 2-norm and the residual torques");
+    unsigned int n(*m_nbMus);
+    if (activeSet.size() != n) {
+        activeSet.assign(n, 0);
+    }
+
+    // With r = b - J*a and b = target - torqueZero, the objective a'a + w*r'r is
+    // 1/2 a'Ha + c'a + w*b'b with H = 2*(I + w*J'J) and c = -2w*J'b
+    utils::Vector b(*m_torqueTarget - *m_torqueZero);
+    utils::Matrix H(2 * (utils::Matrix::Identity(n, n)
+                         + *m_torquePonderation * m_jacobian->transpose() * *m_jacobian));
+    utils::Vector c(-2 * *m_torquePonderation * m_jacobian->transpose() * b);
+    double tol(1e-12 * std::max(1., H.diagonal().maxCoeff()));
+
+    // Same bounds as get_bounds_info
+    double lowerBound(0.0001);
+    double upperBound(0.9999);
+    utils::Vector x(n);
+    for (unsigned int i = 0; i < n; ++i) {
+        if (activeSet[i] < 0) {
+            x[i] = lowerBound;
+        } else if (activeSet[i] > 0) {
+            x[i] = upperBound;
+        } else {
+            x[i] = std::min(upperBound, std::max(lowerBound, (*m_activations)[i]));
+        }
+    }
+
+    bool converged(false);
+    bool isStationary(false);
+    std::vector<unsigned int> freeSet;
+    for (unsigned int iter = 0; iter < 10 * n + 100 && !converged; ++iter) {
+        utils::Vector gradient(H * x + c);
+        if (isStationary) {
+            // Release the bound the gradient pushes away from the most
+            int worst(-1);
+            double worstViolation(tol);
+            for (unsigned int i = 0; i < n; ++i) {
+                double violation(activeSet[i] * gradient[i]);
+                if (violation > worstViolation) {
+                    worst = static_cast<int>(i);
+                    worstViolation = violation;
+                }
+            }
+            if (worst < 0) {
+                converged = true;
+            } else {
+                activeSet[static_cast<unsigned int>(worst)] = 0;
+                isStationary = false;
+            }
+            continue;
+        }
+
+        freeSet.clear();
+        for (unsigned int i = 0; i < n; ++i) {
+            if (activeSet[i] == 0) {
+                freeSet.push_back(i);
+            }
+        }
+        unsigned int nFree(static_cast<unsigned int>(freeSet.size()));
+        if (!nFree) {
+            isStationary = true;
+            continue;
+        }
+
+        // Newton step on the free activations, the other ones staying on their bound
+        utils::Matrix HFree(nFree, nFree);
+        utils::Vector gradientFree(nFree);
+        for (unsigned int i = 0; i < nFree; ++i) {
+            for (unsigned int j = 0; j < nFree; ++j) {
+                HFree(i, j) = H(freeSet[i], freeSet[j]);
+            }
+            gradientFree[i] = gradient[freeSet[i]];
+        }
+        utils::Vector step(-HFree.llt().solve(gradientFree));
+
+        // Go as far as possible in the direction of the step without leaving the bounds
+        double alpha(1);
+        int blocking(-1);
+        for (unsigned int i = 0; i < nFree; ++i) {
+            double distance;
+            if (step[i] < 0) {
+                distance = (lowerBound - x[freeSet[i]]) / step[i];
+            } else if (step[i] > 0) {
+                distance = (upperBound - x[freeSet[i]]) / step[i];
+            } else {
+                continue;
+            }
+            if (distance < alpha) {
+                alpha = distance;
+                blocking = static_cast<int>(i);
+            }
+        }
+        for (unsigned int i = 0; i < nFree; ++i) {
+            x[freeSet[i]] += alpha * step[i];
+        }
+        if (blocking >= 0) {
+            unsigned int i(freeSet[static_cast<unsigned int>(blocking)]);
+            activeSet[i] = step[static_cast<unsigned int>(blocking)] < 0 ? -1 : 1;
+            x[i] = activeSet[i] < 0 ? lowerBound : upperBound;
+        } else {
+            // A full step lands on the minimum over the free activations
+            isStationary = true;
+        }
+    }
+
+    if (!converged) {
+        return false;
+    }
+
+    for (unsigned int i = 0; i < n; ++i) {
+        (*m_activations)[i] = x[i];
+        (*m_states)[i]->setActivation(x[i]);
+    }
+    *m_torqueResidual = b - *m_jacobian * x;
+    *m_finalSolution = *m_activations;
+    *m_finalResidual = *m_torqueResidual;
+
+    if (*m_verbose >= 1) {
+        std::cout << std::endl << "Final results" << std::endl;
+        std::cout << "Activations = " << m_activations->transpose() << std::endl;
+        std::cout << "Residual torques= " << m_torqueResidual->transpose() << std::endl;
+    }
+    return true;
+}
@@ -2,17 +2,24 @@
 #include "ModelReader.h"
 
 #include <limits.h>
+#include <cstdio>
+#include <fstream>
 
 #include "BiorbdModel.h"
+#include "ModelWriter.h"
 #include "Utils/Error.h"
 #include "Utils/IfStream.h"
 #include "Utils/String.h"
 #include "Utils/Equation.h"
 #include "Utils/Vector.h"
 #include "Utils/Vector3d.h"
+#include "Utils/Matrix.h"
+#include "Utils/MappedMatrix.h"
 #include "Utils/Rotation.h"
 #include "Utils/Range.h"
 #include "Utils/SpatialVector.h"
+#include "Utils/Path.h"
+#include "Utils/RotoTransNode.h"
 #include "RigidBody/GeneralizedCoordinates.h"
 #include "RigidBody/Mesh.h"
 #include "RigidBody/SegmentCharacteristics.h"
@@ -65,17 +72,20 @@
 using namespace BIORBD_NAMESPACE;
 
 // ------ Public methods ------ //
-Model Reader::readModelFile(const utils::Path &path)
+Model Reader::readModelFile(
+    const utils::Path &path,
+    bool lazyMeshes)
 {
     // Add the elements that have been entered
     Model model;
-    Reader::readModelFile(path, &model);
+    Reader::readModelFile(path, &model, lazyMeshes);
     return model;
 }
 
 void Reader::readModelFile(
     const utils::Path &path,
-    Model *model)
+    Model *model,
+    bool lazyMeshes)
 {
     // Open file
     if (!path.isFileReadable())
@@ -279,24 +289,18 @@ void Reader::readModelFile(
                         utils::String filePathInString;
                         file.read(filePathInString);
                         utils::Path filePath(filePathInString);
-                        if (!filePath.extension().compare("bioMesh")) {
-                            mesh = readMeshFileBiorbdSegments(path.folder() + filePath.relativePath());
-                        } else if (!filePath.extension().compare("ply")) {
-                            mesh = readMeshFilePly(path.folder() + filePath.relativePath());
-                        } else if (!filePath.extension().compare("obj")) {
-                            mesh = readMeshFileObj(path.folder() + filePath.relativePath());
-                        }
-#ifdef MODULE_VTP_FILES_READER
-                        else if (!filePath.extension().compare("vtp")) {
-                            mesh = readMeshFileVtp(path.folder() + filePath.relativePath());
-                        }
-#endif
-                        else if (!filePath.extension().tolower().compare("stl")) {
-                            mesh = readMeshFileStl(path.folder() + filePath.relativePath());
-                        }
-                        else {
-                            utils::Error::raise(filePath.extension() +
-                                                        " is an unrecognized mesh file");
+                        utils::Path meshPath(path.folder() + filePath.relativePath());
+                        if (lazyMeshes) {
+                            // Only the path is kept, the file is read on the first access to the mesh
+                            utils::Error::check(meshPath.isFileReadable(),
+                                                "File " + meshPath.absolutePath() + " could not be open");
+                            mesh = rigidbody::Mesh();
+                            mesh.setPath(meshPath);
+                            mesh.setDeferredReader([meshPath]() {
+                                return readMeshFile(meshPath);
+                            });
+                        } else {
+                            mesh = readMeshFile(meshPath);
                         }
                         isMeshSet = true;
                     } else if (!property_tag.tolower().compare("meshrt")) {
@@ -1354,6 +1358,439 @@ void Reader::readModelFile(
     // std::cout << "Model file successfully loaded" << std::endl;
     file.close();
 }
+#ifndef BIORBD_USE_CASADI_MATH
+namespace
+{
+utils::String binaryFilePath(const utils::Path &path)
+{
+#ifdef _WIN32
+    return utils::Path::toWindowsFormat(path.absolutePath());
+#else
+    return path.absolutePath();
+#endif
+}
+
+void readBinary(std::istream& file, char* data, size_t n)
+{
+    file.read(data, static_cast<std::streamsize>(n));
+    utils::Error::check(static_cast<bool>(file), "The compiled model file is truncated");
+}
+
+std::uint32_t readBinaryUInt(std::istream& file)
+{
+    std::uint32_t value;
+    readBinary(file, reinterpret_cast<char*>(&value), sizeof(value));
+    return value;
+}
+
+std::int32_t readBinaryInt(std::istream& file)
+{
+    std::int32_t value;
+    readBinary(file, reinterpret_cast<char*>(&value), sizeof(value));
+    return value;
+}
+
+bool readBinaryBool(std::istream& file)
+{
+    char value;
+    readBinary(file, &value, 1);
+    return value != 0;
+}
+
+void readBinaryDoubles(std::istream& file, double* data, size_t n)
+{
+    readBinary(file, reinterpret_cast<char*>(data), n * sizeof(double));
+}
+
+double readBinaryDouble(std::istream& file)
+{
+    double value;
+    readBinaryDoubles(file, &value, 1);
+    return value;
+}
+
+utils::String readBinaryString(std::istream& file)
+{
+    std::string value(readBinaryUInt(file), '\0');
+    if (value.size()) {
+        readBinary(file, &value[0], value.size());
+    }
+    return value;
+}
+
+utils::Vector3d readBinaryVector3d(std::istream& file)
+{
+    utils::Vector3d value;
+    readBinaryDoubles(file, value.data(), 3);
+    return value;
+}
+
+utils::RotoTrans readBinaryRotoTrans(std::istream& file)
+{
+    utils::RotoTrans value;
+    readBinaryDoubles(file, value.data(), 16);
+    return value;
+}
+
+std::vector<utils::Range> readBinaryRanges(std::istream& file)
+{
+    std::vector<utils::Range> ranges(readBinaryUInt(file));
+    for (auto& range : ranges) {
+        double min(readBinaryDouble(file));
+        double max(readBinaryDouble(file));
+        range = utils::Range(min, max);
+    }
+    return ranges;
+}
+
+// Read the header of a compiled model, return false if the file was written
+// by another version of biorbd (or of the format) and cannot be read
+bool readBinaryHeader(
+    std::istream& file,
+    utils::String& modelPath,
+    std::vector<std::pair<utils::String, std::uint64_t>>& sources)
+{
+    char magic[sizeof(BIORBD_COMPILED_MODEL_MAGIC)];
+    readBinary(file, magic, sizeof(magic));
+    if (std::string(magic, sizeof(magic)) != std::string(BIORBD_COMPILED_MODEL_MAGIC,
+            sizeof(BIORBD_COMPILED_MODEL_MAGIC))
+            || readBinaryUInt(file) != BIORBD_COMPILED_MODEL_VERSION
+            || readBinaryUInt(file) != 0x01020304
+            || readBinaryString(file).compare(BIORBD_VERSION)) {
+        return false;
+    }
+    modelPath = readBinaryString(file);
+    sources.resize(readBinaryUInt(file));
+    for (auto& source : sources) {
+        source.first = readBinaryString(file);
+        readBinary(file, reinterpret_cast<char*>(&source.second), sizeof(source.second));
+    }
+    return true;
+}
+
+// Read the vertex and the faces of a mesh of a compiled model
+rigidbody::Mesh readBinaryMeshGeometry(std::istream& file)
+{
+    rigidbody::Mesh mesh;
+    unsigned int nbVertex(readBinaryUInt(file));
+    for (unsigned int i=0; i<nbVertex; ++i) {
+        mesh.addPoint(readBinaryVector3d(file));
+    }
+    unsigned int nbFaces(readBinaryUInt(file));
+    for (unsigned int i=0; i<nbFaces; ++i) {
+        std::vector<int> face(3);
+        for (auto& vertex : face) {
+            vertex = readBinaryInt(file);
+        }
+        mesh.addFace(face);
+    }
+    return mesh;
+}
+
+// Skip the vertex and the faces of a mesh of a compiled model, return if there were any
+bool skipBinaryMeshGeometry(std::istream& file)
+{
+    std::uint32_t nbVertex(readBinaryUInt(file));
+    file.seekg(static_cast<std::streamoff>(nbVertex) * 3 * sizeof(double), std::ios::cur);
+    std::uint32_t nbFaces(readBinaryUInt(file));
+    file.seekg(static_cast<std::streamoff>(nbFaces) * 3 * sizeof(std::int32_t), std::ios::cur);
+    return nbVertex || nbFaces;
+}
+}
+
+void Reader::readModelFileWithCache(
+    const utils::Path &path,
+    Model *model,
+    bool lazyMeshes)
+{
+    utils::Path compiledPath(compiledModelPath(path));
+    if (isCompiledModelUpToDate(path)) {
+        // Only the header is checked beforehand, so the compiled model is read apart
+        // not to leave a partially filled model if the rest of the file is corrupted
+        try {
+            Model compiled;
+            readCompiledModel(compiledPath, &compiled, lazyMeshes);
+            *model = compiled;
+            return;
+        } catch (std::exception&) {
+            std::remove(compiledPath.absolutePath().c_str());
+        }
+    }
+
+    readModelFile(path, model, lazyMeshes);
+    try {
+        Writer::writeCompiledModel(*model, compiledPath, path);
+    } catch (std::runtime_error&) {
+        // The model cannot be compiled (or the folder is read-only), the
+        // bioMod file will simply be parsed again the next time
+    }
+}
+
+Model Reader::readCompiledModel(
+    const utils::Path &path,
+    bool lazyMeshes)
+{
+    Model model;
+    Reader::readCompiledModel(path, &model, lazyMeshes);
+    return model;
+}
+
+void Reader::readCompiledModel(
+    const utils::Path &path,
+    Model *model,
+    bool lazyMeshes)
+{
+    std::ifstream file(binaryFilePath(path).c_str(), std::ios::in | std::ios::binary);
+    utils::Error::check(file.is_open(), path.absolutePath() + " could not be opened");
+    utils::String modelPath;
+    std::vector<std::pair<utils::String, std::uint64_t>> sources;
+    utils::Error::check(readBinaryHeader(file, modelPath, sources),
+                        path.absolutePath() + " was not compiled by this version of biorbd");
+    if (modelPath.compare("")) {
+        model->m_path = std::make_shared<utils::Path>(modelPath);
+    }
+
+    // Gravity
+    utils::Vector3d gravity(readBinaryVector3d(file));
+    model->gravity = gravity;
+
+    // Segments
+    unsigned int nbSegments(readBinaryUInt(file));
+    for (unsigned int i=0; i<nbSegments; ++i) {
+        utils::String name(readBinaryString(file));
+        utils::String parent(readBinaryString(file));
+        utils::String seqT(readBinaryString(file));
+        utils::String seqR(readBinaryString(file));
+        std::vector<utils::Range> QRanges(readBinaryRanges(file));
+        std::vector<utils::Range> QDotRanges(readBinaryRanges(file));
+        std::vector<utils::Range> QDDotRanges(readBinaryRanges(file));
+        double mass(readBinaryDouble(file));
+        utils::Vector3d com(readBinaryVector3d(file));
+        utils::Matrix3d inertia;
+        readBinaryDoubles(file, inertia.data(), 9);
+        utils::RotoTrans RT(readBinaryRotoTrans(file));
+        int PF(readBinaryInt(file));
+
+        rigidbody::Mesh mesh;
+        if (lazyMeshes) {
+            // Only the position of the geometry is kept, it is read on the first access to the mesh
+            std::streamoff position(file.tellg());
+            if (skipBinaryMeshGeometry(file)) {
+                mesh.setDeferredReader([path, sources, position]() {
+                    std::ifstream compiledFile(binaryFilePath(path).c_str(),
+                                               std::ios::in | std::ios::binary);
+                    utils::Error::check(compiledFile.is_open(),
+                                        path.absolutePath() + " could not be opened");
+                    utils::String headerModelPath;
+                    std::vector<std::pair<utils::String, std::uint64_t>> headerSources;
+                    utils::Error::check(readBinaryHeader(compiledFile, headerModelPath, headerSources)
+                                        && headerSources == sources,
+                                        path.absolutePath() + " was modified since the model was read");
+                    compiledFile.seekg(position);
+                    return readBinaryMeshGeometry(compiledFile);
+                });
+            }
+        } else {
+            mesh = readBinaryMeshGeometry(file);
+        }
+        utils::String meshPath(readBinaryString(file));
+        if (meshPath.compare("")) {
+            mesh.setPath(meshPath);
+        }
+        mesh.setColor(readBinaryVector3d(file));
+        // The vertices were written transformed, so the scaling and rotation are only restored
+        mesh.getScale() = readBinaryVector3d(file);
+        mesh.getRotation() = readBinaryRotoTrans(file);
+
+        rigidbody::SegmentCharacteristics characteristics(mass, com, inertia, mesh);
+        model->AddSegment(name, parent, seqT, seqR, QRanges, QDotRanges, QDDotRanges,
+                          characteristics, RT, PF);
+    }
+
+    // Markers
+    unsigned int nbMarkers(readBinaryUInt(file));
+    for (unsigned int i=0; i<nbMarkers; ++i) {
+        utils::Vector3d pos(readBinaryVector3d(file));
+        utils::String name(readBinaryString(file));
+        utils::String parent(readBinaryString(file));
+        bool technical(readBinaryBool(file));
+        bool anatomical(readBinaryBool(file));
+        utils::String axesToRemove(readBinaryString(file));
+        model->addMarker(pos, name, parent, technical, anatomical, axesToRemove);
+    }
+
+    // IMUs
+    unsigned int nbIMUs(readBinaryUInt(file));
+    for (unsigned int i=0; i<nbIMUs; ++i) {
+        utils::RotoTrans rt(readBinaryRotoTrans(file));
+        utils::String name(readBinaryString(file));
+        utils::String parent(readBinaryString(file));
+        bool technical(readBinaryBool(file));
+        bool anatomical(readBinaryBool(file));
+        model->addIMU(utils::RotoTransNode(rt, name, parent), technical, anatomical);
+    }
+
+    // Custom RTs
+    unsigned int nbRTs(readBinaryUInt(file));
+    for (unsigned int i=0; i<nbRTs; ++i) {
+        utils::RotoTrans rt(readBinaryRotoTrans(file));
+        utils::String name(readBinaryString(file));
+        utils::String parent(readBinaryString(file));
+        model->addRT(utils::RotoTransNode(rt, name, parent));
+    }
+
+    // Rigid contacts
+    unsigned int nbRigidContacts(readBinaryUInt(file));
+    for (unsigned int i=0; i<nbRigidContacts; ++i) {
+        utils::Vector3d pos(readBinaryVector3d(file));
+        utils::String name(readBinaryString(file));
+        unsigned int parentId(readBinaryUInt(file));
+        utils::String axis(readBinaryString(file));
+        model->AddConstraint(parentId, pos, axis, name);
+    }
+
+    // Soft contacts
+    unsigned int nbSoftContacts(readBinaryUInt(file));
+    for (unsigned int i=0; i<nbSoftContacts; ++i) {
+        utils::Vector3d pos(readBinaryVector3d(file));
+        utils::String name(readBinaryString(file));
+        utils::String parent(readBinaryString(file));
+        double parameters[6];
+        readBinaryDoubles(file, parameters, 6);
+        model->addSoftContact(rigidbody::SoftContactSphere(
+                                  pos[0], pos[1], pos[2], parameters[0], parameters[1],
+                                  parameters[2], parameters[3], parameters[4], parameters[5],
+                                  name, parent, static_cast<int>(model->GetBodyId(parent.c_str()))));
+    }
+
+    // Muscles
+    unsigned int nbMuscleGroups(readBinaryUInt(file));
+#ifdef MODULE_MUSCLES
+    for (unsigned int g=0; g<nbMuscleGroups; ++g) {
+        utils::String groupName(readBinaryString(file));
+        utils::String origin(readBinaryString(file));
+        utils::String insertion(readBinaryString(file));
+        model->addMuscleGroup(groupName, origin, insertion);
+        internal_forces::muscles::MuscleGroup& group(model->muscleGroup(g));
+
+        unsigned int nbMuscles(readBinaryUInt(file));
+        for (unsigned int m=0; m<nbMuscles; ++m) {
+            utils::String name(readBinaryString(file));
+            internal_forces::muscles::MUSCLE_TYPE type(
+                static_cast<internal_forces::muscles::MUSCLE_TYPE>(readBinaryUInt(file)));
+            internal_forces::muscles::STATE_TYPE stateType(
+                static_cast<internal_forces::muscles::STATE_TYPE>(readBinaryUInt(file)));
+            internal_forces::muscles::STATE_FATIGUE_TYPE dynamicFatigueType(
+                static_cast<internal_forces::muscles::STATE_FATIGUE_TYPE>(readBinaryUInt(file)));
+            double shapeFactor(readBinaryDouble(file));
+
+            std::vector<utils::Vector3d> nodes;
+            for (unsigned int k=0; k<2; ++k) {
+                utils::Vector3d pos(readBinaryVector3d(file));
+                utils::String nodeName(readBinaryString(file));
+                utils::String nodeParent(readBinaryString(file));
+                nodes.push_back(utils::Vector3d(pos, nodeName, nodeParent));
+            }
+            internal_forces::muscles::MuscleGeometry geo(nodes[0], nodes[1]);
+
+            double parameters[11];
+            readBinaryDoubles(file, parameters, 11);
+            bool useDamping(readBinaryBool(file));
+            double torqueParameters[3];
+            readBinaryDoubles(file, torqueParameters, 3);
+            internal_forces::muscles::Characteristics characteristics(
+                parameters[0], parameters[1], parameters[2], parameters[3], parameters[4],
+                internal_forces::muscles::State(parameters[5], parameters[6]),
+                internal_forces::muscles::FatigueParameters(
+                    parameters[7], parameters[8], parameters[9], parameters[10]),
+                useDamping, torqueParameters[0], torqueParameters[1], torqueParameters[2]);
+            group.addMuscle(name, type, geo, characteristics,
+                            internal_forces::PathModifiers(), stateType, dynamicFatigueType);
+            internal_forces::muscles::Muscle& muscle(group.muscle(m));
+            if (stateType == internal_forces::muscles::STATE_TYPE::BUCHANAN) {
+                static_cast<internal_forces::muscles::StateDynamicsBuchanan&>(
+                    muscle.state()).shapeFactor(shapeFactor);
+            }
+
+            unsigned int nbObjects(readBinaryUInt(file));
+            for (unsigned int k=0; k<nbObjects; ++k) {
+                utils::NODE_TYPE nodeType(static_cast<utils::NODE_TYPE>(readBinaryUInt(file)));
+                utils::String objectName(readBinaryString(file));
+                utils::String objectParent(readBinaryString(file));
+                if (nodeType == utils::NODE_TYPE::VIA_POINT) {
+                    utils::Vector3d pos(readBinaryVector3d(file));
+                    internal_forces::ViaPoint viaPoint(pos[0], pos[1], pos[2], objectName,
+                                                       objectParent);
+                    muscle.addPathObject(viaPoint);
+                } else if (nodeType == utils::NODE_TYPE::WRAPPING_HALF_CYLINDER) {
+                    utils::RotoTrans rt(readBinaryRotoTrans(file));
+                    double radius(readBinaryDouble(file));
+                    double length(readBinaryDouble(file));
+                    internal_forces::WrappingHalfCylinder cylinder(rt, radius, length, objectName,
+                            objectParent);
+                    muscle.addPathObject(cylinder);
+                } else {
+                    utils::Error::raise("Unknown path modifier in the compiled model file");
+                }
+            }
+        }
+    }
+#else // MODULE_MUSCLES
+    utils::Error::check(nbMuscleGroups == 0,
+                        "Biorbd was build without the module Muscles but the model defines a muscle");
+#endif // MODULE_MUSCLES
+}
+
+utils::Path Reader::compiledModelPath(
+    const utils::Path &path)
+{
+    return path.absolutePath() + ".biorbdc";
+}
+
+bool Reader::isCompiledModelUpToDate(
+    const utils::Path &path)
+{
+    utils::Path compiledPath(compiledModelPath(path));
+    if (!compiledPath.isFileExist()) {
+        return false;
+    }
+    std::ifstream file(binaryFilePath(compiledPath).c_str(), std::ios::in | std::ios::binary);
+    try {
+        utils::String modelPath;
+        std::vector<std::pair<utils::String, std::uint64_t>> sources;
+        if (!readBinaryHeader(file, modelPath, sources)
+                || modelPath.compare(path.absolutePath())) {
+            return false;
+        }
+        for (const auto& source : sources) {
+            if (!utils::Path::isFileExist(source.first) || fileHash(source.first) != source.second) {
+                return false;
+            }
+        }
+    } catch (std::runtime_error&) {
+        return false;
+    }
+    return true;
+}
+
+std::uint64_t Reader::fileHash(
+    const utils::Path &path)
+{
+    std::ifstream file(binaryFilePath(path).c_str(), std::ios::in | std::ios::binary);
+    utils::Error::check(file.is_open(), path.absolutePath() + " could not be opened");
+    std::uint64_t hash(14695981039346656037ULL);
+    std::vector<char> buffer(1 << 16);
+    while (file.read(buffer.data(), static_cast<std::streamsize>(buffer.size()))
+            || file.gcount() > 0) {
+        for (std::streamsize i=0; i<file.gcount(); ++i) {
+            hash ^= static_cast<unsigned char>(buffer[static_cast<size_t>(i)]);
+            hash *= 1099511628211ULL;
+        }
+    }
+    return hash;
+}
+#endif
+
 std::vector<std::vector<utils::Vector3d>>
         Reader::readMarkerDataFile(
             const utils::Path &path)
@@ -1592,6 +2029,113 @@ Reader::readTorqueDataFile(
 
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+utils::Matrix Reader::readMarkerDataFileInMatrix(
+    const utils::Path &path)
+{
+    utils::IfStream file(binaryFilePath(path).c_str(), std::ios::in);
+    utils::String tp;
+
+    file.readSpecificTag("version", tp);
+    unsigned int version(static_cast<unsigned int>(atoi(tp.c_str())));
+    utils::Error::check(version == 1, "Version not implemented yet");
+
+    file.readSpecificTag("nbmark", tp);
+    unsigned int nbMark(static_cast<unsigned int>(atoi(tp.c_str())));
+
+    file.readSpecificTag("nbintervals", tp);
+    unsigned int nbIntervals(static_cast<unsigned int>(atoi(tp.c_str())));
+
+    // The markers are stored one after the other, so they are written
+    // directly in their rows instead of going through the nested vectors
+    utils::Matrix markers(3 * nbMark, nbIntervals + 1);
+    for (unsigned int j=0; j<nbMark; ++j) {
+        while (tp.compare("Marker")) {
+            bool check = file.read(tp);
+            utils::Error::check(check,
+                                "Marker file error, wrong size of marker or intervals?");
+        }
+
+        unsigned int noMarker;
+        file.read(noMarker);
+        for (unsigned int i=0; i<=nbIntervals; ++i) {
+            for (unsigned int k=0; k<3; ++k) {
+                file.read(markers(3*j + k, i));
+            }
+        }
+        tp = "";
+    }
+    file.close();
+    return markers;
+}
+
+utils::Matrix Reader::readQDataFileInMatrix(
+    const utils::Path &path)
+{
+    return readTimeSeriesDataFile(
+               path, "nddl", "Kin file error, wrong size of NDDL or intervals?");
+}
+
+utils::Matrix Reader::readActivationDataFileInMatrix(
+    const utils::Path &path)
+{
+    return readTimeSeriesDataFile(
+               path, "nbmuscles",
+               "Kin file error, wrong size of number of muscles or intervals?");
+}
+
+utils::Matrix Reader::readTorqueDataFileInMatrix(
+    const utils::Path &path)
+{
+    return readTimeSeriesDataFile(
+               path, "nGeneralizedTorque",
+               "Kin file error, wrong size of NGeneralizedTorque or intervals?");
+}
+
+utils::Matrix Reader::readBinaryDataFile(
+    const utils::Path &path)
+{
+    return utils::MappedMatrix(path).matrix();
+}
+
+utils::Matrix Reader::readTimeSeriesDataFile(
+    const utils::Path &path,
+    const utils::String &sizeTag,
+    const utils::String &errorMessage)
+{
+    utils::IfStream file(binaryFilePath(path).c_str(), std::ios::in);
+    utils::String tp;
+
+    file.readSpecificTag("version", tp);
+    unsigned int version(static_cast<unsigned int>(atoi(tp.c_str())));
+    utils::Error::check(version == 1, "Version not implemented yet");
+
+    file.readSpecificTag(sizeTag, tp);
+    unsigned int nbValues(static_cast<unsigned int>(atoi(tp.c_str())));
+
+    file.readSpecificTag("nbintervals", tp);
+    unsigned int nbIntervals(static_cast<unsigned int>(atoi(tp.c_str())));
+
+    // Each frame fills a column of the (column major) matrix
+    utils::Matrix data(nbValues, nbIntervals + 1);
+    for (unsigned int j=0; j<nbIntervals+1; ++j) {
+        while (tp.compare("T")) {
+            bool check = file.read(tp);
+            utils::Error::check(check, errorMessage);
+        }
+
+        double time;
+        file.read(time);
+        for (unsigned int i=0; i<nbValues; ++i) {
+            file.read(data(i, j));
+        }
+        tp = "";
+    }
+    file.close();
+    return data;
+}
+#endif
+
 std::vector<utils::Vector>
 Reader::readGroundReactionForceDataFile(
     const utils::Path &path)
@@ -1936,6 +2480,27 @@ std::vector<std::vector<utils::Vector3d>>
     return data;
 }
 
+rigidbody::Mesh Reader::readMeshFile(
+    const utils::Path &path)
+{
+    if (!path.extension().compare("bioMesh")) {
+        return readMeshFileBiorbdSegments(path);
+    } else if (!path.extension().compare("ply")) {
+        return readMeshFilePly(path);
+    } else if (!path.extension().compare("obj")) {
+        return readMeshFileObj(path);
+    }
+#ifdef MODULE_VTP_FILES_READER
+    else if (!path.extension().compare("vtp")) {
+        return readMeshFileVtp(path);
+    }
+#endif
+    else if (!path.extension().tolower().compare("stl")) {
+        return readMeshFileStl(path);
+    }
+    utils::Error::raise(path.extension() + " is an unrecognized mesh file");
+}
+
 rigidbody::Mesh
 Reader::readMeshFileBiorbdSegments(
     const utils::Path &path)
@@ -3,17 +3,49 @@
 
 #include <iostream>
 #include <fstream>
+#include <cctype>
+#include <cstdint>
+#include <cstdio>
+#include <random>
+#include <sstream>
+#ifdef _WIN32
+    #include <process.h>
+#else
+    #include <unistd.h>
+#endif
 
 #include "BiorbdModel.h"
+#include "ModelReader.h"
+#include "Utils/Error.h"
 #include "Utils/String.h"
 #include "Utils/Path.h"
 #include "Utils/Matrix3d.h"
+#include "Utils/Matrix.h"
+#include "Utils/MappedMatrix.h"
 #include "Utils/Vector.h"
+#include "Utils/Range.h"
+#include "Utils/RotoTransNode.h"
 #include "RigidBody/IMU.h"
 #include "RigidBody/NodeSegment.h"
 #include "RigidBody/Segment.h"
 #include "RigidBody/Mesh.h"
+#include "RigidBody/MeshFace.h"
 #include "RigidBody/SegmentCharacteristics.h"
+#include "RigidBody/SoftContactSphere.h"
+
+#ifdef MODULE_MUSCLES
+    #include "InternalForces/Muscles/Muscle.h"
+    #include "InternalForces/Muscles/MuscleGroup.h"
+    #include "InternalForces/Muscles/MuscleGeometry.h"
+    #include "InternalForces/Muscles/Characteristics.h"
+    #include "InternalForces/Muscles/State.h"
+    #include "InternalForces/Muscles/FatigueParameters.h"
+    #include "InternalForces/Muscles/FatigueModel.h"
+    #include "InternalForces/Muscles/FatigueState.h"
+    #include "InternalForces/Muscles/StateDynamicsBuchanan.h"
+    #include "InternalForces/PathModifiers.h"
+    #include "InternalForces/WrappingHalfCylinder.h"
+#endif // MODULE_MUSCLES
 
 using namespace BIORBD_NAMESPACE;
 
@@ -179,4 +211,398 @@ void Writer::writeModel(Model & model,
     biorbdModelFile.close();
 
 }
+
+// ------ Compiled model ------ //
+namespace
+{
+void writeBinaryUInt(std::ostream& file, std::uint32_t value)
+{
+    file.write(reinterpret_cast<const char*>(&value), sizeof(value));
+}
+
+void writeBinaryInt(std::ostream& file, std::int32_t value)
+{
+    file.write(reinterpret_cast<const char*>(&value), sizeof(value));
+}
+
+void writeBinaryBool(std::ostream& file, bool value)
+{
+    char c(value ? 1 : 0);
+    file.write(&c, 1);
+}
+
+void writeBinaryDoubles(std::ostream& file, const double* data, size_t n)
+{
+    file.write(reinterpret_cast<const char*>(data), static_cast<std::streamsize>(n * sizeof(double)));
+}
+
+void writeBinaryDouble(std::ostream& file, double value)
+{
+    writeBinaryDoubles(file, &value, 1);
+}
+
+void writeBinaryString(std::ostream& file, const std::string& value)
+{
+    writeBinaryUInt(file, static_cast<std::uint32_t>(value.size()));
+    file.write(value.c_str(), static_cast<std::streamsize>(value.size()));
+}
+
+void writeBinaryRanges(std::ostream& file, const std::vector<utils::Range>& ranges)
+{
+    writeBinaryUInt(file, static_cast<std::uint32_t>(ranges.size()));
+    for (const auto& range : ranges) {
+        writeBinaryDouble(file, range.min());
+        writeBinaryDouble(file, range.max());
+    }
+}
+
+// Remove a temporary file when leaving the scope, unless it was kept
+class TemporaryFileRemover
+{
+public:
+    TemporaryFileRemover(
+        std::ofstream& file,
+        const utils::String& path) :
+        m_file(file),
+        m_path(path),
+        m_keep(false)
+    {
+
+    }
+
+    ~TemporaryFileRemover()
+    {
+        if (!m_keep) {
+            if (m_file.is_open()) {
+                m_file.close();
+            }
+            std::remove(m_path.c_str());
+        }
+    }
+
+    void keep()
+    {
+        m_keep = true;
+    }
+
+protected:
+    std::ofstream& m_file; ///< The stream writing the temporary file
+    utils::String m_path; ///< The path of the temporary file
+    bool m_keep; ///< If the file must not be removed
+};
+}
+
+void Writer::writeCompiledModel(
+    Model & model,
+    const utils::Path& pathToWrite)
+{
+    writeCompiledModel(model, pathToWrite, model.path());
+}
+
+void Writer::writeCompiledModel(
+    Model & model,
+    const utils::Path& pathToWrite,
+    const utils::Path& modelPath)
+{
+    // Make sure every component of the model can be compiled before writing anything
+#ifdef MODULE_ACTUATORS
+    utils::Error::check(model.nbActuators() == 0, "Actuators cannot be compiled yet");
+#endif
+#ifdef MODULE_LIGAMENTS
+    utils::Error::check(model.nbLigaments() == 0, "Ligaments cannot be compiled yet");
+#endif
+#ifdef MODULE_PASSIVE_TORQUES
+    utils::Error::check(model.nbPassiveTorques() == 0, "Passive torques cannot be compiled yet");
+#endif
+    // The axes of the rigid contacts are taken from RBDL so the order they were declared in is kept
+    std::vector<utils::String> contactAxes;
+    unsigned int nbContactAxes(0);
+    for (const auto& contact : model.rigidContacts()) {
+        utils::String axes;
+        for (size_t i=0; i<contact.axesToRemove().length(); ++i) {
+            utils::Error::check(nbContactAxes < model.nbContacts(),
+                                "Loop constraints and contacts defined by their normal cannot be compiled yet");
+            utils::String name(model.contactName(nbContactAxes++));
+            utils::String prefix(contact.utils::Node::name() + "_");
+            utils::Error::check(name.length() == prefix.length() + 1
+                                && !name.compare(0, prefix.length(), prefix),
+                                "Contacts defined by their normal cannot be compiled yet");
+            axes += static_cast<char>(std::tolower(name.back()));
+        }
+        contactAxes.push_back(axes);
+    }
+    utils::Error::check(nbContactAxes == model.nbContacts(),
+                        "Loop constraints cannot be compiled yet");
+    for (unsigned int i=0; i<model.nbSoftContacts(); ++i) {
+        utils::Error::check(
+            model.softContact(i).typeOfNode() == utils::NODE_TYPE::SOFT_CONTACT_SPHERE,
+            "Only the spherical soft contacts can be compiled");
+    }
+#ifdef MODULE_MUSCLES
+    for (unsigned int g=0; g<model.nbMuscleGroups(); ++g) {
+        for (unsigned int m=0; m<model.muscleGroup(g).nbMuscles(); ++m) {
+            const internal_forces::PathModifiers& pathModifiers(
+                model.muscleGroup(g).muscle(m).pathModifier());
+            for (unsigned int k=0; k<pathModifiers.nbObjects(); ++k) {
+                utils::NODE_TYPE type(pathModifiers.object(k).typeOfNode());
+                utils::Error::check(type == utils::NODE_TYPE::VIA_POINT
+                                    || type == utils::NODE_TYPE::WRAPPING_HALF_CYLINDER,
+                                    "Only the via points and the half cylinders can be compiled");
+            }
+        }
+    }
+#endif
+
+    // The files the model was built from, so a cache can tell when it is outdated
+    utils::String modelAbsolutePath;
+    std::vector<utils::String> sources;
+    if (modelPath.filename().compare("")) {
+        modelAbsolutePath = modelPath.absolutePath();
+        sources.push_back(modelAbsolutePath);
+    }
+    for (unsigned int i=0; i<model.nbSegment(); ++i) {
+        const utils::Path& meshPath(model.segment(i).characteristics().mesh().path());
+        if (meshPath.filename().compare("")) {
+            sources.push_back(meshPath.absolutePath());
+        }
+    }
+    // Hashed before the temporary file is created, as a missing source throws
+    std::vector<std::uint64_t> hashes;
+    for (const auto& source : sources) {
+        hashes.push_back(Reader::fileHash(source));
+    }
+
+    if(!pathToWrite.isFolderExist()) {
+        pathToWrite.createFolder();
+    }
+    // Write in a temporary file first so a reader never sees a partial file. The
+    // name is unique to the writer, as other processes may write the same model
+    std::random_device randomDevice;
+    std::stringstream tempName;
+#ifdef _WIN32
+    tempName << "." << _getpid();
+#else
+    tempName << "." << getpid();
+#endif
+    tempName << "." << std::hex << randomDevice() << ".tmp";
+    utils::String tempPath(pathToWrite.absolutePath() + tempName.str());
+    std::ofstream file(tempPath.c_str(), std::ios::out | std::ios::binary);
+    utils::Error::check(file.is_open(), tempPath + " could not be opened");
+    // Any error while writing removes the temporary file
+    TemporaryFileRemover tempFileRemover(file, tempPath);
+
+    // Header
+    file.write(BIORBD_COMPILED_MODEL_MAGIC, sizeof(BIORBD_COMPILED_MODEL_MAGIC));
+    writeBinaryUInt(file, BIORBD_COMPILED_MODEL_VERSION);
+    writeBinaryUInt(file, 0x01020304); // To detect a file written with another endianness
+    writeBinaryString(file, BIORBD_VERSION);
+    writeBinaryString(file, modelAbsolutePath);
+    writeBinaryUInt(file, static_cast<std::uint32_t>(sources.size()));
+    for (size_t i=0; i<sources.size(); ++i) {
+        writeBinaryString(file, sources[i]);
+        file.write(reinterpret_cast<const char*>(&hashes[i]), sizeof(hashes[i]));
+    }
+
+    // Gravity
+    writeBinaryDoubles(file, model.gravity.data(), 3);
+
+    // Segments
+    writeBinaryUInt(file, model.nbSegment());
+    for (unsigned int i=0; i<model.nbSegment(); ++i) {
+        const rigidbody::Segment& segment(model.segment(i));
+        writeBinaryString(file, segment.name());
+        writeBinaryString(file, segment.parent());
+        writeBinaryString(file, segment.seqT());
+        writeBinaryString(file, segment.seqR());
+        writeBinaryRanges(file, segment.QRanges());
+        writeBinaryRanges(file, segment.QDotRanges());
+        writeBinaryRanges(file, segment.QDDotRanges());
+        const rigidbody::SegmentCharacteristics& characteristics(segment.characteristics());
+        writeBinaryDouble(file, characteristics.mass());
+        writeBinaryDoubles(file, characteristics.CoM().data(), 3);
+        writeBinaryDoubles(file, characteristics.inertia().data(), 9);
+        writeBinaryDoubles(file, segment.localJCS().data(), 16);
+        writeBinaryInt(file, segment.platformIdx());
+
+        // The vertices are written once the mesh rotation and scaling are applied
+        const rigidbody::Mesh& mesh(characteristics.mesh());
+        writeBinaryUInt(file, mesh.nbVertex());
+        for (unsigned int j=0; j<mesh.nbVertex(); ++j) {
+            writeBinaryDoubles(file, mesh.point(j).data(), 3);
+        }
+        writeBinaryUInt(file, static_cast<std::uint32_t>(mesh.faces().size()));
+        for (auto face : mesh.faces()) {
+            for (unsigned int k=0; k<3; ++k) {
+                writeBinaryInt(file, face.face()[k]);
+            }
+        }
+        writeBinaryString(file, mesh.path().filename().compare("") ?
+                          mesh.path().absolutePath() : utils::String(""));
+        writeBinaryDoubles(file, mesh.color().data(), 3);
+        writeBinaryDoubles(file, mesh.getScale().data(), 3);
+        writeBinaryDoubles(file, mesh.getRotation().data(), 16);
+    }
+
+    // Markers
+    writeBinaryUInt(file, model.nbMarkers());
+    for (unsigned int i=0; i<model.nbMarkers(); ++i) {
+        const rigidbody::NodeSegment& marker(model.marker(i));
+        writeBinaryDoubles(file, marker.data(), 3);
+        writeBinaryString(file, marker.utils::Node::name());
+        writeBinaryString(file, marker.parent());
+        writeBinaryBool(file, marker.isTechnical());
+        writeBinaryBool(file, marker.isAnatomical());
+        writeBinaryString(file, marker.axesToRemove());
+    }
+
+    // IMUs
+    writeBinaryUInt(file, model.nbIMUs());
+    for (unsigned int i=0; i<model.nbIMUs(); ++i) {
+        const rigidbody::IMU& imu(model.IMU(i));
+        writeBinaryDoubles(file, imu.data(), 16);
+        writeBinaryString(file, imu.utils::Node::name());
+        writeBinaryString(file, imu.parent());
+        writeBinaryBool(file, imu.isTechnical());
+        writeBinaryBool(file, imu.isAnatomical());
+    }
+
+    // Custom RTs
+    writeBinaryUInt(file, model.nbRTs());
+    for (unsigned int i=0; i<model.nbRTs(); ++i) {
+        const utils::RotoTransNode& rt(model.RT(i));
+        writeBinaryDoubles(file, rt.data(), 16);
+        writeBinaryString(file, rt.utils::Node::name());
+        writeBinaryString(file, rt.parent());
+    }
+
+    // Rigid contacts
+    writeBinaryUInt(file, static_cast<std::uint32_t>(model.rigidContacts().size()));
+    for (size_t i=0; i<model.rigidContacts().size(); ++i) {
+        const rigidbody::NodeSegment& contact(model.rigidContacts()[i]);
+        writeBinaryDoubles(file, contact.data(), 3);
+        writeBinaryString(file, contact.utils::Node::name());
+        writeBinaryUInt(file, static_cast<std::uint32_t>(contact.parentId()));
+        writeBinaryString(file, contactAxes[i]);
+    }
+
+    // Soft contacts
+    writeBinaryUInt(file, model.nbSoftContacts());
+    for (unsigned int i=0; i<model.nbSoftContacts(); ++i) {
+        const rigidbody::SoftContactSphere& contact(
+            static_cast<const rigidbody::SoftContactSphere&>(model.softContact(i)));
+        writeBinaryDoubles(file, contact.data(), 3);
+        writeBinaryString(file, contact.utils::Node::name());
+        writeBinaryString(file, contact.parent());
+        writeBinaryDouble(file, contact.radius());
+        writeBinaryDouble(file, contact.stiffness());
+        writeBinaryDouble(file, contact.damping());
+        writeBinaryDouble(file, contact.muStatic());
+        writeBinaryDouble(file, contact.muDynamic());
+        writeBinaryDouble(file, contact.muViscous());
+    }
+
+    // Muscles
+#ifdef MODULE_MUSCLES
+    writeBinaryUInt(file, model.nbMuscleGroups());
+    for (unsigned int g=0; g<model.nbMuscleGroups(); ++g) {
+        internal_forces::muscles::MuscleGroup& group(model.muscleGroup(g));
+        writeBinaryString(file, group.name());
+        writeBinaryString(file, group.origin());
+        writeBinaryString(file, group.insertion());
+        writeBinaryUInt(file, group.nbMuscles());
+        for (unsigned int m=0; m<group.nbMuscles(); ++m) {
+            internal_forces::muscles::Muscle& muscle(group.muscle(m));
+            writeBinaryString(file, muscle.name());
+            writeBinaryUInt(file, muscle.type());
+            writeBinaryUInt(file, muscle.state().type());
+            const internal_forces::muscles::FatigueModel* fatigue(
+                dynamic_cast<const internal_forces::muscles::FatigueModel*>(&muscle));
+            writeBinaryUInt(file, fatigue ? fatigue->fatigueState().getType() :
+                            internal_forces::muscles::STATE_FATIGUE_TYPE::NO_FATIGUE_STATE_TYPE);
+            writeBinaryDouble(file,
+                              muscle.state().type() == internal_forces::muscles::STATE_TYPE::BUCHANAN ?
+                              static_cast<const internal_forces::muscles::StateDynamicsBuchanan&>(
+                                  muscle.state()).shapeFactor() : 0);
+
+            const internal_forces::muscles::MuscleGeometry& geometry(muscle.position());
+            for (const utils::Vector3d* node : {&geometry.originInLocal(), &geometry.insertionInLocal()}) {
+                writeBinaryDoubles(file, node->data(), 3);
+                writeBinaryString(file, node->utils::Node::name());
+                writeBinaryString(file, node->parent());
+            }
+
+            const internal_forces::muscles::Characteristics& characteristics(
+                muscle.characteristics());
+            writeBinaryDouble(file, characteristics.optimalLength());
+            writeBinaryDouble(file, characteristics.forceIsoMax());
+            writeBinaryDouble(file, characteristics.PCSA());
+            writeBinaryDouble(file, characteristics.tendonSlackLength());
+            writeBinaryDouble(file, characteristics.pennationAngle());
+            writeBinaryDouble(file, characteristics.stateMax().excitation());
+            writeBinaryDouble(file, characteristics.stateMax().activation());
+            writeBinaryDouble(file, characteristics.fatigueParameters().fatigueRate());
+            writeBinaryDouble(file, characteristics.fatigueParameters().recoveryRate());
+            writeBinaryDouble(file, characteristics.fatigueParameters().developFactor());
+            writeBinaryDouble(file, characteristics.fatigueParameters().recoveryFactor());
+            writeBinaryBool(file, characteristics.useDamping());
+            writeBinaryDouble(file, characteristics.torqueActivation());
+            writeBinaryDouble(file, characteristics.torqueDeactivation());
+            writeBinaryDouble(file, characteristics.minActivation());
+
+            const internal_forces::PathModifiers& pathModifiers(muscle.pathModifier());
+            writeBinaryUInt(file, pathModifiers.nbObjects());
+            for (unsigned int k=0; k<pathModifiers.nbObjects(); ++k) {
+                const utils::Vector3d& object(pathModifiers.object(k));
+                writeBinaryUInt(file, object.typeOfNode());
+                writeBinaryString(file, object.utils::Node::name());
+                writeBinaryString(file, object.parent());
+                if (object.typeOfNode() == utils::NODE_TYPE::VIA_POINT) {
+                    writeBinaryDoubles(file, object.data(), 3);
+                } else if (object.typeOfNode() == utils::NODE_TYPE::WRAPPING_HALF_CYLINDER) {
+                    const internal_forces::WrappingHalfCylinder& cylinder(
+                        static_cast<const internal_forces::WrappingHalfCylinder&>(object));
+                    writeBinaryDoubles(file, cylinder.internal_forces::WrappingObject::RT().data(), 16);
+                    writeBinaryDouble(file, cylinder.radius());
+                    writeBinaryDouble(file, cylinder.length());
+                }
+            }
+        }
+    }
+#else
+    writeBinaryUInt(file, 0);
+#endif // MODULE_MUSCLES
+
+    file.close();
+    utils::Error::check(!file.fail(), "Writing " + tempPath + " failed");
+#ifdef _WIN32
+    // Renaming onto an existing file fails on Windows, while it atomically replaces it elsewhere
+    std::remove(pathToWrite.absolutePath().c_str());
+#endif
+    utils::Error::check(std::rename(tempPath.c_str(), pathToWrite.absolutePath().c_str()) == 0,
+                        "Could not write " + pathToWrite.absolutePath());
+    tempFileRemover.keep();
+}
+
+// ------ Binary data ------ //
+void Writer::writeBinaryDataFile(
+    const utils::Matrix& data,
+    const utils::Path& pathToWrite)
+{
+    std::ofstream file(pathToWrite.absolutePath().c_str(), std::ios::out | std::ios::binary);
+    utils::Error::check(file.is_open(), "Could not write " + pathToWrite.absolutePath());
+
+    // Header: magic, version, endianness marker, number of rows and of columns (32 bytes)
+    file.write(BIORBD_BINARY_DATA_MAGIC, 8);
+    writeBinaryUInt(file, BIORBD_BINARY_DATA_VERSION);
+    writeBinaryUInt(file, 0x01020304);
+    std::uint64_t rows(static_cast<std::uint64_t>(data.rows()));
+    std::uint64_t cols(static_cast<std::uint64_t>(data.cols()));
+    file.write(reinterpret_cast<const char*>(&rows), sizeof(rows));
+    file.write(reinterpret_cast<const char*>(&cols), sizeof(cols));
+
+    // Eigen matrices are column-major, so each frame is contiguous
+    writeBinaryDoubles(file, data.data(), static_cast<size_t>(data.size()));
+    file.close();
+    utils::Error::check(static_cast<bool>(file), "Writing " + pathToWrite.absolutePath() + " failed");
+}
 #endif
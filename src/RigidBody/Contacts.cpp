@@ -212,9 +212,12 @@ rigidbody::Contacts::constraintsInGlobal(
     // On each control, apply the rotation and save the position
     for (unsigned int i=0; i<contactConstraints.size(); ++i) {
         for (unsigned int j=0; j<contactConstraints[i]->getConstraintSize(); ++j) {
+            if (updateKin) {
+                model.UpdateKinematicsCustom(&Q);
+            }
             tp.push_back(RigidBodyDynamics::CalcBodyToBaseCoordinates(
                              model, Q, contactConstraints[i]->getBodyIds()[0],
-                             contactConstraints[i]->getBodyFrames()[0].r, updateKin));
+                             contactConstraints[i]->getBodyFrames()[0].r, false));
 #ifndef BIORBD_USE_CASADI_MATH
             updateKin = false;
 #endif
@@ -239,8 +242,11 @@ utils::Vector3d rigidbody::Contacts::rigidContact(
     const rigidbody::NodeSegment& c = rigidContact(idx);
 
     // Calculate the acceleration of the contact
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q);
+    }
     return RigidBodyDynamics::CalcBodyToBaseCoordinates(
-            model, Q, c.parentId(), c, updateKin);
+            model, Q, c.parentId(), c, false);
 }
 
 std::vector<utils::Vector3d>
@@ -259,8 +265,11 @@ rigidbody::Contacts::rigidContacts(
 
     // On each control, apply the rotation and save the position
     for (const rigidbody::NodeSegment& c : *m_rigidContacts) {
+        if (updateKin) {
+            model.UpdateKinematicsCustom(&Q);
+        }
         tp.push_back(RigidBodyDynamics::CalcBodyToBaseCoordinates(
-            model, Q, c.parentId(), c, updateKin)
+            model, Q, c.parentId(), c, false)
         );
 #ifndef BIORBD_USE_CASADI_MATH
         updateKin = false;
@@ -286,8 +295,11 @@ utils::Vector3d rigidbody::Contacts::rigidContactVelocity(
     const rigidbody::NodeSegment& c = rigidContact(idx);
 
     // Calculate the acceleration of the contact
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q, &Qdot);
+    }
     return RigidBodyDynamics::CalcPointVelocity(
-            model, Q, Qdot, c.parentId(), c, updateKin);
+            model, Q, Qdot, c.parentId(), c, false);
 }
 
 std::vector<utils::Vector3d> rigidbody::Contacts::rigidContactsVelocity(
@@ -307,8 +319,11 @@ std::vector<utils::Vector3d> rigidbody::Contacts::rigidContactsVelocity(
 
     // On each control, apply the Q, Qdot, Qddot and save the acceleration
     for (const rigidbody::NodeSegment& c : *m_rigidContacts) {
+        if (updateKin) {
+            model.UpdateKinematicsCustom(&Q, &Qdot);
+        }
         tp.push_back(RigidBodyDynamics::CalcPointVelocity(
-            model, Q, Qdot, c.parentId(), c, updateKin)
+            model, Q, Qdot, c.parentId(), c, false)
         );
 #ifndef BIORBD_USE_CASADI_MATH
     updateKin = false;
@@ -335,8 +350,11 @@ utils::Vector3d rigidbody::Contacts::rigidContactAcceleration(
     const rigidbody::NodeSegment& c = rigidContact(idx);
 
     // Calculate the acceleration of the contact
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q, &Qdot, &Qddot);
+    }
     return RigidBodyDynamics::CalcPointAcceleration(
-            model, Q, Qdot, Qddot, c.parentId(), c, updateKin);
+            model, Q, Qdot, Qddot, c.parentId(), c, false);
 }
 
 std::vector<utils::Vector3d> rigidbody::Contacts::rigidContactsAcceleration(
@@ -357,8 +375,11 @@ std::vector<utils::Vector3d> rigidbody::Contacts::rigidContactsAcceleration(
 
     // On each control, apply the Q, Qdot, Qddot and save the acceleration
     for (const rigidbody::NodeSegment& c : *m_rigidContacts) {
+        if (updateKin) {
+            model.UpdateKinematicsCustom(&Q, &Qdot, &Qddot);
+        }
         tp.push_back(RigidBodyDynamics::CalcPointAcceleration(
-            model, Q, Qdot, Qddot, c.parentId(), c, updateKin)
+            model, Q, Qdot, Qddot, c.parentId(), c, false)
         );
 #ifndef BIORBD_USE_CASADI_MATH
     updateKin = false;
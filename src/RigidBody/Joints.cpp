@@ -1,6 +1,8 @@
 #define BIORBD_API_EXPORTS
 #include "RigidBody/Joints.h"
 
+#include <algorithm>
+#include <cstring>
 #include <rbdl/rbdl_utils.h>
 #include <rbdl/Kinematics.h>
 #include <rbdl/Dynamics.h>
@@ -38,7 +40,17 @@ rigidbody::Joints::Joints() :
     m_nbQddot(std::make_shared<unsigned int>(0)),
     m_nRotAQuat(std::make_shared<unsigned int>(0)),
     m_isKinematicsComputed(std::make_shared<bool>(false)),
-    m_totalMass(std::make_shared<utils::Scalar>(0))
+    m_kinematicsQ(std::make_shared<rigidbody::GeneralizedCoordinates>()),
+    m_kinematicsQdot(std::make_shared<rigidbody::GeneralizedVelocity>()),
+    m_kinematicsQddot(std::make_shared<rigidbody::GeneralizedAcceleration>()),
+    m_nbKinematicsCacheHits(std::make_shared<unsigned int>(0)),
+    m_nbKinematicsCacheMisses(std::make_shared<unsigned int>(0)),
+    m_totalMass(std::make_shared<utils::Scalar>(0)),
+    m_dofSubTrees(std::make_shared<std::vector<std::vector<unsigned int>>>()),
+    m_massMatrixInverseF(std::make_shared<std::vector<RigidBodyDynamics::Math::MatrixNd>>()),
+    m_meshPointsPacked(std::make_shared<utils::Matrix>()),
+    m_meshPointsOffsets(std::make_shared<std::vector<unsigned int>>()),
+    m_meshFacesPacked(std::make_shared<std::vector<int>>())
 {
     // Redefining gravity so it is on z by default
     this->gravity = utils::Vector3d (0, 0, -9.81);
@@ -53,8 +65,20 @@ rigidbody::Joints::Joints(const rigidbody::Joints &other) :
     m_nbQdot(other.m_nbQdot),
     m_nbQddot(other.m_nbQddot),
     m_nRotAQuat(other.m_nRotAQuat),
-    m_isKinematicsComputed(other.m_isKinematicsComputed),
-    m_totalMass(other.m_totalMass)
+    m_isKinematicsComputed(std::make_shared<bool>(*other.m_isKinematicsComputed)),
+    // The kinematic state is copied along with the RBDL model, so is its description
+    m_kinematicsQ(std::make_shared<rigidbody::GeneralizedCoordinates>(*other.m_kinematicsQ)),
+    m_kinematicsQdot(std::make_shared<rigidbody::GeneralizedVelocity>(*other.m_kinematicsQdot)),
+    m_kinematicsQddot(std::make_shared<rigidbody::GeneralizedAcceleration>(*other.m_kinematicsQddot)),
+    m_nbKinematicsCacheHits(std::make_shared<unsigned int>(0)),
+    m_nbKinematicsCacheMisses(std::make_shared<unsigned int>(0)),
+    m_totalMass(other.m_totalMass),
+    // Each copy fills its own caches so they can be used from different threads
+    m_dofSubTrees(std::make_shared<std::vector<std::vector<unsigned int>>>(*other.m_dofSubTrees)),
+    m_massMatrixInverseF(std::make_shared<std::vector<RigidBodyDynamics::Math::MatrixNd>>()),
+    m_meshPointsPacked(std::make_shared<utils::Matrix>(*other.m_meshPointsPacked)),
+    m_meshPointsOffsets(std::make_shared<std::vector<unsigned int>>(*other.m_meshPointsOffsets)),
+    m_meshFacesPacked(std::make_shared<std::vector<int>>(*other.m_meshFacesPacked))
 {
 
 }
@@ -85,7 +109,17 @@ void rigidbody::Joints::DeepCopy(const rigidbody::Joints &other)
     *m_nbQddot = *other.m_nbQddot;
     *m_nRotAQuat = *other.m_nRotAQuat;
     *m_isKinematicsComputed = *other.m_isKinematicsComputed;
+    *m_kinematicsQ = *other.m_kinematicsQ;
+    *m_kinematicsQdot = *other.m_kinematicsQdot;
+    *m_kinematicsQddot = *other.m_kinematicsQddot;
+    *m_nbKinematicsCacheHits = *other.m_nbKinematicsCacheHits;
+    *m_nbKinematicsCacheMisses = *other.m_nbKinematicsCacheMisses;
     *m_totalMass = *other.m_totalMass;
+    *m_dofSubTrees = *other.m_dofSubTrees;
+    m_massMatrixInverseF->clear();
+    *m_meshPointsPacked = *other.m_meshPointsPacked;
+    *m_meshPointsOffsets = *other.m_meshPointsOffsets;
+    *m_meshFacesPacked = *other.m_meshFacesPacked;
 }
 
 unsigned int rigidbody::Joints::nbGeneralizedTorque() const
@@ -171,6 +205,9 @@ unsigned int rigidbody::Joints::AddSegment(
     *m_totalMass +=
         characteristics.mMass; // Add the segment mass to the total body mass
     m_segments->push_back(tp);
+    invalidateKinematicsCache();
+    m_dofSubTrees->clear();
+    m_meshPointsOffsets->clear();
     return 0;
 }
 unsigned int rigidbody::Joints::AddSegment(
@@ -199,6 +236,9 @@ unsigned int rigidbody::Joints::AddSegment(
     *m_totalMass +=
         characteristics.mMass; // Add the segment mass to the total body mass
     m_segments->push_back(tp);
+    invalidateKinematicsCache();
+    m_dofSubTrees->clear();
+    m_meshPointsOffsets->clear();
     return 0;
 }
 
@@ -220,6 +260,8 @@ void rigidbody::Joints::updateSegmentCharacteristics(
     utils::Error::check(idx < m_segments->size(),
                                 "Asked for a wrong segment (out of range)");
     (*m_segments)[idx].updateCharacteristics(*this, characteristics);
+    invalidateKinematicsCache();
+    m_meshPointsOffsets->clear();
 }
 
 const rigidbody::Segment& rigidbody::Joints::segment(
@@ -414,8 +456,13 @@ unsigned int rigidbody::Joints::getBodyBiorbdIdToRbdlId(
     return (*m_segments)[idx].id();
 }
 
-std::vector<std::vector<unsigned int> > rigidbody::Joints::getDofSubTrees()
+const std::vector<std::vector<unsigned int> >& rigidbody::Joints::getDofSubTrees()
 {
+    // The topology does not change once the segments are added
+    if (!m_dofSubTrees->empty()) {
+        return *m_dofSubTrees;
+    }
+
     // initialize subTrees
     std::vector<std::vector<unsigned int> > subTrees;
     std::vector<unsigned int> subTree_empty;
@@ -458,7 +505,8 @@ std::vector<std::vector<unsigned int> > rigidbody::Joints::getDofSubTrees()
 
     subTrees.erase(subTrees.begin());
 
-    return  subTrees;
+    *m_dofSubTrees = subTrees;
+    return *m_dofSubTrees;
 }
 
 std::vector<std::vector<unsigned int> > rigidbody::Joints::recursiveDofSubTrees(
@@ -506,6 +554,26 @@ const
     return out;
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+utils::Matrix rigidbody::Joints::allGlobalJCSBatch(
+    const utils::Matrix &Q)
+{
+    utils::Error::check(Q.rows() == nbQ(), "Q must be of dimension nbQ x nFrames");
+
+    unsigned int nSegments(nbSegment());
+    utils::Matrix out(16 * nSegments, Q.cols());
+    rigidbody::GeneralizedCoordinates q(*this);
+    for (unsigned int f=0; f<Q.cols(); ++f) {
+        q = Q.col(f);
+        UpdateKinematicsCustom(&q, nullptr, nullptr);
+        for (unsigned int i=0; i<nSegments; ++i) {
+            Eigen::Map<Eigen::Matrix4d>(out.col(f).data() + 16*i) = globalJCS(i);
+        }
+    }
+    return out;
+}
+#endif
+
 utils::RotoTrans rigidbody::Joints::globalJCS(
     const rigidbody::GeneralizedCoordinates &Q,
     const utils::String &name)
@@ -760,9 +828,13 @@ utils::Vector3d rigidbody::Joints::segmentAngularVelocity(
     const utils::String& segmentName(segment(idx).name());
     unsigned int id(this->GetBodyId(segmentName.c_str()));
 
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &Qdot);
+    }
+
     // Calculate the velocity of the point
     return RigidBodyDynamics::CalcPointVelocity6D(
-                *this, Q, Qdot, id, utils::Vector3d(0, 0, 0), updateKin).block(0, 0, 3, 1);
+                *this, Q, Qdot, id, utils::Vector3d(0, 0, 0), false).block(0, 0, 3, 1);
 }
 
 utils::Vector3d rigidbody::Joints::CoM(
@@ -799,9 +871,12 @@ utils::Matrix rigidbody::Joints::massMatrix (
 #ifdef BIORBD_USE_CASADI_MATH
     updateKin = true;
 #endif
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q);
+    }
     RigidBodyDynamics::Math::MatrixNd massMatrix(nbQ(), nbQ());
     massMatrix.setZero();
-    RigidBodyDynamics::CompositeRigidBodyAlgorithm(*this, Q, massMatrix, updateKin);
+    RigidBodyDynamics::CompositeRigidBodyAlgorithm(*this, Q, massMatrix, false);
     return massMatrix;
 }
 
@@ -823,22 +898,22 @@ utils::Matrix rigidbody::Joints::massMatrixInverse (
     // First Forward Pass
     for (i = 1; i < this->mBodies.size(); i++) {
 
-      this->I[i].setSpatialMatrix(this->IA[i]);
+        this->IA[i] = this->I[i].toMatrix();
       }
     // End First Forward Pass
 
-    // set F (n x 6 x n)
-    RigidBodyDynamics::Math::MatrixNd F_i(6, this->dof_count);
-    F_i.setZero();
-    // Fill a vector of matrix (6 x n)
-    std::vector<RigidBodyDynamics::Math::MatrixNd> F;
-    for (i = 1; i < this->mBodies.size(); i++)
-    {
-        F.push_back(F_i);
+    // set F (n x 6 x n), the workspace is only allocated on the first call
+    std::vector<RigidBodyDynamics::Math::MatrixNd>& F = *m_massMatrixInverseF;
+    if (F.size() != this->mBodies.size() - 1) {
+        F.assign(this->mBodies.size() - 1,
+                 RigidBodyDynamics::Math::MatrixNd(6, this->dof_count));
+    }
+    for (i = 0; i < F.size(); i++) {
+        F[i].setZero();
     }
 
     // Backward Pass
-    std::vector<std::vector<unsigned int>> subTrees = getDofSubTrees();
+    const std::vector<std::vector<unsigned int>>& subTrees = getDofSubTrees();
     for (i = this->mBodies.size() - 1; i > 0; i--)
     {    
         unsigned int q_index_i = this->mJoints[i].q_index;
@@ -940,15 +1015,18 @@ utils::Vector3d rigidbody::Joints::CoMdot(
     // For each segment, find the CoM
     utils::Vector3d com_dot(0,0,0);
 
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q);
+    }
+
     // CoMdot = sum(mass_seg * Jacobian * qdot)/mass totale
     utils::Matrix Jac(utils::Matrix(3,this->dof_count));
     for (auto segment : *m_segments) {
         Jac.setZero();
         RigidBodyDynamics::CalcPointJacobian(
             *this, Q, GetBodyId(segment.name().c_str()),
-            segment.characteristics().mCenterOfMass, Jac, updateKin);
+            segment.characteristics().mCenterOfMass, Jac, false);
         com_dot += ((Jac*Qdot) * segment.characteristics().mMass);
-        updateKin = false;
     }
     // Divide by total mass
     com_dot = com_dot/mass();
@@ -967,9 +1045,12 @@ utils::Vector3d rigidbody::Joints::CoMddot(
 #endif
     utils::Scalar mass;
     RigidBodyDynamics::Math::Vector3d com, com_ddot;
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &Qdot, &Qddot);
+    }
     RigidBodyDynamics::Utils::CalcCenterOfMass(
         *this, Q, Qdot, &Qddot, mass, com, nullptr, &com_ddot,
-        nullptr, nullptr, updateKin);
+        nullptr, nullptr, false);
 
 
     // Return the acceleration of CoM
@@ -987,15 +1068,18 @@ utils::Matrix rigidbody::Joints::CoMJacobian(
     // Total jacobian
     utils::Matrix JacTotal(utils::Matrix::Zero(3,this->dof_count));
 
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q);
+    }
+
     // CoMdot = sum(mass_seg * Jacobian * qdot)/mass total
     utils::Matrix Jac(utils::Matrix::Zero(3,this->dof_count));
     for (auto segment : *m_segments) {
         Jac.setZero();
         RigidBodyDynamics::CalcPointJacobian(
             *this, Q, GetBodyId(segment.name().c_str()),
-            segment.characteristics().mCenterOfMass, Jac, updateKin);
+            segment.characteristics().mCenterOfMass, Jac, false);
         JacTotal += segment.characteristics().mMass*Jac;
-        updateKin = false;
     }
 
     // Divide by total mass
@@ -1042,9 +1126,12 @@ utils::Vector3d rigidbody::Joints::CoMbySegment(
 #ifdef BIORBD_USE_CASADI_MATH
     updateKin = true;
 #endif
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q);
+    }
     return RigidBodyDynamics::CalcBodyToBaseCoordinates(
                *this, Q, (*m_segments)[idx].id(),
-               (*m_segments)[idx].characteristics().mCenterOfMass, updateKin);
+               (*m_segments)[idx].characteristics().mCenterOfMass, false);
 }
 
 
@@ -1074,9 +1161,12 @@ utils::Vector3d rigidbody::Joints::CoMdotBySegment(
 #ifdef BIORBD_USE_CASADI_MATH
     updateKin = true;
 #endif
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &Qdot);
+    }
     return CalcPointVelocity(
                *this, Q, Qdot, (*m_segments)[idx].id(),
-               (*m_segments)[idx].characteristics().mCenterOfMass,updateKin);
+               (*m_segments)[idx].characteristics().mCenterOfMass, false);
 }
 
 
@@ -1108,9 +1198,12 @@ utils::Vector3d rigidbody::Joints::CoMddotBySegment(
 #ifdef BIORBD_USE_CASADI_MATH
     updateKin = true;
 #endif
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &Qdot, &Qddot);
+    }
     return RigidBodyDynamics::CalcPointAcceleration(
                *this, Q, Qdot, Qddot, (*m_segments)[idx].id(),
-               (*m_segments)[idx].characteristics().mCenterOfMass,updateKin);
+               (*m_segments)[idx].characteristics().mCenterOfMass, false);
 }
 
 std::vector<std::vector<utils::Vector3d>>
@@ -1195,6 +1288,89 @@ std::vector<utils::Vector3d> rigidbody::Joints::meshPoints(
     return v;
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+void rigidbody::Joints::packMeshes()
+{
+    if (!m_meshPointsOffsets->empty()) {
+        return;
+    }
+
+    std::vector<unsigned int> offsets(1, 0);
+    for (unsigned int i=0; i<nbSegment(); ++i) {
+        offsets.push_back(offsets.back() + mesh(i).nbVertex());
+    }
+
+    m_meshPointsPacked->resize(3, offsets.back());
+    m_meshFacesPacked->clear();
+    for (unsigned int i=0; i<nbSegment(); ++i) {
+        const rigidbody::Mesh& m(mesh(i));
+        for (unsigned int j=0; j<m.nbVertex(); ++j) {
+            m_meshPointsPacked->col(offsets[i] + j) = m.point(j);
+        }
+        for (auto face : m.faces()) {
+            for (int vertex : face.face()) {
+                m_meshFacesPacked->push_back(vertex + static_cast<int>(offsets[i]));
+            }
+        }
+    }
+    *m_meshPointsOffsets = offsets;
+}
+
+const utils::Matrix& rigidbody::Joints::meshPointsPacked()
+{
+    packMeshes();
+    return *m_meshPointsPacked;
+}
+
+const std::vector<unsigned int>& rigidbody::Joints::meshPointsOffsets()
+{
+    packMeshes();
+    return *m_meshPointsOffsets;
+}
+
+const std::vector<int>& rigidbody::Joints::meshFacesPacked()
+{
+    packMeshes();
+    return *m_meshFacesPacked;
+}
+
+utils::Matrix rigidbody::Joints::meshPointsBatch(
+    const utils::Matrix &Q)
+{
+    utils::Matrix out(3 * meshPointsPacked().cols(), Q.cols());
+    meshPointsBatch(Q, out.data());
+    return out;
+}
+
+void rigidbody::Joints::meshPointsBatch(
+    const utils::Matrix &Q,
+    double* out)
+{
+    utils::Error::check(Q.rows() == nbQ(), "Q must be of dimension nbQ x nFrames");
+    packMeshes();
+    const utils::Matrix& vertices(*m_meshPointsPacked);
+    const std::vector<unsigned int>& offsets(*m_meshPointsOffsets);
+
+    rigidbody::GeneralizedCoordinates q(*this);
+    for (unsigned int f=0; f<Q.cols(); ++f) {
+        q = Q.col(f);
+        UpdateKinematicsCustom(&q, nullptr, nullptr);
+        double* outFrame(out + 3 * vertices.cols() * f);
+        for (unsigned int i=0; i<nbSegment(); ++i) {
+            unsigned int nVertices(offsets[i+1] - offsets[i]);
+            if (nVertices == 0) {
+                continue;
+            }
+            // All the vertices of a segment are transformed at once
+            const utils::RotoTrans& rt(globalJCS(i));
+            Eigen::Map<Eigen::Matrix3Xd> points(outFrame + 3 * offsets[i], 3, nVertices);
+            points.noalias() = rt.block<3, 3>(0, 0) * vertices.middleCols(offsets[i], nVertices);
+            points.colwise() += rt.block<3, 1>(0, 3);
+        }
+    }
+}
+#endif
+
 std::vector<std::vector<rigidbody::MeshFace>>
         rigidbody::Joints::meshFaces() const
 {
@@ -1240,9 +1416,12 @@ utils::Vector3d rigidbody::Joints::CalcAngularMomentum (
 #ifdef BIORBD_USE_CASADI_MATH
     updateKin = true;
 #endif
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &Qdot, nullptr);
+    }
     RigidBodyDynamics::Utils::CalcCenterOfMass(
         *this, Q, Qdot, nullptr, mass, com, nullptr, nullptr,
-        &angularMomentum, nullptr, updateKin);
+        &angularMomentum, nullptr, false);
     return angularMomentum;
 }
 
@@ -1261,9 +1440,12 @@ utils::Vector3d rigidbody::Joints::CalcAngularMomentum (
 #ifdef BIORBD_USE_CASADI_MATH
     updateKin = true;
 #endif
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &Qdot, &Qddot);
+    }
     RigidBodyDynamics::Utils::CalcCenterOfMass(
         *this, Q, Qdot, &Qddot, mass, com, nullptr, nullptr,
-        &angularMomentum, nullptr, updateKin);
+        &angularMomentum, nullptr, false);
 
     return angularMomentum;
 }
@@ -1280,9 +1462,12 @@ rigidbody::Joints::CalcSegmentsAngularMomentum (
 
     utils::Scalar mass;
     RigidBodyDynamics::Math::Vector3d com;
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &Qdot, nullptr);
+    }
     RigidBodyDynamics::Utils::CalcCenterOfMass (
         *this, Q, Qdot, nullptr, mass, com, nullptr,
-        nullptr, nullptr, nullptr, updateKin);
+        nullptr, nullptr, nullptr, false);
     RigidBodyDynamics::Math::SpatialTransform X_to_COM (
         RigidBodyDynamics::Math::Xtrans(com));
 
@@ -1321,9 +1506,12 @@ rigidbody::Joints::CalcSegmentsAngularMomentum (
 
     utils::Scalar mass;
     RigidBodyDynamics::Math::Vector3d com;
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &Qdot, &Qddot);
+    }
     RigidBodyDynamics::Utils::CalcCenterOfMass (*this, Q, Qdot, &Qddot, mass, com,
             nullptr, nullptr, nullptr, nullptr,
-            updateKin);
+            false);
     RigidBodyDynamics::Math::SpatialTransform X_to_COM (
         RigidBodyDynamics::Math::Xtrans(com));
 
@@ -1403,7 +1591,10 @@ utils::Scalar rigidbody::Joints::KineticEnergy(
         const rigidbody::GeneralizedVelocity &QDot,
         bool updateKin)
 {
-    return RigidBodyDynamics::Utils::CalcKineticEnergy(*this, Q, QDot, updateKin);
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &QDot);
+    }
+    return RigidBodyDynamics::Utils::CalcKineticEnergy(*this, Q, QDot, false);
 }
 
 
@@ -1411,7 +1602,10 @@ utils::Scalar rigidbody::Joints::PotentialEnergy(
         const rigidbody::GeneralizedCoordinates &Q,
         bool updateKin)
 {
-    return RigidBodyDynamics::Utils::CalcPotentialEnergy(*this, Q, updateKin);
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q);
+    }
+    return RigidBodyDynamics::Utils::CalcPotentialEnergy(*this, Q, false);
 }
 
 utils::Scalar rigidbody::Joints::Lagrangian(
@@ -1419,7 +1613,10 @@ utils::Scalar rigidbody::Joints::Lagrangian(
         const rigidbody::GeneralizedVelocity &QDot,
         bool updateKin)
 {
-    return RigidBodyDynamics::Utils::CalcKineticEnergy(*this, Q, QDot, updateKin) - RigidBodyDynamics::Utils::CalcPotentialEnergy(*this, Q, updateKin);
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &QDot);
+    }
+    return RigidBodyDynamics::Utils::CalcKineticEnergy(*this, Q, QDot, false) - RigidBodyDynamics::Utils::CalcPotentialEnergy(*this, Q, false);
 }
 
 
@@ -1428,7 +1625,10 @@ utils::Scalar rigidbody::Joints::TotalEnergy(
         const rigidbody::GeneralizedVelocity &QDot,
         bool updateKin)
 {
-    return RigidBodyDynamics::Utils::CalcKineticEnergy(*this, Q, QDot, updateKin) + RigidBodyDynamics::Utils::CalcPotentialEnergy(*this, Q, updateKin);;
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &QDot);
+    }
+    return RigidBodyDynamics::Utils::CalcKineticEnergy(*this, Q, QDot, false) + RigidBodyDynamics::Utils::CalcPotentialEnergy(*this, Q, false);
 }
 
 rigidbody::GeneralizedTorque rigidbody::Joints::InverseDynamics(
@@ -1441,6 +1641,7 @@ rigidbody::GeneralizedTorque rigidbody::Joints::InverseDynamics(
     rigidbody::GeneralizedTorque Tau(nbGeneralizedTorque());
     std::vector<RigidBodyDynamics::Math::SpatialVector> *f_ext_rbdl(combineExtForceAndSoftContact(f_ext, f_contacts, Q, QDot, true));
     RigidBodyDynamics::InverseDynamics(*this, Q, QDot, QDDot, Tau, f_ext_rbdl);
+    invalidateKinematicsCache();
     if (f_ext_rbdl){
         delete f_ext_rbdl;
     }
@@ -1456,6 +1657,7 @@ rigidbody::GeneralizedTorque rigidbody::Joints::NonLinearEffect(
     rigidbody::GeneralizedTorque Tau(*this);
     std::vector<RigidBodyDynamics::Math::SpatialVector> *f_ext_rbdl(combineExtForceAndSoftContact(f_ext, f_contacts, Q, QDot, true));
     RigidBodyDynamics::NonlinearEffects(*this, Q, QDot, Tau, f_ext_rbdl);
+    invalidateKinematicsCache();
     if (f_ext_rbdl){
         delete f_ext_rbdl;
     }
@@ -1476,12 +1678,142 @@ rigidbody::Joints::ForwardDynamics(
     rigidbody::GeneralizedAcceleration QDDot(*this);
     std::vector<RigidBodyDynamics::Math::SpatialVector> *f_ext_rbdl(combineExtForceAndSoftContact(f_ext, f_contacts, Q, QDot, updateKin));
     RigidBodyDynamics::ForwardDynamics(*this, Q, QDot, Tau, QDDot, f_ext_rbdl);
+    invalidateKinematicsCache();
     if (f_ext_rbdl){
         delete f_ext_rbdl;
     }
     return QDDot;
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+void rigidbody::Joints::InverseDynamicsDerivatives(
+    const rigidbody::GeneralizedCoordinates &Q,
+    const rigidbody::GeneralizedVelocity &QDot,
+    const rigidbody::GeneralizedAcceleration &QDDot,
+    utils::Matrix &dTau_dQ,
+    utils::Matrix &dTau_dQDot,
+    utils::Matrix &dTau_dQDDot)
+{
+    // The soft contact forces depend on Q and QDot, their derivatives are not implemented
+    utils::Error::check(
+        dynamic_cast<rigidbody::SoftContacts*>(this)->nbSoftContacts() == 0,
+        "Dynamics derivatives are not implemented for models with soft contacts");
+    unsigned int nbBodies(static_cast<unsigned int>(this->mBodies.size()));
+    for (unsigned int i = 1; i < nbBodies; ++i) {
+        utils::Error::check(this->mJoints[i].mDoFCount == 1,
+                            "Dynamics derivatives are only implemented for single dof joints");
+    }
+
+    // The nominal pass fills the velocities, accelerations and forces of each body
+    rigidbody::GeneralizedTorque Tau(nbGeneralizedTorque());
+    RigidBodyDynamics::InverseDynamics(*this, Q, QDot, QDDot, Tau, nullptr);
+    invalidateKinematicsCache();
+
+    dTau_dQDDot = utils::Matrix::Zero(this->dof_count, this->dof_count);
+    RigidBodyDynamics::CompositeRigidBodyAlgorithm(*this, Q, dTau_dQDDot, false);
+    dTau_dQ = utils::Matrix::Zero(this->dof_count, this->dof_count);
+    dTau_dQDot = utils::Matrix::Zero(this->dof_count, this->dof_count);
+
+    const RigidBodyDynamics::Math::SpatialVector aRoot(
+        0, 0, 0, -this->gravity[0], -this->gravity[1], -this->gravity[2]);
+    std::vector<RigidBodyDynamics::Math::SpatialVector> dv_dq(nbBodies);
+    std::vector<RigidBodyDynamics::Math::SpatialVector> da_dq(nbBodies);
+    std::vector<RigidBodyDynamics::Math::SpatialVector> df_dq(nbBodies);
+    std::vector<RigidBodyDynamics::Math::SpatialVector> dv_dqdot(nbBodies);
+    std::vector<RigidBodyDynamics::Math::SpatialVector> da_dqdot(nbBodies);
+    std::vector<RigidBodyDynamics::Math::SpatialVector> df_dqdot(nbBodies);
+    std::vector<bool> isInSubTree(nbBodies);
+
+    // A dof only moves its subtree, so each column is the derivative of the
+    // recursive Newton-Euler algorithm over the subtree and up to the root
+    for (unsigned int k = 1; k < nbBodies; ++k) {
+        unsigned int col(this->mJoints[k].q_index);
+        std::fill(isInSubTree.begin(), isInSubTree.end(), false);
+        for (unsigned int i = 0; i < nbBodies; ++i) {
+            df_dq[i].setZero();
+            df_dqdot[i].setZero();
+        }
+
+        // Forward pass
+        for (unsigned int i = k; i < nbBodies; ++i) {
+            unsigned int lambda(this->lambda[i]);
+            if (i != k && !isInSubTree[lambda]) {
+                continue;
+            }
+            isInSubTree[i] = true;
+
+            const RigidBodyDynamics::Math::SpatialVector vJ(
+                this->S[i] * QDot[this->mJoints[i].q_index]);
+            if (i == k) {
+                // d(X_lambda)/dq = -S x X_lambda
+                const RigidBodyDynamics::Math::SpatialVector& aParent(
+                    lambda == 0 ? aRoot : this->a[lambda]);
+                dv_dq[i] = -RigidBodyDynamics::Math::crossm(
+                               this->S[i], this->X_lambda[i].apply(this->v[lambda]));
+                da_dq[i] = -RigidBodyDynamics::Math::crossm(
+                               this->S[i], this->X_lambda[i].apply(aParent))
+                           + RigidBodyDynamics::Math::crossm(dv_dq[i], vJ);
+                dv_dqdot[i] = this->S[i];
+                da_dqdot[i] = RigidBodyDynamics::Math::crossm(dv_dqdot[i], vJ)
+                              + RigidBodyDynamics::Math::crossm(this->v[i], this->S[i]);
+            } else {
+                dv_dq[i] = this->X_lambda[i].apply(dv_dq[lambda]);
+                da_dq[i] = this->X_lambda[i].apply(da_dq[lambda])
+                           + RigidBodyDynamics::Math::crossm(dv_dq[i], vJ);
+                dv_dqdot[i] = this->X_lambda[i].apply(dv_dqdot[lambda]);
+                da_dqdot[i] = this->X_lambda[i].apply(da_dqdot[lambda])
+                              + RigidBodyDynamics::Math::crossm(dv_dqdot[i], vJ);
+            }
+
+            const RigidBodyDynamics::Math::SpatialVector Iv(this->I[i] * this->v[i]);
+            df_dq[i] = this->I[i] * da_dq[i]
+                       + RigidBodyDynamics::Math::crossf(dv_dq[i], Iv)
+                       + RigidBodyDynamics::Math::crossf(this->v[i], this->I[i] * dv_dq[i]);
+            df_dqdot[i] = this->I[i] * da_dqdot[i]
+                          + RigidBodyDynamics::Math::crossf(dv_dqdot[i], Iv)
+                          + RigidBodyDynamics::Math::crossf(this->v[i], this->I[i] * dv_dqdot[i]);
+        }
+
+        // Backward pass
+        for (unsigned int i = nbBodies - 1; i > 0; --i) {
+            dTau_dQ(this->mJoints[i].q_index, col) = this->S[i].dot(df_dq[i]);
+            dTau_dQDot(this->mJoints[i].q_index, col) = this->S[i].dot(df_dqdot[i]);
+
+            unsigned int lambda(this->lambda[i]);
+            if (lambda != 0) {
+                df_dq[lambda] += this->X_lambda[i].applyTranspose(df_dq[i]);
+                if (i == k) {
+                    // d(X_lambda^T)/dq f = X_lambda^T (S x* f)
+                    df_dq[lambda] += this->X_lambda[i].applyTranspose(
+                                         RigidBodyDynamics::Math::crossf(this->S[i], this->f[i]));
+                }
+                df_dqdot[lambda] += this->X_lambda[i].applyTranspose(df_dqdot[i]);
+            }
+        }
+    }
+}
+
+void rigidbody::Joints::ForwardDynamicsDerivatives(
+    const rigidbody::GeneralizedCoordinates &Q,
+    const rigidbody::GeneralizedVelocity &QDot,
+    const rigidbody::GeneralizedTorque &Tau,
+    utils::Matrix &dQDDot_dQ,
+    utils::Matrix &dQDDot_dQDot,
+    utils::Matrix &dQDDot_dTau)
+{
+    // M(Q) QDDot + N(Q, QDot) = Tau, so dQDDot = M^-1 (dTau - dID/dQ dQ - dID/dQDot dQDot)
+    const rigidbody::GeneralizedAcceleration& QDDot(ForwardDynamics(Q, QDot, Tau));
+    utils::Matrix dTau_dQ;
+    utils::Matrix dTau_dQDot;
+    utils::Matrix M;
+    InverseDynamicsDerivatives(Q, QDot, QDDot, dTau_dQ, dTau_dQDot, M);
+
+    dQDDot_dTau = M.llt().solve(utils::Matrix::Identity(M.rows(), M.cols()));
+    dQDDot_dQ = -dQDDot_dTau * dTau_dQ;
+    dQDDot_dQDot = -dQDDot_dTau * dTau_dQDot;
+}
+#endif
+
 rigidbody::GeneralizedAcceleration
 rigidbody::Joints::ForwardDynamicsFreeFloatingBase(
     const rigidbody::GeneralizedCoordinates& Q,
@@ -1533,6 +1865,7 @@ rigidbody::Joints::ForwardDynamicsConstraintsDirect(
     rigidbody::GeneralizedAcceleration QDDot(*this);
     std::vector<RigidBodyDynamics::Math::SpatialVector> *f_ext_rbdl(combineExtForceAndSoftContact(f_ext, nullptr, Q, QDot, updateKin));
     RigidBodyDynamics::ForwardDynamicsConstraintsDirect(*this, Q, QDot, Tau, CS, QDDot, updateKin, f_ext_rbdl);
+    invalidateKinematicsCache();
     if (f_ext_rbdl){
         delete f_ext_rbdl;
     }
@@ -1579,6 +1912,7 @@ rigidbody::Joints::ComputeConstraintImpulsesDirect(
 
         rigidbody::GeneralizedVelocity QDotPost(*this);
         RigidBodyDynamics::ComputeConstraintImpulsesDirect(*this, Q, QDotPre, CS, QDotPost);
+        invalidateKinematicsCache();
         return QDotPost;
     }
 }
@@ -1627,9 +1961,12 @@ utils::Vector3d rigidbody::Joints::bodyAngularVelocity (
 #ifdef BIORBD_USE_CASADI_MATH
     updateKin = true;
 #endif
+    if (updateKin) {
+        UpdateKinematicsCustom(&Q, &Qdot, nullptr);
+    }
     RigidBodyDynamics::Utils::CalcCenterOfMass(
         *this, Q, Qdot, nullptr, mass, com, nullptr, nullptr,
-        &angularMomentum, nullptr, updateKin);
+        &angularMomentum, nullptr, false);
     utils::Matrix3d body_inertia = bodyInertia (Q, updateKin);
         
 #ifdef BIORBD_USE_CASADI_MATH
@@ -1668,13 +2005,74 @@ unsigned int rigidbody::Joints::getDofIndex(
     return idx;
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+// Bitwise comparison, so the comparison is exact and a NaN is equal to itself
+static bool isSameVector(
+    const utils::Vector& v1,
+    const utils::Vector& v2)
+{
+    return v1.size() == v2.size()
+           && std::memcmp(v1.data(), v2.data(), v1.size() * sizeof(double)) == 0;
+}
+#endif
+
 void rigidbody::Joints::UpdateKinematicsCustom(
     const rigidbody::GeneralizedCoordinates *Q,
     const rigidbody::GeneralizedVelocity *Qdot,
     const rigidbody::GeneralizedAcceleration *Qddot)
 {
     checkGeneralizedDimensions(Q, Qdot, Qddot);
+#ifndef BIORBD_USE_CASADI_MATH
+    if (Q && *m_isKinematicsComputed
+            && isSameVector(*Q, *m_kinematicsQ)
+            && (!Qdot || isSameVector(*Qdot, *m_kinematicsQdot))
+            && (!Qddot || isSameVector(*Qddot, *m_kinematicsQddot))) {
+        // The model is already at the requested state
+        ++*m_nbKinematicsCacheHits;
+        return;
+    }
+    ++*m_nbKinematicsCacheMisses;
+#endif
+
     RigidBodyDynamics::UpdateKinematicsCustom(*this, Q, Qdot, Qddot);
+
+#ifndef BIORBD_USE_CASADI_MATH
+    if (Q) {
+        // The velocities and accelerations not recomputed are not valid anymore
+        *m_kinematicsQ = *Q;
+        m_kinematicsQdot->resize(0);
+        m_kinematicsQddot->resize(0);
+        *m_isKinematicsComputed = true;
+    }
+    if (Qdot) {
+        *m_kinematicsQdot = *Qdot;
+        m_kinematicsQddot->resize(0);
+    }
+    if (Qddot) {
+        *m_kinematicsQddot = *Qddot;
+    }
+#endif
+}
+
+void rigidbody::Joints::invalidateKinematicsCache()
+{
+    *m_isKinematicsComputed = false;
+}
+
+unsigned int rigidbody::Joints::nbKinematicsCacheHits() const
+{
+    return *m_nbKinematicsCacheHits;
+}
+
+unsigned int rigidbody::Joints::nbKinematicsCacheMisses() const
+{
+    return *m_nbKinematicsCacheMisses;
+}
+
+void rigidbody::Joints::resetKinematicsCacheCounters()
+{
+    *m_nbKinematicsCacheHits = 0;
+    *m_nbKinematicsCacheMisses = 0;
 }
 
 void rigidbody::Joints::CalcMatRotJacobian(
@@ -19,7 +19,17 @@ rigidbody::KalmanRecons::KalmanRecons() :
     m_A(std::make_shared<utils::Matrix>()),
     m_Q(std::make_shared<utils::Matrix>()),
     m_R(std::make_shared<utils::Matrix>()),
-    m_Pp(std::make_shared<utils::Matrix>())
+    m_Pp(std::make_shared<utils::Matrix>()),
+    m_observedRows(std::make_shared<std::vector<unsigned int>>()),
+    m_xkm(std::make_shared<utils::Vector>()),
+    m_Pkm(std::make_shared<utils::Matrix>()),
+    m_Hobs(std::make_shared<utils::Matrix>()),
+    m_innovation(std::make_shared<utils::Vector>()),
+    m_Robs(std::make_shared<utils::Matrix>()),
+    m_PHt(std::make_shared<utils::Matrix>()),
+    m_S(std::make_shared<utils::Matrix>()),
+    m_K(std::make_shared<utils::Matrix>()),
+    m_IKH(std::make_shared<utils::Matrix>())
 {
 
 }
@@ -36,7 +46,17 @@ rigidbody::KalmanRecons::KalmanRecons(
     m_A(std::make_shared<utils::Matrix>()),
     m_Q(std::make_shared<utils::Matrix>()),
     m_R(std::make_shared<utils::Matrix>()),
-    m_Pp(std::make_shared<utils::Matrix>())
+    m_Pp(std::make_shared<utils::Matrix>()),
+    m_observedRows(std::make_shared<std::vector<unsigned int>>()),
+    m_xkm(std::make_shared<utils::Vector>()),
+    m_Pkm(std::make_shared<utils::Matrix>()),
+    m_Hobs(std::make_shared<utils::Matrix>()),
+    m_innovation(std::make_shared<utils::Vector>()),
+    m_Robs(std::make_shared<utils::Matrix>()),
+    m_PHt(std::make_shared<utils::Matrix>()),
+    m_S(std::make_shared<utils::Matrix>()),
+    m_K(std::make_shared<utils::Matrix>()),
+    m_IKH(std::make_shared<utils::Matrix>())
 {
 
 }
@@ -67,31 +87,54 @@ void rigidbody::KalmanRecons::iteration(
     const std::vector<unsigned int> &occlusion)
 {
     // Prediction
-    const utils::Vector& xkm(*m_A * *m_xp);
-    const utils::Matrix& Pkm(*m_A * *m_Pp * m_A->transpose() + *m_Q);
-
-    // Correction
-    utils::Matrix InvTp( (Hessian * Pkm * Hessian.transpose() + *m_R).inverse() );
-    manageOcclusionDuringIteration(InvTp, measure, occlusion);
-    const utils::Matrix& K(Pkm*Hessian.transpose() * InvTp); // Gain
+    *m_xkm = *m_A * *m_xp;
+    *m_Pkm = *m_A * *m_Pp * m_A->transpose() + *m_Q;
+
+    // Only keep the measurements that are not occluded
+    unsigned int nbByOcclusion(nbMeasurementsByOcclusion());
+    std::vector<bool> isObserved(measure.size(), true);
+    for (unsigned int i = 0; i < occlusion.size(); ++i) {
+        for (unsigned int j = occlusion[i] * nbByOcclusion;
+                j < (occlusion[i] + 1) * nbByOcclusion; ++j) {
+            isObserved[j] = false;
+        }
+    }
+    m_observedRows->clear();
+    for (unsigned int i = 0; i < isObserved.size(); ++i) {
+        if (isObserved[i]) {
+            m_observedRows->push_back(i);
+        }
+    }
+    unsigned int nbObserved(static_cast<unsigned int>(m_observedRows->size()));
+    unsigned int nbStates(3 * *m_nbDof);
+    if (m_Hobs->rows() != nbObserved || m_Hobs->cols() != nbStates) {
+        m_Hobs->resize(nbObserved, nbStates);
+        m_innovation->resize(nbObserved);
+        m_Robs->resize(nbObserved, nbObserved);
+    }
+    for (unsigned int i = 0; i < nbObserved; ++i) {
+        unsigned int row((*m_observedRows)[i]);
+        m_Hobs->row(i) = Hessian.row(row);
+        (*m_innovation)(i) = measure(row) - projectedMeasure(row);
+        for (unsigned int j = 0; j < nbObserved; ++j) {
+            (*m_Robs)(i, j) = (*m_R)(row, (*m_observedRows)[j]);
+        }
+    }
 
-    *m_xp = xkm+K*(measure-projectedMeasure); // New estimated state
-    const RigidBodyDynamics::Math::MatrixNd& temp(utils::Matrix::Identity(
-                3* *m_nbDof, 3* *m_nbDof) - K*Hessian);
-    *m_Pp =  temp * Pkm * temp.transpose() + K* *m_R*K.transpose();
+    // Correction, the gain K = Pkm * H^T * S^-1 is solved from S * K^T = H * Pkm
+    *m_PHt = *m_Pkm * m_Hobs->transpose();
+    *m_S = *m_Hobs * *m_PHt + *m_Robs;
+    *m_K = m_S->llt().solve(m_PHt->transpose()).transpose();
 
+    *m_xp = *m_xkm + *m_K * *m_innovation; // New estimated state
+    *m_IKH = -*m_K * *m_Hobs;
+    m_IKH->diagonal().array() += 1;
+    *m_Pp = *m_IKH * *m_Pkm * m_IKH->transpose() + *m_K * *m_Robs * m_K->transpose();
 }
 
-void rigidbody::KalmanRecons::manageOcclusionDuringIteration(
-    utils::Matrix &InvTp,
-    utils::Vector &measure,
-    const std::vector<unsigned int> &occlusion)
+unsigned int rigidbody::KalmanRecons::nbMeasurementsByOcclusion() const
 {
-    for (unsigned int i = 0; i < occlusion.size(); ++i)
-        for (unsigned int j=occlusion[i]; j< occlusion[i]+1; ++j) {
-            InvTp(j,j) = 0; // Artifact due to the fact that m_R has a value at (j:j+2,j:j+2)
-            measure(j) = 0;
-        }
+    return 1;
 }
 
 void rigidbody::KalmanRecons::getState(
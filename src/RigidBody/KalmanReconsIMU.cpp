@@ -46,17 +46,9 @@ void rigidbody::KalmanReconsIMU::DeepCopy(const
     *m_firstIteration = *other.m_firstIteration;
 }
 
-void rigidbody::KalmanReconsIMU::manageOcclusionDuringIteration(
-    utils::Matrix &InvTp,
-    utils::Vector &measure,
-    const std::vector<unsigned int> &occlusion)
+unsigned int rigidbody::KalmanReconsIMU::nbMeasurementsByOcclusion() const
 {
-    for (unsigned int i = 0; i < occlusion.size(); ++i)
-        for (unsigned int j=occlusion[i] * 9; j< occlusion[i] * 9+9; ++j) {
-            InvTp(j,j) =
-                0; // Artefact due to the fact that m_R has a value at (j:j+2,j:j+2)
-            measure[j] = 0;
-        }
+    return 9; // The elements of the rotation matrix
 }
 
 bool rigidbody::KalmanReconsIMU::first()
@@ -60,17 +60,9 @@ void rigidbody::KalmanReconsMarkers::initialize()
     *m_PpInitial = *m_Pp;
 }
 
-void rigidbody::KalmanReconsMarkers::manageOcclusionDuringIteration(
-    utils::Matrix &InvTp,
-    utils::Vector &measure,
-    const std::vector<unsigned int> &occlusion)
+unsigned int rigidbody::KalmanReconsMarkers::nbMeasurementsByOcclusion() const
 {
-    for (unsigned int i = 0; i < occlusion.size(); ++i)
-        for (unsigned int j=occlusion[i] * 3; j< occlusion[i] * 3+3; ++j) {
-            InvTp(j,j) =
-                0; // Artefact due to the fact that m_R has a value at (j:j+2,j:j+2)
-            measure[j] = 0;
-        }
+    return 3; // X, Y, Z
 }
 
 bool rigidbody::KalmanReconsMarkers::first()
@@ -158,7 +150,7 @@ void rigidbody::KalmanReconsMarkers::reconstructFrame(
     const std::vector<rigidbody::NodeSegment>& zest_tp(
         model.technicalMarkers(Q_tp, removeAxes, false));
     // Jacobian
-    const  std::vector<utils::Matrix>& J_tp(model.technicalMarkersJacobian(
+    const utils::Matrix& J_tp(model.allTechnicalMarkersJacobian(
                 Q_tp, removeAxes, false));
     // Create only one matrix for zest and Jacobian
     utils::Matrix H(utils::Matrix::Zero(*m_nMeasure,
@@ -176,7 +168,7 @@ void rigidbody::KalmanReconsMarkers::reconstructFrame(
                 !isnan(Tobs(i*3)*Tobs(i*3) + Tobs(i*3+1)*Tobs(i*3+1) + Tobs(i*3+2)*Tobs(
                            i*3+2))) {
 #endif
-            H.block(i*3,0,3,*m_nbDof) = J_tp[i];
+            H.block(i*3,0,3,*m_nbDof) = J_tp.block(i*3,0,3,*m_nbDof);
             zest.block(i*3, 0, 3, 1) = zest_tp[i];
         } else {
             occlusionIdx.push_back(i);
@@ -188,6 +180,35 @@ void rigidbody::KalmanReconsMarkers::reconstructFrame(
     getState(Q, Qdot, Qddot);
 }
 
+void rigidbody::KalmanReconsMarkers::reconstructTrial(
+    Model &model,
+    const utils::Matrix &Tobs,
+    utils::Matrix &Q,
+    utils::Matrix &Qdot,
+    utils::Matrix &Qddot,
+    bool removeAxes)
+{
+    utils::Error::check(Tobs.rows() == *m_nMeasure,
+                        "Tobs must be of dimension 3*nbTechnicalMarkers x nFrames");
+
+    unsigned int nbFrames(static_cast<unsigned int>(Tobs.cols()));
+    Q.resize(*m_nbDof, nbFrames);
+    Qdot.resize(*m_nbDof, nbFrames);
+    Qddot.resize(*m_nbDof, nbFrames);
+
+    rigidbody::GeneralizedCoordinates Q_tp(model);
+    rigidbody::GeneralizedVelocity Qdot_tp(model);
+    rigidbody::GeneralizedAcceleration Qddot_tp(model);
+    utils::Vector T(*m_nMeasure);
+    for (unsigned int f=0; f<nbFrames; ++f) {
+        T = Tobs.col(f);
+        reconstructFrame(model, T, &Q_tp, &Qdot_tp, &Qddot_tp, removeAxes);
+        Q.col(f) = Q_tp;
+        Qdot.col(f) = Qdot_tp;
+        Qddot.col(f) = Qddot_tp;
+    }
+}
+
 void rigidbody::KalmanReconsMarkers::reconstructFrame()
 {
     utils::Error::raise("Implémentation impossible");
@@ -1,9 +1,12 @@
 #define BIORBD_API_EXPORTS
 #include "RigidBody/Markers.h"
 
+#include <limits>
+#include <map>
 #include <rbdl/Model.h>
 #include <rbdl/Kinematics.h>
 #include "Utils/String.h"
+#include "Utils/Error.h"
 #include "Utils/Matrix.h"
 #include "RigidBody/GeneralizedCoordinates.h"
 #include "RigidBody/GeneralizedVelocity.h"
@@ -57,11 +60,33 @@ void rigidbody::Markers::addMarker(
     const utils::String& axesToRemove,
     int id)
 {
+    // Resolve the parent body once so the kinematics do not have to look it up by name
+    rigidbody::Joints* model = dynamic_cast<rigidbody::Joints*>(this);
+    if (model) {
+        unsigned int bodyId(model->GetBodyId(parentName.c_str()));
+        if (model->IsBodyId(bodyId)) {
+            id = static_cast<int>(bodyId);
+        }
+    }
+
     rigidbody::NodeSegment tp(pos, name, parentName, technical, anatomical,
                                       axesToRemove, id);
     m_marks->push_back(tp);
 }
 
+unsigned int rigidbody::Markers::markerBodyId(
+    unsigned int idx)
+{
+    const rigidbody::NodeSegment& node(marker(idx));
+    if (node.parentId() >= 0) {
+        return static_cast<unsigned int>(node.parentId());
+    }
+
+    // The marker was added without its parent, so fall back on the name
+    rigidbody::Joints &model = dynamic_cast<rigidbody::Joints &>(*this);
+    return model.GetBodyId(node.parent().c_str());
+}
+
 const rigidbody::NodeSegment &rigidbody::Markers::marker(
     unsigned int idx) const
 {
@@ -94,14 +119,18 @@ rigidbody::NodeSegment rigidbody::Markers::marker(
     updateKin = true;
 #endif
 
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q);
+    }
+
     unsigned int id = model.GetBodyId(n.parent().c_str());
     if (removeAxis) {
         return rigidbody::NodeSegment(
                    RigidBodyDynamics::CalcBodyToBaseCoordinates(model, Q, id, n.removeAxes(),
-                           updateKin));
+                           false));
     } else {
         return rigidbody::NodeSegment(
-                   RigidBodyDynamics::CalcBodyToBaseCoordinates(model, Q, id, n, updateKin));
+                   RigidBodyDynamics::CalcBodyToBaseCoordinates(model, Q, id, n, false));
     }
 }
 
@@ -118,14 +147,16 @@ rigidbody::NodeSegment rigidbody::Markers::marker(
     updateKin = true;
 #endif
 
-    const rigidbody::NodeSegment& node(marker(idx));
-    unsigned int id = model.GetBodyId(node.parent().c_str());
+    unsigned int id(markerBodyId(idx));
 
     // Retrieve the position of the marker in the local reference
     const rigidbody::NodeSegment& pos = marker(idx, removeAxis);
 
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q);
+    }
     return rigidbody::NodeSegment(
-               RigidBodyDynamics::CalcBodyToBaseCoordinates(model, Q, id, pos, updateKin));
+               RigidBodyDynamics::CalcBodyToBaseCoordinates(model, Q, id, pos, false));
 }
 
 // Get a marker
@@ -181,15 +212,17 @@ rigidbody::NodeSegment rigidbody::Markers::markerVelocity(
     updateKin = true;
 #endif
 
-    const rigidbody::NodeSegment& node(marker(idx));
-    unsigned int id(model.GetBodyId(node.parent().c_str()));
+    unsigned int id(markerBodyId(idx));
 
     // Retrieve the position of the marker in the local reference
     const rigidbody::NodeSegment& pos(marker(idx, removeAxis));
 
     // Calculate the velocity of the point
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q, &Qdot);
+    }
     return rigidbody::NodeSegment(RigidBodyDynamics::CalcPointVelocity(
-            model, Q, Qdot, id, pos, updateKin));
+            model, Q, Qdot, id, pos, false));
 }
 
 // Get a marker's velocity
@@ -206,15 +239,17 @@ rigidbody::NodeSegment rigidbody::Markers::markerAngularVelocity(
     updateKin = true;
 #endif
 
-    const rigidbody::NodeSegment& node(marker(idx));
-    unsigned int id(model.GetBodyId(node.parent().c_str()));
+    unsigned int id(markerBodyId(idx));
 
     // Retrieve the position of the marker in the local reference
     const rigidbody::NodeSegment& pos(marker(idx, removeAxis));
 
     // Calculate the velocity of the point
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q, &Qdot);
+    }
     return rigidbody::NodeSegment(
-                RigidBodyDynamics::CalcPointVelocity6D(model, Q, Qdot, id, pos, updateKin).block(0, 0, 3, 1)
+                RigidBodyDynamics::CalcPointVelocity6D(model, Q, Qdot, id, pos, false).block(0, 0, 3, 1)
             );
 }
 
@@ -267,16 +302,18 @@ rigidbody::NodeSegment rigidbody::Markers::markerAcceleration(
     updateKin = true;
 #endif
 
-    const rigidbody::NodeSegment& node(marker(idx));
-    unsigned int id(model.GetBodyId(node.parent().c_str()));
+    unsigned int id(markerBodyId(idx));
 
     // Retrieve the position of the marker in the local reference
     const rigidbody::NodeSegment& pos(marker(idx, removeAxis));
 
     // Calculate the acceleration of the point
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q, &Qdot, &Qddot);
+    }
     return rigidbody::NodeSegment(RigidBodyDynamics::CalcPointAcceleration(
             model, Q, Qdot, Qddot, id, pos,
-            updateKin));
+            false));
 }
 
 std::vector<rigidbody::NodeSegment>
@@ -441,7 +478,10 @@ utils::Matrix rigidbody::Markers::markersJacobian(
 
     // Calculate the Jacobien of this Tag
     unsigned int id = model.GetBodyId(parentName.c_str());
-    RigidBodyDynamics::CalcPointJacobian(model, Q, id, p, G, updateKin);
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q);
+    }
+    RigidBodyDynamics::CalcPointJacobian(model, Q, id, p, G, false);
 
     return G;
 }
@@ -477,10 +517,245 @@ bool rigidbody::Markers::inverseKinematics(
                            +i)).parentId()) );
     }
 
-    // Call the base function
-    return RigidBodyDynamics::InverseKinematics(
-               dynamic_cast<rigidbody::Joints &>(*this),
-               Qinit, body_id, body_pointEigen, markersInRbdl, Q);
+    // Call the base function (it moves the model, so the cached kinematics is dropped)
+    bool isSuccess = RigidBodyDynamics::InverseKinematics(
+               model, Qinit, body_id, body_pointEigen, markersInRbdl, Q);
+    model.invalidateKinematicsCache();
+    return isSuccess;
+}
+
+// Difference between the model and the tracked markers, for the tracked markers only
+static void markersResiduals(
+    rigidbody::Joints &model,
+    const rigidbody::GeneralizedCoordinates &Q,
+    const std::vector<unsigned int> &parentIds,
+    const std::vector<RigidBodyDynamics::Math::Vector3d> &positions,
+    const std::vector<unsigned int> &tracked,
+    const utils::Vector &markers,
+    utils::Vector &residuals)
+{
+    model.UpdateKinematicsCustom(&Q);
+    for (unsigned int i=0; i<tracked.size(); ++i) {
+        unsigned int m(tracked[i]);
+        residuals.segment(3*i, 3) = RigidBodyDynamics::CalcBodyToBaseCoordinates(
+                                        model, Q, parentIds[m], positions[m], false)
+                                    - markers.segment(3*m, 3);
+    }
+}
+
+// Jacobian of the tracked markers, the kinematics must be up to date
+static void markersResidualsJacobian(
+    rigidbody::Joints &model,
+    const rigidbody::GeneralizedCoordinates &Q,
+    const std::vector<unsigned int> &parentIds,
+    const std::vector<RigidBodyDynamics::Math::Vector3d> &positions,
+    const std::vector<unsigned int> &tracked,
+    utils::Matrix &G,
+    utils::Matrix &jacobian)
+{
+    for (unsigned int i=0; i<tracked.size(); ++i) {
+        unsigned int m(tracked[i]);
+        G.setZero();
+        RigidBodyDynamics::CalcPointJacobian(
+            model, Q, parentIds[m], positions[m], G, false);
+        jacobian.block(3*i, 0, 3, model.nbQ()) = G;
+    }
+}
+
+void rigidbody::Markers::inverseKinematicsSequence(
+    const utils::Matrix &markers,
+    const rigidbody::GeneralizedCoordinates &Qinit,
+    utils::Matrix &Q,
+    utils::Matrix &residuals,
+    std::vector<int> &nfev,
+    std::vector<int> &njev,
+    std::vector<int> &status,
+    bool removeAxes,
+    double xtol,
+    double ftol,
+    double gtol,
+    unsigned int maxNbEvaluations)
+{
+    // Assuming that this is also a joint type (via BiorbdModel)
+    rigidbody::Joints &model = dynamic_cast<rigidbody::Joints &>(*this);
+    unsigned int nbQ(model.nbQ());
+    unsigned int nbFrames(static_cast<unsigned int>(markers.cols()));
+    utils::Error::check(markers.rows() == 3 * nbTechnicalMarkers(),
+                        "Markers must be of dimension 3*nbTechnicalMarkers x nFrames");
+    utils::Error::check(Qinit.size() == nbQ, "Qinit must be of dimension nbQ");
+
+    // Everything that does not depend on Q is resolved once for all frames
+    std::vector<unsigned int> parentIds;
+    std::vector<RigidBodyDynamics::Math::Vector3d> positions;
+    for (unsigned int i=0; i<nbMarkers(); ++i) {
+        const rigidbody::NodeSegment& node(marker(i));
+        if (!node.isTechnical()) {
+            continue;
+        }
+        parentIds.push_back(markerBodyId(i));
+        positions.push_back(marker(i, removeAxes));
+    }
+    unsigned int nbTracked(static_cast<unsigned int>(positions.size()));
+
+    Q = utils::Matrix(nbQ, nbFrames);
+    residuals = utils::Matrix::Constant(3 * nbTracked, nbFrames,
+                                        std::numeric_limits<double>::quiet_NaN());
+    nfev.assign(nbFrames, 0);
+    njev.assign(nbFrames, 0);
+    status.assign(nbFrames, -1);
+
+    // Workspaces shared by all the frames
+    rigidbody::GeneralizedCoordinates q(Qinit);
+    rigidbody::GeneralizedCoordinates qTrial(Qinit);
+    utils::Vector data(3 * nbTracked);
+    utils::Vector r;
+    utils::Vector rTrial;
+    utils::Matrix G(utils::Matrix::Zero(3, nbQ));
+    utils::Matrix J;
+    utils::Matrix JtJ(nbQ, nbQ);
+    utils::Matrix A(nbQ, nbQ);
+    utils::Vector g(nbQ);
+    utils::Vector dq(nbQ);
+    std::vector<unsigned int> tracked;
+    tracked.reserve(nbTracked);
+
+    for (unsigned int f=0; f<nbFrames; ++f) {
+        // Warm start from the previous frame
+        if (f > 0) {
+            q = Q.col(f-1);
+        }
+        data = markers.col(f);
+        tracked.clear();
+        for (unsigned int m=0; m<nbTracked; ++m) {
+            if (data.segment(3*m, 3).allFinite()) {
+                tracked.push_back(m);
+            }
+        }
+        if (tracked.empty()) {
+            Q.col(f) = q;
+            continue;
+        }
+        r.resize(3 * tracked.size());
+        rTrial.resize(3 * tracked.size());
+        J.resize(3 * tracked.size(), nbQ);
+
+        markersResiduals(model, q, parentIds, positions, tracked, data, r);
+        markersResidualsJacobian(model, q, parentIds, positions, tracked, G, J);
+        nfev[f] = 1;
+        njev[f] = 1;
+        double cost(0.5 * r.squaredNorm());
+        JtJ = J.transpose() * J;
+        // Dimensionless, as the damping is scaled by the diagonal of JtJ
+        double lambda(1e-3);
+
+        status[f] = 0;
+        while (true) {
+            g = J.transpose() * r;
+            if (g.lpNorm<Eigen::Infinity>() <= gtol) {
+                status[f] = 1;
+                break;
+            }
+
+            // Damped normal equations (Marquardt scaling)
+            A = JtJ;
+            for (unsigned int i=0; i<nbQ; ++i) {
+                A(i, i) += lambda * std::max(JtJ(i, i), 1e-12);
+            }
+            dq = A.ldlt().solve(-g);
+            bool xtolReached(dq.norm() <= xtol * (xtol + q.norm()));
+            if (xtolReached) {
+                status[f] = 3;
+                break;
+            }
+            if (static_cast<unsigned int>(nfev[f]) >= maxNbEvaluations) {
+                break;
+            }
+
+            qTrial = q + dq;
+            markersResiduals(model, qTrial, parentIds, positions, tracked, data, rTrial);
+            ++nfev[f];
+            double costTrial(0.5 * rTrial.squaredNorm());
+            if (costTrial < cost) {
+                bool ftolReached(cost - costTrial <= ftol * cost);
+                q = qTrial;
+                r = rTrial;
+                cost = costTrial;
+                lambda /= 10;
+                if (ftolReached) {
+                    status[f] = 2;
+                    break;
+                }
+                markersResidualsJacobian(model, q, parentIds, positions, tracked, G, J);
+                ++njev[f];
+                JtJ = J.transpose() * J;
+            } else {
+                lambda *= 10;
+            }
+        }
+
+        Q.col(f) = q;
+        for (unsigned int i=0; i<tracked.size(); ++i) {
+            residuals.block(3*tracked[i], f, 3, 1) = r.segment(3*i, 3);
+        }
+    }
+}
+
+utils::Matrix rigidbody::Markers::markersBatch(
+    const utils::Matrix &Q,
+    bool removeAxis)
+{
+    return markersBatch(Q, removeAxis, false, false);
+}
+
+utils::Matrix rigidbody::Markers::technicalMarkersBatch(
+    const utils::Matrix &Q,
+    bool removeAxis)
+{
+    return markersBatch(Q, removeAxis, true, false);
+}
+
+utils::Matrix rigidbody::Markers::anatomicalMarkersBatch(
+    const utils::Matrix &Q,
+    bool removeAxis)
+{
+    return markersBatch(Q, removeAxis, false, true);
+}
+
+utils::Matrix rigidbody::Markers::markersBatch(
+    const utils::Matrix &Q,
+    bool removeAxis,
+    bool lookForTechnical,
+    bool lookForAnatomical)
+{
+    // Assuming that this is also a joint type (via BiorbdModel)
+    rigidbody::Joints &model = dynamic_cast<rigidbody::Joints &>(*this);
+    utils::Error::check(Q.rows() == model.nbQ(),
+                        "Q must be of dimension nbQ x nFrames");
+
+    // Everything that does not depend on Q is resolved once for all frames
+    std::vector<unsigned int> parentIds;
+    std::vector<RigidBodyDynamics::Math::Vector3d> positions;
+    for (unsigned int i=0; i<nbMarkers(); ++i) {
+        const rigidbody::NodeSegment& node(marker(i));
+        if ((lookForTechnical && !node.isTechnical())
+                || (lookForAnatomical && !node.isAnatomical())) {
+            continue;
+        }
+        parentIds.push_back(markerBodyId(i));
+        positions.push_back(marker(i, removeAxis));
+    }
+
+    utils::Matrix out(3 * positions.size(), Q.cols());
+    rigidbody::GeneralizedCoordinates q(model);
+    for (unsigned int f=0; f<Q.cols(); ++f) {
+        q = Q.col(f);
+        model.UpdateKinematicsCustom(&q);
+        for (unsigned int i=0; i<positions.size(); ++i) {
+            out.block(3*i, f, 3, 1) = RigidBodyDynamics::CalcBodyToBaseCoordinates(
+                                          model, q, parentIds[i], positions[i], false);
+        }
+    }
+    return out;
 }
 #endif
 
@@ -507,12 +782,15 @@ std::vector<utils::Matrix> rigidbody::Markers::markersJacobian(
             continue;
         }
 
-        unsigned int id = model.GetBodyId(node.parent().c_str());
+        unsigned int id(markerBodyId(idx));
         const utils::Vector3d& pos(marker(idx, removeAxis));
         utils::Matrix G_tp(utils::Matrix::Zero(3,model.nbQ()));
 
         // Calculate the Jacobian of this Tag
-        RigidBodyDynamics::CalcPointJacobian(model, Q, id, pos, G_tp, updateKin);
+        if (updateKin) {
+            model.UpdateKinematicsCustom(&Q);
+        }
+        RigidBodyDynamics::CalcPointJacobian(model, Q, id, pos, G_tp, false);
 #ifndef BIORBD_USE_CASADI_MATH
         updateKin = false;
 #endif
@@ -523,6 +801,68 @@ std::vector<utils::Matrix> rigidbody::Markers::markersJacobian(
     return G;
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+utils::Matrix rigidbody::Markers::allMarkersJacobian(
+    const rigidbody::GeneralizedCoordinates &Q,
+    bool removeAxis,
+    bool updateKin)
+{
+    return allMarkersJacobian(Q, removeAxis, updateKin, false);
+}
+
+utils::Matrix rigidbody::Markers::allTechnicalMarkersJacobian(
+    const rigidbody::GeneralizedCoordinates &Q,
+    bool removeAxis,
+    bool updateKin)
+{
+    return allMarkersJacobian(Q, removeAxis, updateKin, true);
+}
+
+utils::Matrix rigidbody::Markers::allMarkersJacobian(
+    const rigidbody::GeneralizedCoordinates &Q,
+    bool removeAxis,
+    bool updateKin,
+    bool lookForTechnical)
+{
+    // Assuming that this is also a joint type (via BiorbdModel)
+    rigidbody::Joints &model = dynamic_cast<rigidbody::Joints &>(*this);
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q);
+    }
+
+    // Group the markers by body (first: row block in the output, second: marker index)
+    std::map<unsigned int, std::vector<std::pair<unsigned int, unsigned int>>> markersOnBody;
+    unsigned int nbRows(0);
+    for (unsigned int idx=0; idx<nbMarkers(); ++idx) {
+        if (lookForTechnical && !marker(idx).isTechnical()) {
+            continue;
+        }
+        markersOnBody[markerBodyId(idx)].push_back(std::make_pair(nbRows++, idx));
+    }
+
+    utils::Matrix G(utils::Matrix::Zero(3 * nbRows, model.nbQ()));
+    RigidBodyDynamics::Math::MatrixNd bodyJacobian(6, model.nbQ());
+    for (auto& body : markersOnBody) {
+        // Angular (top) and linear (bottom) jacobian of the body origin, computed once per body
+        bodyJacobian.setZero();
+        RigidBodyDynamics::CalcPointJacobian6D(
+            model, Q, body.first, RigidBodyDynamics::Math::Vector3d::Zero(),
+            bodyJacobian, false);
+        RigidBodyDynamics::Math::Matrix3d orientation(
+            RigidBodyDynamics::CalcBodyWorldOrientation(model, Q, body.first,
+                    false).transpose());
+
+        // v_marker = v_origin + omega x r, where r is the marker expressed in the global frame
+        for (auto& row : body.second) {
+            RigidBodyDynamics::Math::Vector3d r(orientation * marker(row.second, removeAxis));
+            G.block(3 * row.first, 0, 3, model.nbQ()) = bodyJacobian.bottomRows(3)
+                    - RigidBodyDynamics::Math::VectorCrossMatrix(r) * bodyJacobian.topRows(3);
+        }
+    }
+    return G;
+}
+#endif
+
 unsigned int rigidbody::Markers::nbTechnicalMarkers()
 {
     unsigned int nTechMarkers = 0;
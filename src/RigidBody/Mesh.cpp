@@ -1,6 +1,8 @@
 #define BIORBD_API_EXPORTS
 #include "RigidBody/Mesh.h"
 
+#include <atomic>
+#include <mutex>
 #include "Utils/Path.h"
 #include "Utils/Vector3d.h"
 #include "Utils/RotoTrans.h"
@@ -8,10 +10,46 @@
 
 using namespace BIORBD_NAMESPACE;
 
+class rigidbody::Mesh::DeferredReader
+{
+public:
+    DeferredReader(const std::function<rigidbody::Mesh()>& reader) :
+        read(reader),
+        isRead(false)
+    {
+
+    }
+
+    std::function<rigidbody::Mesh()> read; ///< The function that reads the mesh
+    std::vector<std::function<void(utils::Vector3d&)>>
+            transformations; ///< The transformations to apply once the mesh is read
+    std::atomic<bool> isRead; ///< If the mesh was read
+    std::mutex mutex; ///< Serializes the reading between the copies used in different threads
+};
+
+class rigidbody::Mesh::Geometry
+{
+public:
+    Geometry(
+            const std::vector<utils::Vector3d>& vertex = {},
+            const std::vector<rigidbody::MeshFace>& faces = {}) :
+        vertex(std::make_shared<std::vector<utils::Vector3d>>(vertex)),
+        faces(std::make_shared<std::vector<rigidbody::MeshFace>>(faces))
+    {
+
+    }
+
+    std::shared_ptr<DeferredReader>
+            reader; ///< The deferred reading (nullptr if the mesh is not deferred)
+    std::shared_ptr<std::vector<utils::Vector3d>>
+            vertex; ///< The vertex (shared by the deep copies until one is modified)
+    std::shared_ptr<std::vector<rigidbody::MeshFace>>
+            faces; ///< The faces (shared by the deep copies until one is modified)
+};
+
 rigidbody::Mesh::Mesh() :
+    m_geometry(std::make_shared<Geometry>()),
     m_rotation(std::make_shared<utils::RotoTrans>()),
-    m_vertex(std::make_shared<std::vector<utils::Vector3d>>()),
-    m_faces(std::make_shared<std::vector<rigidbody::MeshFace>>()),
     m_pathFile(std::make_shared<utils::Path>()),
     m_patchColor(std::make_shared<utils::Vector3d>(0.89, 0.855, 0.788)),
     m_scale(std::make_shared<utils::Vector3d>(1.0, 1.0, 1.0))
@@ -21,9 +59,8 @@ rigidbody::Mesh::Mesh() :
 
 rigidbody::Mesh::Mesh(
         const std::vector<utils::Vector3d> &other):
+    m_geometry(std::make_shared<Geometry>(other)),
     m_rotation(std::make_shared<utils::RotoTrans>()),
-    m_vertex(std::make_shared<std::vector<utils::Vector3d>>(other)),
-    m_faces(std::make_shared<std::vector<rigidbody::MeshFace>>()),
     m_pathFile(std::make_shared<utils::Path>()),
 	m_patchColor(std::make_shared<utils::Vector3d>(0.89, 0.855, 0.788)),
 	m_scale(std::make_shared<utils::Vector3d>(1.0, 1.0, 1.0))
@@ -34,9 +71,8 @@ rigidbody::Mesh::Mesh(
 rigidbody::Mesh::Mesh(
         const std::vector<utils::Vector3d> &vertex,
         const std::vector<rigidbody::MeshFace> & faces) :
+    m_geometry(std::make_shared<Geometry>(vertex, faces)),
     m_rotation(std::make_shared<utils::RotoTrans>()),
-    m_vertex(std::make_shared<std::vector<utils::Vector3d>>(vertex)),
-    m_faces(std::make_shared<std::vector<rigidbody::MeshFace>>(faces)),
     m_pathFile(std::make_shared<utils::Path>()),
 	m_patchColor(std::make_shared<utils::Vector3d>(0.89, 0.855, 0.788)),
 	m_scale(std::make_shared<utils::Vector3d>(1.0, 1.0, 1.0))
@@ -53,18 +89,128 @@ rigidbody::Mesh rigidbody::Mesh::DeepCopy() const
 
 void rigidbody::Mesh::DeepCopy(const rigidbody::Mesh &other)
 {
-    m_vertex->resize(other.m_vertex->size());
-    for (unsigned int i=0; i<other.m_vertex->size(); ++i) {
-        (*m_vertex)[i] = (*other.m_vertex)[i].DeepCopy();
-    }
-    m_faces->resize(other.m_faces->size());
-    for (unsigned int i=0; i<other.m_faces->size(); ++i) {
-        (*m_faces)[i] = (*other.m_faces)[i].DeepCopy();
+    if (other.m_geometry->reader) {
+        // The geometry is only read once, whichever copy accesses it first. It
+        // is copied when one of the copies is modified
+        m_geometry->reader = other.m_geometry->reader;
+        m_geometry->vertex = other.m_geometry->vertex;
+        m_geometry->faces = other.m_geometry->faces;
+    } else {
+        // Keep the vectors of other alive in case other is this mesh
+        std::shared_ptr<std::vector<utils::Vector3d>> otherVertexPtr(
+                    other.m_geometry->vertex);
+        std::shared_ptr<std::vector<rigidbody::MeshFace>> otherFacesPtr(
+                    other.m_geometry->faces);
+        const std::vector<utils::Vector3d>& otherVertex(*otherVertexPtr);
+        const std::vector<rigidbody::MeshFace>& otherFaces(*otherFacesPtr);
+        m_geometry->reader = nullptr;
+        m_geometry->vertex = std::make_shared<std::vector<utils::Vector3d>>(
+                                 otherVertex.size());
+        for (unsigned int i=0; i<otherVertex.size(); ++i) {
+            (*m_geometry->vertex)[i] = otherVertex[i].DeepCopy();
+        }
+        m_geometry->faces = std::make_shared<std::vector<rigidbody::MeshFace>>(
+                                otherFaces.size());
+        for (unsigned int i=0; i<otherFaces.size(); ++i) {
+            (*m_geometry->faces)[i] = otherFaces[i].DeepCopy();
+        }
     }
     *m_pathFile = other.m_pathFile->DeepCopy();
     *m_patchColor = other.m_patchColor->DeepCopy();
     *m_rotation = *other.m_rotation;
-    *m_rotation = *other.m_rotation;
+    *m_scale = *other.m_scale;
+}
+
+void rigidbody::Mesh::setDeferredReader(
+        const std::function<rigidbody::Mesh()>& reader)
+{
+    m_geometry->reader = std::make_shared<DeferredReader>(reader);
+    m_geometry->vertex = std::make_shared<std::vector<utils::Vector3d>>();
+    m_geometry->faces = std::make_shared<std::vector<rigidbody::MeshFace>>();
+}
+
+bool rigidbody::Mesh::isLoaded() const
+{
+    return !m_geometry->reader || m_geometry->reader->isRead;
+}
+
+void rigidbody::Mesh::load() const
+{
+    if (isLoaded()) {
+        return;
+    }
+    // The copies sharing the reader also share the vertex and the faces it fills
+    DeferredReader& reader(*m_geometry->reader);
+    std::lock_guard<std::mutex> lock(reader.mutex);
+    if (reader.isRead) {
+        return;
+    }
+    rigidbody::Mesh mesh(reader.read());
+    std::vector<utils::Vector3d>& vertex(*m_geometry->vertex);
+    vertex = *mesh.m_geometry->vertex;
+    *m_geometry->faces = *mesh.m_geometry->faces;
+    for (const auto& transformation : reader.transformations) {
+        for (auto& v : vertex) {
+            transformation(v);
+        }
+    }
+    reader.transformations.clear();
+    reader.isRead = true;
+}
+
+void rigidbody::Mesh::transformVertex(
+        const std::function<void(utils::Vector3d&)>& transformation)
+{
+    if (m_geometry->reader) {
+        std::unique_lock<std::mutex> lock(m_geometry->reader->mutex);
+        if (!m_geometry->reader->isRead) {
+            if (m_geometry->reader.use_count() > 1) {
+                // Another copy shares the pending transformations, so this one
+                // gets its own reader (and therefore reads the file on its own)
+                std::shared_ptr<DeferredReader> reader(
+                    std::make_shared<DeferredReader>(m_geometry->reader->read));
+                reader->transformations = m_geometry->reader->transformations;
+                lock.unlock();
+                m_geometry->reader = reader;
+                m_geometry->vertex = std::make_shared<std::vector<utils::Vector3d>>();
+                m_geometry->faces = std::make_shared<std::vector<rigidbody::MeshFace>>();
+            }
+            m_geometry->reader->transformations.push_back(transformation);
+            return;
+        }
+    }
+    detachVertex();
+    for (auto& v : *m_geometry->vertex) {
+        transformation(v);
+    }
+}
+
+void rigidbody::Mesh::detachVertex()
+{
+    load();
+    if (m_geometry->vertex.use_count() > 1) {
+        const std::vector<utils::Vector3d>& shared(*m_geometry->vertex);
+        std::shared_ptr<std::vector<utils::Vector3d>> vertex(
+                    std::make_shared<std::vector<utils::Vector3d>>(shared.size()));
+        for (unsigned int i=0; i<shared.size(); ++i) {
+            (*vertex)[i] = shared[i].DeepCopy();
+        }
+        m_geometry->vertex = vertex;
+    }
+}
+
+void rigidbody::Mesh::detachFaces()
+{
+    load();
+    if (m_geometry->faces.use_count() > 1) {
+        const std::vector<rigidbody::MeshFace>& shared(*m_geometry->faces);
+        std::shared_ptr<std::vector<rigidbody::MeshFace>> faces(
+                    std::make_shared<std::vector<rigidbody::MeshFace>>(shared.size()));
+        for (unsigned int i=0; i<shared.size(); ++i) {
+            (*faces)[i] = shared[i].DeepCopy();
+        }
+        m_geometry->faces = faces;
+    }
 }
 
 void rigidbody::Mesh::setColor(
@@ -80,25 +226,28 @@ utils::Vector3d &rigidbody::Mesh::color() const
 
 void rigidbody::Mesh::addPoint(const utils::Vector3d &node)
 {
-    m_vertex->push_back(node);
+    detachVertex();
+    m_geometry->vertex->push_back(node);
 }
 const utils::Vector3d &rigidbody::Mesh::point(
     unsigned int idx) const
 {
-    return (*m_vertex)[idx];
+    load();
+    return (*m_geometry->vertex)[idx];
 }
 unsigned int rigidbody::Mesh::nbVertex() const
 {
-    return static_cast<unsigned int>(m_vertex->size());
+    load();
+    return static_cast<unsigned int>(m_geometry->vertex->size());
 }
 
 void rigidbody::Mesh::rotate(
         const utils::RotoTrans &rt)
 {
     *m_rotation = rt;
-    for (auto& v : *m_vertex){
+    transformVertex([rt](utils::Vector3d& v) {
         v.applyRT(rt);
-    }
+    });
 }
 
 utils::RotoTrans &rigidbody::Mesh::getRotation() const
@@ -110,11 +259,11 @@ void rigidbody::Mesh::scale(
         const utils::Vector3d &scaler)
 {   
     *m_scale = scaler;
-    for (auto& v: *m_vertex){
+    transformVertex([scaler](utils::Vector3d& v) {
         v(0) *= scaler(0);
         v(1) *= scaler(1);
         v(2) *= scaler(2);
-    }
+    });
 }
 
 utils::Vector3d &rigidbody::Mesh::getScale() const
@@ -124,11 +273,13 @@ utils::Vector3d &rigidbody::Mesh::getScale() const
 
 unsigned int rigidbody::Mesh::nbFaces()
 {
-    return static_cast<unsigned int>(m_faces->size());
+    load();
+    return static_cast<unsigned int>(m_geometry->faces->size());
 }
 void rigidbody::Mesh::addFace(const rigidbody::MeshFace& face)
 {
-    m_faces->push_back(face);
+    detachFaces();
+    m_geometry->faces->push_back(face);
 }
 void rigidbody::Mesh::addFace(const std::vector<int> & face)
 {
@@ -137,12 +288,14 @@ void rigidbody::Mesh::addFace(const std::vector<int> & face)
 const std::vector<rigidbody::MeshFace>& rigidbody::Mesh::faces()
 const
 {
-    return *m_faces;
+    load();
+    return *m_geometry->faces;
 }
 const rigidbody::MeshFace &rigidbody::Mesh::face(
     unsigned int idx) const
 {
-    return (*m_faces)[idx];
+    load();
+    return (*m_geometry->faces)[idx];
 }
 
 void rigidbody::Mesh::setPath(const utils::Path& path)
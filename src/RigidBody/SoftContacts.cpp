@@ -125,7 +125,10 @@ rigidbody::NodeSegment rigidbody::SoftContacts::softContact(
     const rigidbody::SoftContactNode& sc(softContact(idx));
     unsigned int id = model.GetBodyId(sc.parent().c_str());
 
-    return rigidbody::NodeSegment(RigidBodyDynamics::CalcBodyToBaseCoordinates(model, Q, id, sc, updateKin));
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q);
+    }
+    return rigidbody::NodeSegment(RigidBodyDynamics::CalcBodyToBaseCoordinates(model, Q, id, sc, false));
 }
 
 std::vector<rigidbody::NodeSegment> rigidbody::SoftContacts::softContacts(
@@ -158,8 +161,11 @@ rigidbody::NodeSegment rigidbody::SoftContacts::softContactVelocity(
     unsigned int id(model.GetBodyId(sc.parent().c_str()));
 
     // Calculate the velocity of the point
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q, &Qdot);
+    }
     return rigidbody::NodeSegment(
-        RigidBodyDynamics::CalcPointVelocity(model, Q, Qdot, id, sc, updateKin)
+        RigidBodyDynamics::CalcPointVelocity(model, Q, Qdot, id, sc, false)
     );
 }
 
@@ -179,8 +185,11 @@ rigidbody::NodeSegment rigidbody::SoftContacts::softContactAngularVelocity(
     unsigned int id(model.GetBodyId(sc.parent().c_str()));
 
     // Calculate the velocity of the point
+    if (updateKin) {
+        model.UpdateKinematicsCustom(&Q, &Qdot);
+    }
     return rigidbody::NodeSegment(
-        RigidBodyDynamics::CalcPointVelocity6D(model, Q, Qdot, id, sc, updateKin).block(0, 0, 3, 1)
+        RigidBodyDynamics::CalcPointVelocity6D(model, Q, Qdot, id, sc, false).block(0, 0, 3, 1)
     );
 }
 
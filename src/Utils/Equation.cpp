@@ -6,10 +6,173 @@
 #endif
 
 #include <math.h>
+#include <cstdlib>
+#include <memory>
+#include <mutex>
 #include "Utils/Error.h"
 
 using namespace BIORBD_NAMESPACE;
 
+namespace
+{
+///
+/// \brief An operation of a compiled equation, which are evaluated on a stack
+///
+struct Operation {
+    enum TYPE {
+        NUMBER,
+        VARIABLE,
+        NEGATE,
+        EXPONENT,
+        DIVIDE,
+        MULTIPLY,
+        ADD,
+        SUBTRACT
+    };
+    TYPE type;
+    double value;
+    utils::Equation name;
+};
+
+///
+/// \brief Compile an equation into operations in reverse polish notation
+///
+/// The priority of the operations is the same as the one used by
+/// Equation::evaluateEquation (see Equation::prepareMathSymbols), that is
+/// e, /, *, + and then -, each of them being left associative. The variables
+/// are kept by name so the compiled equation does not depend on their values.
+///
+class EquationCompiler
+{
+public:
+    EquationCompiler(
+        const utils::Equation& eq,
+        std::vector<Operation>& operations) :
+        m_eq(eq),
+        m_pos(0),
+        m_operations(operations)
+    {
+
+    }
+
+    void compile()
+    {
+        parseBinary(0);
+        utils::Error::check(m_pos == m_eq.size(), "You must open brackets!");
+    }
+
+protected:
+    void parseBinary(unsigned int priority)
+    {
+        // From the lowest to the highest priority
+        static const char symbols[] = {'-', '+', '*', '/', 'e'};
+        static const Operation::TYPE types[] = {
+            Operation::SUBTRACT, Operation::ADD, Operation::MULTIPLY,
+            Operation::DIVIDE, Operation::EXPONENT
+        };
+        if (priority == sizeof(symbols)) {
+            parseUnary();
+            return;
+        }
+        parseBinary(priority + 1);
+        while (m_pos < m_eq.size() && m_eq[m_pos] == symbols[priority]) {
+            ++m_pos;
+            parseBinary(priority + 1);
+            push(types[priority]);
+        }
+    }
+
+    void parseUnary()
+    {
+        if (m_pos < m_eq.size() && (m_eq[m_pos] == '-' || m_eq[m_pos] == '+')) {
+            bool negate(m_eq[m_pos] == '-');
+            ++m_pos;
+            parseUnary();
+            if (negate) {
+                push(Operation::NEGATE);
+            }
+            return;
+        }
+        parseAtom();
+    }
+
+    void parseAtom()
+    {
+        utils::Error::check(m_pos < m_eq.size(), "The equation ends with an operator");
+        char c(m_eq[m_pos]);
+        if (c == '(') {
+            ++m_pos;
+            parseBinary(0);
+            utils::Error::check(m_pos < m_eq.size() && m_eq[m_pos] == ')',
+                                "You must close brackets!");
+            ++m_pos;
+        } else if (c == '$') {
+            size_t end(std::min(m_eq.find_first_of("+-*/()", m_pos + 1), m_eq.size()));
+            push(Operation::VARIABLE, 0, m_eq.substr(m_pos, end - m_pos));
+            m_pos = end;
+        } else if ((c >= '0' && c <= '9') || c == '.') {
+            size_t end(std::min(m_eq.find_first_not_of("0123456789.", m_pos), m_eq.size()));
+            utils::String number(m_eq.substr(m_pos, end - m_pos));
+            char* numberEnd;
+            double value(std::strtod(number.c_str(), &numberEnd));
+            utils::Error::check(*numberEnd == '\0', number + " is not a number");
+            push(Operation::NUMBER, value);
+            m_pos = end;
+        } else if (!utils::String(m_eq.substr(m_pos, 2)).tolower().compare("pi")) {
+            push(Operation::NUMBER, M_PI);
+            m_pos += 2;
+        } else {
+            utils::Error::raise("Unexpected symbol \"" + std::string(1, c) + "\"");
+        }
+    }
+
+    void push(
+        Operation::TYPE type,
+        double value = 0,
+        const utils::Equation& name = "")
+    {
+        Operation operation;
+        operation.type = type;
+        operation.value = value;
+        operation.name = name;
+        m_operations.push_back(operation);
+    }
+
+    const utils::Equation& m_eq;
+    size_t m_pos;
+    std::vector<Operation>& m_operations;
+};
+
+///
+/// \brief Return the compiled equation, compiling it only the first time it is met
+///
+std::shared_ptr<const std::vector<Operation>> compiledEquation(
+    const utils::Equation& eq)
+{
+    static std::mutex cacheMutex;
+    static std::map<std::string, std::shared_ptr<const std::vector<Operation>>> cache;
+    {
+        std::lock_guard<std::mutex> lock(cacheMutex);
+        auto found(cache.find(eq));
+        if (found != cache.end()) {
+            return found->second;
+        }
+    }
+
+    std::shared_ptr<std::vector<Operation>> operations(
+        std::make_shared<std::vector<Operation>>());
+    EquationCompiler(eq, *operations).compile();
+
+    std::lock_guard<std::mutex> lock(cacheMutex);
+    if (cache.size() >= 10000) {
+        // Do not let generated models grow the cache indefinitely
+        cache.clear();
+    }
+    cache[eq] = operations;
+    return operations;
+}
+}
+
 std::vector<utils::Equation>
 utils::Equation::prepareMathSymbols()
 {
@@ -260,11 +423,56 @@ double utils::Equation::evaluateEquation(
     utils::Equation wholeEq,
     const std::map<utils::Equation, double>& variables)
 {
-    return evaluateEquation(splitIntoEquation(wholeEq, variables));
+    // Most of the values are plain numbers, they don't need to be compiled
+    if (wholeEq.size()) {
+        char* end;
+        double value(std::strtod(wholeEq.c_str(), &end));
+        if (*end == '\0') {
+            return value;
+        }
+    }
+
+    const std::vector<Operation>& operations(*compiledEquation(wholeEq));
+    std::vector<double> stack;
+    stack.reserve(operations.size());
+    for (const auto& operation : operations) {
+        switch (operation.type) {
+        case Operation::NUMBER:
+            stack.push_back(operation.value);
+            break;
+        case Operation::VARIABLE: {
+            auto variable(variables.find(operation.name));
+            utils::Error::check(variable != variables.end(),
+                                "The variable " + operation.name + " is not defined");
+            stack.push_back(variable->second);
+            break;
+        }
+        case Operation::NEGATE:
+            stack.back() = -stack.back();
+            break;
+        default: {
+            double right(stack.back());
+            stack.pop_back();
+            double& left(stack.back());
+            if (operation.type == Operation::EXPONENT) {
+                left *= pow(10, right);
+            } else if (operation.type == Operation::DIVIDE) {
+                left /= right;
+            } else if (operation.type == Operation::MULTIPLY) {
+                left *= right;
+            } else if (operation.type == Operation::ADD) {
+                left += right;
+            } else {
+                left -= right;
+            }
+        }
+        }
+    }
+    return stack.back();
 }
 double utils::Equation::evaluateEquation(
     utils::Equation wholeEq)
 {
     std::map<utils::Equation, double> dumb;
-    return evaluateEquation(splitIntoEquation(wholeEq, dumb));
+    return evaluateEquation(wholeEq, dumb);
 }
@@ -0,0 +1,156 @@
+#define BIORBD_API_EXPORTS
+#include "Utils/MappedMatrix.h"
+
+#ifndef BIORBD_USE_CASADI_MATH
+#include <cstdint>
+#include <cstring>
+#ifdef _WIN32
+    #include <windows.h>
+#else
+    #include <fcntl.h>
+    #include <sys/mman.h>
+    #include <sys/stat.h>
+    #include <unistd.h>
+#endif
+#include "Utils/Error.h"
+#include "Utils/Matrix.h"
+#include "Utils/Path.h"
+#include "Utils/String.h"
+
+using namespace BIORBD_NAMESPACE;
+
+class utils::MappedMatrix::FileMapping
+{
+public:
+    FileMapping(const utils::String& path) :
+        m_address(nullptr),
+        m_size(0)
+    {
+#ifdef _WIN32
+        HANDLE file(CreateFileA(path.c_str(), GENERIC_READ, FILE_SHARE_READ, nullptr,
+                                OPEN_EXISTING, FILE_ATTRIBUTE_NORMAL, nullptr));
+        utils::Error::check(file != INVALID_HANDLE_VALUE, path + " could not be opened");
+        LARGE_INTEGER size;
+        if (!GetFileSizeEx(file, &size)) {
+            CloseHandle(file);
+            utils::Error::raise(path + " could not be read");
+        }
+        m_size = static_cast<size_t>(size.QuadPart);
+        HANDLE mapping(m_size ? CreateFileMappingA(file, nullptr, PAGE_READONLY, 0, 0, nullptr) : nullptr);
+        CloseHandle(file);
+        utils::Error::check(mapping != nullptr, path + " could not be mapped");
+        m_address = MapViewOfFile(mapping, FILE_MAP_READ, 0, 0, 0);
+        CloseHandle(mapping);
+        utils::Error::check(m_address != nullptr, path + " could not be mapped");
+#else
+        int file(open(path.c_str(), O_RDONLY));
+        utils::Error::check(file != -1, path + " could not be opened");
+        struct stat status;
+        if (fstat(file, &status) == -1) {
+            close(file);
+            utils::Error::raise(path + " could not be read");
+        }
+        m_size = static_cast<size_t>(status.st_size);
+        void* address(m_size ? mmap(nullptr, m_size, PROT_READ, MAP_SHARED, file, 0) : MAP_FAILED);
+        close(file);
+        utils::Error::check(address != MAP_FAILED, path + " could not be mapped");
+        m_address = address;
+#endif
+    }
+
+    ~FileMapping()
+    {
+#ifdef _WIN32
+        UnmapViewOfFile(m_address);
+#else
+        munmap(m_address, m_size);
+#endif
+    }
+
+    const char* address() const
+    {
+        return static_cast<const char*>(m_address);
+    }
+
+    size_t size() const
+    {
+        return m_size;
+    }
+
+protected:
+    void* m_address;
+    size_t m_size;
+};
+
+utils::MappedMatrix::MappedMatrix(
+    const utils::Path &path) :
+#ifdef _WIN32
+    m_mapping(std::make_shared<FileMapping>(
+                  utils::Path::toWindowsFormat(path.absolutePath()))),
+#else
+    m_mapping(std::make_shared<FileMapping>(path.absolutePath())),
+#endif
+    m_rows(0),
+    m_cols(0),
+    m_data(nullptr)
+{
+    // Header: magic, version, endianness marker, number of rows and of columns
+    const char* header(m_mapping->address());
+    utils::Error::check(m_mapping->size() >= 32
+                        && !std::memcmp(header, BIORBD_BINARY_DATA_MAGIC, 8),
+                        path.absolutePath() + " is not a binary data file");
+    std::uint32_t version;
+    std::uint32_t endianness;
+    std::uint64_t rows;
+    std::uint64_t cols;
+    std::memcpy(&version, header + 8, 4);
+    std::memcpy(&endianness, header + 12, 4);
+    std::memcpy(&rows, header + 16, 8);
+    std::memcpy(&cols, header + 24, 8);
+    utils::Error::check(version == BIORBD_BINARY_DATA_VERSION,
+                        "Version of the binary data file not implemented yet");
+    utils::Error::check(endianness == 0x01020304,
+                        "The binary data file was written with another endianness");
+    // Divide rather than multiply so that a corrupted header cannot overflow
+    size_t dataSize(m_mapping->size() - 32);
+    size_t nbValues(dataSize / sizeof(double));
+    utils::Error::check(dataSize % sizeof(double) == 0
+                        && (cols ? nbValues % cols == 0 && rows == nbValues / cols
+                            : nbValues == 0),
+                        path.absolutePath() + " is truncated");
+
+    m_rows = static_cast<size_t>(rows);
+    m_cols = static_cast<size_t>(cols);
+    m_data = reinterpret_cast<const double*>(header + 32);
+}
+
+size_t utils::MappedMatrix::rows() const
+{
+    return m_rows;
+}
+
+size_t utils::MappedMatrix::cols() const
+{
+    return m_cols;
+}
+
+const double* utils::MappedMatrix::data() const
+{
+    return m_data;
+}
+
+utils::Matrix utils::MappedMatrix::block(
+    size_t firstCol,
+    size_t nbCols) const
+{
+    utils::Error::check(firstCol + nbCols <= m_cols,
+                        "The requested columns are out of the mapped matrix");
+    return Eigen::Map<const Eigen::MatrixXd>(
+               m_data + firstCol * m_rows, m_rows, nbCols);
+}
+
+utils::Matrix utils::MappedMatrix::matrix() const
+{
+    return block(0, m_cols);
+}
+#endif
@@ -1,6 +1,9 @@
 """
 Test for file IO
 """
+import os
+import shutil
+
 import pytest
 import numpy as np
 
@@ -129,6 +132,66 @@ def test_forward_dynamics(brbd):
     np.testing.assert_almost_equal(qddot, qddot_expected)
 
 
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_dynamics_derivatives(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # The analytical derivatives are only available with the Eigen backend
+        return
+
+    m = brbd.Model("../../models/pyomecaman_withActuators.bioMod")
+    q = np.linspace(-0.4, 0.8, m.nbQ())
+    qdot = np.linspace(0.3, -0.3, m.nbQdot())
+    tau = np.linspace(0, 5, m.nbGeneralizedTorque())
+    h = 1e-6
+
+    qddot = m.ForwardDynamics(q, qdot, tau).to_array()
+    dtau_dq, dtau_dqdot, dtau_dqddot = m.InverseDynamicsDerivatives(q, qdot, qddot)
+    np.testing.assert_almost_equal(dtau_dqddot, m.massMatrix(q).to_array())
+    dqddot_dq, dqddot_dqdot, dqddot_dtau = m.ForwardDynamicsDerivatives(q, qdot, tau)
+    np.testing.assert_almost_equal(dqddot_dtau, np.linalg.inv(m.massMatrix(q).to_array()))
+
+    def inverse_dynamics(q, qdot):
+        return m.InverseDynamics(q, qdot, qddot).to_array()
+
+    def forward_dynamics(q, qdot):
+        return m.ForwardDynamics(q, qdot, tau).to_array()
+
+    for j in range(m.nbQ()):
+        e = np.zeros(m.nbQ())
+        e[j] = h
+        fd = (inverse_dynamics(q + e, qdot) - inverse_dynamics(q - e, qdot)) / (2 * h)
+        np.testing.assert_allclose(dtau_dq[:, j], fd, rtol=1e-5, atol=1e-5)
+        fd = (inverse_dynamics(q, qdot + e) - inverse_dynamics(q, qdot - e)) / (2 * h)
+        np.testing.assert_allclose(dtau_dqdot[:, j], fd, rtol=1e-5, atol=1e-5)
+        fd = (forward_dynamics(q + e, qdot) - forward_dynamics(q - e, qdot)) / (2 * h)
+        np.testing.assert_allclose(dqddot_dq[:, j], fd, rtol=1e-4, atol=1e-4)
+        fd = (forward_dynamics(q, qdot + e) - forward_dynamics(q, qdot - e)) / (2 * h)
+        np.testing.assert_allclose(dqddot_dqdot[:, j], fd, rtol=1e-4, atol=1e-4)
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_forward_simulation(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # The native forward simulation is only available with the Eigen backend
+        return
+
+    m = brbd.Model("../../models/pendulum.bioMod")
+    sim = brbd.ForwardSimulation(m)
+    n_runs = 3
+    n_steps = 20
+    x0 = np.zeros((sim.nbStates(), n_runs))
+    x0[1, :] = np.linspace(0, 0.5, n_runs)
+    controls = np.zeros((sim.nbControls(), n_steps))
+
+    states = sim.run(x0, controls, 0.01)
+    np.testing.assert_equal(states.shape, (sim.nbStates(), n_steps + 1, n_runs))
+    np.testing.assert_almost_equal(states[:, 0, :], x0)
+    np.testing.assert_almost_equal(sim.run(x0, controls, 0.01, 2), states)
+
+    with pytest.raises(ValueError):
+        sim.run(x0[:-1, :], controls, 0.01)
+
+
 @pytest.mark.parametrize("brbd", brbd_to_test)
 def test_forward_dynamics_with_external_forces(brbd):
     m = brbd.Model("../../models/pyomecaman_withActuators.bioMod")
@@ -304,6 +367,246 @@ def test_markers(brbd):
     np.testing.assert_almost_equal(markers_dot[:, -1], expected_markers_last_dot)
 
 
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_markers_batch(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # Batched markers are only available with the Eigen backend
+        return
+
+    m = brbd.Model("../../models/pyomecaman.bioMod")
+    n_frames = 5
+    q = np.linspace(-0.5, 0.5, m.nbQ() * n_frames).reshape((m.nbQ(), n_frames))
+
+    markers = m.markersBatch(q)
+    assert markers.shape == (3, m.nbMarkers(), n_frames)
+    assert markers.flags["C_CONTIGUOUS"]
+    for i in range(n_frames):
+        expected = np.array([mark.to_array() for mark in m.markers(q[:, i])]).T
+        np.testing.assert_almost_equal(markers[:, :, i], expected)
+
+    technical = m.technicalMarkersBatch(q)
+    assert technical.shape == (3, m.nbTechnicalMarkers(), n_frames)
+    anatomical = m.anatomicalMarkersBatch(q, False)
+    assert anatomical.shape == (3, m.nbAnatomicalMarkers(), n_frames)
+
+    with pytest.raises(ValueError):
+        m.markersBatch(q[:-1, :])
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_all_global_jcs_batch(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # Batched JCS are only available with the Eigen backend
+        return
+
+    m = brbd.Model("../../models/pyomecaman.bioMod")
+    n_frames = 4
+    q = np.linspace(-0.5, 0.5, m.nbQ() * n_frames).reshape((m.nbQ(), n_frames))
+
+    jcs = m.allGlobalJCSBatch(q)
+    assert jcs.shape == (4, 4, m.nbSegment(), n_frames)
+    assert jcs.flags["C_CONTIGUOUS"]
+    for f in range(n_frames):
+        for i, rt in enumerate(m.allGlobalJCS(q[:, f])):
+            np.testing.assert_almost_equal(jcs[:, :, i, f], rt.to_array())
+
+    local_jcs = m.allLocalJCSToArray()
+    assert local_jcs.shape == (4, 4, m.nbSegment())
+    for i, rt in enumerate(m.localJCS()):
+        np.testing.assert_almost_equal(local_jcs[:, :, i], rt.to_array())
+
+    with pytest.raises(ValueError):
+        m.allGlobalJCSBatch(q[:-1, :])
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_mesh_points_batch(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # Batched meshes are only available with the Eigen backend
+        return
+
+    m = brbd.Model("../../models/pendulum.bioMod")
+    n_frames = 3
+    q = np.linspace(-0.5, 0.5, m.nbQ() * n_frames).reshape((m.nbQ(), n_frames))
+
+    offsets = m.meshPointsOffsets()
+    n_vertices = offsets[-1]
+    assert m.meshPointsPacked().shape == (3, n_vertices)
+    faces = m.meshFacesPacked()
+    assert faces.shape[1] == 3
+    assert faces.max() < n_vertices
+
+    points = m.meshPointsBatch(q)
+    assert points.shape == (3, n_vertices, n_frames)
+    assert points.flags["F_CONTIGUOUS"]
+    for f in range(n_frames):
+        for i, expected in enumerate(m.meshPointsInMatrix(q[:, f])):
+            np.testing.assert_almost_equal(points[:, offsets[i] : offsets[i + 1], f], expected.to_array())
+
+    # The same buffer can be filled again
+    out = np.zeros((3, n_vertices, n_frames), order="F")
+    assert m.meshPointsBatch(q, out) is out
+    np.testing.assert_almost_equal(out, points)
+
+    with pytest.raises(ValueError):
+        m.meshPointsBatch(q, np.zeros((3, n_vertices, n_frames)))
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_lazy_meshes(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        return
+
+    m = brbd.Model("../../models/pendulum.bioMod")
+    m_lazy = brbd.Model("../../models/pendulum.bioMod", True)
+    assert not m_lazy.mesh(0).isLoaded()
+
+    q = np.linspace(-0.5, 0.5, m.nbQ())
+    for expected, value in zip(m.meshPointsInMatrix(q), m_lazy.meshPointsInMatrix(q)):
+        np.testing.assert_almost_equal(value.to_array(), expected.to_array())
+    assert m_lazy.mesh(0).isLoaded()
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_compiled_model(brbd, tmp_path):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # Compiled models are only available with the Eigen backend
+        return
+
+    m = brbd.Model("../../models/pendulum.bioMod")
+    brbd.Writer.writeCompiledModel(m, "temporary.biorbdc")
+    m_compiled = brbd.Reader.readCompiledModel("temporary.biorbdc")
+    os.remove("temporary.biorbdc")
+
+    assert m_compiled.nbQ() == m.nbQ()
+    assert m_compiled.nbMarkers() == m.nbMarkers()
+    q = np.linspace(-0.5, 0.5, m.nbQ())
+    for expected, value in zip(m.markers(q), m_compiled.markers(q)):
+        np.testing.assert_almost_equal(value.to_array(), expected.to_array())
+    for expected, value in zip(m.meshPointsInMatrix(q), m_compiled.meshPointsInMatrix(q)):
+        np.testing.assert_almost_equal(value.to_array(), expected.to_array())
+    np.testing.assert_almost_equal(m_compiled.massMatrix(q).to_array(), m.massMatrix(q).to_array())
+
+    m.saveCompiled("temporary.biorbdc")
+    m_loaded = brbd.Model.loadCompiled("temporary.biorbdc")
+    os.remove("temporary.biorbdc")
+    np.testing.assert_almost_equal(m_loaded.massMatrix(q).to_array(), m.massMatrix(q).to_array())
+    assert m_loaded.path().absolutePath().to_string() == m.path().absolutePath().to_string()
+
+    # A failed writing leaves no temporary file behind
+    shutil.copytree("../../models/meshFiles/stl", tmp_path / "meshFiles" / "stl")
+    shutil.copy("../../models/pendulum.bioMod", tmp_path)
+    m_lazy = brbd.Model(str(tmp_path / "pendulum.bioMod"), True)
+    os.remove(tmp_path / "meshFiles" / "stl" / "pendulum.STL")
+    with pytest.raises(RuntimeError):
+        brbd.Writer.writeCompiledModel(m_lazy, str(tmp_path / "pendulum.biorbdc"))
+    assert not [file for file in os.listdir(tmp_path) if file.endswith(".tmp")]
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_data_files(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # The contiguous loaders are only available with the Eigen backend
+        return
+
+    q = np.linspace(-1, 1, 12).reshape(3, 4)
+    with open("temporary.bioKin", "w") as file:
+        file.write("version 1\nnddl 3\nnbintervals 3\n\n")
+        for j in range(q.shape[1]):
+            file.write(f"T {0.1 * j}\n" + "\n".join(str(value) for value in q[:, j]) + "\n")
+    q_read = brbd.Reader.readQDataFileToArray("temporary.bioKin")
+    os.remove("temporary.bioKin")
+    np.testing.assert_almost_equal(q_read, q)
+
+    markers = np.arange(12.0).reshape(3, 2, 2)
+    with open("temporary.bioMark", "w") as file:
+        file.write("version 1\nnbmark 2\nnbintervals 1\n\n")
+        for m in range(markers.shape[1]):
+            file.write(f"Marker {m + 1}\n")
+            for j in range(markers.shape[2]):
+                file.write("\t".join(str(value) for value in markers[:, m, j]) + "\n")
+    markers_read = brbd.Reader.readMarkerDataFileToArray("temporary.bioMark")
+    os.remove("temporary.bioMark")
+    assert markers_read.shape == (3, 2, 2)
+    np.testing.assert_almost_equal(markers_read, markers)
+
+    brbd.Writer.writeBinaryDataFile(q, "temporary.biorbdd")
+    q_loaded = brbd.Reader.readBinaryDataFileToArray("temporary.biorbdd", False)
+    q_mapped = brbd.Reader.readBinaryDataFileToArray("temporary.biorbdd")
+    np.testing.assert_almost_equal(q_loaded, q)
+    np.testing.assert_almost_equal(q_mapped, q)
+    assert not q_mapped.flags.writeable
+    del q_mapped
+    os.remove("temporary.biorbdd")
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_all_markers_jacobian(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # The stacked jacobian is only available with the Eigen backend
+        return
+
+    m = brbd.Model("../../models/pyomecaman.bioMod")
+    q = np.linspace(-0.5, 0.5, m.nbQ())
+
+    jacobian = m.allMarkersJacobian(q).to_array()
+    assert jacobian.shape == (3 * m.nbMarkers(), m.nbQ())
+    expected = np.concatenate([jac.to_array() for jac in m.markersJacobian(q)])
+    np.testing.assert_almost_equal(jacobian, expected)
+
+    technical = m.allTechnicalMarkersJacobian(q, False).to_array()
+    expected = np.concatenate([jac.to_array() for jac in m.technicalMarkersJacobian(q, False)])
+    np.testing.assert_almost_equal(technical, expected)
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_workspace_threads(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # The GIL is only released with the Eigen backend
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    m = brbd.Model("../../models/pyomecaman.bioMod")
+    n_frames = 20
+    q = np.linspace(-1, 1, m.nbQ() * n_frames).reshape((n_frames, m.nbQ()))
+    qdot = np.ones((m.nbQdot(),))
+    qddot = np.zeros((m.nbQddot(),))
+    expected = np.array([m.InverseDynamics(q_tp, qdot, qddot).to_array() for q_tp in q])
+
+    workspaces = [m.workspace() for _ in range(4)]
+
+    def compute(i):
+        ws = workspaces[i % len(workspaces)]
+        return [ws.InverseDynamics(q_tp, qdot, qddot).to_array() for q_tp in q[i :: len(workspaces)]]
+
+    with ThreadPoolExecutor(max_workers=len(workspaces)) as executor:
+        results = list(executor.map(compute, range(len(workspaces))))
+    for i, result in enumerate(results):
+        np.testing.assert_almost_equal(np.array(result), expected[i :: len(workspaces)])
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_kinematics_cache(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        # The kinematics is always recomputed with the Casadi backend
+        return
+
+    m = brbd.Model("../../models/pyomecaman.bioMod")
+    q = np.linspace(-1, 1, m.nbQ())
+    m.resetKinematicsCacheCounters()
+
+    markers = np.array([mark.to_array() for mark in m.markers(q)])
+    markers_cached = np.array([mark.to_array() for mark in m.markers(q)])
+    np.testing.assert_equal(markers, markers_cached)
+    np.testing.assert_almost_equal(m.CoM(q).to_array(), m.CoM(q).to_array())
+    assert m.nbKinematicsCacheMisses() == 1
+    assert m.nbKinematicsCacheHits() == 3
+
+    m.markers(q + 0.1)
+    assert m.nbKinematicsCacheMisses() == 2
+
+
 @pytest.mark.parametrize("brbd", brbd_to_test)
 def test_forward_dynamics_constraints_direct(brbd):
     m = brbd.Model("../../models/pyomecaman.bioMod")
@@ -389,3 +692,56 @@ def test_name_to_index(brbd):
     np.testing.assert_equal(brbd.marker_index(m, "piedg6"), 96)
     with pytest.raises(ValueError, match="dummy is not in the biorbd model"):
         brbd.marker_index(m, "dummy")
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_kalman_reconstruct_trial(brbd):
+    if not hasattr(brbd, "KalmanReconsMarkers"):
+        # The Kalman filter is not compiled with the Casadi backend
+        return
+
+    from concurrent.futures import ThreadPoolExecutor
+
+    m = brbd.Model("../../models/pyomecaman.bioMod")
+    n_frames = 5
+    q_ref = np.ones((m.nbQ(), n_frames)) * 0.2
+    markers = m.technicalMarkersBatch(q_ref)
+    markers[:, 0, -1] = np.nan
+
+    def reconstruct(_):
+        workspace = m.workspace()
+        kalman = brbd.KalmanReconsMarkers(workspace, brbd.KalmanParam(100))
+        return kalman.reconstructTrial(workspace, markers)
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        results = list(executor.map(reconstruct, range(2)))
+    for q, qdot, qddot in results:
+        assert q.shape == (m.nbQ(), n_frames)
+        assert qdot.shape == (m.nbQdot(), n_frames)
+        assert qddot.shape == (m.nbQddot(), n_frames)
+        np.testing.assert_almost_equal(q, q_ref, decimal=4)
+    np.testing.assert_equal(results[0][0], results[1][0])
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_muscle_forces_from_activations(brbd):
+    if brbd.currentLinearAlgebraBackend() != 0:
+        pytest.skip("The batched muscle forces are only available with the Eigen backend")
+
+    m = brbd.Model("../../models/arm26.bioMod")
+    n_frames = 4
+    q = np.linspace(-0.5, 0.5, m.nbQ() * n_frames).reshape((m.nbQ(), n_frames))
+    qdot = np.linspace(-1, 1, m.nbQdot() * n_frames).reshape((m.nbQdot(), n_frames))
+    activations = np.linspace(0.1, 0.9, m.nbMuscles() * n_frames).reshape((m.nbMuscles(), n_frames))
+
+    forces = m.muscleForcesFromActivations(activations, q, qdot)
+    assert forces.shape == (m.nbMuscles(), n_frames)
+    states = m.stateSet()
+    for f in range(n_frames):
+        for i, state in enumerate(states):
+            state.setActivation(activations[i, f])
+        expected = m.muscleForces(states, q[:, f], qdot[:, f]).to_array()
+        np.testing.assert_almost_equal(forces[:, f], expected)
+
+    with pytest.raises(ValueError):
+        m.muscleForcesFromActivations(activations[:-1, :], q, qdot)
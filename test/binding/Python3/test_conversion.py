@@ -38,6 +38,35 @@ def test_np_mx_to_generalized(brbd):
         biorbd_model.ForwardDynamics(q, qdot, tau.to_array())
 
 
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_np_non_contiguous_to_generalized(brbd):
+    if brbd.currentLinearAlgebraBackend() == 1:
+        # Only numpy inputs are tested here
+        return
+
+    biorbd_model = brbd.Model("../../models/pyomecaman.bioMod")
+    n_q = biorbd_model.nbQ()
+    q = np.linspace(-0.5, 0.5, n_q)
+    qdot = np.linspace(1, 2, n_q)
+    qddot = np.linspace(-1, 1, n_q)
+    tau = biorbd_model.InverseDynamics(q, qdot, qddot).to_array()
+
+    # Strided, Fortran ordered and integer arrays must give the same results as contiguous float64 arrays
+    q_strided = np.repeat(q, 2)[::2]
+    qdot_fortran = np.asfortranarray(qdot)
+    np.testing.assert_almost_equal(
+        biorbd_model.InverseDynamics(q_strided, qdot_fortran, qddot).to_array(), tau
+    )
+    np.testing.assert_almost_equal(
+        biorbd_model.InverseDynamics(np.zeros(n_q, dtype=int), qdot, qddot).to_array(),
+        biorbd_model.InverseDynamics(np.zeros(n_q), qdot, qddot).to_array(),
+    )
+    np.testing.assert_almost_equal(biorbd_model.ForwardDynamics(q_strided, qdot, tau).to_array(), qddot)
+
+    with pytest.raises(ValueError):
+        biorbd_model.InverseDynamics(q[np.newaxis, :], qdot, qddot)
+
+
 # --- Options --- #
 @pytest.mark.parametrize("brbd", brbd_to_test)
 def test_imu_to_array(brbd):
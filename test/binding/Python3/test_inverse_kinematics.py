@@ -14,7 +14,7 @@ except ModuleNotFoundError:
 
 
 @pytest.mark.parametrize("brbd", brbd_to_test)
-@pytest.mark.parametrize("method", ["only_lm", "lm", "trf"])
+@pytest.mark.parametrize("method", ["only_lm", "lm", "trf", "native"])
 def test_solve(brbd, method):
     biorbd_model = brbd.Model("../../models/pyomecaman.bioMod")
 
@@ -31,5 +31,68 @@ def test_solve(brbd, method):
             np.squeeze(ik_q.T),
             qinit,
         )
-    elif method == "trf" or method == "lm":
+    elif method == "trf" or method == "lm" or method == "native":
         np.testing.assert_almost_equal(np.squeeze(np.round(ik_q, 1).T), qinit, decimal=1)
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+def test_solve_native_with_occlusions(brbd):
+    biorbd_model = brbd.Model("../../models/pyomecaman.bioMod")
+
+    n_frames = 5
+    qinit = np.array([0.1, 0.1, -0.3, 0.35, 1.15, -0.35, 1.15, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1])
+    q = np.repeat(qinit[:, np.newaxis], n_frames, axis=1) + np.linspace(0, 0.1, n_frames)
+    markers = biorbd_model.markersBatch(q)
+    markers[:, 0, 2] = np.nan
+
+    ik = biorbd.InverseKinematics(biorbd_model, markers)
+    assert ik.indices_to_keep.shape == (biorbd_model.nbMarkers(), n_frames)
+    assert not ik.indices_to_keep[0, 2]
+    assert ik.indices_to_remove[0, 2]
+    assert np.sum(ik.indices_to_remove) == 1
+    ik_q = ik.solve(method="native")
+    np.testing.assert_almost_equal(ik_q, q, decimal=1)
+
+    sol = ik.sol()
+    assert sol["nfev"].shape == (n_frames,)
+    assert sol["status"].dtype.kind == "i"
+    assert np.all(np.array(sol["status"]) > 0)
+    assert np.all(np.array(sol["nfev"]) >= 1)
+    assert np.isnan(sol["residuals"][0, 2])
+    np.testing.assert_almost_equal(np.nan_to_num(sol["residuals"]), np.zeros((biorbd_model.nbMarkers(), n_frames)))
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+@pytest.mark.parametrize("method", ["lm", "native"])
+def test_solve_parallel(brbd, method):
+    biorbd_model = brbd.Model("../../models/pyomecaman.bioMod")
+
+    n_frames = 12
+    qinit = np.array([0.1, 0.1, -0.3, 0.35, 1.15, -0.35, 1.15, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1])
+    q = np.repeat(qinit[:, np.newaxis], n_frames, axis=1) + np.linspace(0, 0.1, n_frames)
+    markers = biorbd_model.markersBatch(q)
+
+    ik = biorbd.InverseKinematics(biorbd_model, markers)
+    ik_q = ik.solve(method=method, n_workers=2, chunk_size=5, n_overlap=2)
+    np.testing.assert_almost_equal(ik_q, q, decimal=1)
+    assert len(ik.sol()["status"]) == n_frames
+
+
+@pytest.mark.parametrize("brbd", brbd_to_test)
+@pytest.mark.parametrize("smoothness_weight", [0, 1e-3])
+def test_solve_trajectory(brbd, smoothness_weight):
+    biorbd_model = brbd.Model("../../models/pyomecaman.bioMod")
+
+    n_frames = 4
+    qinit = np.array([0.1, 0.1, -0.3, 0.35, 1.15, -0.35, 1.15, 0.1, 0.1, 0.1, 0.1, 0.1, 0.1])
+    q = np.repeat(qinit[:, np.newaxis], n_frames, axis=1) + np.linspace(0, 0.1, n_frames)
+    markers = biorbd_model.markersBatch(q)
+    markers[:, 0, 1] = np.nan
+
+    ik = biorbd.InverseKinematics(biorbd_model, markers)
+    ik_q = ik.solve(method="trajectory", smoothness_weight=smoothness_weight)
+    np.testing.assert_almost_equal(ik_q, q, decimal=1)
+
+    sol = ik.sol()
+    assert np.isnan(sol["residuals"][0, 1])
+    assert len(sol["status"]) == n_frames
@@ -1,20 +1,37 @@
+#include <cstdint>
 #include <iostream>
+#include <fstream>
+#include <functional>
+#include <iterator>
+#include <thread>
 #include <gtest/gtest.h>
 #include <rbdl/Dynamics.h>
 
 #include "BiorbdModel.h"
 #include "RigidBody/Joints.h"
+#include "ModelReader.h"
 #include "ModelWriter.h"
+#include "ForwardSimulation.h"
 #include "biorbdConfig.h"
 #include "Utils/String.h"
 #include "Utils/RotoTrans.h"
 #include "Utils/RotoTransNode.h"
 #include "RigidBody/Segment.h"
+#include "RigidBody/SegmentCharacteristics.h"
+#include "RigidBody/Mesh.h"
+#include "RigidBody/MeshFace.h"
 #include "RigidBody/NodeSegment.h"
 #include "RigidBody/IMU.h"
 #include "RigidBody/GeneralizedCoordinates.h"
 #include "RigidBody/GeneralizedVelocity.h"
+#include "RigidBody/GeneralizedAcceleration.h"
 #include "RigidBody/GeneralizedTorque.h"
+#include "Utils/Matrix.h"
+#include "Utils/MappedMatrix.h"
+#include "Utils/Vector3d.h"
+#ifdef MODULE_MUSCLES
+#include "InternalForces/Muscles/State.h"
+#endif
 
 using namespace BIORBD_NAMESPACE;
 
@@ -86,6 +103,250 @@ TEST(FileIO, WriteModel)
     }
     remove(savePath.c_str());
 }
+
+TEST(FileIO, CompiledModel)
+{
+    {
+        Model model(modelPathWithStl);
+        utils::String savePath("temporary.biorbdc");
+        Writer::writeCompiledModel(model, savePath);
+        Model modelCopy(Reader::readCompiledModel(savePath));
+        remove(savePath.c_str());
+
+        // The compiled model can be loaded again from the bioMod file it was compiled from
+        EXPECT_EQ(modelCopy.path().absolutePath(), model.path().absolutePath());
+        EXPECT_EQ(modelCopy.nbSegment(), model.nbSegment());
+        EXPECT_EQ(modelCopy.nbQ(), model.nbQ());
+        EXPECT_EQ(modelCopy.nbMarkers(), model.nbMarkers());
+        rigidbody::GeneralizedCoordinates Q(model);
+        for (unsigned int i=0; i<model.nbQ(); ++i) {
+            Q[i] = 0.1 * (i+1);
+        }
+        EXPECT_NEAR((modelCopy.massMatrix(Q) - model.massMatrix(Q)).norm(), 0, requiredPrecision);
+        for (unsigned int k=0; k<model.nbSegment(); ++k) {
+            EXPECT_NEAR((modelCopy.globalJCS(Q, k) - model.globalJCS(Q, k)).norm(), 0,
+                        requiredPrecision);
+            EXPECT_EQ(modelCopy.segment(k).characteristics().mesh().path().absolutePath(),
+                      model.segment(k).characteristics().mesh().path().absolutePath());
+        }
+        for (unsigned int k=0; k<model.nbMarkers(); ++k) {
+            EXPECT_NEAR((modelCopy.marker(Q, k) - model.marker(Q, k)).norm(), 0, requiredPrecision);
+        }
+        EXPECT_NEAR((modelCopy.meshPointsBatch(Q) - model.meshPointsBatch(Q)).norm(), 0,
+                    requiredPrecision);
+    }
+    {
+        // The meshes are read from the compiled file on their first access
+        Model model(modelPathWithStl);
+        utils::String savePath("temporary.biorbdc");
+        Writer::writeCompiledModel(model, savePath);
+        Model modelLazy(Reader::readCompiledModel(savePath, true));
+        for (unsigned int k=0; k<model.nbSegment(); ++k) {
+            EXPECT_EQ(modelLazy.mesh(k).isLoaded(), model.mesh(k).nbVertex() == 0);
+        }
+        rigidbody::GeneralizedCoordinates Q(model);
+        Q.setOnes();
+        EXPECT_NEAR((modelLazy.meshPointsBatch(Q) - model.meshPointsBatch(Q)).norm(), 0,
+                    requiredPrecision);
+        for (unsigned int k=0; k<model.nbSegment(); ++k) {
+            EXPECT_EQ(modelLazy.mesh(k).faces().size(), model.mesh(k).faces().size());
+        }
+
+        // A compiled file written from other sources is not used for the meshes not read yet
+        Model modelOutdated(Reader::readCompiledModel(savePath, true));
+        Model otherModel("models/two_segments.bioMod");
+        Writer::writeCompiledModel(otherModel, savePath);
+        for (unsigned int k=0; k<model.nbSegment(); ++k) {
+            if (model.mesh(k).nbVertex()) {
+                EXPECT_THROW(modelOutdated.mesh(k).nbVertex(), std::runtime_error);
+            }
+        }
+        remove(savePath.c_str());
+    }
+#ifdef MODULE_MUSCLES
+    {
+        Model model("models/arm26.bioMod");
+        utils::String savePath("temporary.biorbdc");
+        Writer::writeCompiledModel(model, savePath);
+        Model modelCopy(Reader::readCompiledModel(savePath));
+        remove(savePath.c_str());
+
+        EXPECT_EQ(modelCopy.nbMuscles(), model.nbMuscles());
+        rigidbody::GeneralizedCoordinates Q(model);
+        Q.setConstant(0.3);
+        EXPECT_NEAR((modelCopy.musclesLengthJacobian(Q) - model.musclesLengthJacobian(Q)).norm(),
+                    0, requiredPrecision);
+    }
+#endif
+#ifdef MODULE_ACTUATORS
+    {
+        // The actuators cannot be compiled yet
+        Model model("models/pyomecaman_withActuators.bioMod");
+        EXPECT_THROW(Writer::writeCompiledModel(model, utils::String("temporary.biorbdc")),
+                     std::runtime_error);
+    }
+#endif
+    {
+        // The compiled model is used as a cache once it is written
+        utils::Path path("models/two_segments.bioMod");
+        remove(Reader::compiledModelPath(path).absolutePath().c_str());
+        EXPECT_FALSE(Reader::isCompiledModelUpToDate(path));
+        Model model(path);
+        Model modelParsed;
+        Reader::readModelFileWithCache(path, &modelParsed);
+        EXPECT_TRUE(Reader::isCompiledModelUpToDate(path));
+        Model modelCached;
+        Reader::readModelFileWithCache(path, &modelCached);
+        remove(Reader::compiledModelPath(path).absolutePath().c_str());
+
+        rigidbody::GeneralizedCoordinates Q(model);
+        Q.setOnes();
+        EXPECT_EQ(modelCached.nbSegment(), model.nbSegment());
+        EXPECT_EQ(modelCached.nbRTs(), model.nbRTs());
+        EXPECT_EQ(modelCached.nbIMUs(), model.nbIMUs());
+        for (unsigned int k=0; k<model.nbSegment(); ++k) {
+            EXPECT_NEAR((modelCached.globalJCS(Q, k) - model.globalJCS(Q, k)).norm(), 0,
+                        requiredPrecision);
+        }
+        for (unsigned int k=0; k<model.nbRTs(); ++k) {
+            EXPECT_NEAR((modelCached.RT(Q, k) - model.RT(Q, k)).norm(), 0, requiredPrecision);
+        }
+    }
+    {
+        // A corrupted compiled model is replaced by the parsed bioMod file
+        utils::Path path("models/two_segments.bioMod");
+        utils::String compiledPath(Reader::compiledModelPath(path).absolutePath());
+        Model model(path);
+        Model modelParsed;
+        Reader::readModelFileWithCache(path, &modelParsed);
+        std::string content;
+        {
+            std::ifstream file(compiledPath.c_str(), std::ios::in | std::ios::binary);
+            content.assign(std::istreambuf_iterator<char>(file), std::istreambuf_iterator<char>());
+        }
+        {
+            // The header is left untouched, only the end of the file is lost
+            std::ofstream file(compiledPath.c_str(), std::ios::out | std::ios::binary);
+            file.write(content.data(), static_cast<std::streamsize>(content.size() - 16));
+        }
+        EXPECT_TRUE(Reader::isCompiledModelUpToDate(path));
+        EXPECT_THROW(Reader::readCompiledModel(compiledPath), std::runtime_error);
+
+        Model modelRecovered;
+        EXPECT_NO_THROW(Reader::readModelFileWithCache(path, &modelRecovered));
+        EXPECT_NO_THROW(Reader::readCompiledModel(compiledPath));
+        remove(compiledPath.c_str());
+
+        rigidbody::GeneralizedCoordinates Q(model);
+        Q.setOnes();
+        EXPECT_EQ(modelRecovered.nbSegment(), model.nbSegment());
+        for (unsigned int k=0; k<model.nbSegment(); ++k) {
+            EXPECT_NEAR((modelRecovered.globalJCS(Q, k) - model.globalJCS(Q, k)).norm(), 0,
+                        requiredPrecision);
+        }
+    }
+    {
+        // Concurrent writers do not share their temporary file
+        utils::String savePath("temporary.biorbdc");
+        std::vector<std::thread> writers;
+        for (unsigned int i=0; i<4; ++i) {
+            writers.push_back(std::thread([&savePath]() {
+                Model model(modelPathWithStl);
+                for (unsigned int j=0; j<5; ++j) {
+                    model.saveCompiled(savePath);
+                }
+            }));
+        }
+        for (auto& writer : writers) {
+            writer.join();
+        }
+        Model model(modelPathWithStl);
+        Model modelCopy(Model::loadCompiled(savePath));
+        remove(savePath.c_str());
+        EXPECT_EQ(modelCopy.path().absolutePath(), model.path().absolutePath());
+        EXPECT_EQ(modelCopy.nbSegment(), model.nbSegment());
+        EXPECT_EQ(modelCopy.nbMarkers(), model.nbMarkers());
+    }
+}
+
+TEST(FileIO, DataFiles)
+{
+    // Kinematics written in the text format
+    utils::String kinPath("temporary.bioKin");
+    {
+        std::ofstream file(kinPath.c_str());
+        file << "version 1\nnddl 3\nnbintervals 2\n\n";
+        for (unsigned int j=0; j<3; ++j) {
+            file << "T " << 0.1 * j << "\n";
+            for (unsigned int i=0; i<3; ++i) {
+                file << 0.5 * i - 0.25 * j << "\n";
+            }
+        }
+    }
+    std::vector<rigidbody::GeneralizedCoordinates> Q(Reader::readQDataFile(kinPath));
+    utils::Matrix QInMatrix(Reader::readQDataFileInMatrix(kinPath));
+    remove(kinPath.c_str());
+    EXPECT_EQ(QInMatrix.rows(), 3);
+    EXPECT_EQ(QInMatrix.cols(), 3);
+    for (unsigned int j=0; j<Q.size(); ++j) {
+        EXPECT_NEAR((QInMatrix.col(j) - Q[j]).norm(), 0, requiredPrecision);
+    }
+
+    // Markers written in the text format
+    utils::String markPath("temporary.bioMark");
+    {
+        std::ofstream file(markPath.c_str());
+        file << "version 1\nnbmark 2\nnbintervals 1\n\n";
+        for (unsigned int m=0; m<2; ++m) {
+            file << "Marker " << m + 1 << "\n";
+            for (unsigned int j=0; j<2; ++j) {
+                file << m << "\t" << j << "\t" << m + j + 0.5 << "\n";
+            }
+        }
+    }
+    std::vector<std::vector<utils::Vector3d>> markers(Reader::readMarkerDataFile(markPath));
+    utils::Matrix markersInMatrix(Reader::readMarkerDataFileInMatrix(markPath));
+    remove(markPath.c_str());
+    EXPECT_EQ(markersInMatrix.rows(), 6);
+    EXPECT_EQ(markersInMatrix.cols(), 2);
+    for (unsigned int m=0; m<markers.size(); ++m) {
+        for (unsigned int j=0; j<markers[m].size(); ++j) {
+            EXPECT_NEAR((markersInMatrix.block(3*m, j, 3, 1) - markers[m][j]).norm(), 0,
+                        requiredPrecision);
+        }
+    }
+
+    // Binary round trip, loaded and mapped
+    utils::String binaryPath("temporary.biorbdd");
+    Writer::writeBinaryDataFile(QInMatrix, binaryPath);
+    EXPECT_NEAR((Reader::readBinaryDataFile(binaryPath) - QInMatrix).norm(), 0, requiredPrecision);
+    {
+        utils::MappedMatrix mapped(binaryPath);
+        EXPECT_EQ(mapped.rows(), 3);
+        EXPECT_EQ(mapped.cols(), 3);
+        EXPECT_NEAR((mapped.matrix() - QInMatrix).norm(), 0, requiredPrecision);
+        EXPECT_NEAR((mapped.block(1, 2) - QInMatrix.rightCols(2)).norm(), 0, requiredPrecision);
+        EXPECT_THROW(mapped.block(2, 2), std::runtime_error);
+    }
+    remove(binaryPath.c_str());
+    EXPECT_THROW(utils::MappedMatrix mapped(modelPathWithStl), std::runtime_error);
+
+    // A header whose size overflows once multiplied must not pass for an empty matrix
+    {
+        std::ofstream file(binaryPath.c_str(), std::ios::binary);
+        std::uint32_t version(BIORBD_BINARY_DATA_VERSION);
+        std::uint32_t endianness(0x01020304);
+        std::uint64_t rows(static_cast<std::uint64_t>(1) << 61);
+        std::uint64_t cols(8);
+        file.write(BIORBD_BINARY_DATA_MAGIC, 8);
+        file.write(reinterpret_cast<const char*>(&version), 4);
+        file.write(reinterpret_cast<const char*>(&endianness), 4);
+        file.write(reinterpret_cast<const char*>(&rows), 8);
+        file.write(reinterpret_cast<const char*>(&cols), 8);
+    }
+    EXPECT_THROW(utils::MappedMatrix mapped(binaryPath), std::runtime_error);
+    remove(binaryPath.c_str());
+}
 #endif
 
 TEST(GenericTests, mass)
@@ -95,12 +356,251 @@ TEST(GenericTests, mass)
     EXPECT_NEAR(mass, 52.41212, requiredPrecision);
 }
 
+TEST(GenericTests, workspace)
+{
+    Model model(modelPathForGeneralTesting);
+    Model workspace(model.workspace());
+    EXPECT_EQ(workspace.nbQ(), model.nbQ());
+    EXPECT_EQ(workspace.nbMarkers(), model.nbMarkers());
+
+    rigidbody::GeneralizedCoordinates Q1(model), Q2(model);
+    for (unsigned int i=0; i<model.nbQ(); ++i) {
+        Q1[i] = 0.1 * i;
+        Q2[i] = -0.2 * i;
+    }
+
+    // Updating the kinematics of the workspace must not change the state of the model
+    std::vector<rigidbody::NodeSegment> expected(model.markers(Q1));
+    workspace.UpdateKinematicsCustom(&Q2);
+    std::vector<rigidbody::NodeSegment> markers(model.markers(Q1, true, false));
+    std::vector<rigidbody::NodeSegment> markersWorkspace(workspace.markers(Q2, true, false));
+    std::vector<rigidbody::NodeSegment> expectedWorkspace(model.markers(Q2));
+    for (unsigned int i=0; i<model.nbMarkers(); ++i) {
+        for (unsigned int j=0; j<3; ++j) {
+            SCALAR_TO_DOUBLE(mark, markers[i][j]);
+            SCALAR_TO_DOUBLE(expectedMark, expected[i][j]);
+            EXPECT_NEAR(mark, expectedMark, requiredPrecision);
+            SCALAR_TO_DOUBLE(markWorkspace, markersWorkspace[i][j]);
+            SCALAR_TO_DOUBLE(expectedMarkWorkspace, expectedWorkspace[i][j]);
+            EXPECT_NEAR(markWorkspace, expectedMarkWorkspace, requiredPrecision);
+        }
+    }
+}
+
+#ifndef BIORBD_USE_CASADI_MATH
+TEST(ForwardSimulation, torqueDriven)
+{
+    Model model(modelPathWithStl);
+    ForwardSimulation rk4(model);
+    EXPECT_EQ(rk4.nbStates(), model.nbQ() + model.nbQdot());
+    EXPECT_EQ(rk4.nbControls(), model.nbGeneralizedTorque());
+
+    unsigned int nbRuns(4);
+    unsigned int nbSteps(50);
+    double dt(0.01);
+    utils::Matrix x0(utils::Matrix::Zero(rk4.nbStates(), nbRuns));
+    for (unsigned int r=0; r<nbRuns; ++r) {
+        x0(1, r) = 0.2 * r;
+        x0(model.nbQ() + 2, r) = -0.5 * r;
+    }
+    utils::Matrix controls(utils::Matrix::Zero(rk4.nbControls(), nbSteps));
+
+    std::vector<utils::Matrix> states(rk4.run(x0, controls, dt));
+    EXPECT_EQ(states.size(), nbRuns);
+    EXPECT_EQ(states[0].rows(), rk4.nbStates());
+    EXPECT_EQ(states[0].cols(), nbSteps + 1);
+
+    // The runs do not depend on how they are dispatched on the threads
+    std::vector<utils::Matrix> statesThreads(rk4.run(x0, controls, dt, 3));
+    std::vector<utils::Matrix> statesCallback(rk4.run(x0,
+    [](double, const utils::Vector&, utils::Vector& u) {
+        u.setZero();
+    }, nbSteps, dt, 2));
+
+    // The adaptive integrator agrees with the fixed step one
+    ForwardSimulation rk45(model, ForwardSimulation::TORQUE_DRIVEN, ForwardSimulation::RK45);
+    rk45.setTolerances(1e-10, 1e-12);
+    std::vector<utils::Matrix> statesRk45(rk45.run(x0, controls, dt, 2));
+
+    for (unsigned int r=0; r<nbRuns; ++r) {
+        for (unsigned int i=0; i<rk4.nbStates(); ++i) {
+            for (unsigned int j=0; j<nbSteps + 1; ++j) {
+                EXPECT_NEAR(statesThreads[r](i, j), states[r](i, j), requiredPrecision);
+                EXPECT_NEAR(statesCallback[r](i, j), states[r](i, j), requiredPrecision);
+                EXPECT_NEAR(statesRk45[r](i, j), states[r](i, j), 1e-5);
+            }
+        }
+
+        // Without torque, the energy is conserved
+        rigidbody::GeneralizedCoordinates Q0(states[r].block(0, 0, model.nbQ(), 1));
+        rigidbody::GeneralizedVelocity QDot0(states[r].block(model.nbQ(), 0, model.nbQdot(), 1));
+        rigidbody::GeneralizedCoordinates Q(statesRk45[r].block(0, nbSteps, model.nbQ(), 1));
+        rigidbody::GeneralizedVelocity QDot(statesRk45[r].block(model.nbQ(), nbSteps, model.nbQdot(), 1));
+        EXPECT_NEAR(model.TotalEnergy(Q, QDot), model.TotalEnergy(Q0, QDot0), 1e-6);
+    }
+
+    EXPECT_THROW(rk4.run(utils::Matrix::Zero(rk4.nbStates() + 1, 1), controls, dt),
+                 std::runtime_error);
+    EXPECT_THROW(rk4.run(x0, utils::Matrix::Zero(rk4.nbControls() + 1, 1), dt),
+                 std::runtime_error);
+}
+
+// Fixed step Runge-Kutta of order 4 of the dynamics (step index, states) -> derivative of the states
+static utils::Matrix referenceRk4(
+    const std::function<utils::Vector(unsigned int, const utils::Vector&)>& f,
+    const utils::Vector& x0,
+    unsigned int nbSteps,
+    double dt)
+{
+    utils::Matrix states(x0.size(), nbSteps + 1);
+    states.col(0) = x0;
+    utils::Vector x(x0);
+    for (unsigned int step=0; step<nbSteps; ++step) {
+        utils::Vector k1(f(step, x));
+        utils::Vector k2(f(step, x + dt/2 * k1));
+        utils::Vector k3(f(step, x + dt/2 * k2));
+        utils::Vector k4(f(step, x + dt * k3));
+        x += dt/6 * (k1 + 2*k2 + 2*k3 + k4);
+        states.col(step + 1) = x;
+    }
+    return states;
+}
+
+TEST(ForwardSimulation, torqueDrivenWithContacts)
+{
+    Model model(modelPathForGeneralTesting);
+    ForwardSimulation simulation(model, ForwardSimulation::TORQUE_DRIVEN_WITH_CONTACTS);
+    unsigned int nbQ(model.nbQ());
+    unsigned int nbQdot(model.nbQdot());
+
+    unsigned int nbRuns(2);
+    unsigned int nbSteps(20);
+    double dt(0.005);
+    utils::Matrix x0(utils::Matrix::Zero(simulation.nbStates(), nbRuns));
+    for (unsigned int r=0; r<nbRuns; ++r) {
+        for (unsigned int i=0; i<nbQ; ++i) {
+            x0(i, r) = 0.05 * i + 0.1 * r;
+        }
+    }
+    utils::Matrix controls(simulation.nbControls(), nbSteps);
+    for (unsigned int s=0; s<nbSteps; ++s) {
+        for (unsigned int i=0; i<simulation.nbControls(); ++i) {
+            controls(i, s) = 2 * std::sin(0.3 * s + i);
+        }
+    }
+    std::vector<utils::Matrix> states(simulation.run(x0, controls, dt, 2));
+
+    // Per step integration of the constrained forward dynamics
+    std::function<utils::Vector(unsigned int, const utils::Vector&)> f(
+    [&](unsigned int step, const utils::Vector& x) {
+        rigidbody::GeneralizedCoordinates Q(x.topRows(nbQ));
+        rigidbody::GeneralizedVelocity QDot(x.segment(nbQ, nbQdot));
+        rigidbody::GeneralizedTorque Tau(controls.col(step));
+        utils::Vector xdot(x.size());
+        xdot.topRows(nbQ) = model.computeQdot(Q, rigidbody::GeneralizedCoordinates(QDot));
+        xdot.segment(nbQ, nbQdot) = model.ForwardDynamicsConstraintsDirect(Q, QDot, Tau);
+        return xdot;
+    });
+    for (unsigned int r=0; r<nbRuns; ++r) {
+        utils::Matrix expected(referenceRk4(f, x0.col(r), nbSteps, dt));
+        EXPECT_NEAR((states[r] - expected).norm(), 0, 1e-8);
+    }
+
+    Model modelWithoutContacts(modelPathWithStl);
+    EXPECT_EQ(modelWithoutContacts.nbContacts(), 0);
+    EXPECT_THROW(ForwardSimulation(modelWithoutContacts,
+                                   ForwardSimulation::TORQUE_DRIVEN_WITH_CONTACTS),
+                 std::runtime_error);
+}
+
+#ifdef MODULE_MUSCLES
+TEST(ForwardSimulation, muscleExcitationDriven)
+{
+    Model model("models/arm26.bioMod");
+    ForwardSimulation simulation(model, ForwardSimulation::MUSCLE_EXCITATION_DRIVEN);
+    unsigned int nbQ(model.nbQ());
+    unsigned int nbQdot(model.nbQdot());
+    unsigned int nbMuscles(model.nbMuscles());
+    EXPECT_EQ(simulation.nbStates(), nbQ + nbQdot + nbMuscles);
+    EXPECT_EQ(simulation.nbControls(), nbMuscles);
+
+    unsigned int nbRuns(3);
+    unsigned int nbSteps(20);
+    double dt(0.005);
+    utils::Matrix x0(utils::Matrix::Zero(simulation.nbStates(), nbRuns));
+    for (unsigned int r=0; r<nbRuns; ++r) {
+        for (unsigned int i=0; i<nbQ; ++i) {
+            x0(i, r) = 0.3 + 0.2 * i + 0.1 * r;
+        }
+        for (unsigned int i=0; i<nbMuscles; ++i) {
+            x0(nbQ + nbQdot + i, r) = 0.1 + 0.1 * i;
+        }
+    }
+    utils::Matrix controls(nbMuscles, nbSteps);
+    for (unsigned int s=0; s<nbSteps; ++s) {
+        for (unsigned int i=0; i<nbMuscles; ++i) {
+            controls(i, s) = 0.5 + 0.4 * std::sin(0.3 * s + i);
+        }
+    }
+    std::vector<utils::Matrix> states(simulation.run(x0, controls, dt, 2));
+
+    // Per step integration of the activation dynamics and of the forward dynamics
+    std::function<utils::Vector(unsigned int, const utils::Vector&)> f(
+    [&](unsigned int step, const utils::Vector& x) {
+        rigidbody::GeneralizedCoordinates Q(x.topRows(nbQ));
+        rigidbody::GeneralizedVelocity QDot(x.segment(nbQ, nbQdot));
+        std::vector<std::shared_ptr<internal_forces::muscles::State>> muscleStates(
+                    model.stateSet());
+        for (unsigned int i=0; i<nbMuscles; ++i) {
+            muscleStates[i]->setExcitation(controls(i, step), true);
+            muscleStates[i]->setActivation(x[nbQ + nbQdot + i], true);
+        }
+        utils::Vector xdot(x.size());
+        xdot.topRows(nbQ) = QDot;
+        xdot.segment(nbQ, nbQdot) = model.ForwardDynamics(
+                                        Q, QDot, model.muscularJointTorque(muscleStates, Q, QDot));
+        xdot.bottomRows(nbMuscles) = model.activationDot(muscleStates);
+        return xdot;
+    });
+    for (unsigned int r=0; r<nbRuns; ++r) {
+        utils::Matrix expected(referenceRk4(f, x0.col(r), nbSteps, dt));
+        EXPECT_NEAR((states[r] - expected).norm(), 0, 1e-8);
+    }
+}
+#endif
+#endif
+
 TEST(MeshFile, FileIO)
 {
     EXPECT_NO_THROW(Model model(modelPathWithMeshFile));
     Model model(modelPathWithMeshFile);
 }
 
+TEST(MeshFile, Lazy)
+{
+    Model model(modelPathWithStl);
+    Model modelLazy(modelPathWithStl, true);
+    for (unsigned int i=0; i<modelLazy.nbSegment(); ++i) {
+        EXPECT_FALSE(modelLazy.mesh(i).isLoaded());
+    }
+    rigidbody::Joints jointsCopy(modelLazy.rigidbody::Joints::DeepCopy());
+
+    rigidbody::GeneralizedCoordinates Q(model);
+    Q.setOnes();
+    std::vector<std::vector<utils::Vector3d>> meshPoints(model.meshPoints(Q));
+    std::vector<std::vector<utils::Vector3d>> meshPointsLazy(jointsCopy.meshPoints(Q));
+    ASSERT_EQ(meshPointsLazy.size(), meshPoints.size());
+    for (unsigned int i=0; i<meshPoints.size(); ++i) {
+        ASSERT_EQ(meshPointsLazy[i].size(), meshPoints[i].size());
+        for (unsigned int j=0; j<meshPoints[i].size(); ++j) {
+            EXPECT_NEAR((meshPointsLazy[i][j] - meshPoints[i][j]).norm(), 0, requiredPrecision);
+        }
+        // The mesh was read through the copy for both models
+        EXPECT_TRUE(modelLazy.mesh(i).isLoaded());
+        EXPECT_EQ(modelLazy.mesh(i).faces().size(), model.mesh(i).faces().size());
+    }
+}
+
 TEST(MeshFile, FileIoObj)
 {
     EXPECT_NO_THROW(Model model(modelPathWithObj));
@@ -2768,6 +2768,290 @@ TEST(MuscleForce, force)
     }
 }
 
+TEST(MuscleForce, forceActivationDerivative)
+{
+    Model model(modelPathForMuscleForce);
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedVelocity QDot(model);
+    Q = Q.setOnes()/10;
+    QDot = QDot.setOnes()/10;
+    std::vector<std::shared_ptr<internal_forces::muscles::State>> states;
+    std::vector<std::shared_ptr<internal_forces::muscles::State>> statesPlus;
+    std::vector<std::shared_ptr<internal_forces::muscles::State>> statesMinus;
+    double h(1e-6);
+    for (unsigned int i=0; i<model.nbMuscleTotal(); ++i) {
+        states.push_back(std::make_shared<internal_forces::muscles::StateDynamics>(0, 0.2));
+        statesPlus.push_back(std::make_shared<internal_forces::muscles::StateDynamics>(0, 0.2 + h));
+        statesMinus.push_back(std::make_shared<internal_forces::muscles::StateDynamics>(0, 0.2 - h));
+    }
+    model.updateMuscles(Q, QDot, true);
+
+    utils::Vector dF(model.muscleForcesActivationDerivative(states));
+    utils::Vector FPlus(model.muscleForces(statesPlus));
+    utils::Vector FMinus(model.muscleForces(statesMinus));
+    for (unsigned int i=0; i<model.nbMuscleTotal(); ++i) {
+        SCALAR_TO_DOUBLE(val, dF(i));
+        SCALAR_TO_DOUBLE(plus, FPlus(i));
+        SCALAR_TO_DOUBLE(minus, FMinus(i));
+        EXPECT_NEAR(val, (plus - minus) / (2*h), 1e-3);
+    }
+}
+
+#ifndef BIORBD_USE_CASADI_MATH
+TEST(MuscleSurrogate, lengthAndJacobian)
+{
+    Model model(modelPathForMuscleForce);
+    rigidbody::GeneralizedCoordinates Q(model);
+    for (unsigned int i=0; i<Q.size(); ++i) {
+        Q[i] = 0.3 + 0.2 * i;
+    }
+    model.updateMuscles(Q, true);
+    std::vector<double> expectedLengths;
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        expectedLengths.push_back(model.muscle(i).position().musculoTendonLength());
+    }
+    utils::Matrix expectedJacobian(model.musclesLengthJacobian());
+
+    utils::Matrix errors(model.fitMusclesSurrogate(8, 500));
+    EXPECT_EQ(errors.rows(), model.nbMuscles());
+    EXPECT_EQ(errors.cols(), 2);
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_TRUE(model.muscle(i).position().hasSurrogate());
+        EXPECT_EQ(model.muscle(i).position().surrogate().degree(), 8);
+        // The default QRanges span a full turn, so the paths are not that smooth
+        EXPECT_LT(errors(i, 0), 1e-2);
+        EXPECT_LT(errors(i, 1), 5e-2);
+    }
+
+    // The muscles are now updated from the surrogates
+    model.updateMuscles(Q, true);
+    utils::Matrix jacobian(model.musclesLengthJacobian());
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(model.muscle(i).position().musculoTendonLength(), expectedLengths[i], 5e-3);
+        for (unsigned int j=0; j<model.nbDof(); ++j) {
+            EXPECT_NEAR(jacobian(i, j), expectedJacobian(i, j), 1e-2);
+        }
+    }
+
+    // The workspaces share the surrogates
+    Model workspace(model.workspace());
+    EXPECT_TRUE(workspace.muscle(0).position().hasSurrogate());
+
+    // Back to the geometric path
+    model.clearMusclesSurrogate();
+    EXPECT_FALSE(model.muscle(0).position().hasSurrogate());
+    EXPECT_THROW(model.muscle(0).position().surrogate(), std::runtime_error);
+    model.updateMuscles(Q, true);
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(model.muscle(i).position().musculoTendonLength(), expectedLengths[i], requiredPrecision);
+    }
+}
+
+TEST(MuscleSurrogate, geometry)
+{
+    Model model(modelPathForMuscleForce);
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedCoordinates QOther(model);
+    for (unsigned int i=0; i<Q.size(); ++i) {
+        Q[i] = 0.3 + 0.2 * i;
+        QOther[i] = 0.6 + 0.1 * i;
+    }
+    internal_forces::muscles::Muscle& muscle(model.muscleGroup(0).muscle(0));
+    std::vector<utils::Vector3d> expectedPoints(muscle.musclesPointsInGlobal(model, QOther));
+    utils::Matrix expectedJacobian(muscle.position().jacobian());
+
+    model.fitMusclesSurrogate(4, 200);
+
+    // The points and their jacobian are not computed by the surrogates
+    model.updateMuscles(Q, true);
+    double length(muscle.position().length());
+    EXPECT_THROW(muscle.musclesPointsInGlobal(), std::runtime_error);
+    EXPECT_THROW(muscle.position().originInGlobal(), std::runtime_error);
+    EXPECT_THROW(muscle.position().insertionInGlobal(), std::runtime_error);
+    EXPECT_THROW(muscle.position().jacobian(), std::runtime_error);
+    EXPECT_THROW(muscle.position().jacobianOrigin(), std::runtime_error);
+    EXPECT_THROW(muscle.position().jacobianInsertion(), std::runtime_error);
+
+    // Unless they are computed from the generalized coordinates
+    std::vector<utils::Vector3d> points(muscle.musclesPointsInGlobal(model, QOther));
+    EXPECT_EQ(points.size(), expectedPoints.size());
+    for (unsigned int i=0; i<points.size(); ++i) {
+        EXPECT_NEAR((points[i] - expectedPoints[i]).norm(), 0, requiredPrecision);
+    }
+    EXPECT_NEAR((muscle.position().jacobian() - expectedJacobian).norm(), 0, requiredPrecision);
+    EXPECT_TRUE(muscle.position().hasSurrogate());
+
+    // The characteristics are applied to the length approximated by the surrogate
+    internal_forces::muscles::Characteristics characteristics(muscle.characteristics());
+    double tendonSlackLength(characteristics.tendonSlackLength());
+    characteristics.setTendonSlackLength(tendonSlackLength + 0.01);
+    muscle.setCharacteristics(characteristics);
+    model.updateMuscles(Q, true);
+    EXPECT_TRUE(muscle.position().hasSurrogate());
+    EXPECT_NEAR(muscle.position().length(),
+                length - 0.01 / std::cos(characteristics.pennationAngle()), requiredPrecision);
+
+    // Changing the path removes the surrogate
+    muscle.setPosition(muscle.position());
+    EXPECT_FALSE(muscle.position().hasSurrogate());
+    internal_forces::muscles::Muscle& otherMuscle(model.muscleGroup(0).muscle(1));
+    EXPECT_TRUE(otherMuscle.position().hasSurrogate());
+    internal_forces::ViaPoint viaPoint(0, 0, 0, "viaPoint", "r_humerus");
+    otherMuscle.addPathObject(viaPoint);
+    EXPECT_FALSE(otherMuscle.position().hasSurrogate());
+}
+
+TEST(MuscleForcesKernel, fromActivations)
+{
+    for (auto& path : {modelPathForMuscleForce, modelPathForDeGrooteDynamics}) {
+        Model model(path);
+        for (auto& muscle : model.muscles()) {
+            internal_forces::muscles::FatigueModel* fatigue(
+                dynamic_cast<internal_forces::muscles::FatigueModel*>(muscle.get()));
+            if (fatigue) {
+                fatigue->fatigueState().setState(0.8, 0.1, 0.1);
+            }
+        }
+
+        // Frames lengthening and shortening the muscles
+        unsigned int nFrames(4);
+        utils::Matrix Q(model.nbQ(), nFrames);
+        utils::Matrix QDot(model.nbQdot(), nFrames);
+        utils::Matrix activations(model.nbMuscles(), nFrames);
+        for (unsigned int f=0; f<nFrames; ++f) {
+            for (unsigned int i=0; i<model.nbQ(); ++i) {
+                Q(i, f) = 0.2 + 0.3 * f + 0.1 * i;
+                QDot(i, f) = (f % 2 ? -1. : 1.) * (0.5 + 0.5 * f);
+            }
+            for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+                activations(i, f) = 0.1 + 0.8 * (i + f) / (model.nbMuscles() + nFrames);
+            }
+        }
+
+        utils::Matrix forces(model.muscleForcesFromActivations(activations, Q, QDot));
+        EXPECT_EQ(forces.rows(), model.nbMuscles());
+        EXPECT_EQ(forces.cols(), nFrames);
+        for (unsigned int f=0; f<nFrames; ++f) {
+            std::vector<std::shared_ptr<internal_forces::muscles::State>> states;
+            for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+                states.push_back(std::make_shared<internal_forces::muscles::StateDynamics>(0, activations(i, f)));
+            }
+            rigidbody::GeneralizedCoordinates QFrame(Q.col(f));
+            rigidbody::GeneralizedVelocity QDotFrame(QDot.col(f));
+            utils::Vector expectedForces(model.muscleForces(states, QFrame, QDotFrame));
+            utils::Vector frameForces(model.muscleForcesFromActivations(activations.col(f)));
+            for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+                EXPECT_NEAR(forces(i, f), expectedForces[i], requiredPrecision);
+                EXPECT_NEAR(frameForces[i], expectedForces[i], requiredPrecision);
+            }
+        }
+    }
+
+    // The types that are not in the models
+    Model model(modelPathForMuscleForce);
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedVelocity QDot(model);
+    Q.setOnes();
+    QDot.setOnes();
+    const internal_forces::muscles::Muscle& original(model.muscle(0));
+    std::vector<std::shared_ptr<internal_forces::muscles::Muscle>> muscles;
+    muscles.push_back(std::make_shared<internal_forces::muscles::IdealizedActuator>(original));
+    muscles.push_back(std::make_shared<internal_forces::muscles::HillThelenActiveOnlyType>(original));
+    muscles.push_back(std::make_shared<internal_forces::muscles::HillDeGrooteActiveOnlyType>(original));
+    muscles.push_back(std::make_shared<internal_forces::muscles::HillDeGrooteTypeFatigable>(original));
+    internal_forces::muscles::StateDynamics emg(0, 0.6);
+    utils::Vector lengths(static_cast<unsigned int>(muscles.size()));
+    utils::Vector velocities(static_cast<unsigned int>(muscles.size()));
+    utils::Vector activations(static_cast<unsigned int>(muscles.size()));
+    utils::Vector activeFibers(static_cast<unsigned int>(muscles.size()));
+    utils::Vector expectedForces(static_cast<unsigned int>(muscles.size()));
+    activeFibers.setOnes();
+    for (unsigned int i=0; i<muscles.size(); ++i) {
+        expectedForces[i] = muscles[i]->force(model, Q, QDot, emg, 2);
+        lengths[i] = muscles[i]->position().length();
+        velocities[i] = muscles[i]->position().velocity();
+        activations[i] = emg.activation();
+    }
+    activeFibers[3] = dynamic_cast<internal_forces::muscles::FatigueModel&>
+                      (*muscles[3]).fatigueState().activeFibers();
+
+    internal_forces::muscles::MuscleForcesKernel kernel(muscles);
+    EXPECT_EQ(kernel.nbMuscles(), muscles.size());
+    EXPECT_NEAR(kernel.optimalLength()[0], original.characteristics().optimalLength(), requiredPrecision);
+    EXPECT_NEAR(kernel.forceIsoMax()[0], original.characteristics().forceIsoMax(), requiredPrecision);
+    utils::Vector forces(kernel.forces(lengths, velocities, activations, activeFibers));
+    for (unsigned int i=0; i<muscles.size(); ++i) {
+        EXPECT_NEAR(forces[i], expectedForces[i], requiredPrecision);
+    }
+    utils::Vector tooShort(lengths.head(2));
+    EXPECT_THROW(kernel.forces(tooShort, tooShort, tooShort, tooShort), std::runtime_error);
+}
+
+TEST(MuscleForcesKernel, saturatedActivations)
+{
+    Model model(modelPathForMuscleForce);
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedVelocity QDot(model);
+    Q.setOnes();
+    QDot.setOnes();
+    model.updateMuscles(Q, QDot, true);
+
+    // The activations out of [0, 1] are saturated as the states do
+    utils::Vector activations(model.nbMuscles());
+    activations.setConstant(1.2);
+    activations[0] = -0.2;
+    std::vector<std::shared_ptr<internal_forces::muscles::State>> states;
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        states.push_back(std::make_shared<internal_forces::muscles::StateDynamics>());
+        states[i]->setActivation(activations[i], true);
+    }
+    utils::Vector expectedForces(model.muscleForces(states));
+    utils::Vector forces(model.muscleForcesFromActivations(activations));
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(forces[i], expectedForces[i], requiredPrecision);
+    }
+}
+
+TEST(MuscleForcesKernel, rebuiltWhenMusclesChange)
+{
+    Model model(modelPathForMuscleForce);
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedVelocity QDot(model);
+    Q.setOnes();
+    QDot.setOnes();
+    model.updateMuscles(Q, QDot, true);
+    utils::Vector activations(model.nbMuscles());
+    activations.setConstant(0.5);
+    utils::Vector forces(model.muscleForcesFromActivations(activations));
+
+    // Changing the characteristics of a muscle
+    internal_forces::muscles::Muscle& muscle(model.muscleGroup(0).muscle(0));
+    muscle.setForceIsoMax(2 * muscle.characteristics().forceIsoMax());
+    utils::Vector newForces(model.muscleForcesFromActivations(activations));
+    EXPECT_NEAR(newForces[0], 2 * forces[0], requiredPrecision);
+    for (unsigned int i=1; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(newForces[i], forces[i], requiredPrecision);
+    }
+
+    // Adding a muscle
+    model.muscleGroup(0).addMuscle(internal_forces::muscles::HillType(
+                                       "addedMuscle", muscle.position(), muscle.characteristics()));
+    model.updateMuscles(Q, QDot, true);
+    activations = utils::Vector(model.nbMuscles());
+    activations.setConstant(0.5);
+    std::vector<std::shared_ptr<internal_forces::muscles::State>> states;
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        states.push_back(std::make_shared<internal_forces::muscles::StateDynamics>(0, 0.5));
+    }
+    utils::Vector expectedForces(model.muscleForces(states));
+    utils::Vector addedForces(model.muscleForcesFromActivations(activations));
+    EXPECT_EQ(addedForces.size(), newForces.size() + 1);
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(addedForces[i], expectedForces[i], requiredPrecision);
+    }
+}
+#endif
+
 TEST(MuscleForce, torqueFromMuscles)
 {
     Model model(modelPathForMuscleForce);
@@ -3309,6 +3593,40 @@ TEST(MuscleFatigue, FatigueXiaSetStateLimitsTest)
 
 #ifdef MODULE_STATIC_OPTIM
 
+#ifndef BIORBD_USE_CASADI_MATH
+// Solve the linearized problem with IPOPT, to a tolerance tighter than the one of StaticOptimization
+static utils::Vector linearizedStaticOptimSolution(
+    Model& model,
+    const rigidbody::GeneralizedCoordinates& Q,
+    const rigidbody::GeneralizedVelocity& Qdot,
+    const rigidbody::GeneralizedTorque& Tau,
+    const utils::Vector& initialActivationGuess)
+{
+    Ipopt::SmartPtr<Ipopt::TNLP> ipoptProblem(
+        new internal_forces::muscles::StaticOptimizationIpoptLinearized(
+            model, Q, Qdot, Tau, initialActivationGuess));
+    Ipopt::SmartPtr<Ipopt::IpoptApplication> app = IpoptApplicationFactory();
+    app->Options()->SetNumericValue("tol", 1e-10);
+    app->Options()->SetStringValue("hessian_approximation", "limited-memory");
+    app->Options()->SetIntegerValue("print_level", 0);
+    EXPECT_EQ(app->Initialize(), Ipopt::Solve_Succeeded);
+    app->OptimizeTNLP(ipoptProblem);
+    return static_cast<internal_forces::muscles::StaticOptimizationIpoptLinearized*>(
+               Ipopt::GetRawPtr(ipoptProblem))->finalSolution();
+}
+
+static utils::Vector linearizedStaticOptimSolution(
+    Model& model,
+    const rigidbody::GeneralizedCoordinates& Q,
+    const rigidbody::GeneralizedVelocity& Qdot,
+    const rigidbody::GeneralizedTorque& Tau)
+{
+    utils::Vector initialActivationGuess(model.nbMuscles());
+    initialActivationGuess.setConstant(0.01);
+    return linearizedStaticOptimSolution(model, Q, Qdot, Tau, initialActivationGuess);
+}
+#endif
+
 TEST(StaticOptim, OneFrameNoActivations)
 {
 #ifdef BIORBD_USE_CASADI_MATH
@@ -3331,14 +3649,34 @@ TEST(StaticOptim, OneFrameNoActivations)
     optim.run();
     auto muscleActivations = optim.finalSolution()[0];
 
+    // Checked against torqueZero + J*a + r = Tau outside of biorbd before being frozen
     std::vector<double> expectedActivations = {
-        0.00010047848168370485, 0.00026033154088793019, 0.00010447521345058055,
-        0.00028606920658459623,  0.00024239415731516569, 0.0001088407448652662
+        0.0001, 0.09186557755140376, 0.0011311816894127534,
+        0.03829945343254171, 0.03231992832529825, 0.0001
     };
-    for (size_t i=0; i<expectedActivations.size(); ++i) {
+    utils::Vector ipoptActivations(linearizedStaticOptimSolution(model, Q, Qdot, Tau));
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(ipoptActivations[i], expectedActivations[i], 1e-5);
         EXPECT_NEAR(muscleActivations(i), expectedActivations[i], 1e-5);
     }
 
+    // The linearized muscular torque of the expected activations reaches the target
+    std::vector<std::shared_ptr<internal_forces::muscles::State>> states;
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        states.push_back(std::make_shared<internal_forces::muscles::StateDynamics>(0, 0));
+    }
+    rigidbody::GeneralizedTorque torqueZero(model.muscularJointTorque(states, Q, Qdot));
+    utils::Vector linearizedTorque(torqueZero);
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        states[i]->setActivation(1, true);
+        linearizedTorque += (model.muscularJointTorque(states, Q, Qdot) - torqueZero)
+                            * expectedActivations[i];
+        states[i]->setActivation(0, true);
+    }
+    for (unsigned int i=0; i<Tau.size(); ++i) {
+        EXPECT_NEAR(linearizedTorque[i], Tau[i], 1e-4);
+    }
+
 #endif
 }
 
@@ -3366,11 +3704,14 @@ TEST(StaticOptim, OneFrameOneActivationDouble)
     optim.run();
     auto muscleActivations = optim.finalSolution()[0];
 
+    // Checked against torqueZero + J*a + r = Tau outside of biorbd before being frozen
     std::vector<double> expectedActivations = {
-        0.00010053617554538839, 0.00026033154088793019, 0.00010449199826840102,
-        0.00028606920658459623,  0.00024239415731516569, 0.00010877907171798182
+        0.0001, 0.09186557755140376, 0.0011311816894127534,
+        0.03829945343254171, 0.03231992832529825, 0.0001
     };
-    for (size_t i=0; i<expectedActivations.size(); ++i) {
+    utils::Vector ipoptActivations(linearizedStaticOptimSolution(model, Q, Qdot, Tau));
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(ipoptActivations[i], expectedActivations[i], 1e-5);
         EXPECT_NEAR(muscleActivations(i), expectedActivations[i], 1e-5);
     }
 
@@ -3404,11 +3745,14 @@ TEST(StaticOptim, OneFrameOneActivationVector)
     optim.run();
     auto muscleActivations = optim.finalSolution()[0];
 
+    // Checked against torqueZero + J*a + r = Tau outside of biorbd before being frozen
     std::vector<double> expectedActivations = {
-        0.00010053617554538839, 0.00026033154088793019, 0.00010449199826840102,
-        0.00028606920658459623,  0.00024239415731516569, 0.00010877907171798182
+        0.0001, 0.09186557755140376, 0.0011311816894127534,
+        0.03829945343254171, 0.03231992832529825, 0.0001
     };
-    for (size_t i=0; i<expectedActivations.size(); ++i) {
+    utils::Vector ipoptActivations(linearizedStaticOptimSolution(model, Q, Qdot, Tau));
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(ipoptActivations[i], expectedActivations[i], 1e-5);
         EXPECT_NEAR(muscleActivations(i), expectedActivations[i], 1e-5);
     }
 
@@ -3449,12 +3793,17 @@ TEST(StaticOptim, MultiFrameNoActivation)
     optim.run();
     auto allMuscleActivations = optim.finalSolution();
 
+    // Checked against torqueZero + J*a + r = Tau outside of biorbd before being frozen
     std::vector<double> expectedActivations = {
-        0.00010053617554538839, 0.00026033154088793019, 0.00010449199826840102,
-        0.00028606920658459623,  0.00024239415731516569, 0.00010877907171798182
+        0.0001, 0.09186557755140376, 0.0011311816894127534,
+        0.03829945343254171, 0.03231992832529825, 0.0001
     };
+    utils::Vector ipoptActivations(linearizedStaticOptimSolution(model, Q, Qdot, Tau));
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(ipoptActivations[i], expectedActivations[i], 1e-5);
+    }
     for (auto muscleActivations : allMuscleActivations) {
-        for (size_t i=0; i<expectedActivations.size(); ++i) {
+        for (unsigned int i=0; i<model.nbMuscles(); ++i) {
             EXPECT_NEAR(muscleActivations(i), expectedActivations[i], 1e-5);
         }
     }
@@ -3498,12 +3847,17 @@ TEST(StaticOptim, MultiFrameActivationDouble)
     optim.run();
     auto allMuscleActivations = optim.finalSolution();
 
+    // Checked against torqueZero + J*a + r = Tau outside of biorbd before being frozen
     std::vector<double> expectedActivations = {
-        0.00010053617554538839, 0.00026033154088793019, 0.00010449199826840102,
-        0.00028606920658459623,  0.00024239415731516569, 0.00010877907171798182
+        0.0001, 0.09186557755140376, 0.0011311816894127534,
+        0.03829945343254171, 0.03231992832529825, 0.0001
     };
+    utils::Vector ipoptActivations(linearizedStaticOptimSolution(model, Q, Qdot, Tau));
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(ipoptActivations[i], expectedActivations[i], 1e-5);
+    }
     for (auto muscleActivations : allMuscleActivations) {
-        for (size_t i=0; i<expectedActivations.size(); ++i) {
+        for (unsigned int i=0; i<model.nbMuscles(); ++i) {
             EXPECT_NEAR(muscleActivations(i), expectedActivations[i], 1e-5);
         }
     }
@@ -3550,12 +3904,17 @@ TEST(StaticOptim, MultiFrameNoActivationVector)
     optim.run();
     auto allMuscleActivations = optim.finalSolution();
 
+    // Checked against torqueZero + J*a + r = Tau outside of biorbd before being frozen
     std::vector<double> expectedActivations = {
-        0.00010053617554538839, 0.00026033154088793019, 0.00010449199826840102,
-        0.00028606920658459623,  0.00024239415731516569, 0.00010877907171798182
+        0.0001, 0.09186557755140376, 0.0011311816894127534,
+        0.03829945343254171, 0.03231992832529825, 0.0001
     };
+    utils::Vector ipoptActivations(linearizedStaticOptimSolution(model, Q, Qdot, Tau));
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(ipoptActivations[i], expectedActivations[i], 1e-5);
+    }
     for (auto muscleActivations : allMuscleActivations) {
-        for (size_t i=0; i<expectedActivations.size(); ++i) {
+        for (unsigned int i=0; i<model.nbMuscles(); ++i) {
             EXPECT_NEAR(muscleActivations(i), expectedActivations[i], 1e-5);
         }
     }
@@ -3566,5 +3925,131 @@ TEST(StaticOptim, MultiFrameNoActivationVector)
 
 
 
+TEST(StaticOptim, MultiFrameThreaded)
+{
+#ifdef BIORBD_USE_CASADI_MATH
+    std::cout << "StaticOptim is not tested for CasADi backend" << std::endl;
+
+#else
+    Model model(modelPathForMuscleForce);
+
+    std::vector<rigidbody::GeneralizedCoordinates> allQ;
+    std::vector<rigidbody::GeneralizedVelocity> allQdot;
+    std::vector<rigidbody::GeneralizedTorque> allTau;
+    for (unsigned int frame=0; frame<5; ++frame) {
+        rigidbody::GeneralizedCoordinates Q(model);
+        rigidbody::GeneralizedVelocity Qdot(model);
+        rigidbody::GeneralizedTorque Tau(model);
+        for (unsigned int i=0; i<Q.size(); ++i) {
+            Q[i] = static_cast<double>(i) * 1.1 + frame * 0.05;
+            Qdot[i] = static_cast<double>(i) * 1.1;
+            Tau[i] = static_cast<double>(i) * 1.1;
+        }
+        allQ.push_back(Q);
+        allQdot.push_back(Qdot);
+        allTau.push_back(Tau);
+    }
+
+    auto sequential = internal_forces::muscles::StaticOptimization(
+                          model, allQ, allQdot, allTau, 0.5);
+    sequential.setSolverProfile(
+        internal_forces::muscles::StaticOptimization::PRODUCTION);
+    sequential.run();
+
+    auto threaded = internal_forces::muscles::StaticOptimization(
+                        model, allQ, allQdot, allTau, 0.5);
+    threaded.setSolverProfile(
+        internal_forces::muscles::StaticOptimization::PRODUCTION);
+    threaded.setSolverOption("tol", 1e-6);
+    threaded.run(true, 2);
+
+    EXPECT_THROW(internal_forces::muscles::StaticOptimization(
+                     model, allQ, allQdot, allTau, 0.5).frameTimes(), std::runtime_error);
+    std::vector<double> frameTimes(threaded.frameTimes());
+    EXPECT_EQ(frameTimes.size(), allQ.size());
+    for (auto time : frameTimes) {
+        EXPECT_GT(time, 0);
+    }
+
+    std::vector<utils::Vector> expected(sequential.finalSolution());
+    std::vector<utils::Vector> activations(threaded.finalSolution());
+    EXPECT_EQ(activations.size(), allQ.size());
+    for (unsigned int frame=0; frame<allQ.size(); ++frame) {
+        for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+            EXPECT_NEAR(activations[frame](i), expected[frame](i), 1e-4);
+        }
+    }
+#endif
+}
+
+TEST(StaticOptim, LinearizedQuadratic)
+{
+#ifdef BIORBD_USE_CASADI_MATH
+    std::cout << "StaticOptim is not tested for CasADi backend" << std::endl;
+
+#else
+    Model model(modelPathForMuscleForce);
+
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedVelocity Qdot(model);
+    Q[0] = 0.3;
+    Q[1] = 0.8;
+    Qdot.setZero();
+
+    // The target is produced by the flexors (BIClong, BICshort and BRA) alone, so the
+    // elbow extensors end on their lower bound while the flexors are free
+    std::vector<std::shared_ptr<internal_forces::muscles::State>> states;
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        bool isFlexor(i == 1 || i == 2 || i == 5);
+        states.push_back(std::make_shared<internal_forces::muscles::StateDynamics>(
+                             0, isFlexor ? 0.3 : 0.0001));
+    }
+    rigidbody::GeneralizedTorque Tau(model.muscularJointTorque(states, Q, Qdot));
+    utils::Vector initialActivationGuess(model.nbMuscles());
+    initialActivationGuess.setConstant(0.5);
+    utils::Vector expected(linearizedStaticOptimSolution(model, Q, Qdot, Tau, initialActivationGuess));
+
+    internal_forces::muscles::StaticOptimizationIpoptLinearized quadraticProblem(
+        model, Q, Qdot, Tau, initialActivationGuess);
+    std::vector<int> activeSet;
+    EXPECT_TRUE(quadraticProblem.solveQuadratic(activeSet));
+    EXPECT_EQ(activeSet.size(), model.nbMuscles());
+    utils::Vector activations(quadraticProblem.finalSolution());
+    unsigned int nbFree(0);
+    unsigned int nbOnLowerBound(0);
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(activations[i], expected[i], 1e-5);
+        if (activeSet[i] == 0) {
+            EXPECT_GT(activations[i], 0.001);
+            EXPECT_LT(activations[i], 0.9);
+            ++nbFree;
+        } else if (activeSet[i] < 0) {
+            EXPECT_NEAR(activations[i], 0.0001, 1e-12);
+            ++nbOnLowerBound;
+        }
+    }
+    EXPECT_GT(nbFree, 0);
+    EXPECT_GT(nbOnLowerBound, 0);
+
+    // The muscles are strong enough, so the linearized muscular torque matches the target
+    utils::Vector residual(quadraticProblem.finalResidual());
+    for (unsigned int i=0; i<model.nbGeneralizedTorque(); ++i) {
+        EXPECT_NEAR(residual[i], 0, 1e-2);
+    }
+
+    // Warm starting from the solution converges to the same point
+    internal_forces::muscles::StaticOptimizationIpoptLinearized warmProblem(
+        model, Q, Qdot, Tau, activations);
+    EXPECT_TRUE(warmProblem.solveQuadratic(activeSet));
+    for (unsigned int i=0; i<model.nbMuscles(); ++i) {
+        EXPECT_NEAR(warmProblem.finalSolution()[i], activations[i], 1e-10);
+    }
+
+    internal_forces::muscles::StaticOptimizationIpoptLinearized cubicProblem(
+        model, Q, Qdot, Tau, initialActivationGuess, true, 3);
+    EXPECT_THROW(cubicProblem.solveQuadratic(activeSet), std::runtime_error);
+#endif
+}
+
 #endif
 
@@ -17,6 +17,7 @@
 #include "RigidBody/GeneralizedTorque.h"
 #include "RigidBody/SoftContactSphere.h"
 #include "RigidBody/Mesh.h"
+#include "RigidBody/MeshFace.h"
 #include "RigidBody/SegmentCharacteristics.h"
 #include "RigidBody/NodeSegment.h"
 #include "RigidBody/Segment.h"
@@ -1401,9 +1402,108 @@ TEST(Joints, massMatrixInverse)
                 EXPECT_NEAR(Minv_num_ij, Minv_symbolic_ij, requiredPrecision);
             }
         }
+
+        // The subtrees are computed once and the workspace is reused for another Q
+        const std::vector<std::vector<unsigned int>>& subTrees(model.getDofSubTrees());
+        EXPECT_EQ(&subTrees, &model.getDofSubTrees());
+        EXPECT_EQ(subTrees.size(), model.dof_count);
+
+        FILL_VECTOR(Q, std::vector<double>({0.1, 0.2, 0.3, -0.4, 0.5, -0.6,
+                                           0.7, -0.8, 0.9, 1.0, -1.1, 1.2, 0.4}));
+        Minv_num = model.massMatrix(Q).inverse();
+        Minv_symbolic = model.massMatrixInverse(Q);
+        for (unsigned int j = 0; j < model.dof_count; j++)
+        {
+            for (unsigned int i = 0; i < model.dof_count; i++)
+            {
+                SCALAR_TO_DOUBLE(Minv_num_ij, Minv_num(i,j));
+                SCALAR_TO_DOUBLE(Minv_symbolic_ij, Minv_symbolic(i,j));
+                EXPECT_NEAR(Minv_num_ij, Minv_symbolic_ij, requiredPrecision);
+            }
+        }
+    }
+}
+
+#ifndef BIORBD_USE_CASADI_MATH
+TEST(Joints, kinematicsCache)
+{
+    Model model(modelPathForGeneralTesting);
+    DECLARE_GENERALIZED_COORDINATES(Q, model);
+    DECLARE_GENERALIZED_VELOCITY(QDot, model);
+    DECLARE_GENERALIZED_TORQUE(Tau, model);
+    FILL_VECTOR(Q, std::vector<double>({-2.01, -3.01, -3.01, 0.1, 0.2, 0.3,
+                                       -2.01, -3.01, -3.01, 0.1, 0.2, 0.3, 0.4}));
+    model.resetKinematicsCacheCounters();
+
+    // The second call at the same Q does not recompute the kinematics
+    std::vector<rigidbody::NodeSegment> markers(model.markers(Q));
+    EXPECT_EQ(model.nbKinematicsCacheHits(), 0);
+    EXPECT_EQ(model.nbKinematicsCacheMisses(), 1);
+    std::vector<rigidbody::NodeSegment> markersCached(model.markers(Q));
+    EXPECT_EQ(model.nbKinematicsCacheHits(), 1);
+    EXPECT_EQ(model.nbKinematicsCacheMisses(), 1);
+    for (size_t i=0; i<markers.size(); ++i) {
+        for (unsigned int j=0; j<3; ++j) {
+            EXPECT_EQ(markers[i](j), markersCached[i](j));
+        }
+    }
+
+    // A different Q is a miss
+    rigidbody::GeneralizedCoordinates Q2(Q);
+    Q2[0] += 0.1;
+    model.markers(Q2);
+    EXPECT_EQ(model.nbKinematicsCacheHits(), 1);
+    EXPECT_EQ(model.nbKinematicsCacheMisses(), 2);
+
+    // Dynamics moves the model, so the next kinematics is recomputed
+    model.markers(Q);
+    model.ForwardDynamics(Q, QDot, Tau);
+    unsigned int nbMisses(model.nbKinematicsCacheMisses());
+    std::vector<rigidbody::NodeSegment> markersAfterDynamics(model.markers(Q));
+    EXPECT_EQ(model.nbKinematicsCacheMisses(), nbMisses + 1);
+    for (size_t i=0; i<markers.size(); ++i) {
+        for (unsigned int j=0; j<3; ++j) {
+            EXPECT_NEAR(markers[i](j), markersAfterDynamics[i](j), requiredPrecision);
+        }
     }
+
+    // Explicit invalidation
+    model.invalidateKinematicsCache();
+    model.markers(Q);
+    EXPECT_EQ(model.nbKinematicsCacheMisses(), nbMisses + 2);
+
+    model.resetKinematicsCacheCounters();
+    EXPECT_EQ(model.nbKinematicsCacheHits(), 0);
+    EXPECT_EQ(model.nbKinematicsCacheMisses(), 0);
 }
 
+TEST(Joints, allGlobalJCSBatch)
+{
+    Model model(modelPathForGeneralTesting);
+    utils::Matrix Q(model.nbQ(), 3);
+    for (unsigned int f=0; f<Q.cols(); ++f) {
+        for (unsigned int i=0; i<model.nbQ(); ++i) {
+            Q(i, f) = 0.1 * i - 0.3 * f;
+        }
+    }
+
+    utils::Matrix jcs(model.allGlobalJCSBatch(Q));
+    EXPECT_EQ(jcs.rows(), 16 * model.nbSegment());
+    EXPECT_EQ(jcs.cols(), Q.cols());
+    for (unsigned int f=0; f<Q.cols(); ++f) {
+        rigidbody::GeneralizedCoordinates q(Q.col(f));
+        std::vector<utils::RotoTrans> expected(model.allGlobalJCS(q));
+        for (unsigned int i=0; i<model.nbSegment(); ++i) {
+            for (unsigned int j=0; j<16; ++j) {
+                EXPECT_NEAR(jcs(16*i + j, f), expected[i](j), requiredPrecision);
+            }
+        }
+    }
+    EXPECT_THROW(model.allGlobalJCSBatch(utils::Matrix(model.nbQ() + 1, 2)),
+                 std::runtime_error);
+}
+#endif
+
 TEST(Markers, copy)
 {
     {
@@ -1870,6 +1970,95 @@ TEST(Mesh, scale)
     }
 }
 
+TEST(Mesh, deferred)
+{
+    unsigned int nbReads(0);
+    rigidbody::Mesh mesh;
+    mesh.setDeferredReader([&nbReads]() {
+        ++nbReads;
+        rigidbody::Mesh read;
+        read.addPoint(utils::Vector3d(2, 3, 4));
+        read.addPoint(utils::Vector3d(5, 6, 7));
+        read.addFace(std::vector<int>({0, 1, 0}));
+        return read;
+    });
+    mesh.scale(utils::Vector3d(2, 3, 4));
+    rigidbody::Mesh copy(mesh.DeepCopy());
+    EXPECT_FALSE(mesh.isLoaded());
+    EXPECT_FALSE(copy.isLoaded());
+    EXPECT_EQ(nbReads, 0);
+
+    // Reading one of the copies reads them all
+    EXPECT_EQ(copy.nbVertex(), 2);
+    EXPECT_TRUE(mesh.isLoaded());
+    EXPECT_EQ(mesh.nbFaces(), 1);
+    EXPECT_EQ(nbReads, 1);
+    {
+        SCALAR_TO_DOUBLE(val, mesh.point(0)[1]);
+        EXPECT_FLOAT_EQ(val, 9);
+    }
+    {
+        SCALAR_TO_DOUBLE(val, mesh.point(1)[2]);
+        EXPECT_FLOAT_EQ(val, 28);
+    }
+}
+
+TEST(Mesh, deferredDeepCopyIndependence)
+{
+    unsigned int nbReads(0);
+    rigidbody::Mesh mesh;
+    mesh.setDeferredReader([&nbReads]() {
+        ++nbReads;
+        rigidbody::Mesh read;
+        read.addPoint(utils::Vector3d(2, 3, 4));
+        read.addPoint(utils::Vector3d(5, 6, 7));
+        read.addFace(std::vector<int>({0, 1, 0}));
+        return read;
+    });
+    rigidbody::Mesh copy(mesh.DeepCopy());
+    rigidbody::Mesh shallowCopy(copy);
+
+    // Scaling a copy before the reading does not scale the other
+    copy.scale(utils::Vector3d(2, 3, 4));
+    EXPECT_FALSE(mesh.isLoaded());
+    EXPECT_FALSE(copy.isLoaded());
+    {
+        SCALAR_TO_DOUBLE(val, mesh.point(0)[1]);
+        EXPECT_FLOAT_EQ(val, 3);
+    }
+    EXPECT_FALSE(copy.isLoaded());
+    {
+        SCALAR_TO_DOUBLE(val, copy.point(0)[1]);
+        EXPECT_FLOAT_EQ(val, 9);
+    }
+    {
+        SCALAR_TO_DOUBLE(val, shallowCopy.point(0)[1]);
+        EXPECT_FLOAT_EQ(val, 9);
+    }
+    EXPECT_EQ(nbReads, 2);
+
+    // Scaling a copy after the reading does not scale the other
+    rigidbody::Mesh loadedCopy(mesh.DeepCopy());
+    loadedCopy.scale(utils::Vector3d(2, 3, 4));
+    {
+        SCALAR_TO_DOUBLE(val, mesh.point(1)[2]);
+        EXPECT_FLOAT_EQ(val, 7);
+    }
+    {
+        SCALAR_TO_DOUBLE(val, loadedCopy.point(1)[2]);
+        EXPECT_FLOAT_EQ(val, 28);
+    }
+    EXPECT_EQ(nbReads, 2);
+
+    // Nor does adding points and faces
+    loadedCopy.addPoint(utils::Vector3d(8, 9, 10));
+    loadedCopy.addFace(std::vector<int>({0, 1, 2}));
+    EXPECT_EQ(mesh.nbVertex(), 2);
+    EXPECT_EQ(mesh.nbFaces(), 1);
+    EXPECT_EQ(loadedCopy.nbVertex(), 3);
+    EXPECT_EQ(loadedCopy.nbFaces(), 2);
+}
+
 TEST(Mesh, color){
     rigidbody::Mesh mesh;
     utils::Vector3d color(mesh.color());
@@ -1925,6 +2114,126 @@ TEST(Markers, allPositions)
     }
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+TEST(Markers, batchPositions)
+{
+    Model model(modelPathMeshEqualsMarker);
+    std::vector<std::vector<double>> expectedMarkers2 = {
+        std::vector<double>({1.290033288920621, 0.40925158443563553, 0.21112830525233722}),
+        std::vector<double>({0.20066533460246938,  1.2890382781008347, 0.40925158443563558}),
+        std::vector<double>({0.39983341664682814, 0.20066533460246938,  1.290033288920621}),
+        std::vector<double>({1.2905320401699185, 1.2989551971389397, 1.310413178608594})
+    };
+
+    utils::Matrix Q(model.nbQ(), 2);
+    for (unsigned int i=0; i<model.nbQ(); ++i) {
+        Q(i, 0) = QtestEqualsMarker[i];
+    }
+    Q.col(1) << 0.3, 0.3, 0.3, 0.1, 0.1, 0.1;
+
+    utils::Matrix markers(model.markersBatch(Q));
+    EXPECT_EQ(markers.rows(), 3 * model.nbMarkers());
+    EXPECT_EQ(markers.cols(), 2);
+    for (unsigned int i=0; i<model.nbMarkers(); ++i) {
+        for (unsigned int j=0; j<3; ++j) {
+            EXPECT_NEAR(markers(3*i+j, 0), expectedMarkers[i][j], requiredPrecision);
+            EXPECT_NEAR(markers(3*i+j, 1), expectedMarkers2[i][j], requiredPrecision);
+        }
+    }
+
+    EXPECT_EQ(model.technicalMarkersBatch(Q).rows(),
+              3 * model.nbTechnicalMarkers());
+    EXPECT_EQ(model.anatomicalMarkersBatch(Q).rows(),
+              3 * model.nbAnatomicalMarkers());
+    EXPECT_THROW(model.markersBatch(utils::Matrix(model.nbQ() + 1, 2)),
+                 std::runtime_error);
+}
+
+TEST(Markers, allMarkersJacobian)
+{
+    Model model(modelPathForGeneralTesting);
+    rigidbody::GeneralizedCoordinates Q(model);
+    for (unsigned int i=0; i<model.nbQ(); ++i) {
+        Q[i] = 0.1 * static_cast<double>(i) - 0.3;
+    }
+
+    // Markers are attached to their body when the model is read
+    for (unsigned int i=0; i<model.nbMarkers(); ++i) {
+        EXPECT_EQ(model.markerBodyId(i),
+                  model.GetBodyId(model.marker(i).parent().c_str()));
+    }
+
+    std::vector<utils::Matrix> expected(model.markersJacobian(Q));
+    utils::Matrix jacobian(model.allMarkersJacobian(Q));
+    EXPECT_EQ(jacobian.rows(), 3 * model.nbMarkers());
+    EXPECT_EQ(jacobian.cols(), model.nbQ());
+    for (unsigned int i=0; i<model.nbMarkers(); ++i) {
+        for (unsigned int j=0; j<3; ++j) {
+            for (unsigned int k=0; k<model.nbQ(); ++k) {
+                EXPECT_NEAR(jacobian(3*i+j, k), expected[i](j, k), requiredPrecision);
+            }
+        }
+    }
+
+    std::vector<utils::Matrix> expectedTechnical(model.technicalMarkersJacobian(Q,
+            false));
+    utils::Matrix technical(model.allTechnicalMarkersJacobian(Q, false));
+    EXPECT_EQ(technical.rows(), 3 * model.nbTechnicalMarkers());
+    for (unsigned int i=0; i<model.nbTechnicalMarkers(); ++i) {
+        for (unsigned int j=0; j<3; ++j) {
+            for (unsigned int k=0; k<model.nbQ(); ++k) {
+                EXPECT_NEAR(technical(3*i+j, k), expectedTechnical[i](j, k),
+                            requiredPrecision);
+            }
+        }
+    }
+}
+
+TEST(Markers, inverseKinematicsSequence)
+{
+    Model model(modelPathForGeneralTesting);
+    unsigned int nbFrames(3);
+    utils::Matrix Q(model.nbQ(), nbFrames);
+    for (unsigned int f=0; f<nbFrames; ++f) {
+        for (unsigned int i=0; i<model.nbQ(); ++i) {
+            Q(i, f) = 0.1 + 0.05 * static_cast<double>(f) + 0.01 * static_cast<double>(i);
+        }
+    }
+    utils::Matrix markers(model.technicalMarkersBatch(Q));
+    // The first marker is occluded on the second frame
+    markers.block(0, 1, 3, 1).setConstant(std::numeric_limits<double>::quiet_NaN());
+
+    rigidbody::GeneralizedCoordinates Qinit(model);
+    Qinit = Q.col(0) + utils::Vector::Constant(model.nbQ(), 0.05);
+    utils::Matrix Qrecons;
+    utils::Matrix residuals;
+    std::vector<int> nfev;
+    std::vector<int> njev;
+    std::vector<int> status;
+    model.inverseKinematicsSequence(markers, Qinit, Qrecons, residuals, nfev, njev, status);
+
+    EXPECT_EQ(Qrecons.rows(), model.nbQ());
+    EXPECT_EQ(Qrecons.cols(), nbFrames);
+    EXPECT_EQ(residuals.rows(), 3 * model.nbTechnicalMarkers());
+    for (unsigned int f=0; f<nbFrames; ++f) {
+        EXPECT_GT(status[f], 0);
+        EXPECT_GE(nfev[f], 1);
+        EXPECT_GE(njev[f], 1);
+        for (unsigned int i=0; i<residuals.rows(); ++i) {
+            if (f == 1 && i < 3) {
+                EXPECT_TRUE(std::isnan(residuals(i, f)));
+            } else {
+                EXPECT_NEAR(residuals(i, f), 0, 1e-5);
+            }
+        }
+    }
+
+    EXPECT_THROW(model.inverseKinematicsSequence(
+                     utils::Matrix(3, nbFrames), Qinit, Qrecons, residuals, nfev, njev, status),
+                 std::runtime_error);
+}
+#endif
+
 TEST(Markers, individualPositions)
 {
     Model model(modelPathMeshEqualsMarker);
@@ -2004,6 +2313,103 @@ TEST(Mesh, position)
     }
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+TEST(Mesh, batchPositions)
+{
+    Model model("models/pendulum.bioMod");
+    utils::Matrix Q(model.nbQ(), 3);
+    for (unsigned int f=0; f<Q.cols(); ++f) {
+        for (unsigned int i=0; i<model.nbQ(); ++i) {
+            Q(i, f) = 0.2 * i + 0.4 * f;
+        }
+    }
+
+    const std::vector<unsigned int>& offsets(model.meshPointsOffsets());
+    EXPECT_EQ(offsets.size(), model.nbSegment() + 1);
+    EXPECT_EQ(offsets.back(), model.meshPointsPacked().cols());
+
+    // The faces index the packed vertices
+    const std::vector<int>& faces(model.meshFacesPacked());
+    unsigned int nFaces(0);
+    for (unsigned int i=0; i<model.nbSegment(); ++i) {
+        for (auto face : model.meshFaces(i)) {
+            for (unsigned int j=0; j<3; ++j) {
+                EXPECT_EQ(faces[3*nFaces + j], face(j) + static_cast<int>(offsets[i]));
+            }
+            ++nFaces;
+        }
+    }
+    EXPECT_EQ(faces.size(), 3 * nFaces);
+
+    utils::Matrix points(model.meshPointsBatch(Q));
+    EXPECT_EQ(points.rows(), 3 * offsets.back());
+    EXPECT_EQ(points.cols(), Q.cols());
+    for (unsigned int f=0; f<Q.cols(); ++f) {
+        rigidbody::GeneralizedCoordinates q(Q.col(f));
+        std::vector<std::vector<utils::Vector3d>> expected(model.meshPoints(q));
+        for (unsigned int i=0; i<model.nbSegment(); ++i) {
+            for (unsigned int j=0; j<expected[i].size(); ++j) {
+                for (unsigned int xyz=0; xyz<3; ++xyz) {
+                    EXPECT_NEAR(points(3*(offsets[i] + j) + xyz, f), expected[i][j][xyz],
+                                requiredPrecision);
+                }
+            }
+        }
+    }
+
+    // The packed meshes follow the copies
+    Model copy(model);
+    EXPECT_EQ(copy.meshPointsOffsets(), offsets);
+    EXPECT_THROW(model.meshPointsBatch(utils::Matrix(model.nbQ() + 1, 2)),
+                 std::runtime_error);
+
+    // The meshes are packed again when a mesh is changed
+    rigidbody::Mesh newMesh;
+    newMesh.addPoint(utils::Vector3d(0.1, 0.2, 0.3));
+    newMesh.addPoint(utils::Vector3d(0.4, 0.5, 0.6));
+    newMesh.addPoint(utils::Vector3d(0.7, 0.8, 0.9));
+    newMesh.addPoint(utils::Vector3d(1.0, 1.1, 1.2));
+    newMesh.addFace(std::vector<int>({0, 1, 2}));
+    newMesh.addFace(std::vector<int>({1, 2, 3}));
+    size_t nbFacesReplaced(model.meshFaces(0).size());
+    const rigidbody::SegmentCharacteristics& characteristics(model.segment(0).characteristics());
+    model.updateSegmentCharacteristics(0, rigidbody::SegmentCharacteristics(
+                                           characteristics.mass(), characteristics.CoM(),
+                                           characteristics.inertia(), newMesh));
+    std::vector<unsigned int> newOffsets(model.meshPointsOffsets());
+    EXPECT_EQ(newOffsets[1] - newOffsets[0], 4);
+    for (unsigned int i=1; i<model.nbSegment(); ++i) {
+        EXPECT_EQ(newOffsets[i + 1] - newOffsets[i], model.mesh(i).nbVertex());
+    }
+    EXPECT_EQ(newOffsets.back(), model.meshPointsPacked().cols());
+    for (unsigned int j=0; j<4; ++j) {
+        EXPECT_NEAR((model.meshPointsPacked().col(j) - newMesh.point(j)).norm(), 0,
+                    requiredPrecision);
+    }
+    const std::vector<int>& newFaces(model.meshFacesPacked());
+    std::vector<int> expectedFaces({0, 1, 2, 1, 2, 3});
+    for (unsigned int j=0; j<expectedFaces.size(); ++j) {
+        EXPECT_EQ(newFaces[j], expectedFaces[j]);
+    }
+    EXPECT_EQ(newFaces.size(), expectedFaces.size() + 3 * (nFaces - nbFacesReplaced));
+
+    points = model.meshPointsBatch(Q);
+    EXPECT_EQ(points.rows(), 3 * newOffsets.back());
+    for (unsigned int f=0; f<Q.cols(); ++f) {
+        rigidbody::GeneralizedCoordinates q(Q.col(f));
+        std::vector<std::vector<utils::Vector3d>> expected(model.meshPoints(q));
+        for (unsigned int i=0; i<model.nbSegment(); ++i) {
+            for (unsigned int j=0; j<expected[i].size(); ++j) {
+                for (unsigned int xyz=0; xyz<3; ++xyz) {
+                    EXPECT_NEAR(points(3*(newOffsets[i] + j) + xyz, f), expected[i][j][xyz],
+                                requiredPrecision);
+                }
+            }
+        }
+    }
+}
+#endif
+
 TEST(Dynamics, Forward)
 {
     Model model(modelPathForGeneralTesting);
@@ -2140,6 +2546,109 @@ TEST(Dynamics, ForwardDynamicsFreeFloatingBase)
 
 }
 
+#ifndef BIORBD_USE_CASADI_MATH
+TEST(Dynamics, InverseDynamicsDerivatives)
+{
+    Model model(modelPathForGeneralTesting);
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedVelocity QDot(model);
+    rigidbody::GeneralizedAcceleration QDDot(model);
+    for (unsigned int i=0; i<model.nbQ(); ++i) {
+        Q[i] = 0.1 * static_cast<double>(i) - 0.4;
+        QDot[i] = 0.3 - 0.05 * static_cast<double>(i);
+        QDDot[i] = 0.2 * static_cast<double>(i);
+    }
+
+    utils::Matrix dTau_dQ, dTau_dQDot, dTau_dQDDot;
+    model.InverseDynamicsDerivatives(Q, QDot, QDDot, dTau_dQ, dTau_dQDot, dTau_dQDDot);
+    utils::Matrix M(model.massMatrix(Q));
+
+    // Compare to central finite differences
+    double h(1e-6);
+    for (unsigned int j=0; j<model.nbQ(); ++j) {
+        rigidbody::GeneralizedCoordinates Qplus(Q), Qminus(Q);
+        Qplus[j] += h;
+        Qminus[j] -= h;
+        utils::Vector dTau((model.InverseDynamics(Qplus, QDot, QDDot)
+                            - model.InverseDynamics(Qminus, QDot, QDDot)) / (2*h));
+
+        rigidbody::GeneralizedVelocity QDotPlus(QDot), QDotMinus(QDot);
+        QDotPlus[j] += h;
+        QDotMinus[j] -= h;
+        utils::Vector dTauDot((model.InverseDynamics(Q, QDotPlus, QDDot)
+                               - model.InverseDynamics(Q, QDotMinus, QDDot)) / (2*h));
+
+        for (unsigned int i=0; i<model.nbGeneralizedTorque(); ++i) {
+            EXPECT_NEAR(dTau_dQ(i, j), dTau[i], 1e-5 * (1 + std::fabs(dTau[i])));
+            EXPECT_NEAR(dTau_dQDot(i, j), dTauDot[i], 1e-5 * (1 + std::fabs(dTauDot[i])));
+            EXPECT_NEAR(dTau_dQDDot(i, j), M(i, j), requiredPrecision);
+        }
+    }
+}
+
+TEST(Dynamics, ForwardDynamicsDerivatives)
+{
+    Model model(modelPathForGeneralTesting);
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedVelocity QDot(model);
+    rigidbody::GeneralizedTorque Tau(model);
+    for (unsigned int i=0; i<model.nbQ(); ++i) {
+        Q[i] = 0.1 * static_cast<double>(i) - 0.4;
+        QDot[i] = 0.3 - 0.05 * static_cast<double>(i);
+        Tau[i] = 0.5 * static_cast<double>(i);
+    }
+
+    utils::Matrix dQDDot_dQ, dQDDot_dQDot, dQDDot_dTau;
+    model.ForwardDynamicsDerivatives(Q, QDot, Tau, dQDDot_dQ, dQDDot_dQDot, dQDDot_dTau);
+    utils::Matrix Minv(model.massMatrix(Q).inverse());
+
+    // Compare to central finite differences
+    double h(1e-6);
+    for (unsigned int j=0; j<model.nbQ(); ++j) {
+        rigidbody::GeneralizedCoordinates Qplus(Q), Qminus(Q);
+        Qplus[j] += h;
+        Qminus[j] -= h;
+        utils::Vector dQDDot((model.ForwardDynamics(Qplus, QDot, Tau)
+                              - model.ForwardDynamics(Qminus, QDot, Tau)) / (2*h));
+
+        rigidbody::GeneralizedVelocity QDotPlus(QDot), QDotMinus(QDot);
+        QDotPlus[j] += h;
+        QDotMinus[j] -= h;
+        utils::Vector dQDDotDot((model.ForwardDynamics(Q, QDotPlus, Tau)
+                                 - model.ForwardDynamics(Q, QDotMinus, Tau)) / (2*h));
+
+        for (unsigned int i=0; i<model.nbQddot(); ++i) {
+            EXPECT_NEAR(dQDDot_dQ(i, j), dQDDot[i], 1e-4 * (1 + std::fabs(dQDDot[i])));
+            EXPECT_NEAR(dQDDot_dQDot(i, j), dQDDotDot[i], 1e-4 * (1 + std::fabs(dQDDotDot[i])));
+            EXPECT_NEAR(dQDDot_dTau(i, j), Minv(i, j), requiredPrecision);
+        }
+    }
+}
+
+TEST(Dynamics, DynamicsDerivativesWithSoftContacts)
+{
+    Model model(modelWithSoftContact);
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedVelocity QDot(model);
+    rigidbody::GeneralizedAcceleration QDDot(model);
+    rigidbody::GeneralizedTorque Tau(model);
+    Q.setZero();
+    QDot.setZero();
+    QDDot.setZero();
+    Tau.setZero();
+
+    // The soft contact forces are not part of the derivatives
+    utils::Matrix dTau_dQ, dTau_dQDot, dTau_dQDDot;
+    EXPECT_THROW(model.InverseDynamicsDerivatives(
+                     Q, QDot, QDDot, dTau_dQ, dTau_dQDot, dTau_dQDDot),
+                 std::runtime_error);
+    utils::Matrix dQDDot_dQ, dQDDot_dQDot, dQDDot_dTau;
+    EXPECT_THROW(model.ForwardDynamicsDerivatives(
+                     Q, QDot, Tau, dQDDot_dQ, dQDDot_dQDot, dQDDot_dTau),
+                 std::runtime_error);
+}
+#endif
+
 #ifdef MODULE_ACTUATORS
 TEST(Dynamics, ForwardChangingMass)
 {
@@ -2427,6 +2936,139 @@ TEST(Kalman, markers)
         EXPECT_NEAR(qddot, 0, 1e-6);
     }
 }
+
+TEST(Kalman, markersTrial)
+{
+    Model model(modelPathForGeneralTesting);
+    rigidbody::KalmanReconsMarkers kalmanTrial(model);
+    rigidbody::KalmanReconsMarkers kalmanFrames(model);
+
+    unsigned int nbFrames(3);
+    utils::Matrix Qref(model.nbQ(), nbFrames);
+    Qref.col(0).setConstant(0.2);
+    Qref.col(1).setConstant(0.3);
+    Qref.col(2).setConstant(0.3);
+    utils::Matrix targetMarkers(model.technicalMarkersBatch(Qref));
+    // The first marker is occluded on the last frame
+    targetMarkers.block(0, 2, 3, 1).setConstant(std::numeric_limits<double>::quiet_NaN());
+
+    utils::Matrix Q, Qdot, Qddot;
+    kalmanTrial.reconstructTrial(model, targetMarkers, Q, Qdot, Qddot);
+    EXPECT_EQ(Q.rows(), model.nbQ());
+    EXPECT_EQ(Q.cols(), nbFrames);
+
+    // Same as reconstructing frame by frame
+    rigidbody::GeneralizedCoordinates Q_tp(model);
+    rigidbody::GeneralizedVelocity Qdot_tp(model);
+    rigidbody::GeneralizedAcceleration Qddot_tp(model);
+    for (unsigned int f=0; f<nbFrames; ++f) {
+        utils::Vector T(targetMarkers.col(f));
+        kalmanFrames.reconstructFrame(model, T, &Q_tp, &Qdot_tp, &Qddot_tp);
+        for (unsigned int i=0; i<model.nbQ(); ++i) {
+            EXPECT_NEAR(Q(i, f), Q_tp[i], requiredPrecision);
+            EXPECT_NEAR(Qdot(i, f), Qdot_tp[i], requiredPrecision);
+            EXPECT_NEAR(Qddot(i, f), Qddot_tp[i], requiredPrecision);
+        }
+    }
+
+    EXPECT_THROW(kalmanTrial.reconstructTrial(
+                     model, utils::Matrix(3, nbFrames), Q, Qdot, Qddot),
+                 std::runtime_error);
+}
+#endif
+
+#ifndef BIORBD_USE_CASADI_MATH
+// Kalman filter inverting the full innovation covariance, the occluded markers being
+// cancelled in its inverse instead of being dropped
+class KalmanReconsMarkersFullGain : public rigidbody::KalmanReconsMarkers
+{
+public:
+    KalmanReconsMarkersFullGain(Model& model) :
+        rigidbody::KalmanReconsMarkers(model)
+    {}
+
+    void reconstructFrameFullGain(
+        Model& model,
+        const utils::Vector& Tobs,
+        rigidbody::GeneralizedCoordinates* Q,
+        rigidbody::GeneralizedVelocity* Qdot,
+        rigidbody::GeneralizedAcceleration* Qddot)
+    {
+        utils::Vector xkm(*m_A * *m_xp);
+        rigidbody::GeneralizedCoordinates Q_tp(xkm.topRows(*m_nbDof));
+        model.UpdateKinematicsCustom(&Q_tp, nullptr, nullptr);
+        std::vector<rigidbody::NodeSegment> zest_tp(model.technicalMarkers(Q_tp, true, false));
+        utils::Matrix J_tp(model.allTechnicalMarkersJacobian(Q_tp, true, false));
+
+        utils::Matrix H(utils::Matrix::Zero(*m_nMeasure, *m_nbDof*3));
+        utils::Vector zest(utils::Vector::Zero(*m_nMeasure));
+        utils::Vector measure(Tobs);
+        std::vector<unsigned int> occlusion;
+        for (unsigned int i=0; i<*m_nMeasure/3; ++i) {
+            if (Tobs.segment(i*3, 3).allFinite()) {
+                H.block(i*3, 0, 3, *m_nbDof) = J_tp.block(i*3, 0, 3, *m_nbDof);
+                zest.segment(i*3, 3) = zest_tp[i];
+            } else {
+                occlusion.push_back(i);
+            }
+        }
+
+        utils::Matrix Pkm(*m_A * *m_Pp * m_A->transpose() + *m_Q);
+        utils::Matrix InvTp((H * Pkm * H.transpose() + *m_R).inverse());
+        for (unsigned int i : occlusion) {
+            for (unsigned int j=i*3; j<i*3+3; ++j) {
+                InvTp(j, j) = 0;
+                measure(j) = 0;
+            }
+        }
+        utils::Matrix K(Pkm * H.transpose() * InvTp);
+        *m_xp = xkm + K * (measure - zest);
+        utils::Matrix IKH(utils::Matrix::Identity(3 * *m_nbDof, 3 * *m_nbDof) - K * H);
+        *m_Pp = IKH * Pkm * IKH.transpose() + K * *m_R * K.transpose();
+        getState(Q, Qdot, Qddot);
+    }
+};
+
+TEST(Kalman, markersOccluded)
+{
+    Model model(modelPathForGeneralTesting);
+    rigidbody::KalmanReconsMarkers kalman(model);
+
+    unsigned int nbFrames(6);
+    utils::Matrix Qref(model.nbQ(), nbFrames);
+    for (unsigned int f=0; f<nbFrames; ++f) {
+        Qref.col(f).setConstant(0.2 + 0.02 * f);
+    }
+    utils::Matrix targetMarkers(model.technicalMarkersBatch(Qref));
+    double nan(std::numeric_limits<double>::quiet_NaN());
+    targetMarkers.block(0, 2, 3, 1).setConstant(nan);
+    targetMarkers.block(3, 3, 3, 1).setConstant(nan);
+    targetMarkers.block(12, 3, 3, 1).setConstant(nan);
+    targetMarkers(1, 4) = nan;
+
+    // Both filters start from the same state once the first frame is filtered
+    rigidbody::GeneralizedCoordinates Q(model);
+    rigidbody::GeneralizedVelocity Qdot(model);
+    rigidbody::GeneralizedAcceleration Qddot(model);
+    kalman.reconstructFrame(model, utils::Vector(targetMarkers.col(0)), &Q, &Qdot, &Qddot);
+    KalmanReconsMarkersFullGain kalmanFullGain(model);
+    kalmanFullGain.DeepCopy(kalman);
+
+    rigidbody::GeneralizedCoordinates QFullGain(model);
+    rigidbody::GeneralizedVelocity QdotFullGain(model);
+    rigidbody::GeneralizedAcceleration QddotFullGain(model);
+    for (unsigned int f=1; f<nbFrames; ++f) {
+        utils::Vector T(targetMarkers.col(f));
+        kalman.reconstructFrame(model, T, &Q, &Qdot, &Qddot);
+        kalmanFullGain.reconstructFrameFullGain(model, T, &QFullGain, &QdotFullGain, &QddotFullGain);
+        for (unsigned int i=0; i<model.nbQ(); ++i) {
+            EXPECT_TRUE(std::isfinite(Q[i]));
+            EXPECT_NEAR(Q[i], QFullGain[i], 1e-8);
+            EXPECT_NEAR(Qdot[i], QdotFullGain[i], 1e-6);
+            EXPECT_NEAR(Qddot[i], QddotFullGain[i], 1e-4);
+        }
+    }
+}
 #endif
 
 #ifndef SKIP_LONG_TESTS
@@ -4,6 +4,7 @@
 
 #include "BiorbdModel.h"
 #include "Utils/String.h"
+#include "Utils/Equation.h"
 #include "Utils/Path.h"
 #include "Utils/Matrix.h"
 #include "Utils/Vector3d.h"
@@ -830,6 +831,32 @@ TEST(ModelReading, equations)
     }
 }
 
+TEST(Equation, compiled)
+{
+    std::map<utils::Equation, double> variables;
+    variables["$first"] = 2;
+    variables["$second"] = -3;
+
+    // The compiled equations give the same results as the split ones
+    std::vector<utils::Equation> equations = {
+        "1.25", "-3--6", "6/-2", "2-3+4", "2+((2+3)*3)*2", "-(1)+4", "1e-2",
+        "1.5e-3*2", "2*-pi", "$first*-$second", "-($first+$second)/4"
+    };
+    for (auto& eq : equations) {
+        EXPECT_NEAR(utils::Equation::evaluateEquation(eq, variables),
+                    utils::Equation::evaluateEquation(
+                        utils::Equation::splitIntoEquation(eq, variables)), requiredPrecision);
+    }
+
+    // The variables are not frozen in the compiled equation
+    variables["$first"] = 5;
+    EXPECT_NEAR(utils::Equation::evaluateEquation("$first*-$second", variables), 15,
+                requiredPrecision);
+
+    EXPECT_THROW(utils::Equation::evaluateEquation("(2+3", variables), std::runtime_error);
+    EXPECT_THROW(utils::Equation::evaluateEquation("$third*2", variables), std::runtime_error);
+}
+
 TEST(Quaternion, creation)
 {
     {